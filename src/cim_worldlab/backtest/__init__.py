@@ -0,0 +1,37 @@
+"""
+backtest 包：用历史事件日志并行回测候选策略
+
+- ensure_columns / open_columns：列式缓存（解码一次，mmap 共享）
+- Candidate / threshold_sweep / load_candidate：候选策略
+- run_backtest / format_table：并行回测与结果对比表
+- score_alerts：按评估口径给报警打分（回测与场景模拟共用）
+"""
+from .columnar import Columns, build_columns, default_cache_path, ensure_columns, open_columns
+from .engine import (
+    Candidate,
+    EvaluationSpec,
+    evaluate_candidate,
+    format_table,
+    load_candidate,
+    load_evaluation,
+    run_backtest,
+    score_alerts,
+    threshold_sweep,
+)
+
+__all__ = [
+    "Candidate",
+    "Columns",
+    "EvaluationSpec",
+    "build_columns",
+    "default_cache_path",
+    "ensure_columns",
+    "evaluate_candidate",
+    "format_table",
+    "load_candidate",
+    "load_evaluation",
+    "open_columns",
+    "run_backtest",
+    "score_alerts",
+    "threshold_sweep",
+]
@@ -0,0 +1,219 @@
+"""
+columnar.py
+===========
+列式缓存（columnar cache）：把 events.jsonl 里的外部输入“解码一次”，存成紧凑的二进制列
+
+为什么要列式？
+- 回测要把同一份历史（几个月的 events.jsonl）用几十套候选策略反复评估
+- 每套策略都去 json.loads 一遍 JSONL，解码成本会乘以候选数
+- 策略真正需要的只有几列：t、(type, channel, name)、若干数值字段（例如 data.temp_c）
+- 所以：解码一次 -> 写成列 -> 各个工作进程用 mmap 只读共享（操作系统页缓存只有一份）
+
+文件格式：
+    MAGIC(8 字节) | header 长度(8 字节, little-endian) | header JSON | 对齐填充 | 各列原始数组
+
+header 记录：
+- n：行数（外部输入事件数）
+- source：源文件 path/size/mtime_ns（用来判断缓存是否过期）
+- keys：(event_type, channel, name) 字典表；key 列存的是它的下标
+- fields：已抽取的数值字段路径；缺失/非数值用 NaN 表示
+- columns：每列的 offset（相对数据区）、typecode、长度
+"""
+
+from __future__ import annotations
+
+import json
+import math
+import mmap
+import struct
+import sys
+from array import array
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from cim_worldlab.world.events.codec import loads
+from cim_worldlab.world.events.external_input import EXTERNAL_INPUT_TYPE
+from cim_worldlab.world.policy.declarative import _MISSING, _as_float, _compile_getter
+
+MAGIC = b"CIMCOL01"
+_ALIGN = 8
+
+Key = Tuple[str, Optional[str], Optional[str]]
+
+
+def _field_column(field_path: str) -> str:
+    return f"f:{field_path}"
+
+
+def _source_info(path: Path) -> Dict[str, Any]:
+    st = path.stat()
+    return {"path": str(path), "size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+
+def build_columns(events_path: Path, cache_path: Path, fields: Iterable[str]) -> None:
+    """
+    扫描一次 events.jsonl，只解码 EXTERNAL_INPUT 行，写出列式缓存文件。
+    """
+    fields = sorted(set(fields))
+    getters = [_compile_getter(f) for f in fields]
+
+    t_col = array("q")
+    key_col = array("i")
+    value_cols = [array("d") for _ in fields]
+    keys: List[Key] = []
+    key_index: Dict[Key, int] = {}
+    nan = math.nan
+    marker = EXTERNAL_INPUT_TYPE.encode("ascii")
+
+    with events_path.open("rb") as f:
+        for raw in f:
+            # 先用子串粗筛，WORLD_TICK / POLICY_DECISION 等行不做 json 解码
+            if marker not in raw:
+                continue
+            obj = loads(raw)
+            if obj.get("type") != EXTERNAL_INPUT_TYPE:
+                continue
+            payload = obj.get("payload") or {}
+
+            k: Key = (EXTERNAL_INPUT_TYPE, payload.get("channel"), payload.get("name"))
+            code = key_index.get(k)
+            if code is None:
+                code = key_index[k] = len(keys)
+                keys.append(k)
+
+            t_col.append(int(obj["t"]))
+            key_col.append(code)
+            for g, col in zip(getters, value_cols):
+                v = g(payload)
+                x = None if v is _MISSING else _as_float(v)
+                col.append(nan if x is None else x)
+
+    columns: List[Tuple[str, array]] = [("t", t_col), ("key", key_col)]
+    columns += [(_field_column(f), c) for f, c in zip(fields, value_cols)]
+
+    layout: Dict[str, Dict[str, Any]] = {}
+    offset = 0
+    for name, arr in columns:
+        layout[name] = {"offset": offset, "typecode": arr.typecode, "length": len(arr)}
+        nbytes = len(arr) * arr.itemsize
+        offset += nbytes + (-nbytes % _ALIGN)
+
+    header = json.dumps({
+        "n": len(t_col),
+        "byteorder": sys.byteorder,
+        "source": _source_info(events_path),
+        "keys": [list(k) for k in keys],
+        "fields": fields,
+        "columns": layout,
+    }, ensure_ascii=False).encode("utf-8")
+
+    cache_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = cache_path.with_name(cache_path.name + ".tmp")
+    with tmp.open("wb") as out:
+        out.write(MAGIC)
+        out.write(struct.pack("<Q", len(header)))
+        out.write(header)
+        out.write(b"\0" * (-(len(MAGIC) + 8 + len(header)) % _ALIGN))
+        for _, arr in columns:
+            data = arr.tobytes()
+            out.write(data)
+            out.write(b"\0" * (-len(data) % _ALIGN))
+    tmp.replace(cache_path)
+
+
+def read_header(cache_path: Path) -> Optional[Dict[str, Any]]:
+    """读取缓存 header；文件不存在或格式不对返回 None。"""
+    try:
+        with cache_path.open("rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                return None
+            (length,) = struct.unpack("<Q", f.read(8))
+            return json.loads(f.read(length).decode("utf-8"))
+    except (OSError, ValueError, struct.error):
+        return None
+
+
+@dataclass
+class Columns:
+    """
+    mmap 打开的列式缓存（只读）。
+
+    - t / key / column(field) 都是 memoryview（按下标取值，零拷贝）
+    - keys：key 列的字典表
+    """
+    n: int
+    keys: List[Key]
+    fields: List[str]
+    t: Any
+    key: Any
+    _values: Dict[str, Any] = field(default_factory=dict)
+    _mm: Any = None
+
+    def column(self, field_path: str) -> Any:
+        try:
+            return self._values[field_path]
+        except KeyError:
+            raise ValueError(f"Field {field_path!r} is not in the columnar cache") from None
+
+    def codes_matching(self, event_type: str, channel: Optional[str], name: Optional[str]) -> Set[int]:
+        """返回满足订阅声明（channel/name 为 None 表示通配）的 key 下标集合。"""
+        return {
+            i for i, (et, c, nm) in enumerate(self.keys)
+            if et == event_type and (channel is None or c == channel) and (name is None or nm == name)
+        }
+
+
+def open_columns(cache_path: Path) -> Columns:
+    header = read_header(cache_path)
+    if header is None:
+        raise ValueError(f"Not a columnar cache: {cache_path}")
+    if header.get("byteorder") != sys.byteorder:
+        raise ValueError(f"Columnar cache byte order mismatch: {cache_path}")
+
+    with cache_path.open("rb") as f:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    head_len = len(MAGIC) + 8 + struct.unpack("<Q", mm[len(MAGIC):len(MAGIC) + 8])[0]
+    data_start = head_len + (-head_len % _ALIGN)
+    view = memoryview(mm)
+
+    def col(name: str) -> Any:
+        spec = header["columns"][name]
+        itemsize = array(spec["typecode"]).itemsize
+        start = data_start + spec["offset"]
+        return view[start:start + spec["length"] * itemsize].cast(spec["typecode"])
+
+    cols = Columns(
+        n=int(header["n"]),
+        keys=[tuple(k) for k in header["keys"]],  # type: ignore[misc]
+        fields=list(header["fields"]),
+        t=col("t"),
+        key=col("key"),
+        _mm=mm,
+    )
+    for f in cols.fields:
+        cols._values[f] = col(_field_column(f))
+    return cols
+
+
+def ensure_columns(events_path: Path, cache_path: Path, fields: Sequence[str]) -> Path:
+    """
+    缓存存在、源文件没变、且已包含所需字段 -> 直接复用；
+    否则重新解码（新缓存包含旧字段 + 新字段）。
+    """
+    header = read_header(cache_path)
+    needed = set(fields)
+    if header is not None:
+        src = header.get("source", {})
+        cur = _source_info(events_path)
+        fresh = src.get("size") == cur["size"] and src.get("mtime_ns") == cur["mtime_ns"]
+        if fresh and needed <= set(header.get("fields", [])):
+            return cache_path
+        if fresh:
+            needed |= set(header.get("fields", []))
+    build_columns(events_path, cache_path, needed)
+    return cache_path
+
+
+def default_cache_path(events_path: Path) -> Path:
+    return events_path.with_name(events_path.name + ".cols")
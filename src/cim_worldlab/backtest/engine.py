@@ -0,0 +1,255 @@
+"""
+engine.py
+=========
+并行策略回测（backtest）
+
+问题：
+- 想调 temp_high_threshold_c（以及以后的各种规则），需要用几个月的 events.jsonl
+  对比很多套候选配置：各产生多少决策？第一次报警在什么时候？误报率多少？
+- 一套一套串行 replay 太慢；而且每套都重新解码日志是浪费
+
+做法：
+1) 解码一次：把日志里的外部输入写成列式缓存（columnar.py），所有候选共享
+2) 候选配置分发到进程池：每个工作进程用 mmap 打开同一个缓存文件（零拷贝、只读）
+3) 每个候选只在列上跑阈值比较，输出对比指标，汇总成一张表
+
+评估口径（evaluation spec，例如 projects/P01_single_excursion/evaluation.yaml）：
+- truth：什么样的读数算“真的超限”（ground truth），格式与声明式规则的条件一样
+- 指标：
+  - decision_count / decisions_by_rule：决策数量
+  - first_alert_t：第一次报警的世界时间；alert_delay = first_alert_t - first_true_t
+  - false_alarm_rate：报警的输入里，不是真超限的占比
+  - miss_rate：真超限的输入里，没有报警的占比
+
+限制：
+- 只回测“无状态、数值型”的声明式阈值规则（ThresholdRule）；
+  其它规则会被拒绝（ValueError），避免给出看似正确的错误结果
+"""
+
+from __future__ import annotations
+
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, replace
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+from cim_worldlab.backtest.columnar import Columns, default_cache_path, ensure_columns, open_columns
+from cim_worldlab.world.events.external_input import EXTERNAL_INPUT_TYPE
+from cim_worldlab.world.policy.declarative import ThresholdRule, _compile_predicate, parse_rule, parse_rules
+
+
+@dataclass(frozen=True)
+class Candidate:
+    """一套候选策略：名字 + 阈值规则列表（可 pickle，直接发给工作进程）。"""
+    name: str
+    rules: List[ThresholdRule]
+
+
+@dataclass(frozen=True)
+class EvaluationSpec:
+    """回测评估口径：truth 是“真超限”的判定条件（用 ThresholdRule 表达）。"""
+    truth: Optional[ThresholdRule] = None
+
+
+def load_json_or_yaml(path: Path) -> Dict[str, Any]:
+    """
+    读取 .json / .yaml 文件。YAML 需要可选依赖 PyYAML。
+    """
+    text = path.read_text(encoding="utf-8")
+    if path.suffix.lower() in (".yaml", ".yml"):
+        try:
+            import yaml
+        except ImportError:
+            raise ValueError(f"PyYAML is required to read {path} (pip install PyYAML)") from None
+        return yaml.safe_load(text) or {}
+    return json.loads(text) if text.strip() else {}
+
+
+def load_evaluation(path: Optional[Path]) -> EvaluationSpec:
+    if path is None:
+        return EvaluationSpec()
+    doc = load_json_or_yaml(path)
+    truth = doc.get("truth")
+    if not truth:
+        return EvaluationSpec()
+    spec = {"rule_id": "TRUTH", "suggested_action": "NONE", **truth}
+    return EvaluationSpec(truth=parse_rule(spec))
+
+
+def load_candidate(path: Path, name: Optional[str] = None) -> Candidate:
+    doc = json.loads(path.read_text(encoding="utf-8"))
+    return Candidate(name=name or path.stem, rules=parse_rules(doc))
+
+
+def threshold_sweep(base: Candidate, thresholds: Sequence[float], rule_id: Optional[str] = None) -> List[Candidate]:
+    """
+    以 base 为模板，只改一条规则（默认第一条）的阈值，生成一组候选。
+    """
+    if not base.rules:
+        raise ValueError("Base policy has no rules")
+    target = rule_id or base.rules[0].rule_id
+    if target not in {r.rule_id for r in base.rules}:
+        raise ValueError(f"Rule {target!r} not found in base policy")
+
+    out = []
+    for thr in thresholds:
+        rules = [replace(r, threshold=float(thr)) if r.rule_id == target else r for r in base.rules]
+        out.append(Candidate(name=f"{target}@{thr:g}", rules=rules))
+    return out
+
+
+def _check_backtestable(rule: ThresholdRule) -> None:
+    if not rule.numeric:
+        raise ValueError(f"Rule {rule.rule_id}: only numeric threshold rules can be backtested")
+    if rule.event_type != EXTERNAL_INPUT_TYPE:
+        raise ValueError(f"Rule {rule.rule_id}: only EXTERNAL_INPUT rules can be backtested")
+
+
+def rule_mask(cols: Columns, rule: ThresholdRule) -> bytearray:
+    """逐行计算规则是否命中（1/0）。"""
+    n = cols.n
+    mask = bytearray(n)
+    codes = cols.codes_matching(rule.event_type, rule.channel, rule.name)
+    if not codes or n == 0:
+        return mask
+    pred, _ = _compile_predicate(rule.op, rule.threshold)
+    values = cols.column(rule.field)
+    keys = cols.key
+    for i in range(n):
+        if keys[i] in codes:
+            x = values[i]
+            if x == x and pred(x):
+                mask[i] = 1
+    return mask
+
+
+def score_alerts(
+    name: str,
+    ts: Sequence[int],
+    alerted: Sequence[int],
+    by_rule: Dict[str, int],
+    truth: Optional[Sequence[int]] = None,
+) -> Dict[str, Any]:
+    """
+    按评估口径给一组报警打分（回测与场景模拟共用，保证指标口径一致）。
+
+    - ts：每个输入的世界时间
+    - alerted / truth：每个输入是否报警 / 是否真超限（1/0，与 ts 等长）
+    - by_rule：每条规则的决策数
+    """
+    n = len(ts)
+    first_alert_t = next((ts[i] for i in range(n) if alerted[i]), None)
+    alerted_n = sum(1 for a in alerted if a)
+    row: Dict[str, Any] = {
+        "candidate": name,
+        "inputs": n,
+        "decision_count": sum(by_rule.values()),
+        "decisions_by_rule": by_rule,
+        "alerted_inputs": alerted_n,
+        "first_alert_t": first_alert_t,
+    }
+
+    if truth is not None:
+        true_n = sum(1 for tr in truth if tr)
+        false_alarms = sum(1 for a, tr in zip(alerted, truth) if a and not tr)
+        missed = sum(1 for a, tr in zip(alerted, truth) if tr and not a)
+        first_true_t = next((ts[i] for i in range(n) if truth[i]), None)
+        row.update({
+            "true_excursions": true_n,
+            "false_alarms": false_alarms,
+            "missed": missed,
+            "false_alarm_rate": false_alarms / alerted_n if alerted_n else 0.0,
+            "miss_rate": missed / true_n if true_n else 0.0,
+            "first_true_t": first_true_t,
+            "alert_delay": (first_alert_t - first_true_t) if first_alert_t is not None and first_true_t is not None else None,
+        })
+    return row
+
+
+def evaluate_candidate(cols: Columns, cand: Candidate, spec: EvaluationSpec) -> Dict[str, Any]:
+    """对一套候选策略计算回测指标（纯函数：同样的列 + 候选 -> 同样的结果）。"""
+    n = cols.n
+    alerted = bytearray(n)
+    by_rule: Dict[str, int] = {}
+    for rule in cand.rules:
+        m = rule_mask(cols, rule)
+        by_rule[rule.rule_id] = m.count(1)
+        alerted = bytearray(a | b for a, b in zip(alerted, m)) if by_rule[rule.rule_id] else alerted
+
+    truth = rule_mask(cols, spec.truth) if spec.truth is not None else None
+    return score_alerts(cand.name, cols.t, alerted, by_rule, truth)
+
+
+# -------------------------------
+# 进程池：每个工作进程打开一次缓存
+# -------------------------------
+
+_WORKER_COLUMNS: Optional[Columns] = None
+
+
+def _init_worker(cache_path: str) -> None:
+    global _WORKER_COLUMNS
+    _WORKER_COLUMNS = open_columns(Path(cache_path))
+
+
+def _run_in_worker(args: Any) -> Dict[str, Any]:
+    cand, spec = args
+    assert _WORKER_COLUMNS is not None
+    return evaluate_candidate(_WORKER_COLUMNS, cand, spec)
+
+
+def run_backtest(
+    events_path: Path,
+    candidates: Sequence[Candidate],
+    spec: EvaluationSpec = EvaluationSpec(),
+    workers: Optional[int] = None,
+    cache_path: Optional[Path] = None,
+) -> List[Dict[str, Any]]:
+    """
+    回测入口：返回每个候选一行指标（顺序与 candidates 一致）。
+
+    - workers：进程数（默认 CPU 核数，且不超过候选数）；1 表示在当前进程里跑
+    - cache_path：列式缓存位置（默认 events.jsonl.cols，源文件不变时复用）
+    """
+    if not candidates:
+        return []
+    for cand in candidates:
+        for r in cand.rules:
+            _check_backtestable(r)
+    if spec.truth is not None:
+        _check_backtestable(spec.truth)
+
+    fields = {r.field for c in candidates for r in c.rules}
+    if spec.truth is not None:
+        fields.add(spec.truth.field)
+
+    cache = ensure_columns(events_path, cache_path or default_cache_path(events_path), sorted(fields))
+
+    n_workers = min(workers or os.cpu_count() or 1, len(candidates))
+    if n_workers <= 1:
+        cols = open_columns(cache)
+        return [evaluate_candidate(cols, c, spec) for c in candidates]
+
+    with ProcessPoolExecutor(max_workers=n_workers, initializer=_init_worker, initargs=(str(cache),)) as pool:
+        return list(pool.map(_run_in_worker, [(c, spec) for c in candidates]))
+
+
+_TABLE_COLUMNS = ["candidate", "decision_count", "first_alert_t", "alert_delay", "false_alarm_rate", "miss_rate"]
+
+
+def format_table(rows: Sequence[Dict[str, Any]], columns: Optional[Sequence[str]] = None) -> str:
+    """把回测结果排成一张对齐的文本表（投屏友好）；columns 默认是回测的对比列。"""
+    present = [c for c in (columns or _TABLE_COLUMNS) if any(c in r for r in rows)]
+
+    def fmt(v: Any) -> str:
+        if v is None:
+            return "-"
+        if isinstance(v, float):
+            return f"{v:.3f}"
+        return str(v)
+
+    table = [present] + [[fmt(r.get(c)) for c in present] for r in rows]
+    widths = [max(len(line[i]) for line in table) for i in range(len(present))]
+    return "\n".join("  ".join(cell.ljust(w) for cell, w in zip(line, widths)).rstrip() for line in table)
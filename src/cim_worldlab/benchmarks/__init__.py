@@ -0,0 +1,27 @@
+"""
+benchmarks 包：性能基准套件
+
+- BENCHMARKS / benchmark：基准注册表与注册装饰器
+- BenchContext / BenchResult / run_suite：运行基准、产出 JSON 结果
+- compare_results：与基线对比，标记性能回退
+- synthetic_inputs / synthetic_events：确定性的合成数据
+"""
+from .generators import synthetic_events, synthetic_inputs
+from .suite import BENCHMARKS, BenchContext, BenchResult, benchmark, run_suite, select_benchmarks
+from .compare import Comparison, compare_results, has_regression, load_results, save_results
+
+__all__ = [
+    "BENCHMARKS",
+    "BenchContext",
+    "BenchResult",
+    "Comparison",
+    "benchmark",
+    "compare_results",
+    "has_regression",
+    "load_results",
+    "run_suite",
+    "save_results",
+    "select_benchmarks",
+    "synthetic_events",
+    "synthetic_inputs",
+]
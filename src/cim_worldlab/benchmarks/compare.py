@@ -0,0 +1,95 @@
+"""
+compare.py
+==========
+基准结果对比（回归检测）
+
+用法：
+- 先跑一次并保存为基线：bench --save-baseline benchmarks_baseline.json
+- 之后每次：bench --baseline benchmarks_baseline.json
+  -> 每个用例对比 seconds，变慢超过 threshold（默认 20%）就标记为 regression
+
+注意：
+- 基线和当前结果必须在同一台机器、同样的 sizes 下才有意义
+- 只比较 seconds（越小越好）；extra 字段仅供参考
+"""
+
+from __future__ import annotations
+
+import json
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+OK = "ok"
+REGRESSION = "regression"
+IMPROVEMENT = "improvement"
+NEW = "new"
+MISSING = "missing"
+
+
+@dataclass(frozen=True)
+class Comparison:
+    """
+    单个用例的对比结果。
+    ratio = current / baseline（>1 表示变慢）
+    """
+    key: str
+    status: str
+    baseline_s: Optional[float]
+    current_s: Optional[float]
+    ratio: Optional[float]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "key": self.key,
+            "status": self.status,
+            "baseline_s": self.baseline_s,
+            "current_s": self.current_s,
+            "ratio": self.ratio,
+        }
+
+
+def load_results(path: Path) -> Dict[str, Any]:
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def save_results(path: Path, results: Dict[str, Any]) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(results, ensure_ascii=False, indent=2), encoding="utf-8")
+
+
+def compare_results(current: Dict[str, Any], baseline: Dict[str, Any], threshold: float = 0.2) -> List[Comparison]:
+    """
+    对比两份 run_suite 结果。
+
+    - 变慢超过 threshold：REGRESSION
+    - 变快超过 threshold：IMPROVEMENT
+    - 只在当前结果里出现：NEW；只在基线里出现：MISSING
+    """
+    cur = {r["key"]: r for r in current.get("results", [])}
+    base = {r["key"]: r for r in baseline.get("results", [])}
+
+    out: List[Comparison] = []
+    for key in sorted(set(cur) | set(base)):
+        c = cur.get(key)
+        b = base.get(key)
+        if c is None:
+            out.append(Comparison(key, MISSING, b["seconds"], None, None))
+            continue
+        if b is None:
+            out.append(Comparison(key, NEW, None, c["seconds"], None))
+            continue
+
+        ratio = c["seconds"] / b["seconds"] if b["seconds"] > 0 else float("inf")
+        if ratio > 1.0 + threshold:
+            status = REGRESSION
+        elif ratio < 1.0 / (1.0 + threshold):
+            status = IMPROVEMENT
+        else:
+            status = OK
+        out.append(Comparison(key, status, b["seconds"], c["seconds"], ratio))
+    return out
+
+
+def has_regression(comparisons: List[Comparison]) -> bool:
+    return any(c.status == REGRESSION for c in comparisons)
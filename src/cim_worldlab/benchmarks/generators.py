@@ -0,0 +1,95 @@
+"""
+generators.py
+=============
+确定性的合成数据生成器（给 benchmark 用）
+
+为什么要“确定性”？
+- 基准测试要可比较：今天跑和明天跑，输入必须一模一样
+- 所以所有随机数都来自 random.Random(seed)，不碰全局随机状态
+
+提供两类数据：
+- synthetic_inputs(n)：外部输入（ExternalInput），模拟设备温度 / 订单 / 人工操作
+- synthetic_events(n)：已经“记录好”的事件流（WORLD_TICK / EXTERNAL_INPUT /
+  POLICY_DECISION / ACTION_EXECUTED），形状与 runtime 真实产出一致，用于 replay / metrics
+"""
+
+from __future__ import annotations
+
+import random
+from typing import List
+
+from cim_worldlab.world.events.action_executed import ActionExecuted
+from cim_worldlab.world.events.event import Event
+from cim_worldlab.world.events.external_input import ExternalInput
+from cim_worldlab.world.policy import PolicyConfig, evaluate_event
+
+# 与 PolicyConfig 默认阈值（92℃）配合：hot_ratio 控制超温读数的占比
+_COOL_RANGE = (70.0, 90.0)
+_HOT_RANGE = (93.0, 99.0)
+
+
+def synthetic_inputs(n: int, seed: int = 42, hot_ratio: float = 0.05, equipment_count: int = 16) -> List[ExternalInput]:
+    """
+    生成 n 条外部输入：
+    - 约 80% 设备温度 TEMP_READING（其中 hot_ratio 比例超阈值）
+    - 其余是订单 / 人工输入（不会触发策略）
+    """
+    rng = random.Random(seed)
+    items: List[ExternalInput] = []
+    for i in range(n):
+        r = rng.random()
+        if r < 0.8:
+            lo, hi = _HOT_RANGE if rng.random() < hot_ratio else _COOL_RANGE
+            items.append(ExternalInput(
+                source="plugin",
+                channel="equipment",
+                name="TEMP_READING",
+                data={"equipment_id": f"EQ-{rng.randrange(equipment_count):03d}", "temp_c": round(rng.uniform(lo, hi), 2)},
+                trace_id=f"TR-{seed}-{i}",
+            ))
+        elif r < 0.95:
+            items.append(ExternalInput(
+                source="system",
+                channel="order",
+                name="NEW_ORDER",
+                data={"order_id": f"O-{i}", "qty": rng.randrange(1, 50)},
+            ))
+        else:
+            items.append(ExternalInput(source="human", channel="ops", name="ACK", data={"by": "op"}))
+    return items
+
+
+def synthetic_events(
+    n: int, seed: int = 42, inputs_per_tick: int = 8, hot_ratio: float = 0.05, equipment_count: int = 16
+) -> List[Event]:
+    """
+    生成约 n 条“已记录”的事件（不经过 runtime，直接按 runtime 的规则拼出来，速度更快）。
+
+    规则与 WorldRuntime._record 一致：
+    - 每 inputs_per_tick 条输入前有一个 WORLD_TICK
+    - 输入命中策略时，紧跟 POLICY_DECISION + ACTION_EXECUTED（cause_id 指向各自的原因）
+    - seq = 事件在列表里的位置
+    """
+    config = PolicyConfig()
+    inputs = synthetic_inputs(n, seed=seed, hot_ratio=hot_ratio, equipment_count=equipment_count)
+    events: List[Event] = []
+    t = 0
+    for i, inp in enumerate(inputs):
+        if len(events) >= n:
+            break
+        if i % inputs_per_tick == 0:
+            t += 1
+            events.append(Event(t=t, type="WORLD_TICK", payload={"i": i}, seq=len(events)))
+        e = inp.to_event(t=t).with_seq(len(events))
+        events.append(e)
+        for d in evaluate_event(e, config):
+            de = d.to_event(t=t, trace_id=inp.trace_id, cause_id=e.id).with_seq(len(events))
+            events.append(de)
+            events.append(ActionExecuted(
+                action_type=d.recommended_action,
+                reason=d.reason,
+                from_policy_t=t,
+                trace_id=inp.trace_id,
+                cause_id=de.id,
+            ).to_event(t=t).with_seq(len(events)))
+    return events[:n]
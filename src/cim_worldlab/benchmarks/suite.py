@@ -0,0 +1,1169 @@
+"""
+suite.py
+========
+基准测试套件（benchmark suite）
+
+为什么要有 benchmark？
+- 单元测试只保证“对不对”，不保证“快不快”
+- 性能优化之前要先有“尺子”：同样的数据、同样的方法、可重复的数字
+- 有了结果文件（JSON），就能和基线（baseline）对比，发现性能回退
+
+结构：
+- BENCHMARKS：名字 -> 基准函数 的注册表（@benchmark("name") 注册）
+- 每个基准函数接收 BenchContext，返回若干 BenchResult（每个数据规模一条）
+- run_suite(ctx, only=...)：跑选中的基准，返回可 JSON 化的结果 dict
+
+计时方法：
+- 每个用例跑 repeat 次，取最快的一次（best-of-N，受噪音影响最小）
+- setup（准备数据、清空文件）不计时
+"""
+
+from __future__ import annotations
+
+import fnmatch
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from cim_worldlab.benchmarks.generators import synthetic_events, synthetic_inputs
+from cim_worldlab.host import WorldHost
+from cim_worldlab.world.events.codec import decode_event, encode_event
+from cim_worldlab.world.events.event import Event
+from cim_worldlab.world.gateway import FakePluginGateway, FileQueueGateway
+from cim_worldlab.world.metrics import compute_metrics
+from cim_worldlab.world.persistence import FileEventStore, SnapshotStore, TraceIndex
+from cim_worldlab.world.persistence.file_input_queue import FileInputQueue
+from cim_worldlab.world.events.action_executed import ACTION_EXECUTED_TYPE
+from cim_worldlab.world.events.external_input import EXTERNAL_INPUT_TYPE, ExternalInput
+from cim_worldlab.world.policy import (
+    BatchEvaluator,
+    DecisionSuppressor,
+    PolicyConfig,
+    PolicyRule,
+    RuleRegistry,
+    StatefulPolicy,
+    SuppressionConfig,
+    WindowRule,
+    temp_high_rule,
+    temp_high_threshold,
+)
+from cim_worldlab.world.policy.batch import HAS_NUMPY
+from cim_worldlab.world.runtime import (
+    ColumnarEventLog,
+    EventBroadcaster,
+    EventLog,
+    InputSchedule,
+    ShardedRuntime,
+    Simulation,
+    SnapshotScheduler,
+    StreamFilter,
+    WorldRuntime,
+)
+from cim_worldlab.world.projections import ProjectionSet, default_projections
+from cim_worldlab.world.state import PMap, WorldState, apply_event, apply_events
+
+DEFAULT_SIZES = [10_000]
+FULL_SIZES = [10_000, 100_000, 1_000_000]
+
+
+@dataclass(frozen=True)
+class BenchResult:
+    """
+    一条基准结果。
+
+    - name：基准名（例如 "replay.full"）
+    - params：参数（例如 {"n": 10000}），name + params 组成唯一 key
+    - ops：这次计时覆盖了多少次操作（事件数 / 请求数）
+    - seconds：best-of-N 耗时
+    - extra：附加信息（例如字节数），不参与回归比较
+    """
+    name: str
+    params: Dict[str, Any]
+    ops: int
+    seconds: float
+    extra: Dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def key(self) -> str:
+        if not self.params:
+            return self.name
+        inner = ",".join(f"{k}={self.params[k]}" for k in sorted(self.params))
+        return f"{self.name}[{inner}]"
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "key": self.key,
+            "name": self.name,
+            "params": dict(self.params),
+            "ops": self.ops,
+            "seconds": self.seconds,
+            "ops_per_s": self.ops / self.seconds if self.seconds > 0 else None,
+            "extra": dict(self.extra),
+        }
+
+
+@dataclass
+class BenchContext:
+    """
+    基准运行上下文：
+    - work_dir：临时文件目录（事件文件、队列、快照都写在这里）
+    - sizes：数据规模列表（例如 [10000, 100000, 1000000]）
+    - repeat：每个用例重复次数（取最快）
+    - http_ops：HTTP 基准的请求数（TestClient 很慢，单独控制）
+    """
+    work_dir: Path
+    sizes: List[int] = field(default_factory=lambda: list(DEFAULT_SIZES))
+    repeat: int = 3
+    seed: int = 42
+    http_ops: int = 500
+    _event_cache: Dict[int, List[Event]] = field(default_factory=dict)
+
+    def events(self, n: int) -> List[Event]:
+        """同一规模的合成事件只生成一次（1M 事件生成本身就要几秒）。"""
+        if n not in self._event_cache:
+            self._event_cache[n] = synthetic_events(n, seed=self.seed)
+        return self._event_cache[n]
+
+    def path(self, name: str) -> Path:
+        self.work_dir.mkdir(parents=True, exist_ok=True)
+        return self.work_dir / name
+
+
+BenchFn = Callable[[BenchContext], List[BenchResult]]
+BENCHMARKS: Dict[str, BenchFn] = {}
+
+
+def benchmark(name: str) -> Callable[[BenchFn], BenchFn]:
+    """注册一个基准函数。"""
+    def deco(fn: BenchFn) -> BenchFn:
+        BENCHMARKS[name] = fn
+        return fn
+    return deco
+
+
+def time_best(fn: Callable[[Any], Any], repeat: int, setup: Optional[Callable[[], Any]] = None) -> float:
+    """
+    跑 repeat 次，返回最快一次的耗时（秒）。
+    setup() 的返回值会传给 fn，setup 本身不计时。
+    """
+    best = float("inf")
+    for _ in range(max(1, repeat)):
+        arg = setup() if setup is not None else None
+        start = time.perf_counter()
+        fn(arg)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def _write_events(path: Path, events: Sequence[Event]) -> FileEventStore:
+    if path.exists():
+        path.unlink()
+    store = FileEventStore(path=path)
+    for e in events:
+        store.append(e)
+    return store
+
+
+# -------------------------------
+# 1) ingest 吞吐
+# -------------------------------
+
+@benchmark("ingest.queue")
+def bench_ingest_queue(ctx: BenchContext) -> List[BenchResult]:
+    """FileInputQueue.append -> FileQueueGateway.pull -> runtime.ingest_inputs 全链路。"""
+    results = []
+    for n in ctx.sizes:
+        inputs = synthetic_inputs(n, seed=ctx.seed)
+        qpath = ctx.path("bench_queue.jsonl")
+
+        def setup() -> None:
+            if qpath.exists():
+                qpath.unlink()
+
+        def run(_: None) -> None:
+            q = FileInputQueue(path=qpath)
+            for inp in inputs:
+                q.append(inp)
+            rt = WorldRuntime(gateway=FileQueueGateway(queue=q))
+            rt.tick()
+            rt.ingest_inputs()
+
+        results.append(BenchResult("ingest.queue", {"n": n}, n, time_best(run, ctx.repeat, setup)))
+    return results
+
+
+@benchmark("ingest.http")
+def bench_ingest_http(ctx: BenchContext) -> List[BenchResult]:
+    """POST /v1/inputs（FastAPI TestClient，进程内）。没装 fastapi 时跳过。"""
+    try:
+        from fastapi.testclient import TestClient
+        from cim_worldlab.plugins.http_ingest_app import create_app
+    except ImportError:
+        return []
+
+    n = ctx.http_ops
+    qpath = ctx.path("bench_http_queue.jsonl")
+    bodies = [
+        {"source": i.source, "channel": i.channel, "name": i.name, "data": i.data}
+        for i in synthetic_inputs(n, seed=ctx.seed)
+    ]
+    client = TestClient(create_app(queue_factory=lambda: FileInputQueue(path=qpath)))
+
+    def setup() -> None:
+        if qpath.exists():
+            qpath.unlink()
+
+    def run(_: None) -> None:
+        for b in bodies:
+            client.post("/v1/inputs", json=b)
+
+    return [BenchResult("ingest.http", {"n": n}, n, time_best(run, ctx.repeat, setup))]
+
+
+# -------------------------------
+# 2) _record 吞吐（有 / 无策略命中）
+# -------------------------------
+
+def _bench_record(
+    ctx: BenchContext,
+    name: str,
+    hot_ratio: float,
+    suppression: Optional[SuppressionConfig] = None,
+) -> List[BenchResult]:
+    results = []
+    for n in ctx.sizes:
+        inputs = synthetic_inputs(n, seed=ctx.seed, hot_ratio=hot_ratio)
+
+        def setup() -> WorldRuntime:
+            suppressor = DecisionSuppressor(suppression) if suppression is not None else None
+            rt = WorldRuntime(gateway=FakePluginGateway(queued=list(inputs)), suppressor=suppressor)
+            rt.tick()
+            return rt
+
+        def run(rt: WorldRuntime) -> None:
+            rt.ingest_inputs()
+
+        rt = setup()
+        run(rt)
+        extra = {"events_written": len(rt.event_log)}
+        results.append(BenchResult(name, {"n": n}, n, time_best(run, ctx.repeat, setup), extra))
+    return results
+
+
+@benchmark("record.no_policy")
+def bench_record_no_policy(ctx: BenchContext) -> List[BenchResult]:
+    return _bench_record(ctx, "record.no_policy", hot_ratio=0.0)
+
+
+@benchmark("record.policy_hit")
+def bench_record_policy_hit(ctx: BenchContext) -> List[BenchResult]:
+    return _bench_record(ctx, "record.policy_hit", hot_ratio=1.0)
+
+
+@benchmark("record.storm_suppressed")
+def bench_record_storm_suppressed(ctx: BenchContext) -> List[BenchResult]:
+    """告警风暴 + 决策压制（对照 record.policy_hit：看吞吐与写入事件数）。"""
+    return _bench_record(ctx, "record.storm_suppressed", hot_ratio=1.0, suppression=SuppressionConfig(holdoff_ticks=10))
+
+
+# -------------------------------
+# 3) FileEventStore append / load
+# -------------------------------
+
+@benchmark("store.append")
+def bench_store_append(ctx: BenchContext) -> List[BenchResult]:
+    results = []
+    for n in ctx.sizes:
+        events = ctx.events(n)
+        path = ctx.path("bench_store_append.jsonl")
+        secs = time_best(lambda _: _write_events(path, events), ctx.repeat)
+        results.append(BenchResult("store.append", {"n": n}, n, secs, {"bytes": path.stat().st_size}))
+    return results
+
+
+@benchmark("store.load")
+def bench_store_load(ctx: BenchContext) -> List[BenchResult]:
+    results = []
+    for n in ctx.sizes:
+        store = _write_events(ctx.path("bench_store_load.jsonl"), ctx.events(n))
+        results.append(BenchResult("store.load", {"n": n}, n, time_best(lambda _: store.load_all(), ctx.repeat)))
+    return results
+
+
+# -------------------------------
+# 4) replay：全量 vs 快照
+# -------------------------------
+
+@benchmark("replay.full")
+def bench_replay_full(ctx: BenchContext) -> List[BenchResult]:
+    results = []
+    for n in ctx.sizes:
+        store = _write_events(ctx.path("bench_replay.jsonl"), ctx.events(n))
+        secs = time_best(lambda _: WorldRuntime.replay_from_store(store), ctx.repeat)
+        results.append(BenchResult("replay.full", {"n": n}, n, secs))
+    return results
+
+
+@benchmark("replay.fast")
+def bench_replay_fast(ctx: BenchContext) -> List[BenchResult]:
+    """快照覆盖前 90% 事件，回放补最后 10%。"""
+    results = []
+    for n in ctx.sizes:
+        events = ctx.events(n)
+        store = _write_events(ctx.path("bench_replay.jsonl"), events)
+        snap = SnapshotStore(path=ctx.path("bench_replay_snapshot.json"))
+        cut = max(1, int(n * 0.9))
+        snap.save(apply_events(WorldState.initial(), events[:cut]), last_event_index=cut - 1)
+        secs = time_best(lambda _: WorldRuntime.replay_fast_from_store(store, snap), ctx.repeat)
+        results.append(BenchResult("replay.fast", {"n": n}, n, secs))
+    return results
+
+
+@benchmark("replay.fold")
+def bench_replay_fold(ctx: BenchContext) -> List[BenchResult]:
+    """
+    纯 reducer 开销（事件已在内存里）：逐条 apply_event（每条一个新 WorldState）
+    vs 批量折叠 apply_events（整批只生成一个 WorldState）。
+    """
+    results = []
+    for n in ctx.sizes:
+        events = ctx.events(n)
+
+        def per_event(_: None) -> WorldState:
+            s = WorldState.initial()
+            for e in events:
+                s = apply_event(s, e)
+            return s
+
+        per_event_s = time_best(per_event, ctx.repeat)
+        fold_s = time_best(lambda _: apply_events(WorldState.initial(), events), ctx.repeat)
+        results.append(BenchResult("replay.apply_per_event", {"n": n}, n, per_event_s))
+        results.append(BenchResult("replay.fold", {"n": n}, n, fold_s, {"speedup": per_event_s / fold_s if fold_s else None}))
+    return results
+
+
+# -------------------------------
+# 5) metrics 计算
+# -------------------------------
+
+@benchmark("metrics.compute")
+def bench_metrics_compute(ctx: BenchContext) -> List[BenchResult]:
+    results = []
+    for n in ctx.sizes:
+        events = ctx.events(n)
+        log = EventLog()
+        for e in events:
+            log.append(e)
+        state = apply_events(WorldState.initial(), events)
+        secs = time_best(lambda _: compute_metrics(state, log), ctx.repeat)
+        results.append(BenchResult("metrics.compute", {"n": n}, n, secs))
+    return results
+
+
+# -------------------------------
+# 6) snapshot save / load
+# -------------------------------
+
+SNAPSHOT_EQUIPMENT = 5_000
+
+
+@benchmark("snapshot.save_load")
+def bench_snapshot(ctx: BenchContext) -> List[BenchResult]:
+    """
+    - snapshot.save / load：只有 WorldState 的小快照（JSON）
+    - snapshot.save_json / save_binary / load_json / load_binary：带 5000 台设备投影 + 指标的大快照，
+      比较两种编码的耗时与文件大小
+    """
+    n = min(ctx.sizes)
+    state = apply_events(WorldState.initial(), ctx.events(n))
+    snap = SnapshotStore(path=ctx.path("bench_snapshot.json"))
+    ops = 1000
+    save_s = time_best(lambda _: [snap.save(state, last_event_index=n - 1) for _ in range(ops)], ctx.repeat)
+    load_s = time_best(lambda _: [snap.load() for _ in range(ops)], ctx.repeat)
+    results = [
+        BenchResult("snapshot.save", {}, ops, save_s, {"bytes": snap.path.stat().st_size}),
+        BenchResult("snapshot.load", {}, ops, load_s),
+    ]
+
+    events = synthetic_events(n, seed=ctx.seed, equipment_count=SNAPSHOT_EQUIPMENT)
+    projections = default_projections()
+    projections.extend(events)
+    big_state = apply_events(WorldState.initial(), events)
+    sections = {
+        "projection_state": projections.snapshot_state(),
+        "metrics_state": {"inputs_by_channel": compute_metrics(big_state, _log_of(events)).inputs_by_channel},
+    }
+    params = {"equipment": len(projections.projection("equipment").keys())}  # type: ignore[union-attr]
+    big_ops = 20
+    for name, binary in (("json", False), ("binary", True)):
+        store = SnapshotStore(path=ctx.path(f"bench_snapshot_big.{name}"), binary=binary)
+        save_s = time_best(
+            lambda _: [store.save(big_state, last_event_index=n - 1, **sections) for _ in range(big_ops)], ctx.repeat
+        )
+        load_s = time_best(lambda _: [store.load_snapshot() for _ in range(big_ops)], ctx.repeat)
+        size = store.path.stat().st_size
+        results.append(BenchResult(f"snapshot.save_{name}", params, big_ops, save_s, {"bytes": size}))
+        results.append(BenchResult(f"snapshot.load_{name}", params, big_ops, load_s, {"bytes": size}))
+    return results
+
+
+def _log_of(events: Sequence[Event]) -> EventLog:
+    log = EventLog()
+    for e in events:
+        log.append(e)
+    return log
+
+
+# -------------------------------
+# 7) 策略分发：索引 vs 线性扫描
+# -------------------------------
+
+def _synthetic_rules(count: int) -> List[PolicyRule]:
+    """1 条真实的 TEMP 规则 + (count-1) 条订阅其它传感器名的“哑规则”。"""
+    rules = [temp_high_rule(PolicyConfig())]
+    for i in range(1, count):
+        rules.append(PolicyRule(
+            rule_id=f"SENSOR_{i}_RULE",
+            check=lambda e: None,
+            channel="equipment",
+            name=f"SENSOR_{i}",
+        ))
+    return rules
+
+
+@benchmark("policy.dispatch")
+def bench_policy_dispatch(ctx: BenchContext) -> List[BenchResult]:
+    n = min(ctx.sizes)
+    events = [inp.to_event(t=1) for inp in synthetic_inputs(n, seed=ctx.seed)]
+    results = []
+    for count in (1, 100, 1000):
+        rules = _synthetic_rules(count)
+        reg = RuleRegistry(rules)
+
+        def indexed(_: None) -> None:
+            for e in events:
+                reg.evaluate(e)
+
+        def linear(_: None) -> None:
+            for e in events:
+                for r in rules:
+                    if r.matches(e):
+                        r.check(e)
+
+        results.append(BenchResult("policy.dispatch.indexed", {"n": n, "rules": count}, n, time_best(indexed, ctx.repeat)))
+        results.append(BenchResult("policy.dispatch.linear", {"n": n, "rules": count}, n, time_best(linear, ctx.repeat)))
+    return results
+
+
+# -------------------------------
+# 8) 有状态窗口规则：大量设备流
+# -------------------------------
+
+def _window_rules() -> List[WindowRule]:
+    match = {"channel": "equipment", "name": "TEMP_READING"}
+    return [
+        WindowRule(rule_id="TEMP_3_OF_5", kind="k_of_n", field="temp_c", op=">", value=92.0, k=3, n=5,
+                   suggested_action="PAUSE", match=match),
+        WindowRule(rule_id="TEMP_RUN_8", kind="run", field="temp_c", mean=85.0, run_length=8,
+                   suggested_action="OBSERVE", match=match),
+        WindowRule(rule_id="TEMP_RATE", kind="rate", field="temp_c", max_rate=10.0,
+                   suggested_action="OBSERVE", match=match),
+    ]
+
+
+@benchmark("policy.stateful")
+def bench_policy_stateful(ctx: BenchContext) -> List[BenchResult]:
+    """10k 台设备、每台 10 个读数，3 条窗口规则；附带每条流的内存占用。"""
+    streams = 10_000
+    per_stream = 10
+    n = streams * per_stream
+    events = [
+        ExternalInput(
+            source="plugin",
+            channel="equipment",
+            name="TEMP_READING",
+            data={"equipment_id": f"EQ-{i % streams:05d}", "temp_c": 80.0 + (i * 7919) % 17},
+        ).to_event(t=1 + i // streams)
+        for i in range(n)
+    ]
+
+    def setup() -> StatefulPolicy:
+        return StatefulPolicy(_window_rules())
+
+    def run(policy: StatefulPolicy) -> None:
+        for e in events:
+            policy.evaluate(e)
+
+    secs = time_best(run, ctx.repeat, setup)
+
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    policy = setup()
+    run(policy)
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    stream_count = policy.stream_count()
+    return [BenchResult(
+        "policy.stateful",
+        {"streams": streams, "n": n},
+        n,
+        secs,
+        {"stream_states": stream_count, "bytes_per_stream_state": (after - before) / max(1, stream_count)},
+    )]
+
+
+# -------------------------------
+# 9) 批量评估：逐事件 vs 批量（纯 Python / NumPy）
+# -------------------------------
+
+@benchmark("policy.batch")
+def bench_policy_batch(ctx: BenchContext) -> List[BenchResult]:
+    results = []
+    for n in ctx.sizes:
+        events = [e for e in ctx.events(n) if e.type == EXTERNAL_INPUT_TYPE]
+        rules = [temp_high_threshold(PolicyConfig())]
+        reg = RuleRegistry([r.compile() for r in rules])
+
+        def per_event(_: None) -> None:
+            for e in events:
+                reg.evaluate(e)
+
+        results.append(BenchResult("policy.batch.per_event", {"n": len(events)}, len(events), time_best(per_event, ctx.repeat)))
+        backends = ["python"] + (["numpy"] if HAS_NUMPY else [])
+        for backend in backends:
+            ev = BatchEvaluator(rules, backend=backend)
+            secs = time_best(lambda _: ev.evaluate_events(events), ctx.repeat)
+            results.append(BenchResult(f"policy.batch.{backend}", {"n": len(events)}, len(events), secs))
+    return results
+
+
+# -------------------------------
+# 10) 内存：每个事件常驻多少字节
+# -------------------------------
+
+@dataclass(frozen=True)
+class _LegacyEvent:
+    """优化前的事件表示（普通 dataclass，有 __dict__），只用作内存对比的基线。"""
+    t: int
+    type: str
+    payload: Dict[str, Any]
+
+
+def _retained_bytes(build: Callable[[], Any]) -> Tuple[Any, int]:
+    """build() 构造出来、并且仍被持有的对象占了多少字节（tracemalloc 口径）。"""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    obj = build()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return obj, after - before
+
+
+@benchmark("memory.events")
+def bench_memory_events(ctx: BenchContext) -> List[BenchResult]:
+    """
+    从 JSONL 行加载 n 个事件并全部留在内存里：
+    - legacy：json.loads + dict 拷贝 + 普通 dataclass（优化前的做法）
+    - slots_interned：decode_event（__slots__ + 字符串驻留）放进 EventLog
+    - columnar：ColumnarEventLog（列式存储）
+    """
+    results = []
+    for n in ctx.sizes:
+        lines = [encode_event(e) for e in ctx.events(n)]
+
+        def legacy() -> List[_LegacyEvent]:
+            out = []
+            for line in lines:
+                obj = json.loads(line)
+                out.append(_LegacyEvent(t=int(obj["t"]), type=str(obj["type"]), payload=dict(obj.get("payload") or {})))
+            return out
+
+        def slots_interned() -> EventLog:
+            log = EventLog()
+            for line in lines:
+                log.append(decode_event(line))
+            return log
+
+        def columnar() -> ColumnarEventLog:
+            log = ColumnarEventLog()
+            for line in lines:
+                log.append(decode_event(line))
+            return log
+
+        for variant, build in (("legacy", legacy), ("slots_interned", slots_interned), ("columnar", columnar)):
+            secs = time_best(lambda _: build(), ctx.repeat)
+            obj, retained = _retained_bytes(build)
+            del obj
+            results.append(BenchResult(
+                f"memory.events.{variant}",
+                {"n": n},
+                n,
+                secs,
+                {"retained_bytes": retained, "bytes_per_event": retained / n},
+            ))
+    return results
+
+
+# -------------------------------
+# 11) trace 查询：索引 vs 全量扫描
+# -------------------------------
+
+@benchmark("trace.lookup")
+def bench_trace_lookup(ctx: BenchContext) -> List[BenchResult]:
+    """
+    建索引（sync，一次性）+ 按 trace_id 查询（每次只读一个桶）；
+    对照组是“扫一遍日志找 trace_id”的老办法。
+    """
+    results = []
+    for n in ctx.sizes:
+        events = ctx.events(n)
+        store = _write_events(ctx.path("bench_trace.jsonl"), events)
+        index_dir = ctx.path("bench_trace.traces")
+
+        def build(_: None) -> TraceIndex:
+            index = TraceIndex(store.path, index_dir=index_dir)
+            index._reset()
+            index.sync()
+            return index
+
+        build_s = time_best(build, ctx.repeat)
+        index = build(None)
+        # 查完整链路（输入 -> 决策 -> 动作）的 trace，在日志里均匀取 100 个
+        traced = [e.payload["trace_id"] for e in events if e.type == ACTION_EXECUTED_TYPE]
+        trace_ids = traced[:: max(1, len(traced) // 100)][:100]
+
+        def lookup(_: None) -> None:
+            for tid in trace_ids:
+                index.trace(tid, sync=False)
+
+        def scan(_: None) -> None:
+            tid = trace_ids[-1]
+            [e for e in store.load_all() if e.payload.get("trace_id") == tid]
+
+        lookup_s = time_best(lookup, ctx.repeat)
+        scan_s = time_best(scan, 1)
+        results.append(BenchResult("trace.index_build", {"n": n}, n, build_s))
+        results.append(BenchResult(
+            "trace.lookup", {"n": n}, len(trace_ids), lookup_s,
+            {"ms_per_lookup": lookup_s * 1000 / len(trace_ids)},
+        ))
+        results.append(BenchResult("trace.scan", {"n": n}, 1, scan_s, {"ms_per_lookup": scan_s * 1000}))
+    return results
+
+
+# -------------------------------
+# 12) 推送扇出：1000 个订阅者
+# -------------------------------
+
+STREAM_SUBSCRIBERS = 1000
+STREAM_MAX_EVENTS = 5_000
+
+
+def _stream_filters(events: Sequence[Event], count: int) -> List[StreamFilter]:
+    """四种订阅混合：全部 / 只看动作 / 只看 equipment 通道 / 只看某一条 trace。"""
+    traced = [e.payload["trace_id"] for e in events if e.type == ACTION_EXECUTED_TYPE] or ["none"]
+    out = []
+    for i in range(count):
+        kind = i % 4
+        if kind == 0:
+            out.append(StreamFilter())
+        elif kind == 1:
+            out.append(StreamFilter.of(types=[ACTION_EXECUTED_TYPE]))
+        elif kind == 2:
+            out.append(StreamFilter.of(channels=["equipment"]))
+        else:
+            out.append(StreamFilter.of(trace_ids=[traced[i % len(traced)]]))
+    return out
+
+
+@benchmark("stream.fanout")
+def bench_stream_fanout(ctx: BenchContext) -> List[BenchResult]:
+    """
+    EventBroadcaster：publish 一批事件 + 每个订阅者取走（含 SSE 外壳）；
+    对照组（stream.naive）是每个订阅者各自判断过滤、各自序列化。
+    事件数最多取 STREAM_MAX_EVENTS（1000 个订阅者 x 事件数 就是投递次数）。
+    """
+    results = []
+    for n in ctx.sizes:
+        events = ctx.events(n)[:STREAM_MAX_EVENTS]
+        m = len(events)
+        filters = _stream_filters(events, STREAM_SUBSCRIBERS)
+        params = {"n": m, "subscribers": STREAM_SUBSCRIBERS}
+
+        def setup() -> Tuple[EventBroadcaster, list]:
+            b = EventBroadcaster()
+            return b, [b.subscribe(f, max_frames=m + 1) for f in filters]
+
+        def fanout(arg: Tuple[EventBroadcaster, list]) -> None:
+            b, subs = arg
+            b.publish(events)
+            for sub in subs:
+                for frame in sub.drain():
+                    frame.sse
+
+        def naive(_: None) -> None:
+            for f in filters:
+                for e in events:
+                    if f.matches(e):
+                        b"data: " + encode_event(e) + b"\n\n"
+
+        fanout_s = time_best(fanout, ctx.repeat, setup=setup)
+        naive_s = time_best(naive, 1)
+        b, subs = setup()
+        fanout((b, subs))
+        delivered = sum(sub.delivered for sub in subs)
+        results.append(BenchResult(
+            "stream.fanout", params, m, fanout_s,
+            {
+                "frames_delivered": delivered,
+                "encoded": b.encoded,
+                "encodes_per_event": b.encoded / m if m else 0.0,
+                "us_per_delivery": fanout_s * 1e6 / delivered if delivered else None,
+            },
+        ))
+        results.append(BenchResult(
+            "stream.naive", params, m, naive_s,
+            {"frames_delivered": delivered, "encoded": delivered},
+        ))
+    return results
+
+
+# -------------------------------
+# 13) 投影：每台设备的当前状态
+# -------------------------------
+
+PROJECTION_TOOLS = 5_000
+
+
+@benchmark("projection.equipment")
+def bench_projection_equipment(ctx: BenchContext) -> List[BenchResult]:
+    """
+    5000 台设备：增量维护设备投影（每条事件 observe 一次）+ 逐台查询（O(1)）；
+    对照组（projection.scan）是扫一遍日志回答“每台设备的当前温度和最近动作”。
+    """
+    results = []
+    for n in ctx.sizes:
+        events = synthetic_events(n, seed=ctx.seed, equipment_count=PROJECTION_TOOLS)
+
+        def update(_: None) -> ProjectionSet:
+            ps = default_projections()
+            ps.extend(events)
+            return ps
+
+        update_s = time_best(update, ctx.repeat)
+        ps = update(None)
+        keys = ps.projection("equipment").keys()
+
+        def query(_: None) -> None:
+            for k in keys:
+                ps.get("equipment", k)
+
+        def scan(_: None) -> Dict[str, Any]:
+            temps: Dict[str, Any] = {}
+            actions: Dict[str, Any] = {}
+            by_trace: Dict[str, str] = {}
+            for e in events:
+                if e.type == EXTERNAL_INPUT_TYPE:
+                    eq = e.payload["data"].get("equipment_id")
+                    if eq is not None:
+                        temps[eq] = e.payload["data"].get("temp_c")
+                        by_trace[e.payload.get("trace_id")] = eq
+                elif e.type == ACTION_EXECUTED_TYPE:
+                    eq = by_trace.get(e.payload.get("trace_id"))
+                    if eq is not None:
+                        actions[eq] = e.payload["action_type"]
+            return {"temps": temps, "actions": actions}
+
+        query_s = time_best(query, ctx.repeat)
+        scan_s = time_best(scan, 1)
+        results.append(BenchResult("projection.update", {"n": n}, n, update_s, {"keys": len(keys)}))
+        results.append(BenchResult(
+            "projection.query", {"n": n}, len(keys), query_s,
+            {"us_per_key": query_s * 1e6 / len(keys) if keys else None},
+        ))
+        results.append(BenchResult("projection.scan", {"n": n}, 1, scan_s, {"keys": len(keys)}))
+    return results
+
+
+# -------------------------------
+# 14) 持久化映射：结构共享 vs 整个 dict 复制
+# -------------------------------
+
+STATE_KEYS = 100_000
+NAIVE_COPY_UPDATES = 200  # 每次复制 10 万个 key 的 dict 太慢，只量这么多次，看单次耗时
+
+
+@benchmark("state.pmap")
+def bench_state_pmap(ctx: BenchContext) -> List[BenchResult]:
+    """
+    10 万个 key 的状态，做 n 次“纯函数式更新”（旧版本保持不变）：
+    - state.pmap_update：PMap.set（只复制一条路径）
+    - state.dict_copy：dict(d) 再改一个 key（n 太大跑不完，只量 NAIVE_COPY_UPDATES 次，ops/s 可直接比）
+    附带 PMap 的构造耗时、查询吞吐。
+    """
+    import random
+
+    rng = random.Random(ctx.seed)
+    base_items = {f"EQ-{i:06d}": i for i in range(STATE_KEYS)}
+    build_s = time_best(lambda _: PMap.of(base_items), 1)
+    base = PMap.of(base_items)
+    keys = list(base_items)
+
+    results = [BenchResult("state.pmap_build", {"keys": STATE_KEYS}, STATE_KEYS, build_s)]
+    for n in ctx.sizes:
+        updates = [(keys[rng.randrange(STATE_KEYS)], i) for i in range(n)]
+
+        def pmap_update(_: None) -> PMap:
+            m = base
+            for k, v in updates:
+                m = m.set(k, v)
+            return m
+
+        def dict_copy(_: None) -> Dict[str, int]:
+            d = base_items
+            for k, v in updates[:NAIVE_COPY_UPDATES]:
+                d = dict(d)
+                d[k] = v
+            return d
+
+        def lookup(_: None) -> None:
+            get = base.get
+            for k, _v in updates:
+                get(k)
+
+        pmap_s = time_best(pmap_update, ctx.repeat)
+        copy_s = time_best(dict_copy, 1)
+        lookup_s = time_best(lookup, ctx.repeat)
+        copies = min(n, NAIVE_COPY_UPDATES)
+        params = {"keys": STATE_KEYS, "n": n}
+        results.append(BenchResult("state.pmap_update", params, n, pmap_s))
+        results.append(BenchResult(
+            "state.dict_copy", params, copies, copy_s,
+            {"estimated_seconds_for_n": copy_s / copies * n},
+        ))
+        results.append(BenchResult("state.pmap_get", params, n, lookup_s))
+    return results
+
+
+# -------------------------------
+# 15) 快照调度：判断开销 + 预计回放耗时准不准
+# -------------------------------
+
+@benchmark("snapshot.schedule")
+def bench_snapshot_schedule(ctx: BenchContext) -> List[BenchResult]:
+    """
+    - snapshot.schedule_due：每批事件后调一次 due() 的开销（四个条件都开，但都不触发）
+    - snapshot.tail_replay：快照在一半处，实际补尾巴（解码 + fold）耗时；
+      extra 里是调度器按实测速度给出的预估，越接近越好
+    """
+    results = []
+    for n in ctx.sizes:
+        events = ctx.events(n)
+        half = len(events) // 2
+        store = _write_events(ctx.path("bench_schedule_events.jsonl"), events[:half])
+        snap = SnapshotStore(path=ctx.path("bench_schedule_snapshot.json"))
+        rt = WorldRuntime.replay_from_store(store)
+        rt.save_snapshot(snap)
+
+        scheduler = SnapshotScheduler(
+            every_n_events=10 * n, every_bytes=1 << 40, every_seconds=1e9, max_replay_seconds=1e9
+        )
+        scheduler.due(rt)  # 以快照时的文件大小为字节数起点
+        for e in events[half:]:
+            store.append(e)
+            rt.event_log.append(e)
+        estimated = scheduler.estimated_replay_seconds(rt)
+        calls = 10_000
+        due_s = time_best(lambda _: [scheduler.due(rt) for _ in range(calls)], ctx.repeat)
+
+        def tail_replay(_: None) -> WorldState:
+            snapshot = snap.load_snapshot()
+            assert snapshot is not None
+            return apply_events(snapshot.state, store.load_from_index(snapshot.last_event_index + 1))
+
+        tail_s = time_best(tail_replay, ctx.repeat)
+        params = {"n": n}
+        results.append(BenchResult("snapshot.schedule_due", params, calls, due_s))
+        results.append(BenchResult(
+            "snapshot.tail_replay", params, len(events) - half, tail_s, {"estimated_seconds": estimated}
+        ))
+    return results
+
+
+# -------------------------------
+# 16) 分片：每片一个进程，吞吐随核数扩展
+# -------------------------------
+
+SHARD_COUNTS = (1, 2, 4)
+SHARD_BATCH = 256
+SHARD_MAX_INPUTS = 50_000
+
+
+@benchmark("sharded.ingest")
+def bench_sharded_ingest(ctx: BenchContext) -> List[BenchResult]:
+    """
+    按设备分片的输入吞吐（每片写自己的事件段 + 设备投影）：shards=1/2/4 个工作进程。
+    每步一次 tick + SHARD_BATCH 条输入。extra 里带 cpu_count：核数不够时不会有扩展。
+    """
+    import os
+    import shutil
+
+    n = min(min(ctx.sizes), SHARD_MAX_INPUTS)
+    inputs = synthetic_inputs(n, seed=ctx.seed, equipment_count=1_000)
+    batches = [inputs[i:i + SHARD_BATCH] for i in range(0, n, SHARD_BATCH)]
+    results = []
+    for shards in SHARD_COUNTS:
+        base = ctx.path(f"bench_sharded_{shards}")
+
+        def setup() -> ShardedRuntime:
+            shutil.rmtree(base, ignore_errors=True)
+            return ShardedRuntime(base, shards=shards, projections_factory=default_projections)
+
+        def run(sharded: ShardedRuntime) -> None:
+            try:
+                for batch in batches:
+                    sharded.step(batch)
+            finally:
+                sharded.close()
+
+        seconds = time_best(run, ctx.repeat, setup)
+        results.append(BenchResult(
+            "sharded.ingest", {"n": n, "shards": shards}, n, seconds, {"cpu_count": os.cpu_count()}
+        ))
+    return results
+
+
+# -------------------------------
+# 17) 多世界托管：很多个世界共用一个进程
+# -------------------------------
+
+HOST_WORLDS = 50
+HOST_MAX_INPUTS = 20_000
+
+
+@benchmark("host.step")
+def bench_host_step(ctx: BenchContext) -> List[BenchResult]:
+    """
+    WorldHost 托管 HOST_WORLDS 个世界：
+    - step_all：输入按世界分散写入各自的队列，一轮调度（共享线程池）把它们全部消费掉
+    - reload：全部世界卸载（打快照）后逐个懒加载回来（快照 + 补尾巴），ops = 世界数
+    """
+    import shutil
+
+    n = min(min(ctx.sizes), HOST_MAX_INPUTS)
+    inputs = synthetic_inputs(n, seed=ctx.seed, equipment_count=1_000)
+    world_ids = [f"w{i:03d}" for i in range(HOST_WORLDS)]
+    root = ctx.path("bench_host")
+    hosts: List[WorldHost] = []
+
+    def setup() -> WorldHost:
+        for old in hosts:
+            old.close()
+        hosts.clear()
+        shutil.rmtree(root, ignore_errors=True)
+        host = WorldHost(root, idle_seconds=None, snapshot_every=0)
+        for i, inp in enumerate(inputs):
+            host.ingest(world_ids[i % HOST_WORLDS], inp)
+        hosts.append(host)
+        return host
+
+    def step_all(host: WorldHost) -> None:
+        host.step_all()
+
+    step_seconds = time_best(step_all, ctx.repeat, setup)
+
+    host = setup()
+    host.step_all()
+
+    def reload(_: None) -> None:
+        for wid in world_ids:
+            host.metrics(wid)
+
+    def evict_all() -> None:
+        for wid in world_ids:
+            host.evict(wid)
+
+    reload_seconds = time_best(reload, ctx.repeat, evict_all)
+    host.close()
+    return [
+        BenchResult("host.step", {"n": n, "worlds": HOST_WORLDS}, n, step_seconds),
+        BenchResult("host.reload", {"n": n, "worlds": HOST_WORLDS}, HOST_WORLDS, reload_seconds),
+    ]
+
+
+# -------------------------------
+# 18) 分叉：what-if 模拟的起步成本
+# -------------------------------
+
+FORK_COUNT = 100
+FORK_COPY_COUNT = 3
+FORK_COPY_MAX_EVENTS = 20_000
+
+
+@benchmark("runtime.fork")
+def bench_runtime_fork(ctx: BenchContext) -> List[BenchResult]:
+    """
+    一个跑了 n 条输入的世界（带设备投影），从当前时刻分出 FORK_COUNT 个分叉：
+    - fork：WorldRuntime.fork()（共享状态、写时复制的日志 / 因果索引）
+    - deepcopy：整个 runtime 深拷贝（朴素做法，很慢：只在最小规模、且 <= FORK_COPY_MAX_EVENTS 时测 FORK_COPY_COUNT 个）
+    ops = 分叉数；extra 里是每个分叉额外占用的字节数（tracemalloc 口径）。
+    """
+    import copy
+
+    results = []
+    for n in ctx.sizes:
+        rt = WorldRuntime(gateway=FakePluginGateway(queued=synthetic_inputs(n, seed=ctx.seed)),
+                          projections=default_projections())
+        rt.tick()
+        rt.ingest_inputs()
+        events = len(rt.event_log)
+
+        modes: List[Tuple[str, Callable[[], WorldRuntime], int]] = [("fork", rt.fork, FORK_COUNT)]
+        if n == min(ctx.sizes) and n <= FORK_COPY_MAX_EVENTS:
+            modes.append(("deepcopy", lambda: copy.deepcopy(rt), FORK_COPY_COUNT))
+        for mode, make, count in modes:
+            seconds = time_best(lambda _: [make() for _ in range(count)], ctx.repeat)
+            _, nbytes = _retained_bytes(lambda: [make() for _ in range(count)])
+            results.append(BenchResult(
+                "runtime.fork", {"n": n, "mode": mode}, count, seconds,
+                {"events": events, "bytes_per_fork": nbytes / count},
+            ))
+    return results
+
+
+# -------------------------------
+# 19) 加速模拟：虚拟时间跑多快
+# -------------------------------
+
+SIM_SPACING = 10  # 脚本里相邻两个输入隔多少个 tick
+
+
+@benchmark("sim.run")
+def bench_sim_run(ctx: BenchContext) -> List[BenchResult]:
+    """
+    Simulation 跑完 n 条脚本输入（每 SIM_SPACING 个 tick 一条）：
+    - dense：逐 tick 推进（ops = 虚拟 tick 数）
+    - skip_idle：空闲时段一步跳过（ops 同样按虚拟 tick 数算，便于对比）
+    extra 里是每分钟推进的虚拟 tick 数。
+    """
+    results = []
+    for n in ctx.sizes:
+        inputs = synthetic_inputs(n, seed=ctx.seed)
+        until = n * SIM_SPACING
+        for mode in ("dense", "skip_idle"):
+            def setup() -> Simulation:
+                schedule = InputSchedule((i * SIM_SPACING, inp) for i, inp in enumerate(inputs))
+                return Simulation(schedule=schedule, skip_idle=mode == "skip_idle")
+
+            seconds = time_best(lambda sim: sim.run(until), ctx.repeat, setup)
+            results.append(BenchResult(
+                "sim.run", {"n": n, "mode": mode}, until, seconds,
+                {"ticks_per_minute": until / seconds * 60 if seconds > 0 else None},
+            ))
+    return results
+
+
+# -------------------------------
+# 20) 场景：多种子并行模拟 + 结果缓存
+# -------------------------------
+
+SCENARIO_SEEDS = 8
+SCENARIO_MAX_INPUTS = 50_000
+
+
+@benchmark("scenario.run")
+def bench_scenario_run(ctx: BenchContext) -> List[BenchResult]:
+    """
+    一个两台设备、一次超限的案例，SCENARIO_SEEDS 个种子一共 n 条输入（n 取最小规模，且 <= SCENARIO_MAX_INPUTS）：
+    - inline：在当前进程里逐个种子跑
+    - parallel：进程池（CPU 核数个工作进程）
+    - cached：同样的 (案例, 策略, 代码版本, 种子) 直接读缓存
+    ops = 模拟的输入条数；extra 里是每秒跑完的种子数。
+    """
+    import os
+    import shutil
+
+    from cim_worldlab.scenario import run_scenario
+
+    n = min(min(ctx.sizes), SCENARIO_MAX_INPUTS)
+    every = 10
+    project = ctx.path("bench_scenario")
+    shutil.rmtree(project, ignore_errors=True)
+    (project / "baseline").mkdir(parents=True)
+    until = max(1, n // SCENARIO_SEEDS // 2) * every
+    (project / "case_input.json").write_text(json.dumps({
+        "version": 1,
+        "until": until,
+        "readings": {"equipment": ["EQ-1", "EQ-2"], "every": every, "base_temp_c": 80.0, "noise_c": 1.5},
+        "excursions": [{"equipment_id": "EQ-1", "start": until // 2, "ramp": 120, "hold": 180, "peak_temp_c": 97.0}],
+        "perturb": {"start_jitter": until // 4, "peak_jitter_c": 2.5, "noise_scale": [0.5, 2.0]},
+    }))
+    (project / "evaluation.json").write_text(json.dumps({"truth": {
+        "match": {"event_type": EXTERNAL_INPUT_TYPE, "channel": "equipment", "name": "TEMP_READING"},
+        "field": "temp_c", "op": ">", "value": 95.0,
+    }}))
+    (project / "baseline" / "reference_policy.json").write_text(json.dumps({"version": 1, "rules": [{
+        "rule_id": "TEMP_HIGH_PAUSE",
+        "match": {"event_type": EXTERNAL_INPUT_TYPE, "channel": "equipment", "name": "TEMP_READING"},
+        "field": "temp_c", "op": ">", "value": 92.0, "suggested_action": "PAUSE",
+    }]}))
+    cache_dir = project / "cache"
+    inputs = SCENARIO_SEEDS * 2 * (until // every)
+
+    results = []
+    for mode, workers in (("inline", 1), ("parallel", os.cpu_count() or 1), ("cached", 1)):
+        def setup() -> None:
+            if mode != "cached":
+                shutil.rmtree(cache_dir, ignore_errors=True)
+
+        if mode == "cached":
+            run_scenario(project, seeds=SCENARIO_SEEDS, workers=1, cache_dir=cache_dir)
+        seconds = time_best(
+            lambda _: run_scenario(project, seeds=SCENARIO_SEEDS, workers=workers, cache_dir=cache_dir),
+            ctx.repeat, setup,
+        )
+        results.append(BenchResult(
+            "scenario.run", {"n": inputs, "mode": mode, "workers": workers}, inputs, seconds,
+            {"seeds_per_second": SCENARIO_SEEDS / seconds if seconds > 0 else None},
+        ))
+    return results
+
+
+# -------------------------------
+# 运行入口
+# -------------------------------
+
+def select_benchmarks(only: Optional[Sequence[str]] = None) -> List[str]:
+    """按通配符挑选基准（例如 ["replay.*", "store.load"]）；None 表示全部。"""
+    names = sorted(BENCHMARKS)
+    if not only:
+        return names
+    return [n for n in names if any(fnmatch.fnmatchcase(n, pat) for pat in only)]
+
+
+def run_suite(ctx: BenchContext, only: Optional[Sequence[str]] = None) -> Dict[str, Any]:
+    """
+    跑选中的基准，返回：
+    {"meta": {...}, "results": [BenchResult.to_dict(), ...]}
+    """
+    results: List[Dict[str, Any]] = []
+    for name in select_benchmarks(only):
+        for r in BENCHMARKS[name](ctx):
+            results.append(r.to_dict())
+    return {
+        "meta": {
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "sizes": list(ctx.sizes),
+            "repeat": ctx.repeat,
+            "seed": ctx.seed,
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": results,
+    }
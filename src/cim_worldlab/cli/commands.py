@@ -8,28 +8,54 @@ CLI 命令的“业务实现层”（可测试）
 - 命令的核心逻辑写成函数（厚、可测试）
 - 这样你以后换成 Typer/Click 也不会改业务逻辑
 
-我们提供 5 个命令能力：
+我们提供这些命令能力：
 1) serve: 启动 HTTP 输入服务（FastAPI/Uvicorn）
 2) run_once: 世界跑一步（tick + ingest + metrics），并保存 cursor
 3) run: 连续跑 N 次 run_once（带 sleep）
-4) replay: 从 events.jsonl 回放重建状态（可选快照加速）
+4) replay: 从 events.jsonl 回放重建状态（可选快照加速；--verify 校验快照回放 == 全量回放）
 5) metrics: 基于 replay 打印指标（稳定、可重复）
+6) profile: 在 cProfile/tracemalloc 下连续跑 N 个 tick，输出性能报告
+7) bench: 跑基准测试套件，输出 JSON 结果，并可与基线对比发现性能回退
+8) backtest: 用历史 events.jsonl 并行回测多套候选策略，输出对比表
+9) trace: 按 trace_id 查一条链路（输入 -> 决策 -> 动作），走 trace 索引，不扫日志
+10) latency: 从 events.jsonl 的时间戳统计端到端延迟（收到 -> 留痕 -> 决策 -> 动作）
+11) follow: 启动只读副本（跟读 events.jsonl，提供 state/metrics/events 查询，不打扰写入者）
+12) host: 一个服务托管很多个世界（按 world id 路由输入，空闲世界卸载到快照，按需加载）
+13) simulate: 无头加速模拟（虚拟时间，按脚本在指定时刻注入输入，不 sleep、不逐条落盘）
+14) scenario run: 跑 projects/<Pxx>/ 的案例（多个随机种子并行模拟，按评估口径和基线策略打分，结果缓存）
 """
 
 from __future__ import annotations
 
+import cProfile
+import io
+import json
 import os
+import pstats
+import tempfile
 import time
+import tracemalloc
 from dataclasses import asdict
 from pathlib import Path
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional
 
 from cim_worldlab.cli.config import CliPaths, default_paths
 from cim_worldlab.cli.utils import load_int, save_int
+from cim_worldlab.world.events.external_input import ExternalInput
 from cim_worldlab.world.gateway import FileQueueGateway
-from cim_worldlab.world.persistence import FileEventStore, SnapshotStore
+from cim_worldlab.world.persistence import BufferedEventStore, FileEventStore, SnapshotStore, TraceIndex
 from cim_worldlab.world.persistence.file_input_queue import FileInputQueue
-from cim_worldlab.world.runtime import WorldRuntime
+from cim_worldlab.world.policy import PolicyFile
+from cim_worldlab.world.projections import default_projections
+from cim_worldlab.world.runtime import (
+    CausalIndex,
+    InputSchedule,
+    LatencyTracker,
+    Simulation,
+    StageProfiler,
+    WorldRuntime,
+    verify_snapshot,
+)
 
 
 def cmd_serve(host: str = "127.0.0.1", port: int = 8000, queue_path: Optional[Path] = None) -> None:
@@ -39,6 +65,7 @@ def cmd_serve(host: str = "127.0.0.1", port: int = 8000, queue_path: Optional[Pa
     说明：
     - HTTP 服务只负责接收 POST /v1/inputs 并写入 input_queue.jsonl
     - 它不跑世界、不做业务决策（边界清晰）
+    - 另外提供只读查询：GET /v1/traces/{trace_id}（读 events.jsonl 旁边的 trace 索引）
     """
     from cim_worldlab.http_server import main as server_main
 
@@ -46,6 +73,8 @@ def cmd_serve(host: str = "127.0.0.1", port: int = 8000, queue_path: Optional[Pa
     paths = default_paths()
     qp = queue_path or paths.input_queue
     os.environ["CIM_INPUT_QUEUE_PATH"] = str(qp)
+    # GET /v1/traces/{id} 查询的事件日志（trace 索引建在它旁边的 traces/ 里）
+    os.environ.setdefault("CIM_EVENTS_PATH", str(paths.events))
 
     os.environ["CIM_HTTP_HOST"] = host
     os.environ["CIM_HTTP_PORT"] = str(port)
@@ -53,13 +82,18 @@ def cmd_serve(host: str = "127.0.0.1", port: int = 8000, queue_path: Optional[Pa
     server_main()
 
 
-def build_runtime_for_cli(paths: CliPaths) -> WorldRuntime:
+def build_runtime_for_cli(paths: CliPaths, policy_path: Optional[Path] = None) -> WorldRuntime:
     """
     构造一个 CLI 使用的 WorldRuntime：
 
     - gateway: FileQueueGateway（从 input_queue.jsonl 增量拉取外部输入）
     - event_store: FileEventStore（把世界事件写入 events.jsonl）
     - cursor: 从 out/cursor.txt 恢复（增量消费）
+    - policy: 可选的声明式规则文件（PolicyFile，文件修改后自动热加载）；不给则用内置规则
+    - 从已有的 events.jsonl 接着跑（快照加速回放）：世界时间、事件 seq 都接着上次往下走，
+      因果索引（causal_index.bin）与日志对齐后继续追加
+    - latency: 挂 LatencyTracker，事件 meta 里记录留痕时间，供 latency 报告使用
+    - projections: 默认的设备投影（每台设备的当前温度 / 最近动作），随快照保存
 
     注意：
     - runtime 的 state 会在 tick/ingest/_record 中自动更新（Step 10）
@@ -71,11 +105,22 @@ def build_runtime_for_cli(paths: CliPaths) -> WorldRuntime:
     gateway = FileQueueGateway(queue=queue, cursor=cursor)
 
     store = FileEventStore(path=paths.events)
-
-    return WorldRuntime(gateway=gateway, event_store=store)
-
-
-def cmd_run_once(paths: Optional[CliPaths] = None, snapshot_every: int = 0) -> Dict[str, Any]:
+    policy = PolicyFile(policy_path) if policy_path is not None else None
+
+    rt = WorldRuntime.replay_fast_from_store(
+        store, SnapshotStore(path=paths.snapshot), policy=policy, projections=default_projections()
+    )
+    rt.causal_index = CausalIndex.open(paths.causal_index, rt.event_log.all())
+    rt.gateway = gateway
+    rt.latency = LatencyTracker()
+    return rt
+
+
+def cmd_run_once(
+    paths: Optional[CliPaths] = None,
+    snapshot_every: int = 0,
+    policy_path: Optional[Path] = None,
+) -> Dict[str, Any]:
     """
     世界跑一步（教学演示最常用）：
 
@@ -86,10 +131,17 @@ def cmd_run_once(paths: Optional[CliPaths] = None, snapshot_every: int = 0) -> D
     5) 可选：达到阈值时保存快照（Step 12）
 
     返回一个 dict，方便测试或未来接 UI。
+
+    注意：每次调用都要从 events.jsonl 恢复 runtime（成本随日志长度增长）；
+    连续跑很多步用 cmd_run（只恢复一次）。
     """
     p = paths or default_paths()
-    rt = build_runtime_for_cli(p)
+    rt = build_runtime_for_cli(p, policy_path=policy_path)
+    return _step_once(rt, p, snapshot_every)
+
 
+def _step_once(rt: WorldRuntime, p: CliPaths, snapshot_every: int) -> Dict[str, Any]:
+    """在已经恢复好的 runtime 上跑一步（cmd_run_once / cmd_run 共用）。"""
     tick_event = rt.tick({"cli": "run-once"})
     input_events = rt.ingest_inputs()
     m = rt.metrics()
@@ -119,7 +171,13 @@ def cmd_run_once(paths: Optional[CliPaths] = None, snapshot_every: int = 0) -> D
     }
 
 
-def cmd_run(ticks: int = 10, sleep_s: float = 0.2, paths: Optional[CliPaths] = None, snapshot_every: int = 0) -> None:
+def cmd_run(
+    ticks: int = 10,
+    sleep_s: float = 0.2,
+    paths: Optional[CliPaths] = None,
+    snapshot_every: int = 0,
+    policy_path: Optional[Path] = None,
+) -> None:
     """
     连续运行世界 N 次。
 
@@ -129,15 +187,20 @@ def cmd_run(ticks: int = 10, sleep_s: float = 0.2, paths: Optional[CliPaths] = N
 
     sleep_s：
     - 每次循环之间 sleep 一下，避免 CPU 100%
+
+    runtime 只恢复一次，之后每步 tick + ingest（与逐次 run_once 的结果相同，
+    但不用每步都重新读一遍 events.jsonl）。
     """
+    p = paths or default_paths()
+    rt = build_runtime_for_cli(p, policy_path=policy_path)
     for i in range(ticks):
-        out = cmd_run_once(paths=paths, snapshot_every=snapshot_every)
+        out = _step_once(rt, p, snapshot_every)
         print(f"[run {i+1}/{ticks}] t={out['metrics']['t']} inputs={out['metrics']['input_count']} cursor={out['cursor']}")
         if sleep_s > 0:
             time.sleep(sleep_s)
 
 
-def cmd_replay(paths: Optional[CliPaths] = None, fast: bool = True) -> Dict[str, Any]:
+def cmd_replay(paths: Optional[CliPaths] = None, fast: bool = True, verify: bool = False) -> Dict[str, Any]:
     """
     从 events.jsonl 回放重建世界（用于复盘/追责/教学）。
 
@@ -145,6 +208,8 @@ def cmd_replay(paths: Optional[CliPaths] = None, fast: bool = True) -> Dict[str,
     - 有 snapshot 时使用 replay_fast_from_store（快）
     - 没 snapshot 自动退化为全量 replay（稳）
 
+    verify=True：再额外校验“快照 + 补尾巴”的回放与全量回放完全一致（结果放在 "verify" 里）
+
     返回：
     - state / metrics / event_count
     """
@@ -159,14 +224,9 @@ def cmd_replay(paths: Optional[CliPaths] = None, fast: bool = True) -> Dict[str,
         rt = WorldRuntime.replay_from_store(store)
 
     m = rt.metrics()
-    return {
+    out: Dict[str, Any] = {
         "t": rt.t,
-        "state": {
-            "t": rt.state.t,
-            "tick_count": rt.state.tick_count,
-            "input_count": rt.state.input_count,
-            "last_input": rt.state.last_input,
-        },
+        "state": asdict(rt.state),
         "metrics": asdict(m),
         "event_count": len(rt.event_log),
         "paths": {
@@ -174,6 +234,9 @@ def cmd_replay(paths: Optional[CliPaths] = None, fast: bool = True) -> Dict[str,
             "snapshot": str(p.snapshot),
         },
     }
+    if verify:
+        out["verify"] = asdict(verify_snapshot(store, snap, projections_factory=default_projections))
+    return out
 
 
 def cmd_metrics(paths: Optional[CliPaths] = None) -> Dict[str, Any]:
@@ -181,3 +244,336 @@ def cmd_metrics(paths: Optional[CliPaths] = None) -> Dict[str, Any]:
     打印当前指标（从事件回放得到，结果稳定可重复）。
     """
     return cmd_replay(paths=paths, fast=True)["metrics"]
+
+
+def cmd_profile(
+    ticks: int = 100,
+    paths: Optional[CliPaths] = None,
+    out_dir: Optional[Path] = None,
+    inputs_per_tick: int = 0,
+    snapshot_every: int = 0,
+    trace_memory: bool = True,
+    top: int = 30,
+    policy_path: Optional[Path] = None,
+) -> Dict[str, Any]:
+    """
+    性能剖析：用同一个 runtime 连续跑 N 个 tick（不 sleep），同时开启：
+    - StageProfiler：按阶段聚合耗时（record / apply_event / evaluate_event / ...）
+    - cProfile：函数级耗时
+    - tracemalloc（可选）：内存分配热点
+
+    inputs_per_tick：
+    - 每个 tick 前往 input_queue 追加 K 条合成的 TEMP_READING（温度确定性递增），
+      让 ingest + policy 路径也有真实负载；0 表示只消费队列里已有的输入
+
+    报告写到 out_dir（默认 <base_dir>/profile/）：
+    - stages.json       分阶段直方图
+    - stages.collapsed  火焰图 collapsed stack（flamegraph.pl / speedscope 可直接读）
+    - cprofile.prof     原始 cProfile 数据（可用 snakeviz 等工具打开）
+    - cprofile.txt      按 cumulative 排序的前 top 个函数
+    - tracemalloc.txt   按行统计的前 top 个分配点（trace_memory=True 时）
+    """
+    p = paths or default_paths()
+    report_dir = out_dir or (p.base_dir / "profile")
+    report_dir.mkdir(parents=True, exist_ok=True)
+
+    rt = build_runtime_for_cli(p, policy_path=policy_path)
+    prof = StageProfiler()
+    rt.profiler = prof
+    snap = SnapshotStore(path=p.snapshot) if snapshot_every and snapshot_every > 0 else None
+    queue = FileInputQueue(path=p.input_queue)
+
+    if trace_memory:
+        tracemalloc.start()
+    cp = cProfile.Profile()
+    started = time.perf_counter()
+    cp.enable()
+    try:
+        for i in range(ticks):
+            for k in range(inputs_per_tick):
+                queue.append(ExternalInput(
+                    source="plugin",
+                    channel="equipment",
+                    name="TEMP_READING",
+                    data={"temp_c": 85.0 + (i * inputs_per_tick + k) % 15},
+                ))
+            rt.tick({"cli": "profile"})
+            rt.ingest_inputs()
+            if snap is not None:
+                rt.maybe_snapshot(snap, every_n_events=snapshot_every)
+    finally:
+        cp.disable()
+        elapsed_s = time.perf_counter() - started
+        mem_snapshot = tracemalloc.take_snapshot() if trace_memory else None
+        if trace_memory:
+            tracemalloc.stop()
+
+    assert rt.gateway is not None
+    save_int(p.cursor, rt.gateway.cursor)
+
+    prof.dump_json(report_dir / "stages.json")
+    prof.dump_collapsed(report_dir / "stages.collapsed")
+
+    cp.dump_stats(str(report_dir / "cprofile.prof"))
+    buf = io.StringIO()
+    pstats.Stats(cp, stream=buf).sort_stats("cumulative").print_stats(top)
+    (report_dir / "cprofile.txt").write_text(buf.getvalue(), encoding="utf-8")
+
+    if mem_snapshot is not None:
+        stats = mem_snapshot.statistics("lineno")[:top]
+        (report_dir / "tracemalloc.txt").write_text("\n".join(str(s) for s in stats) + "\n", encoding="utf-8")
+
+    return {
+        "ticks": ticks,
+        "elapsed_s": elapsed_s,
+        "ticks_per_s": ticks / elapsed_s if elapsed_s > 0 else 0.0,
+        "event_count": len(rt.event_log),
+        "stages": {name: h.to_dict()["total_ms"] for name, h in sorted(prof.stages.items())},
+        "report_dir": str(report_dir),
+    }
+
+
+def cmd_bench(
+    only: Optional[List[str]] = None,
+    sizes: Optional[List[int]] = None,
+    repeat: int = 3,
+    out_path: Optional[Path] = None,
+    baseline_path: Optional[Path] = None,
+    save_baseline: Optional[Path] = None,
+    threshold: float = 0.2,
+    work_dir: Optional[Path] = None,
+) -> Dict[str, Any]:
+    """
+    跑基准测试套件（cim_worldlab.benchmarks）。
+
+    - only：只跑匹配的基准（支持通配符，例如 "replay.*"）
+    - sizes：数据规模（默认 10k；完整规模用 10000,100000,1000000）
+    - out_path：把结果写成 JSON
+    - save_baseline：把本次结果保存为基线
+    - baseline_path：与基线对比，变慢超过 threshold 的用例标记为 regression
+
+    临时文件默认写到系统临时目录，跑完自动清理（不污染 out/）。
+    """
+    from cim_worldlab.benchmarks import (
+        BenchContext,
+        compare_results,
+        has_regression,
+        load_results,
+        run_suite,
+        save_results,
+    )
+    from cim_worldlab.benchmarks.suite import DEFAULT_SIZES
+
+    with tempfile.TemporaryDirectory(prefix="cim_bench_") as tmp:
+        ctx = BenchContext(
+            work_dir=work_dir or Path(tmp),
+            sizes=list(sizes or DEFAULT_SIZES),
+            repeat=repeat,
+        )
+        results = run_suite(ctx, only=only)
+
+    if out_path is not None:
+        save_results(out_path, results)
+    if save_baseline is not None:
+        save_results(save_baseline, results)
+
+    comparisons = []
+    if baseline_path is not None:
+        comparisons = compare_results(results, load_results(baseline_path), threshold=threshold)
+
+    return {
+        "results": results,
+        "comparisons": [c.to_dict() for c in comparisons],
+        "regression": has_regression(comparisons),
+    }
+
+
+def cmd_backtest(
+    paths: Optional[CliPaths] = None,
+    events_path: Optional[Path] = None,
+    policy_paths: Optional[List[Path]] = None,
+    thresholds: Optional[List[float]] = None,
+    rule_id: Optional[str] = None,
+    evaluation_path: Optional[Path] = None,
+    workers: Optional[int] = None,
+    out_path: Optional[Path] = None,
+) -> Dict[str, Any]:
+    """
+    用历史事件日志回测候选策略（cim_worldlab.backtest）。
+
+    候选来源：
+    - policy_paths：若干份声明式规则文件，每份是一个候选
+    - thresholds：以第一份规则文件为模板，只扫描 rule_id 的阈值（例如 90,92,94）
+
+    第一次运行会在 events.jsonl 旁边生成列式缓存（.cols），之后源文件不变就直接复用。
+    """
+    from cim_worldlab.backtest import format_table, load_candidate, load_evaluation, run_backtest, threshold_sweep
+
+    paths = paths or default_paths()
+    events_path = events_path or paths.events
+    if not policy_paths:
+        raise ValueError("backtest needs at least one --policy file")
+
+    candidates = [load_candidate(p) for p in policy_paths]
+    if thresholds:
+        candidates = threshold_sweep(candidates[0], thresholds, rule_id=rule_id)
+
+    rows = run_backtest(events_path, candidates, load_evaluation(evaluation_path), workers=workers)
+    if out_path is not None:
+        out_path.parent.mkdir(parents=True, exist_ok=True)
+        out_path.write_text(json.dumps(rows, ensure_ascii=False, indent=2), encoding="utf-8")
+    return {"rows": rows, "table": format_table(rows)}
+
+
+def cmd_trace(trace_id: str, paths: Optional[CliPaths] = None) -> Dict[str, Any]:
+    """
+    按 trace_id 查询端到端链路。
+
+    trace 索引（out/traces/）第一次使用时建立，之后每次只索引新增的事件；
+    查询只读一个桶文件 + 命中的几行日志，与日志总长度无关。
+    没有这个 trace_id 时返回 {"trace_id": ..., "found": False}。
+    """
+    p = paths or default_paths()
+    index = TraceIndex(p.events, index_dir=p.traces)
+    out = index.trace(trace_id)
+    if out is None:
+        return {"trace_id": trace_id, "found": False}
+    return {"found": True, **out}
+
+
+def cmd_latency(paths: Optional[CliPaths] = None) -> Dict[str, Any]:
+    """
+    延迟报告：读 events.jsonl 里的 meta 时间戳，按因果链统计各段延迟。
+
+    - receive_to_ingest：HTTP 收到 -> 输入进入世界
+    - ingest_to_decision / decision_to_action：世界内部的处理延迟
+    - receive_to_action：端到端（设备 POST -> ACTION_EXECUTED）
+    只统计带时间戳的事件（老日志 / 没挂 LatencyTracker 时各段 count 为 0）。
+    """
+    from cim_worldlab.world.runtime.latency import latency_report
+
+    p = paths or default_paths()
+    out = latency_report(FileEventStore(path=p.events).load_all())
+    out["paths"] = {"events": str(p.events)}
+    return out
+
+
+def cmd_follow(host: str = "127.0.0.1", port: int = 8001, events_path: Optional[Path] = None) -> None:
+    """
+    启动只读副本服务（阻塞运行）。
+
+    - 跟读 events.jsonl（按字节偏移增量读取，处理轮转），自己维护 WorldState 与指标
+    - GET /v1/state、/v1/metrics、/v1/events?from=<seq>：带 ETag，没变化时返回 304
+    - GET /v1/projections/{name}/{key}：投影查询（默认挂设备投影，例如 /v1/projections/equipment/EQ-7）
+    - 与 serve / run 是不同的进程：看板只查这里，写入者不受影响
+    """
+    import uvicorn
+
+    from cim_worldlab.plugins.follower_app import create_follower_app
+    from cim_worldlab.world.runtime import Follower
+
+    ep = events_path or default_paths().events
+    follower = Follower(ep, projections=default_projections())
+    uvicorn.run(create_follower_app(follower), host=host, port=port, reload=False)
+
+
+def cmd_host(
+    host: str = "127.0.0.1",
+    port: int = 8002,
+    root: Path = Path("worlds"),
+    idle_seconds: Optional[float] = 300.0,
+    max_loaded: Optional[int] = None,
+    workers: int = 4,
+) -> None:
+    """
+    启动多世界托管服务（阻塞运行）。
+
+    - 每个世界一个目录 <root>/<world_id>/（布局与 out/ 相同，replay 等命令可以直接对着它用）
+    - POST /v1/worlds/{world_id}/inputs：按 world id 路由输入
+    - 后台调度：共享线程池给有输入 / 已加载的世界跑步骤；空闲世界打快照后卸载，下次用到再加载
+    """
+    import uvicorn
+
+    from cim_worldlab.host import WorldHost
+    from cim_worldlab.plugins.host_app import create_host_app
+
+    world_host = WorldHost(root, idle_seconds=idle_seconds, max_loaded=max_loaded, workers=workers)
+    world_host.start()
+    try:
+        uvicorn.run(create_host_app(world_host), host=host, port=port, reload=False)
+    finally:
+        world_host.close()
+
+
+def cmd_simulate(
+    script: Path,
+    until: int,
+    policy_path: Optional[Path] = None,
+    skip_idle: bool = False,
+    events_out: Optional[Path] = None,
+) -> Dict[str, Any]:
+    """
+    无头加速模拟：从空世界开始，按脚本（JSONL，每行带 at）在虚拟时间注入输入，跑到 until。
+
+    - 不 sleep、不读写 out/ 目录；事件默认只在内存里
+    - events_out：把这次模拟的事件写成 JSONL（攒批写出；文件已存在时覆盖），之后可以用 replay 等工具看
+    - skip_idle：跳过没有输入的时段（决策 / 动作不变，tick 事件少得多）
+
+    返回：虚拟时间、tick 数、事件数、决策 / 动作数、墙钟耗时、速度，以及最终 state / metrics
+    """
+    store = None
+    if events_out is not None:
+        if events_out.exists():
+            events_out.unlink()
+        store = BufferedEventStore(path=events_out)
+    rt = WorldRuntime(event_store=store, policy=PolicyFile(policy_path) if policy_path is not None else None)
+    result = Simulation(rt, InputSchedule.from_jsonl(script), skip_idle=skip_idle).run(until)
+    return {
+        "t": result.t,
+        "ticks": result.ticks,
+        "events": result.events,
+        "decisions": len(result.decisions),
+        "actions": result.state.action_count,
+        "seconds": result.seconds,
+        "virtual_per_second": result.speed,
+        "state": asdict(result.state),
+        "metrics": asdict(result.metrics),
+    }
+
+
+def cmd_scenario_run(
+    project: Path,
+    policy_paths: Optional[List[Path]] = None,
+    seeds: int = 32,
+    first_seed: int = 0,
+    workers: Optional[int] = None,
+    cache_dir: Optional[Path] = None,
+    use_cache: bool = True,
+    out_path: Optional[Path] = None,
+    paths: Optional[CliPaths] = None,
+) -> Dict[str, Any]:
+    """
+    跑一个项目目录（例如 projects/P01_single_excursion）里的案例（cim_worldlab.scenario）。
+
+    - 基线：baseline/reference_policy.json；policy_paths 是要和它比的候选策略
+    - 每个策略跑 seeds 个随机种子（输入带扰动），没命中缓存的分发到进程池并行跑
+    - 缓存默认放在 out/scenario_cache，key 含案例 / 策略 / 评估口径 / 代码版本，任何一个变了都重跑；
+      use_cache=False 时不读也不写缓存
+    """
+    from cim_worldlab.scenario import format_report, run_scenario
+
+    paths = paths or default_paths()
+    if use_cache and cache_dir is None:
+        cache_dir = paths.base_dir / "scenario_cache"
+    report = run_scenario(
+        project,
+        policy_paths=policy_paths or [],
+        seeds=seeds,
+        first_seed=first_seed,
+        workers=workers,
+        cache_dir=cache_dir if use_cache else None,
+    )
+    if out_path is not None:
+        out_path.parent.mkdir(parents=True, exist_ok=True)
+        out_path.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+    return {"report": report, "table": format_report(report)}
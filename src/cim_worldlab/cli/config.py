@@ -13,6 +13,8 @@ CLI 配置集中管理（非常重要的工程习惯）
 - events.jsonl：世界运行产生的事件留痕
 - snapshot.json：快照（用于 replay 加速）
 - cursor.txt：FileQueueGateway 的消费游标（增量消费输入队列）
+- causal_index.bin：因果索引（seq -> 原因 seq，定长记录）
+- traces/：trace 索引（trace_id -> 事件位置，哈希分桶）
 """
 
 from __future__ import annotations
@@ -41,6 +43,14 @@ class CliPaths:
     def cursor(self) -> Path:
         return self.base_dir / "cursor.txt"
 
+    @property
+    def causal_index(self) -> Path:
+        return self.base_dir / "causal_index.bin"
+
+    @property
+    def traces(self) -> Path:
+        return self.base_dir / "traces"
+
 
 def default_paths() -> CliPaths:
     """
@@ -14,7 +14,7 @@ import argparse
 import json
 from pathlib import Path
 
-from cim_worldlab.cli.commands import cmd_serve, cmd_run_once, cmd_run, cmd_replay
+from cim_worldlab.cli.commands import cmd_serve, cmd_run_once, cmd_run, cmd_replay, cmd_profile, cmd_bench, cmd_backtest, cmd_trace, cmd_latency, cmd_follow, cmd_host, cmd_simulate, cmd_scenario_run
 
 
 def build_parser() -> argparse.ArgumentParser:
@@ -31,6 +31,7 @@ def build_parser() -> argparse.ArgumentParser:
     pr = sub.add_parser("run-once", help="Run one tick + ingest inputs, print metrics")
     pr.add_argument("--snapshot-every", type=int, default=0, help="Save snapshot every N events (0=disable)")
     pr.add_argument("--pretty",action="store_true",help="Pretty output for projector")
+    pr.add_argument("--policy", type=Path, default=None, help="Declarative policy rules JSON (hot-reloaded)")
 
 
     # run
@@ -38,10 +39,84 @@ def build_parser() -> argparse.ArgumentParser:
     prun.add_argument("--ticks", type=int, default=10)
     prun.add_argument("--sleep", type=float, default=0.2)
     prun.add_argument("--snapshot-every", type=int, default=0, help="Save snapshot every N events (0=disable)")
+    prun.add_argument("--policy", type=Path, default=None, help="Declarative policy rules JSON (hot-reloaded)")
 
     # replay
     prep = sub.add_parser("replay", help="Replay world from events store and print state/metrics")
     prep.add_argument("--full", action="store_true", help="Force full replay (ignore snapshot)")
+    prep.add_argument("--verify", action="store_true", help="Check snapshot+tail replay equals full replay")
+
+    # profile
+    pprof = sub.add_parser("profile", help="Run N ticks under cProfile/tracemalloc and write a report")
+    pprof.add_argument("--ticks", type=int, default=100)
+    pprof.add_argument("--inputs-per-tick", type=int, default=0, help="Append K synthetic TEMP_READING inputs before each tick")
+    pprof.add_argument("--snapshot-every", type=int, default=0, help="Save snapshot every N events (0=disable)")
+    pprof.add_argument("--out", type=Path, default=None, help="Report directory (default: out/profile)")
+    pprof.add_argument("--no-tracemalloc", action="store_true", help="Disable tracemalloc (lower overhead)")
+    pprof.add_argument("--policy", type=Path, default=None, help="Declarative policy rules JSON")
+
+    # bench
+    pbench = sub.add_parser("bench", help="Run benchmark suite, optionally compare with a baseline")
+    pbench.add_argument("--only", nargs="*", default=None, help="Benchmark name patterns, e.g. 'replay.*'")
+    pbench.add_argument("--sizes", default=None, help="Comma separated event counts, e.g. 10000,100000,1000000")
+    pbench.add_argument("--repeat", type=int, default=3, help="Repeat each case N times and keep the best")
+    pbench.add_argument("--out", type=Path, default=None, help="Write results JSON here")
+    pbench.add_argument("--baseline", type=Path, default=None, help="Compare against this baseline JSON")
+    pbench.add_argument("--save-baseline", type=Path, default=None, help="Save results as a new baseline")
+    pbench.add_argument("--threshold", type=float, default=0.2, help="Regression threshold (0.2 = 20%% slower)")
+
+    # backtest
+    pbt = sub.add_parser("backtest", help="Backtest candidate policies against a historical events.jsonl")
+    pbt.add_argument("--events", type=Path, default=None, help="Events file (default out/events.jsonl)")
+    pbt.add_argument("--policy", type=Path, nargs="+", required=True, help="Candidate policy JSON files")
+    pbt.add_argument("--thresholds", default=None, help="Sweep thresholds of one rule, e.g. 90,92,94")
+    pbt.add_argument("--rule", default=None, help="Rule id to sweep (default: first rule)")
+    pbt.add_argument("--evaluation", type=Path, default=None, help="Evaluation spec (JSON/YAML) with ground truth")
+    pbt.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    pbt.add_argument("--out", type=Path, default=None, help="Write result rows JSON here")
+
+    # trace
+    ptr = sub.add_parser("trace", help="Show the input -> decision -> action chain of one trace_id")
+    ptr.add_argument("trace_id", help="Trace id, e.g. TR-42-0")
+
+    # latency
+    sub.add_parser("latency", help="Latency report: receive -> ingest -> decision -> action")
+
+    # follow
+    pfol = sub.add_parser("follow", help="Start a read-only replica that tails events.jsonl (HTTP queries)")
+    pfol.add_argument("--host", default="127.0.0.1", help="Host to bind")
+    pfol.add_argument("--port", type=int, default=8001, help="Port to bind")
+    pfol.add_argument("--events", type=Path, default=None, help="Events file (default out/events.jsonl)")
+
+    # host
+    phost = sub.add_parser("host", help="Host many worlds in one service (per-world ingest, idle eviction)")
+    phost.add_argument("--host", default="127.0.0.1", help="Host to bind")
+    phost.add_argument("--port", type=int, default=8002, help="Port to bind")
+    phost.add_argument("--root", type=Path, default=Path("worlds"), help="Root directory, one subdirectory per world")
+    phost.add_argument("--idle-seconds", type=float, default=300.0, help="Evict worlds idle for this long (snapshot to disk)")
+    phost.add_argument("--max-loaded", type=int, default=None, help="Max worlds kept in memory (LRU eviction)")
+    phost.add_argument("--workers", type=int, default=4, help="Shared worker threads for stepping worlds")
+
+    # simulate
+    psim = sub.add_parser("simulate", help="Headless accelerated simulation in virtual time from a scripted input file")
+    psim.add_argument("script", type=Path, help="JSONL file, one input per line with an 'at' virtual time")
+    psim.add_argument("--until", type=int, required=True, help="Run until this virtual time")
+    psim.add_argument("--policy", type=Path, default=None, help="Declarative policy JSON (default: built-in rules)")
+    psim.add_argument("--skip-idle", action="store_true", help="Jump over idle periods instead of ticking through them")
+    psim.add_argument("--events-out", type=Path, default=None, help="Write the simulated events to this JSONL file")
+
+    # scenario
+    psc = sub.add_parser("scenario", help="Run projects/ case definitions")
+    psc_sub = psc.add_subparsers(dest="scenario_cmd", required=True)
+    pscr = psc_sub.add_parser("run", help="Simulate a project case over many seeds and score it against the baseline")
+    pscr.add_argument("project", type=Path, help="Project directory, e.g. projects/P01_single_excursion")
+    pscr.add_argument("--policy", type=Path, nargs="*", default=None, help="Candidate policy JSON files to compare")
+    pscr.add_argument("--seeds", type=int, default=32, help="Number of randomized seeds per policy")
+    pscr.add_argument("--first-seed", type=int, default=0, help="First seed (seeds are consecutive)")
+    pscr.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    pscr.add_argument("--cache-dir", type=Path, default=None, help="Result cache directory (default out/scenario_cache)")
+    pscr.add_argument("--no-cache", action="store_true", help="Neither read nor write cached results")
+    pscr.add_argument("--out", type=Path, default=None, help="Write the full report JSON here")
 
     return p
 
@@ -55,7 +130,7 @@ def main(argv: list[str] | None = None) -> int:
         return 0
 
     if args.cmd == "run-once":
-        out = cmd_run_once(snapshot_every=args.snapshot_every)
+        out = cmd_run_once(snapshot_every=args.snapshot_every, policy_path=args.policy)
 
         if args.pretty:
             # ========= 投屏友好输出 =========
@@ -116,12 +191,105 @@ def main(argv: list[str] | None = None) -> int:
 
 
     if args.cmd == "run":
-        cmd_run(ticks=args.ticks, sleep_s=args.sleep, snapshot_every=args.snapshot_every)
+        cmd_run(ticks=args.ticks, sleep_s=args.sleep, snapshot_every=args.snapshot_every, policy_path=args.policy)
         return 0
 
     if args.cmd == "replay":
-        out = cmd_replay(fast=not args.full)
+        out = cmd_replay(fast=not args.full, verify=args.verify)
+        print(json.dumps(out, ensure_ascii=False, indent=2))
+        return 1 if args.verify and not out["verify"]["ok"] else 0
+
+    if args.cmd == "profile":
+        out = cmd_profile(
+            ticks=args.ticks,
+            out_dir=args.out,
+            inputs_per_tick=args.inputs_per_tick,
+            snapshot_every=args.snapshot_every,
+            trace_memory=not args.no_tracemalloc,
+            policy_path=args.policy,
+        )
         print(json.dumps(out, ensure_ascii=False, indent=2))
         return 0
 
+    if args.cmd == "bench":
+        sizes = [int(x) for x in args.sizes.split(",")] if args.sizes else None
+        out = cmd_bench(
+            only=args.only,
+            sizes=sizes,
+            repeat=args.repeat,
+            out_path=args.out,
+            baseline_path=args.baseline,
+            save_baseline=args.save_baseline,
+            threshold=args.threshold,
+        )
+        for r in out["results"]["results"]:
+            rate = f"{r['ops_per_s']:.0f} ops/s" if r["ops_per_s"] else "-"
+            print(f"{r['key']:<40} {r['seconds'] * 1000:>10.2f} ms  {rate}")
+        for c in out["comparisons"]:
+            if c["status"] != "ok":
+                ratio = f"x{c['ratio']:.2f}" if c["ratio"] is not None else ""
+                print(f"[{c['status']}] {c['key']} {ratio}")
+        return 1 if out["regression"] else 0
+
+    if args.cmd == "backtest":
+        thresholds = [float(x) for x in args.thresholds.split(",")] if args.thresholds else None
+        out = cmd_backtest(
+            events_path=args.events,
+            policy_paths=args.policy,
+            thresholds=thresholds,
+            rule_id=args.rule,
+            evaluation_path=args.evaluation,
+            workers=args.workers,
+            out_path=args.out,
+        )
+        print(out["table"])
+        return 0
+
+    if args.cmd == "trace":
+        out = cmd_trace(args.trace_id)
+        print(json.dumps(out, ensure_ascii=False, indent=2))
+        return 0 if out["found"] else 1
+
+    if args.cmd == "latency":
+        out = cmd_latency()
+        for name, h in out["segments"].items():
+            print(f"{name:<20} n={h['count']:<8} p50={h['p50_us']:>10.1f} us  p90={h['p90_us']:>10.1f} us  p99={h['p99_us']:>10.1f} us")
+        return 0
+
+    if args.cmd == "follow":
+        cmd_follow(host=args.host, port=args.port, events_path=args.events)
+        return 0
+
+    if args.cmd == "simulate":
+        out = cmd_simulate(
+            args.script, args.until, policy_path=args.policy, skip_idle=args.skip_idle, events_out=args.events_out
+        )
+        print(json.dumps(out, ensure_ascii=False, indent=2))
+        return 0
+
+    if args.cmd == "scenario" and args.scenario_cmd == "run":
+        out = cmd_scenario_run(
+            args.project,
+            policy_paths=args.policy,
+            seeds=args.seeds,
+            first_seed=args.first_seed,
+            workers=args.workers,
+            cache_dir=args.cache_dir,
+            use_cache=not args.no_cache,
+            out_path=args.out,
+        )
+        print(out["table"])
+        return 0
+
+    if args.cmd == "host":
+        cmd_host(
+            host=args.host,
+            port=args.port,
+            root=args.root,
+            idle_seconds=args.idle_seconds,
+            max_loaded=args.max_loaded,
+            workers=args.workers,
+        )
+        return 0
+
     raise SystemExit("Unknown command")
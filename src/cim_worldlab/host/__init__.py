@@ -0,0 +1,9 @@
+"""
+host 包：一个服务里托管很多个世界（多租户）
+
+- WorldHost：按 world id 管理多个 WorldRuntime（共享线程池调度、空闲卸载到快照、按需懒加载）
+- check_world_id：world id 校验（就是目录名）
+"""
+from .world_host import WorldHost, check_world_id
+
+__all__ = ["WorldHost", "check_world_id"]
@@ -0,0 +1,299 @@
+"""
+world_host.py
+=============
+WorldHost：一个服务里托管很多个世界（多租户）
+
+问题：
+- 每个世界都绑在一个 CliPaths(base_dir=Path("out")) 上，一个世界一个进程
+- 我们有几十个实验 / 产线场景（例如 projects/P01_single_excursion），大部分时间是空闲的
+
+做法：
+- 按 world id 管理多个 WorldRuntime，每个世界一个目录：<root>/<world_id>/
+  目录布局与 CLI 完全相同（input_queue.jsonl / events.jsonl / snapshot.json / cursor.txt ...），
+  所以 replay / trace / latency 等命令直接对着某个世界的目录用
+- 输入路由：ingest(world_id, inp) 只往这个世界的输入队列追加一行（不需要把世界加载进内存）
+- 调度：step_all() 一轮 —— 有新输入的世界各跑一步（tick + 消费输入；没加载的先懒加载），
+  没有输入的世界不 tick（这样空闲的世界才真的空闲）；各世界的步骤提交到共享的线程池并发执行
+  （每个世界一把锁：同一个世界同时只有一个步骤）
+- 空闲回收：idle_seconds 内没有真实活动（输入、查询、消费了输入的一步）的世界打快照、存游标，
+  然后从内存里卸掉（调度本身不算活动）；
+  下次有输入或查询时从快照 + 事件日志懒加载回来（replay_fast）
+- max_loaded：同时加载的世界数上限，超出时先卸最久没用的
+- 世界目录里有 policy.json 时用它做声明式规则（热加载）；没有就用内置规则
+
+start(interval) / stop()：后台线程按 interval 秒循环 step_all + evict_idle（HTTP 服务用）；
+测试里直接调 step_all / evict_idle。
+"""
+
+from __future__ import annotations
+
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional
+
+from cim_worldlab.cli.commands import build_runtime_for_cli
+from cim_worldlab.cli.config import CliPaths
+from cim_worldlab.cli.utils import load_int, save_int
+from cim_worldlab.world.events.external_input import ExternalInput
+from cim_worldlab.world.persistence import SnapshotStore
+from cim_worldlab.world.persistence.file_input_queue import FileInputQueue
+from cim_worldlab.world.runtime import WorldRuntime
+
+if TYPE_CHECKING:
+    from cim_worldlab.world.metrics import WorldMetrics
+
+POLICY_FILE = "policy.json"
+
+_WORLD_ID = re.compile(r"[A-Za-z0-9][A-Za-z0-9_.-]{0,127}")  # 用 fullmatch：$ 会放过结尾的换行
+
+
+def check_world_id(world_id: str) -> str:
+    """world id 就是目录名：只允许字母数字和 _ . -（不能以 . 开头），防止路径穿越。"""
+    if not _WORLD_ID.fullmatch(world_id):
+        raise ValueError(f"invalid world id: {world_id!r}")
+    return world_id
+
+
+def _count_lines(path: Path) -> int:
+    if not path.exists():
+        return 0
+    with path.open("rb") as f:
+        return sum(chunk.count(b"\n") for chunk in iter(lambda: f.read(1 << 20), b""))
+
+
+@dataclass
+class _World:
+    """一个世界的托管槽位：runtime 为 None 表示已卸载（只在磁盘上）。"""
+    paths: CliPaths
+    lock: threading.Lock = field(default_factory=threading.Lock)
+    runtime: Optional[WorldRuntime] = None
+    last_used: float = 0.0          # 最近一次真实活动（输入 / 查询 / 消费了输入的一步）
+    pending: bool = False
+    loads: int = 0
+
+
+class WorldHost:
+    """
+    - root：所有世界的根目录（每个世界一个子目录）
+    - idle_seconds：多久没用就卸载（None = 不按空闲卸载）
+    - max_loaded：同时加载的世界数上限（None = 不限）
+    - snapshot_every：每个世界每攒够 N 条事件打一次快照（卸载时总会打一次）
+    - workers：共享线程池大小
+    - clock：时钟（测试里可以换成假的）
+    """
+
+    def __init__(
+        self,
+        root: Path,
+        idle_seconds: Optional[float] = 300.0,
+        max_loaded: Optional[int] = None,
+        snapshot_every: int = 1000,
+        workers: int = 4,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        if max_loaded is not None and max_loaded < 1:
+            raise ValueError("max_loaded must be >= 1")
+        self.root = Path(root)
+        self.idle_seconds = idle_seconds
+        self.max_loaded = max_loaded
+        self.snapshot_every = snapshot_every
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._worlds: Dict[str, _World] = {}
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="world")
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._discover()
+
+    # -------------------------------
+    # 世界槽位
+    # -------------------------------
+
+    def _discover(self) -> None:
+        """已有的世界目录：输入队列的行数比游标多，说明还有没消费的输入，标记为待处理。"""
+        if not self.root.exists():
+            return
+        for d in sorted(self.root.iterdir()):
+            if d.is_dir() and _WORLD_ID.fullmatch(d.name):
+                w = self._slot(d.name)
+                w.pending = _count_lines(w.paths.input_queue) > load_int(w.paths.cursor, default=0)
+
+    def _slot(self, world_id: str) -> _World:
+        check_world_id(world_id)
+        with self._lock:
+            w = self._worlds.get(world_id)
+            if w is None:
+                w = self._worlds[world_id] = _World(CliPaths(base_dir=self.root / world_id))
+            return w
+
+    def world_ids(self) -> List[str]:
+        with self._lock:
+            return sorted(self._worlds)
+
+    def exists(self, world_id: str) -> bool:
+        return _WORLD_ID.fullmatch(world_id) is not None and (self.root / world_id).is_dir()
+
+    def _load(self, w: _World) -> WorldRuntime:
+        """懒加载（调用方持有 w.lock）：与 CLI 同样的方式从快照 + 事件日志恢复。"""
+        if w.runtime is None:
+            policy = w.paths.base_dir / POLICY_FILE
+            w.runtime = build_runtime_for_cli(w.paths, policy_path=policy if policy.exists() else None)
+            w.loads += 1
+        return w.runtime
+
+    def _unload(self, w: _World) -> bool:
+        """卸载（调用方持有 w.lock）：打快照、存游标，然后丢掉内存里的 runtime。"""
+        rt = w.runtime
+        if rt is None:
+            return False
+        if len(rt.event_log) > rt.events_at_snapshot:
+            rt.save_snapshot(SnapshotStore(path=w.paths.snapshot))
+        if rt.gateway is not None:
+            save_int(w.paths.cursor, rt.gateway.cursor)  # type: ignore[attr-defined]
+        w.runtime = None
+        return True
+
+    # -------------------------------
+    # 输入 / 调度
+    # -------------------------------
+
+    def ingest(self, world_id: str, inp: ExternalInput) -> None:
+        """把输入追加到这个世界的输入队列（世界不存在时创建目录）；下一轮调度消费。"""
+        w = self._slot(world_id)
+        FileInputQueue(path=w.paths.input_queue).append(inp)
+        w.pending = True
+        w.last_used = self.clock()
+
+    def step(self, world_id: str) -> int:
+        """这个世界跑一步（tick + 消费输入），返回留痕的事件数。"""
+        w = self._slot(world_id)
+        with w.lock:
+            n = self._step(w)
+        self._enforce_max_loaded()
+        return n
+
+    def _step(self, w: _World) -> int:
+        w.pending = False
+        rt = self._load(w)
+        before = len(rt.event_log)
+        rt.tick()
+        if rt.ingest_inputs():
+            w.last_used = self.clock()
+        save_int(w.paths.cursor, rt.gateway.cursor)  # type: ignore[union-attr, attr-defined]
+        if self.snapshot_every > 0:
+            rt.maybe_snapshot(SnapshotStore(path=w.paths.snapshot), every_n_events=self.snapshot_every)
+        return len(rt.event_log) - before
+
+    def step_all(self) -> Dict[str, int]:
+        """
+        一轮调度：有新输入的世界各跑一步（共享线程池并发）；没有输入的世界不 tick。
+        返回 {world_id: 这一步留痕的事件数}。
+        """
+        with self._lock:
+            due = {wid: w for wid, w in self._worlds.items() if w.pending}
+
+        def run(w: _World) -> int:
+            with w.lock:
+                return self._step(w)
+
+        futures = {wid: self._pool.submit(run, w) for wid, w in due.items()}
+        out = {wid: f.result() for wid, f in futures.items()}
+        self._enforce_max_loaded()
+        return out
+
+    def evict(self, world_id: str) -> bool:
+        w = self._slot(world_id)
+        with w.lock:
+            return self._unload(w)
+
+    def evict_idle(self) -> List[str]:
+        """卸载 idle_seconds 内没用过的世界，返回卸掉的 world id。"""
+        if self.idle_seconds is None:
+            return []
+        now = self.clock()
+        with self._lock:
+            idle = [(wid, w) for wid, w in self._worlds.items()
+                    if w.runtime is not None and not w.pending and now - w.last_used >= self.idle_seconds]
+        evicted = []
+        for wid, w in idle:
+            with w.lock:
+                if w.runtime is not None and not w.pending and now - w.last_used >= self.idle_seconds:
+                    self._unload(w)
+                    evicted.append(wid)
+        return evicted
+
+    def _enforce_max_loaded(self) -> None:
+        if self.max_loaded is None:
+            return
+        with self._lock:
+            loaded = sorted((w.last_used, wid) for wid, w in self._worlds.items() if w.runtime is not None)
+        for _, wid in loaded[: max(0, len(loaded) - self.max_loaded)]:
+            self.evict(wid)
+
+    # -------------------------------
+    # 查询（懒加载）
+    # -------------------------------
+
+    def _with_runtime(self, world_id: str, fn: Callable[[WorldRuntime], Any]) -> Any:
+        w = self._slot(world_id)
+        with w.lock:
+            result = fn(self._load(w))
+            w.last_used = self.clock()
+        self._enforce_max_loaded()
+        return result
+
+    def metrics(self, world_id: str) -> WorldMetrics:
+        return self._with_runtime(world_id, lambda rt: rt.metrics())
+
+    def project(self, world_id: str, name: str, key: str) -> Optional[Dict[str, Any]]:
+        return self._with_runtime(world_id, lambda rt: rt.project(name, key))
+
+    def status(self) -> List[Dict[str, Any]]:
+        """每个世界：是否已加载、是否有待处理输入、加载过几次、内存里的事件数。"""
+        with self._lock:
+            items = sorted(self._worlds.items())
+        return [
+            {
+                "world_id": wid,
+                "loaded": w.runtime is not None,
+                "pending": w.pending,
+                "loads": w.loads,
+                "events": len(w.runtime.event_log) if w.runtime is not None else None,
+            }
+            for wid, w in items
+        ]
+
+    # -------------------------------
+    # 后台调度
+    # -------------------------------
+
+    def start(self, interval: float = 0.2) -> None:
+        if self._thread is not None:
+            return
+        self._stop.clear()
+
+        def loop() -> None:
+            while not self._stop.wait(interval):
+                self.step_all()
+                self.evict_idle()
+
+        self._thread = threading.Thread(target=loop, name="world-host", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+
+    def close(self) -> None:
+        """停调度、把所有加载着的世界卸载（打快照），关线程池。"""
+        self.stop()
+        for wid in self.world_ids():
+            self.evict(wid)
+        self._pool.shutdown(wait=True)
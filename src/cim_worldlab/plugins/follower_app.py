@@ -0,0 +1,220 @@
+"""
+follower_app.py
+===============
+只读查询服务：把 Follower（只读副本）的状态暴露给看板
+
+- GET /v1/state：当前世界状态（WorldState）
+- GET /v1/metrics：当前指标（WorldMetrics，增量维护，不回放）
+- GET /v1/events?from=<seq>&limit=<n>：从某个 seq 开始的事件（分页拉取）
+- GET /v1/projections：挂了哪些投影、各有多少个 key
+- GET /v1/projections/{name}/{key}：某个 key 的当前状态（例如每台设备的温度 / 最近动作），O(1)
+
+缓存（ETag / If-None-Match）：
+- 每个响应都带 ETag："<generation>-<last_index>"（最后一条已应用事件的 seq）
+- 看板带着上次的 ETag 来问：没有新事件 -> 304 Not Modified，不传正文
+- 看板怎么频繁刷新都只打到这个进程，写入者（runtime）完全不受影响
+
+每个请求先 poll 一次（只多一次 stat；有新事件才读文件），所以查到的总是最新的。
+
+推送（不用再轮询）：
+- GET /v1/stream：Server-Sent Events；WS /v1/ws：WebSocket（每条消息是一帧 JSON）
+- 查询参数：type / channel / trace_id（可重复，任一匹配）、snapshots（是否要状态差量 / 指标）、
+  buffer（缓冲上限）、policy（drop_oldest / drop_newest / coalesce）、limit（推够 N 帧后断开）
+- 连上先收到一份全量状态，之后是新事件、状态差量、指标（见 world/runtime/broadcast.py）
+- 所有连接共用一次 poll（poll_interval 秒内只读一次文件），每个事件只序列化一次
+"""
+
+from __future__ import annotations
+
+import asyncio
+from dataclasses import asdict
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+from fastapi import FastAPI, HTTPException, Query, Request, Response, WebSocket, WebSocketDisconnect
+from fastapi.responses import JSONResponse, ORJSONResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool
+
+from cim_worldlab.world.events.codec import HAS_ORJSON
+from cim_worldlab.world.runtime.broadcast import (
+    DROP_OLDEST,
+    OVERFLOW_POLICIES,
+    EventBroadcaster,
+    Frame,
+    StreamFilter,
+    Subscription,
+)
+from cim_worldlab.world.runtime.follower import Follower
+
+_Json = ORJSONResponse if HAS_ORJSON else JSONResponse
+
+
+def _etag_matches(header: Optional[str], etag: str) -> bool:
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in header.split(","))
+
+
+def create_follower_app(follower: Follower, poll_interval: float = 0.2) -> FastAPI:
+    """
+    app 工厂：注入一个 Follower（测试里直接指向临时的 events.jsonl）。
+    poll_interval：推送连接等新事件时多久读一次文件（秒）。
+    """
+    app = FastAPI(title="CIM WorldLab Read Replica", version="0.2.0", default_response_class=_Json)
+    if follower.broadcaster is None:
+        follower.broadcaster = EventBroadcaster()
+    broadcaster = follower.broadcaster
+
+    def subscribe(
+        types: List[str], channels: List[str], trace_ids: List[str], snapshots: bool, buffer: int, policy: str
+    ) -> Subscription:
+        if policy not in OVERFLOW_POLICIES:
+            raise HTTPException(status_code=400, detail=f"policy must be one of {list(OVERFLOW_POLICIES)}")
+        sub = broadcaster.subscribe(StreamFilter.of(types, channels, trace_ids, snapshots), max_frames=buffer, policy=policy)
+        if snapshots:
+            sub.push(follower.read(lambda: broadcaster.state_frame(follower.state_dict(), follower.last_index)))
+        return sub
+
+    async def frames_of(sub: Subscription, limit: Optional[int], closed: Callable[[], Awaitable[bool]]) -> AsyncIterator[List[Frame]]:
+        # 有帧就成批交出去；没有就 poll 一次（poll_interval 内所有连接只读一次文件），没读到新事件再睡
+        try:
+            sent = 0
+            while limit is None or sent < limit:
+                frames = sub.drain(None if limit is None else limit - sent)
+                if frames:
+                    sent += len(frames)
+                    yield frames
+                    continue
+                if await closed():
+                    return
+                if not await run_in_threadpool(follower.maybe_poll, poll_interval):
+                    await asyncio.sleep(poll_interval)
+        finally:
+            broadcaster.unsubscribe(sub)
+
+    def respond(request: Request, build) -> Response:
+        follower.poll()
+        if_none_match = request.headers.get("if-none-match")
+
+        def read():
+            # ETag 与正文在同一次加锁里取：中间插进来的 poll 不会让正文比 ETag 新
+            etag = follower.etag()
+            return etag, None if _etag_matches(if_none_match, etag) else build()
+
+        etag, body = follower.read(read)
+        if body is None:
+            return Response(status_code=304, headers={"ETag": etag})
+        return _Json(body, headers={"ETag": etag})
+
+    @app.get("/health")
+    def health() -> Dict[str, str]:
+        return {"status": "ok"}
+
+    @app.get("/v1/state")
+    def get_state(request: Request) -> Response:
+        return respond(request, lambda: {"last_index": follower.last_index, "state": follower.state_dict()})
+
+    @app.get("/v1/metrics")
+    def get_metrics(request: Request) -> Response:
+        return respond(request, lambda: {"last_index": follower.last_index, "metrics": asdict(follower.metrics())})
+
+    @app.get("/v1/events")
+    def get_events(
+        request: Request,
+        from_seq: int = Query(0, alias="from", ge=0),
+        limit: int = Query(100, ge=1, le=10_000),
+    ) -> Response:
+        def build() -> Dict[str, Any]:
+            events = follower.events(from_seq, limit)
+            next_from = events[-1].seq + 1 if events and events[-1].seq is not None else from_seq
+            return {
+                "last_index": follower.last_index,
+                "from": from_seq,
+                "next": next_from,
+                "events": [{"id": e.id, **e.to_dict()} for e in events],
+            }
+
+        return respond(request, build)
+
+    @app.get("/v1/projections")
+    def list_projections(request: Request) -> Response:
+        def build() -> Dict[str, Any]:
+            ps = follower.projections
+            sizes = {p.name: len(p.keys()) for p in ps} if ps is not None else {}
+            return {"last_index": follower.last_index, "projections": sizes}
+
+        return respond(request, build)
+
+    @app.get("/v1/projections/{name}/{key}")
+    def get_projection(name: str, key: str, request: Request) -> Response:
+        if follower.projections is None or name not in follower.projections:
+            raise HTTPException(status_code=404, detail=f"projection {name!r} not found")
+        follower.poll()
+        if follower.project(name, key) is None:
+            raise HTTPException(status_code=404, detail=f"{name} {key!r} not found")
+        return respond(request, lambda: {"last_index": follower.last_index, "name": name, "value": follower.project(name, key)})
+
+    @app.get("/v1/stream")
+    async def stream(
+        request: Request,
+        types: List[str] = Query([], alias="type"),
+        channels: List[str] = Query([], alias="channel"),
+        trace_ids: List[str] = Query([], alias="trace_id"),
+        snapshots: bool = True,
+        buffer: int = Query(1000, ge=1, le=100_000),
+        policy: str = DROP_OLDEST,
+        limit: Optional[int] = Query(None, ge=1),
+    ) -> StreamingResponse:
+        sub = subscribe(types, channels, trace_ids, snapshots, buffer, policy)
+
+        async def body() -> AsyncIterator[bytes]:
+            async for frames in frames_of(sub, limit, request.is_disconnected):
+                yield b"".join(f.sse for f in frames)
+
+        return StreamingResponse(body(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+    @app.websocket("/v1/ws")
+    async def ws(
+        websocket: WebSocket,
+        types: List[str] = Query([], alias="type"),
+        channels: List[str] = Query([], alias="channel"),
+        trace_ids: List[str] = Query([], alias="trace_id"),
+        snapshots: bool = True,
+        buffer: int = Query(1000, ge=1, le=100_000),
+        policy: str = DROP_OLDEST,
+        limit: Optional[int] = Query(None, ge=1),
+    ) -> None:
+        if policy not in OVERFLOW_POLICIES:
+            await websocket.close(code=1008)
+            return
+        await websocket.accept()
+        sub = subscribe(types, channels, trace_ids, snapshots, buffer, policy)
+
+        # client_state 要等服务端收 / 发一次才会变：没有新事件时察觉不到断线。
+        # 所以旁边挂一个接收任务（客户端不发消息，收到的只会是断开通知）
+        gone = asyncio.Event()
+
+        async def watch() -> None:
+            try:
+                while (await websocket.receive())["type"] != "websocket.disconnect":
+                    pass
+            finally:
+                gone.set()
+
+        async def closed() -> bool:
+            return gone.is_set()
+
+        watcher = asyncio.create_task(watch())
+        try:
+            async for frames in frames_of(sub, limit, closed):
+                for f in frames:
+                    await websocket.send_text(f.text)
+            if not gone.is_set():
+                await websocket.close()
+        except WebSocketDisconnect:
+            pass
+        finally:
+            watcher.cancel()
+
+    return app
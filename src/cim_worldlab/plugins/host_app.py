@@ -0,0 +1,94 @@
+"""
+host_app.py
+===========
+多世界托管服务：一个进程里托管很多个世界（WorldHost），按 world id 路由
+
+- POST /v1/worlds/{world_id}/inputs：写入这个世界的输入队列（同 /v1/inputs：Pydantic + JSON Schema 校验，失败 400）
+  世界不存在时自动创建；不需要把世界加载进内存，后台调度下一轮消费
+- GET /v1/worlds：所有世界（是否已加载、是否有待处理输入、加载过几次）
+- GET /v1/worlds/{world_id}/metrics：这个世界的指标（已卸载的世界会被懒加载回来）
+- GET /v1/worlds/{world_id}/projections/{name}/{key}：投影查询
+- 非法的 world id 返回 400；查询不存在的世界返回 404
+"""
+
+from __future__ import annotations
+
+import time
+from dataclasses import asdict
+from pathlib import Path
+from typing import Any, Dict, List
+
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import JSONResponse, ORJSONResponse
+
+from cim_worldlab.host.world_host import WorldHost, check_world_id
+from cim_worldlab.plugins.http_ingest_app import DEFAULT_SCHEMA_PATH, InputIn
+from cim_worldlab.plugins.schema_validation import load_schema, validate_or_raise
+from cim_worldlab.world.events.codec import HAS_ORJSON
+from cim_worldlab.world.events.external_input import ExternalInput
+
+
+def create_host_app(host: WorldHost, schema_path: Path = DEFAULT_SCHEMA_PATH) -> FastAPI:
+    """
+    app 工厂：注入一个 WorldHost（调度由调用方 host.start() 负责，测试里直接调 step_all）。
+    """
+    app = FastAPI(
+        title="CIM WorldLab World Host",
+        version="0.1.0",
+        default_response_class=ORJSONResponse if HAS_ORJSON else JSONResponse,
+    )
+    schema = load_schema(schema_path)
+
+    def world(world_id: str, must_exist: bool) -> str:
+        try:
+            check_world_id(world_id)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        if must_exist and not host.exists(world_id):
+            raise HTTPException(status_code=404, detail=f"world {world_id!r} not found")
+        return world_id
+
+    @app.get("/health")
+    def health() -> Dict[str, str]:
+        return {"status": "ok"}
+
+    @app.get("/v1/worlds")
+    def list_worlds() -> Dict[str, List[Dict[str, Any]]]:
+        return {"worlds": host.status()}
+
+    @app.post("/v1/worlds/{world_id}/inputs")
+    def post_input(world_id: str, inp: InputIn) -> Dict[str, Any]:
+        received_ns = time.monotonic_ns()
+        world(world_id, must_exist=False)
+        payload = inp.model_dump()
+        try:
+            validate_or_raise(payload, schema)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        host.ingest(
+            world_id,
+            ExternalInput(
+                source=inp.source,
+                channel=inp.channel,
+                name=inp.name,
+                data=inp.data,
+                trace_id=inp.trace_id,
+                received_ns=received_ns,
+            ),
+        )
+        return {"ok": True, "world_id": world_id}
+
+    @app.get("/v1/worlds/{world_id}/metrics")
+    def get_metrics(world_id: str) -> Dict[str, Any]:
+        world(world_id, must_exist=True)
+        return {"world_id": world_id, "metrics": asdict(host.metrics(world_id))}
+
+    @app.get("/v1/worlds/{world_id}/projections/{name}/{key}")
+    def get_projection(world_id: str, name: str, key: str) -> Dict[str, Any]:
+        world(world_id, must_exist=True)
+        value = host.project(world_id, name, key)
+        if value is None:
+            raise HTTPException(status_code=404, detail=f"{name} {key!r} not found")
+        return {"world_id": world_id, "name": name, "value": value}
+
+    return app
@@ -11,23 +11,32 @@ Step 16 加固版：加入 JSON Schema 校验（跨语言协议契约）
 注意：
 - Schema 校验失败返回 400（Bad Request）
 - 这和“字段缺失/类型错误”很匹配
+
+查询：
+- GET /v1/traces/{trace_id}：一条 trace 的链路（输入 -> 决策 -> 动作），走 TraceIndex，
+  不扫描事件日志；没有该 trace_id 返回 404
 """
 
 from __future__ import annotations
 
 import os
+import time
 from pathlib import Path
 from typing import Any, Dict, Optional, Callable
 
 from fastapi import Depends, FastAPI, HTTPException
+from fastapi.responses import JSONResponse, ORJSONResponse
 from pydantic import BaseModel, Field
 
+from cim_worldlab.world.events.codec import HAS_ORJSON
 from cim_worldlab.world.events.external_input import ExternalInput
 from cim_worldlab.world.persistence.file_input_queue import FileInputQueue
+from cim_worldlab.world.persistence.trace_index import TraceIndex
 from cim_worldlab.plugins.schema_validation import load_schema, validate_or_raise
 
 
 DEFAULT_QUEUE_PATH = "out/input_queue.jsonl"
+DEFAULT_EVENTS_PATH = "out/events.jsonl"
 DEFAULT_SCHEMA_PATH = Path("schemas/input.schema.json")
 
 
@@ -44,14 +53,25 @@ def default_queue_factory() -> FileInputQueue:
     return FileInputQueue(path=path)
 
 
+def default_trace_index_factory() -> TraceIndex:
+    events = Path(os.getenv("CIM_EVENTS_PATH", DEFAULT_EVENTS_PATH))
+    return TraceIndex(events, index_dir=events.with_name("traces"))
+
+
 def create_app(
     queue_factory: Callable[[], FileInputQueue] = default_queue_factory,
     schema_path: Path = DEFAULT_SCHEMA_PATH,
+    trace_index_factory: Callable[[], TraceIndex] = default_trace_index_factory,
 ) -> FastAPI:
     """
-    app 工厂：支持注入 queue_factory，并加载 input.schema.json 用于校验。
+    app 工厂：支持注入 queue_factory / trace_index_factory，并加载 input.schema.json 用于校验。
     """
-    app = FastAPI(title="CIM WorldLab Input Gateway", version="0.3.0")
+    # 装了 orjson 时响应也用它序列化（与事件日志同一个 JSON 后端）
+    app = FastAPI(
+        title="CIM WorldLab Input Gateway",
+        version="0.3.0",
+        default_response_class=ORJSONResponse if HAS_ORJSON else JSONResponse,
+    )
 
     # 启动时加载 schema（一次即可）
     schema = load_schema(schema_path)
@@ -65,6 +85,9 @@ def create_app(
 
     @app.post("/v1/inputs")
     def post_input(inp: InputIn, queue: FileInputQueue = Depends(get_queue)) -> Dict[str, Any]:
+        # 0) 收到请求的时刻（单调时钟，用来量端到端延迟；与 runtime 同机时可直接相减）
+        received_ns = time.monotonic_ns()
+
         # 1) 把 Pydantic 模型转成 dict（准备做 JSON Schema 校验）
         payload = inp.model_dump()
 
@@ -81,10 +104,18 @@ def create_app(
             name=inp.name,
             data=inp.data,
             trace_id=inp.trace_id,
+            received_ns=received_ns,
         )
         queue.append(ext)
         return {"ok": True, "queue_path": str(queue.path)}
 
+    @app.get("/v1/traces/{trace_id}")
+    def get_trace(trace_id: str, index: TraceIndex = Depends(trace_index_factory)) -> Dict[str, Any]:
+        out = index.trace(trace_id)
+        if out is None:
+            raise HTTPException(status_code=404, detail=f"trace {trace_id!r} not found")
+        return out
+
     return app
 
 
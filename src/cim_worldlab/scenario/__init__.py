@@ -0,0 +1,24 @@
+"""
+scenario 包：把 projects/<Pxx>/ 的案例跑起来（加速模拟 + 多种子并行 + 结果缓存）
+
+- ScenarioCase / load_case / generate_inputs：案例定义，按种子生成带扰动的输入脚本
+- ScenarioProject / load_project：项目目录（案例 + 评估口径 + 基线策略）
+- run_seed：一个 (策略, 种子) 的模拟 + 打分
+- run_scenario / format_report：多种子并行跑基线与候选策略，按 (案例, 策略, 代码版本) 缓存，汇总成对比表
+"""
+from .case import Excursion, ScenarioCase, generate_inputs, load_case, parse_case
+from .runner import ScenarioProject, code_version, format_report, load_project, run_scenario, run_seed
+
+__all__ = [
+    "Excursion",
+    "ScenarioCase",
+    "ScenarioProject",
+    "code_version",
+    "format_report",
+    "generate_inputs",
+    "load_case",
+    "load_project",
+    "parse_case",
+    "run_scenario",
+    "run_seed",
+]
@@ -0,0 +1,173 @@
+"""
+case.py
+=======
+场景案例（projects/<Pxx>/case_input.json）：描述“世界里会发生什么”，并按种子生成带扰动的输入脚本
+
+一个案例 = 若干台设备按固定间隔上报读数（基线 + 噪声），其中某些设备在某段时间出现一次超限：
+- readings：谁在报、多久报一次、基线温度、噪声幅度
+- excursions：超限过程（start 开始爬升，ramp 秒升到 peak，保持 hold 秒，再 ramp 秒降回基线）
+- perturb：每个种子的随机扰动范围
+  - start_jitter：超限开始时刻在 ±start_jitter 秒内平移
+  - peak_jitter_c：峰值在 ±peak_jitter_c 度内浮动
+  - noise_scale：噪声幅度乘以 [lo, hi] 里的一个随机系数
+
+同一个 (案例, 种子) 生成的输入完全相同（random.Random(seed)，与进程、平台无关），
+所以模拟结果可以按 (案例, 策略, 代码版本, 种子) 缓存。
+
+文件格式（JSON 或 YAML）：
+    {"version": 1, "case_id": "P01_single_excursion", "until": 3600,
+     "readings": {"channel": "equipment", "name": "TEMP_READING", "equipment": ["EQ-1", "EQ-2"],
+                  "every": 10, "base_temp_c": 80.0, "noise_c": 1.5},
+     "excursions": [{"equipment_id": "EQ-1", "start": 1800, "ramp": 120, "hold": 180, "peak_temp_c": 97.0}],
+     "perturb": {"start_jitter": 600, "peak_jitter_c": 2.5, "noise_scale": [0.5, 2.0]}}
+"""
+
+from __future__ import annotations
+
+import random
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+from cim_worldlab.backtest.engine import load_json_or_yaml
+from cim_worldlab.world.events.external_input import ExternalInput
+
+SUPPORTED_CASE_VERSION = 1
+
+
+@dataclass(frozen=True)
+class Excursion:
+    """一次超限过程（时刻都是虚拟时间，单位秒）。"""
+    equipment_id: str
+    start: int
+    ramp: int
+    hold: int
+    peak_temp_c: float
+
+    def offset(self, t: int, base: float) -> float:
+        """t 时刻在基线之上抬高多少度（梯形：爬升 -> 保持 -> 回落）。"""
+        d = t - self.start
+        if d < 0 or d >= 2 * self.ramp + self.hold:
+            return 0.0
+        if d < self.ramp:
+            frac = d / self.ramp
+        elif d < self.ramp + self.hold:
+            frac = 1.0
+        else:
+            frac = (2 * self.ramp + self.hold - d) / self.ramp
+        return frac * (self.peak_temp_c - base)
+
+
+@dataclass(frozen=True)
+class ScenarioCase:
+    """解析后的案例（可 pickle，直接发给工作进程）。"""
+    case_id: str
+    until: int
+    channel: str
+    name: str
+    equipment: Tuple[str, ...]
+    every: int
+    base_temp_c: float
+    noise_c: float
+    excursions: Tuple[Excursion, ...]
+    start_jitter: int = 0
+    peak_jitter_c: float = 0.0
+    noise_scale: Tuple[float, float] = (1.0, 1.0)
+
+
+def parse_case(doc: Dict[str, Any], default_id: str = "case") -> ScenarioCase:
+    """校验并解析案例文档；不合法时抛 ValueError。"""
+    if not doc:
+        raise ValueError("Case file is empty")
+    version = doc.get("version", SUPPORTED_CASE_VERSION)
+    if version != SUPPORTED_CASE_VERSION:
+        raise ValueError(f"Unsupported case file version: {version!r}")
+
+    try:
+        readings = doc["readings"]
+        until = int(doc["until"])
+        equipment = tuple(str(x) for x in readings["equipment"])
+        every = int(readings.get("every", 1))
+        excursions = tuple(
+            Excursion(
+                equipment_id=str(x["equipment_id"]),
+                start=int(x["start"]),
+                ramp=int(x.get("ramp", 0)),
+                hold=int(x.get("hold", 0)),
+                peak_temp_c=float(x["peak_temp_c"]),
+            )
+            for x in doc.get("excursions", []) or []
+        )
+    except KeyError as e:
+        raise ValueError(f"Case is missing key {e.args[0]!r}") from None
+
+    if until <= 0 or every <= 0:
+        raise ValueError("Case needs until > 0 and readings.every > 0")
+    if not equipment:
+        raise ValueError("Case needs at least one equipment in readings.equipment")
+    for x in excursions:
+        if x.equipment_id not in equipment:
+            raise ValueError(f"Excursion on unknown equipment {x.equipment_id!r}")
+        if x.ramp < 0 or x.hold < 0 or x.ramp + x.hold == 0:
+            raise ValueError(f"Excursion on {x.equipment_id!r} needs ramp/hold >= 0 and not both 0")
+
+    perturb = doc.get("perturb", {}) or {}
+    lo, hi = (float(v) for v in perturb.get("noise_scale", (1.0, 1.0)))
+    if not 0 <= lo <= hi:
+        raise ValueError("perturb.noise_scale must be [lo, hi] with 0 <= lo <= hi")
+    return ScenarioCase(
+        case_id=str(doc.get("case_id", default_id)),
+        until=until,
+        channel=str(readings.get("channel", "equipment")),
+        name=str(readings.get("name", "TEMP_READING")),
+        equipment=equipment,
+        every=every,
+        base_temp_c=float(readings.get("base_temp_c", 80.0)),
+        noise_c=float(readings.get("noise_c", 0.0)),
+        excursions=excursions,
+        start_jitter=int(perturb.get("start_jitter", 0)),
+        peak_jitter_c=float(perturb.get("peak_jitter_c", 0.0)),
+        noise_scale=(lo, hi),
+    )
+
+
+def load_case(path: Path) -> ScenarioCase:
+    """读取案例文件（JSON / YAML）；case_id 默认取项目目录名。"""
+    return parse_case(load_json_or_yaml(path), default_id=path.parent.name)
+
+
+def generate_inputs(case: ScenarioCase, seed: int) -> List[Tuple[int, ExternalInput]]:
+    """
+    按种子生成一份带扰动的输入脚本：[(虚拟时间, 输入), ...]，可直接交给 InputSchedule。
+    同一个 (case, seed) 结果完全相同。
+    """
+    rng = random.Random(seed)
+    noise = case.noise_c * rng.uniform(*case.noise_scale)
+    excursions = [
+        Excursion(
+            equipment_id=x.equipment_id,
+            start=max(0, x.start + rng.randint(-case.start_jitter, case.start_jitter)),
+            ramp=x.ramp,
+            hold=x.hold,
+            peak_temp_c=x.peak_temp_c + rng.uniform(-case.peak_jitter_c, case.peak_jitter_c),
+        )
+        for x in case.excursions
+    ]
+    by_eq: Dict[str, List[Excursion]] = {}
+    for x in excursions:
+        by_eq.setdefault(x.equipment_id, []).append(x)
+
+    base = case.base_temp_c
+    out: List[Tuple[int, ExternalInput]] = []
+    for t in range(case.every, case.until + 1, case.every):
+        for eq in case.equipment:
+            bump = max((x.offset(t, base) for x in by_eq.get(eq, ())), default=0.0)
+            temp = round(base + bump + rng.gauss(0.0, noise), 2)
+            out.append((t, ExternalInput(
+                source="scenario",
+                channel=case.channel,
+                name=case.name,
+                data={"equipment_id": eq, "temp_c": temp},
+                trace_id=f"{eq}-{t}",
+            )))
+    return out
@@ -0,0 +1,295 @@
+"""
+runner.py
+=========
+场景运行器：把 projects/<Pxx>/ 里的案例真正跑起来
+
+项目目录布局：
+- case_input.json：案例（case.py）
+- evaluation.yaml：评估口径（truth，与 backtest 相同）
+- baseline/reference_policy.json：基线策略（报告里的 "baseline"，其它策略都和它比）
+
+一次 run_scenario：
+1) 每个 (策略, 种子) 生成一份带扰动的输入脚本，在无头加速模拟里跑完整个案例
+   （Simulation + skip_idle：走真实的 runtime 路径，决策 / 动作与线上完全一样）
+2) 用 evaluation 的 truth 给每次模拟打分（score_alerts，指标口径与 backtest 一致）
+   报警 = 某个输入触发了决策（决策事件的 cause_id 指回输入）
+3) 没有命中缓存的 (策略, 种子) 分发到进程池并行跑（参数都可 pickle：案例、策略文件字节、truth、种子）
+4) 每个策略汇总成一行：均值 / 最坏值，以及与基线的差（d_*）
+
+缓存：
+- 每个 (策略, 种子) 一个 JSON 文件：<cache_dir>/<key[:2]>/<key>.json
+- key = sha256(案例内容 + 策略内容 + 评估口径内容 + 代码版本 + 种子)
+  代码版本 = cim_worldlab 包内所有 .py 源文件的哈希：改了代码，旧结果自动失效
+- 写入是原子的（先写临时文件再 os.replace），并行 / 中断都不会留下半个结果
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from cim_worldlab.backtest.engine import EvaluationSpec, format_table, load_evaluation, score_alerts
+from cim_worldlab.scenario.case import ScenarioCase, generate_inputs, load_case
+from cim_worldlab.world.events.event import parse_event_id
+from cim_worldlab.world.events.external_input import EXTERNAL_INPUT_TYPE
+from cim_worldlab.world.policy.declarative import ThresholdRule, load_rule_bytes
+from cim_worldlab.world.runtime import InputSchedule, Simulation, WorldRuntime
+
+BASELINE = "baseline"
+CACHE_FORMAT = "scenario-v1"
+
+# 汇总表的列（format_report 用）
+REPORT_COLUMNS = [
+    "candidate", "runs", "decision_count", "alert_delay", "alert_delay_max",
+    "false_alarm_rate", "miss_rate", "miss_rate_max", "missed_runs",
+    "d_alert_delay", "d_false_alarm_rate", "d_miss_rate",
+]
+
+
+@dataclass(frozen=True)
+class ScenarioProject:
+    """一个项目目录解析后的内容（原始字节留着算缓存 key）。"""
+    root: Path
+    case: ScenarioCase
+    case_bytes: bytes
+    evaluation: EvaluationSpec
+    evaluation_bytes: bytes
+    baseline_path: Optional[Path]
+
+
+def load_project(root: Path) -> ScenarioProject:
+    """读取项目目录；没有 case_input.json 或内容不合法时抛 ValueError。"""
+    case_path = root / "case_input.json"
+    if not case_path.exists():
+        raise ValueError(f"{root} has no case_input.json")
+    evaluation_path = next((p for p in (root / "evaluation.yaml", root / "evaluation.json") if p.exists()), None)
+    baseline = root / "baseline" / "reference_policy.json"
+    return ScenarioProject(
+        root=root,
+        case=load_case(case_path),
+        case_bytes=case_path.read_bytes(),
+        evaluation=load_evaluation(evaluation_path),
+        evaluation_bytes=evaluation_path.read_bytes() if evaluation_path is not None else b"",
+        baseline_path=baseline if baseline.exists() else None,
+    )
+
+
+@lru_cache(maxsize=None)
+def code_version() -> str:
+    """cim_worldlab 包内所有 .py 源文件（路径 + 内容）的哈希。"""
+    pkg = Path(__file__).resolve().parents[1]
+    h = hashlib.sha256()
+    for p in sorted(pkg.rglob("*.py")):
+        h.update(p.relative_to(pkg).as_posix().encode("utf-8"))
+        h.update(b"\0")
+        h.update(p.read_bytes())
+    return h.hexdigest()[:16]
+
+
+def cache_key(project: ScenarioProject, policy_bytes: bytes, seed: int) -> str:
+    h = hashlib.sha256(CACHE_FORMAT.encode("ascii"))
+    for part in (project.case_bytes, policy_bytes, project.evaluation_bytes):
+        h.update(hashlib.sha256(part).digest())
+    h.update(f"{code_version()}:{seed}".encode("ascii"))
+    return h.hexdigest()
+
+
+def _cache_path(cache_dir: Path, key: str) -> Path:
+    return cache_dir / key[:2] / f"{key}.json"
+
+
+def _cache_get(cache_dir: Path, key: str) -> Optional[Dict[str, Any]]:
+    path = _cache_path(cache_dir, key)
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def _cache_put(cache_dir: Path, key: str, row: Dict[str, Any]) -> None:
+    path = _cache_path(cache_dir, key)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    tmp.write_text(json.dumps(row, ensure_ascii=False), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def run_seed(case: ScenarioCase, policy_bytes: bytes, truth: Optional[ThresholdRule], seed: int, name: str = "") -> Dict[str, Any]:
+    """
+    跑一次模拟并打分（纯函数：同样的参数 -> 同样的指标；seconds 除外）。
+    策略按内容哈希编译（同一进程里同一份策略只编译一次）。
+    """
+    _, registry = load_rule_bytes(policy_bytes)
+    rt = WorldRuntime(policy=registry)
+    result = Simulation(rt, InputSchedule(generate_inputs(case, seed)), skip_idle=True).run(case.until)
+
+    alerted_seqs = {parse_event_id(d.payload["cause_id"]) for d in result.decisions}
+    by_rule = Counter(str(d.payload["rule_id"]) for d in result.decisions)
+    truth_rule = truth.compile() if truth is not None else None
+
+    ts: List[int] = []
+    alerted = bytearray()
+    truth_mask = bytearray()
+    for e in rt.event_log.all():
+        if e.type != EXTERNAL_INPUT_TYPE:
+            continue
+        ts.append(e.t)
+        alerted.append(e.seq in alerted_seqs)
+        if truth_rule is not None:
+            truth_mask.append(truth_rule.matches(e) and truth_rule.check(e) is not None)
+
+    row = score_alerts(name, ts, alerted, dict(by_rule), truth_mask if truth_rule is not None else None)
+    row.update({
+        "seed": seed,
+        "actions": result.state.action_count,
+        "ticks": result.ticks,
+        "seconds": result.seconds,
+    })
+    return row
+
+
+def _run_task(args: Tuple[ScenarioCase, bytes, Optional[ThresholdRule], int, str]) -> Dict[str, Any]:
+    return run_seed(*args)
+
+
+def _mean(values: Sequence[Any]) -> Optional[float]:
+    xs = [v for v in values if v is not None]
+    return sum(xs) / len(xs) if xs else None
+
+
+def _max(values: Sequence[Any]) -> Optional[float]:
+    xs = [v for v in values if v is not None]
+    return max(xs) if xs else None
+
+
+def summarize(name: str, rows: Sequence[Dict[str, Any]]) -> Dict[str, Any]:
+    """把一个策略的所有种子汇总成一行（均值 + 最坏值）。"""
+    out: Dict[str, Any] = {
+        "candidate": name,
+        "runs": len(rows),
+        "decision_count": _mean([r["decision_count"] for r in rows]),
+        "decision_count_max": _max([r["decision_count"] for r in rows]),
+    }
+    if rows and "miss_rate" in rows[0]:
+        out.update({
+            "alert_delay": _mean([r["alert_delay"] for r in rows]),
+            "alert_delay_max": _max([r["alert_delay"] for r in rows]),
+            "false_alarm_rate": _mean([r["false_alarm_rate"] for r in rows]),
+            "false_alarm_rate_max": _max([r["false_alarm_rate"] for r in rows]),
+            "miss_rate": _mean([r["miss_rate"] for r in rows]),
+            "miss_rate_max": _max([r["miss_rate"] for r in rows]),
+            # 真超限完全没被报出来的种子数（最糟糕的情况）
+            "missed_runs": sum(1 for r in rows if r["true_excursions"] and r["missed"] == r["true_excursions"]),
+        })
+    return out
+
+
+def _with_deltas(row: Dict[str, Any], base: Dict[str, Any]) -> Dict[str, Any]:
+    out = dict(row)
+    for k in ("alert_delay", "false_alarm_rate", "miss_rate"):
+        if k in row and row is not base:
+            a, b = row[k], base.get(k)
+            out[f"d_{k}"] = a - b if a is not None and b is not None else None
+    return out
+
+
+def run_scenario(
+    root: Path,
+    policy_paths: Sequence[Path] = (),
+    seeds: int = 32,
+    first_seed: int = 0,
+    workers: Optional[int] = None,
+    cache_dir: Optional[Path] = None,
+) -> Dict[str, Any]:
+    """
+    在 seeds 个随机种子上跑基线策略和候选策略，返回汇总报告。
+
+    - policy_paths：候选策略（声明式规则文件），名字取文件名（不含扩展名）
+    - workers：进程数（默认 CPU 核数，且不超过要跑的任务数）；1 表示在当前进程里跑
+    - cache_dir：结果缓存目录；None 表示不用缓存
+
+    报告：summary（每个策略一行，候选带与基线的差 d_*）、runs（每个策略每个种子一行）、
+    computed / cached（这次实际跑了 / 从缓存拿了多少个）
+    """
+    if seeds <= 0:
+        raise ValueError("seeds must be > 0")
+    project = load_project(root)
+
+    policies: List[Tuple[str, bytes]] = []
+    if project.baseline_path is not None:
+        policies.append((BASELINE, project.baseline_path.read_bytes()))
+    for p in policy_paths:
+        policies.append((p.stem, p.read_bytes()))
+    if not policies:
+        raise ValueError(f"{root} has no baseline/reference_policy.json; pass at least one --policy")
+    names = [n for n, _ in policies]
+    if len(set(names)) != len(names):
+        raise ValueError(f"Policy names must be unique: {names}")
+    for name, raw in policies:
+        try:
+            load_rule_bytes(raw)
+        except ValueError as e:
+            raise ValueError(f"Policy {name!r}: {e}") from None
+
+    started = time.perf_counter()
+    seed_list = list(range(first_seed, first_seed + seeds))
+    runs: Dict[str, List[Optional[Dict[str, Any]]]] = {name: [None] * seeds for name in names}
+    todo: List[Tuple[str, int, str]] = []  # (策略名, 种子下标, 缓存 key)
+    raw_by_name = dict(policies)
+    for name, raw in policies:
+        for i, seed in enumerate(seed_list):
+            key = cache_key(project, raw, seed)
+            cached = _cache_get(cache_dir, key) if cache_dir is not None else None
+            if cached is not None:
+                cached["candidate"] = name
+                runs[name][i] = cached
+            else:
+                todo.append((name, i, key))
+
+    truth = project.evaluation.truth
+    tasks = [(project.case, raw_by_name[name], truth, seed_list[i], name) for name, i, _ in todo]
+    n_workers = min(workers or os.cpu_count() or 1, len(tasks))
+    if n_workers <= 1:
+        results = [_run_task(t) for t in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=n_workers) as pool:
+            chunksize = max(1, len(tasks) // (n_workers * 4))
+            results = list(pool.map(_run_task, tasks, chunksize=chunksize))
+
+    for (name, i, key), row in zip(todo, results):
+        runs[name][i] = row
+        if cache_dir is not None:
+            _cache_put(cache_dir, key, row)
+
+    done: Dict[str, List[Dict[str, Any]]] = {name: [r for r in rows if r is not None] for name, rows in runs.items()}
+    summary = [summarize(name, done[name]) for name in names]
+    summary = [_with_deltas(row, summary[0]) for row in summary]
+    return {
+        "case_id": project.case.case_id,
+        "project": str(root),
+        "code_version": code_version(),
+        "seeds": seed_list,
+        "reference": names[0],
+        "computed": len(todo),
+        "cached": len(names) * seeds - len(todo),
+        "seconds": time.perf_counter() - started,
+        "summary": summary,
+        "runs": done,
+    }
+
+
+def format_report(report: Dict[str, Any]) -> str:
+    """报告的文本形式：一行概况 + 每个策略一行的对比表。"""
+    head = (
+        f"case {report['case_id']}  seeds {len(report['seeds'])}  code {report['code_version']}  "
+        f"computed {report['computed']}  cached {report['cached']}  {report['seconds']:.2f}s"
+    )
+    return head + "\n" + format_table(report["summary"], REPORT_COLUMNS)
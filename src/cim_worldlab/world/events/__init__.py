@@ -1,10 +1,14 @@
 """
 events 子包导出：
-- Event：统一事件模型
+- Event：统一事件模型（event_id / parse_event_id：seq <-> 稳定 id）
 - ExternalInput：外部输入 payload 规范
+- DecisionsSuppressed：被压制决策的汇总事件
+- encode_event / decode_event：事件编解码（按类型预编译，可选 orjson）
 """
-from .event import Event
+from .event import Event, event_id, parse_event_id
 from .external_input import ExternalInput, EXTERNAL_INPUT_TYPE
 from .action_executed import ActionExecuted, ACTION_EXECUTED_TYPE
+from .decisions_suppressed import DecisionsSuppressed, DECISIONS_SUPPRESSED_TYPE
+from .codec import decode_event, encode_event
 
-__all__ = ["Event", "ExternalInput", "ACTION_EXECUTED_TYPE","ActionExecuted","EXTERNAL_INPUT_TYPE"]
\ No newline at end of file
+__all__ = ["Event", "event_id", "parse_event_id", "ExternalInput", "ACTION_EXECUTED_TYPE","ActionExecuted","EXTERNAL_INPUT_TYPE", "DECISIONS_SUPPRESSED_TYPE", "DecisionsSuppressed", "decode_event", "encode_event"]
\ No newline at end of file
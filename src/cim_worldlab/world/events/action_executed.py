@@ -16,6 +16,9 @@ ACTION_EXECUTED 事件（Step18）
 - reason: str             为什么执行这个动作（投屏友好）
 - from_policy_t: int|None 关联的 POLICY_DECISION 事件时间戳（最小追溯；如果未来有 event_id 可替换）
 - trace_id: str|None      链路追踪（可选，跟 ExternalInput/PolicyDecision 一致）
+- cause_id: str|None      引起这个动作的 POLICY_DECISION 事件 id（例如 "ev-42"）
+                          from_policy_t 只能定位到“某个 tick”，同一 tick 可能有多条决策；
+                          cause_id 是精确引用，因果索引靠它 O(1) 追溯
 """
 
 from __future__ import annotations
@@ -43,6 +46,7 @@ class ActionExecuted:
     reason: str
     from_policy_t: Optional[int] = None
     trace_id: Optional[str] = None
+    cause_id: Optional[str] = None
 
     def to_event(self, t: int) -> Event:
         payload: Dict[str, Any] = {
@@ -52,4 +56,6 @@ class ActionExecuted:
         }
         if self.trace_id is not None:
             payload["trace_id"] = self.trace_id
+        if self.cause_id is not None:
+            payload["cause_id"] = self.cause_id
         return Event(t=t, type=ACTION_EXECUTED_TYPE, payload=payload)
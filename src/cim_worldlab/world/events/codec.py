@@ -0,0 +1,251 @@
+"""
+codec.py
+========
+事件编解码器（Event Codec）：事件 <-> 一行 JSON（bytes）
+
+为什么不用 Event.to_dict + json.dumps？
+- dataclasses.asdict 会递归深拷贝整个 payload，只是为了马上把它序列化掉
+- 读回来时每个 payload 又被 dict(...) 拷贝一次
+- 事件日志是整个系统写得最多、读得最多的东西，这些拷贝都是纯开销
+
+这里的做法：
+1) 按事件类型预先编译编码器 / 解码器（WORLD_TICK / EXTERNAL_INPUT / POLICY_DECISION /
+   ACTION_EXECUTED / DECISIONS_SUPPRESSED），未知类型走通用路径
+   - 编码：外层 {"t", "type", "payload"} 直接拼出来，类型名预先编码好，只序列化 payload
+   - 解码：类型名用预先驻留的字符串（同一类型的所有事件共享一个 str 对象）
+2) 零拷贝：JSON 解码出来的 payload 是全新对象、没有别人持有，直接放进 Event，不再 dict(...)
+   编码时也直接读 e.payload，不做中间拷贝
+3) JSON 后端可选：装了 orjson 就用（快很多），否则用标准库 json
+   - 两种后端输出同样的紧凑格式（无多余空格、不转义非 ASCII），文件可以混着读
+   - 注意：orjson 是严格 JSON，NaN / Infinity 会写成 null；
+     payload 含非字符串 key 等 orjson 不支持的内容时，自动退回标准库
+
+字符串驻留（interning）：
+- 内存里常驻大量事件时，重复的字符串（"equipment"、"TEMP_READING"、payload 的 key）
+  每条事件各存一份是很大的浪费
+- 解码时按类型驻留：事件类型名、EXTERNAL_INPUT 的 source/channel/name、
+  POLICY_DECISION 的 rule_id/severity/suggested_action、ACTION_EXECUTED 的 action_type
+- payload 的 key：orjson 自带 key 缓存（同样的 key 共享一个对象）；标准库 json 只在一次
+  loads 内部复用，所以用标准库时额外把 key 驻留一遍
+
+约定：
+- encode_event(e) -> bytes（不含换行）；decode_event(raw: bytes | str) -> Event
+- 行格式：{"t":..,"seq":..,"type":..,"payload":..,"meta":..}；老日志没有 "seq"，解码出 seq=None，
+  由读取方（FileEventStore）按行号补上；"meta"（观测用时间戳）可有可无
+- dumps / loads：通用 JSON（队列、快照、HTTP 都用这一套，保证格式一致）
+"""
+
+from __future__ import annotations
+
+import json
+import sys
+from typing import Any, Callable, Dict, Optional, Tuple, Union
+
+from cim_worldlab.world.events.action_executed import ACTION_EXECUTED_TYPE
+from cim_worldlab.world.events.decisions_suppressed import DECISIONS_SUPPRESSED_TYPE
+from cim_worldlab.world.events.event import Event
+from cim_worldlab.world.events.external_input import EXTERNAL_INPUT_TYPE
+from cim_worldlab.world.events.policy_decision import POLICY_DECISION_TYPE
+
+try:
+    import orjson
+except ImportError:  # orjson 是可选依赖
+    orjson = None
+
+HAS_ORJSON = orjson is not None
+JSON_BACKEND = "orjson" if HAS_ORJSON else "json"
+
+WORLD_TICK_TYPE = "WORLD_TICK"
+
+# 已知事件类型：解码时复用同一个 str 对象
+KNOWN_TYPES = (
+    WORLD_TICK_TYPE,
+    EXTERNAL_INPUT_TYPE,
+    POLICY_DECISION_TYPE,
+    ACTION_EXECUTED_TYPE,
+    DECISIONS_SUPPRESSED_TYPE,
+)
+_INTERNED: Dict[str, str] = {sys.intern(t): sys.intern(t) for t in KNOWN_TYPES}
+
+Raw = Union[bytes, bytearray, memoryview, str]
+
+
+# -------------------------------
+# 通用 JSON（后端可切换）
+# -------------------------------
+
+_std_encoder = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"))
+_std_pretty = json.JSONEncoder(ensure_ascii=False, indent=2)
+
+
+def _std_dumps(obj: Any) -> bytes:
+    return _std_encoder.encode(obj).encode("utf-8")
+
+
+if HAS_ORJSON:
+    _ORJSON_ERRORS = (orjson.JSONEncodeError, TypeError)
+
+    def dumps(obj: Any) -> bytes:
+        """obj -> 紧凑 JSON bytes。"""
+        try:
+            return orjson.dumps(obj)
+        except _ORJSON_ERRORS:
+            return _std_dumps(obj)
+
+    def loads(raw: Raw) -> Any:
+        """JSON bytes/str -> obj。"""
+        return orjson.loads(raw)
+
+    def dumps_pretty(obj: Any) -> bytes:
+        """带缩进的 JSON（快照等需要人看的文件）。"""
+        try:
+            return orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+        except _ORJSON_ERRORS:
+            return _std_pretty.encode(obj).encode("utf-8")
+
+else:
+
+    def dumps(obj: Any) -> bytes:
+        """obj -> 紧凑 JSON bytes。"""
+        return _std_dumps(obj)
+
+    def loads(raw: Raw) -> Any:
+        """JSON bytes/str -> obj。"""
+        if isinstance(raw, memoryview):
+            raw = raw.tobytes()
+        return json.loads(raw)
+
+    def dumps_pretty(obj: Any) -> bytes:
+        """带缩进的 JSON（快照等需要人看的文件）。"""
+        return _std_pretty.encode(obj).encode("utf-8")
+
+
+# -------------------------------
+# 事件编码：按类型预编译
+# -------------------------------
+
+Encoder = Callable[[Event], bytes]
+
+
+def _compile_encoder(event_type: str) -> Encoder:
+    """
+    预先编码好外层结构里不变的部分：
+        {"t":<t>,"seq":<seq>,"type":"<event_type>","payload":<payload>,"meta":<meta>}
+    每个事件只需要拼 t / seq 和序列化 payload / meta（没有 seq / meta 的事件不写对应的键）。
+    """
+    head = b'{"t":'
+    seq_key = b',"seq":'
+    mid = b',"type":' + dumps(event_type) + b',"payload":'
+    meta_key = b',"meta":'
+    tail = b"}"
+    _dumps = dumps
+
+    def encode(e: Event) -> bytes:
+        seq = b"" if e.seq is None else seq_key + str(e.seq).encode("ascii")
+        end = tail if e.meta is None else meta_key + _dumps(e.meta) + tail
+        return b"".join((head, str(e.t).encode("ascii"), seq, mid, _dumps(e.payload), end))
+
+    return encode
+
+
+def _encode_tick(e: Event) -> bytes:
+    # WORLD_TICK 的 payload 绝大多数是空的：整行都是常量，只有 t 不同
+    if not e.payload and e.meta is None:
+        if e.seq is None:
+            return b'{"t":%d,"type":"WORLD_TICK","payload":{}}' % e.t
+        return b'{"t":%d,"seq":%d,"type":"WORLD_TICK","payload":{}}' % (e.t, e.seq)
+    return _TICK_WITH_PAYLOAD(e)
+
+
+_TICK_WITH_PAYLOAD = _compile_encoder(WORLD_TICK_TYPE)
+
+_ENCODERS: Dict[str, Encoder] = {t: _compile_encoder(t) for t in KNOWN_TYPES}
+_ENCODERS[WORLD_TICK_TYPE] = _encode_tick
+
+
+def encode_event(e: Event) -> bytes:
+    """Event -> 一行 JSON（bytes，不含换行）。未知类型首次出现时编译并缓存编码器。"""
+    enc = _ENCODERS.get(e.type)
+    if enc is None:
+        enc = _ENCODERS[e.type] = _compile_encoder(e.type)
+    return enc(e)
+
+
+# -------------------------------
+# 事件解码：按类型驻留重复字符串
+# -------------------------------
+
+_intern = sys.intern
+# orjson 已经缓存了 key；标准库 json 没有跨行缓存，需要自己驻留
+_INTERN_KEYS = not HAS_ORJSON
+
+
+def _intern_fields(fields: Tuple[str, ...]) -> Callable[[Dict[str, Any]], Dict[str, Any]]:
+    """
+    编译一个 payload 处理函数：把 fields 里的字符串值驻留。
+    payload 是刚解码出来的新对象，原地修改即可（没有别人持有它）。
+    """
+
+    def intern_payload(p: Dict[str, Any]) -> Dict[str, Any]:
+        if _INTERN_KEYS:
+            p = {_intern(k): v for k, v in p.items()}
+        for f in fields:
+            v = p.get(f)
+            if v.__class__ is str:
+                p[f] = _intern(v)
+        return p
+
+    return intern_payload
+
+
+def _intern_input(p: Dict[str, Any]) -> Dict[str, Any]:
+    p = _INPUT_FIELDS(p)
+    data = p.get("data")
+    if _INTERN_KEYS and data.__class__ is dict:
+        p["data"] = {_intern(k): v for k, v in data.items()}
+    return p
+
+
+_INPUT_FIELDS = _intern_fields(("source", "channel", "name"))
+
+_PAYLOAD_DECODERS: Dict[str, Callable[[Dict[str, Any]], Dict[str, Any]]] = {
+    EXTERNAL_INPUT_TYPE: _intern_input,
+    POLICY_DECISION_TYPE: _intern_fields(("rule_id", "severity", "suggested_action")),
+    ACTION_EXECUTED_TYPE: _intern_fields(("action_type",)),
+    DECISIONS_SUPPRESSED_TYPE: _intern_fields(("rule_id", "stream", "ended_by")),
+}
+
+
+def intern_input_fields(source: str, channel: str, name: str) -> Tuple[str, str, str]:
+    """外部输入的 source/channel/name 驻留（FileInputQueue 解码时使用）。"""
+    return _intern(source), _intern(channel), _intern(name)
+
+
+def event_from_obj(obj: Dict[str, Any], default_seq: Optional[int] = None) -> Event:
+    """
+    已解码的 dict -> Event（零拷贝：payload 直接使用，不再 dict(...)）。
+
+    default_seq：行里没有 "seq"（老日志）时使用的序号（读取方按行号给出）。
+    """
+    et = obj["type"]
+    et = _INTERNED.get(et) or str(et)
+    payload = obj.get("payload")
+    if payload is None:
+        payload = {}
+    elif payload.__class__ is dict and payload:
+        dec = _PAYLOAD_DECODERS.get(et)
+        if dec is not None:
+            payload = dec(payload)
+    seq = obj.get("seq")
+    return Event(
+        t=int(obj["t"]),
+        type=et,
+        payload=payload,
+        seq=int(seq) if seq is not None else default_seq,
+        meta=obj.get("meta"),
+    )
+
+
+def decode_event(raw: Raw, default_seq: Optional[int] = None) -> Event:
+    """一行 JSON（bytes/str）-> Event。"""
+    return event_from_obj(loads(raw), default_seq)
@@ -0,0 +1,47 @@
+"""
+decisions_suppressed.py
+=======================
+DECISIONS_SUPPRESSED 事件：被压制的决策的“汇总留痕”
+
+为什么需要？
+- 设备持续过热时，每个超限读数都会产生 POLICY_DECISION + ACTION_EXECUTED，
+  事件量在系统压力最大的时候翻三倍，还会连续刷出一串 PAUSE 动作
+- 决策压制（suppression）会丢掉重复的决策，但“丢掉了多少、什么时候”仍然必须可追溯
+- 所以每段压制结束时写一条汇总事件：N 条决策被压制，时间范围 first_t..last_t
+
+payload 设计：
+- rule_id / stream：哪条规则、哪台设备（流）
+- suppressed：这段时间内被压制的决策数
+- first_t / last_t：第一条 / 最后一条被压制决策的世界时间
+- ended_by：这段压制为什么结束（holdoff_expired / cleared）
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Any, Dict
+
+from cim_worldlab.world.events.event import Event
+
+DECISIONS_SUPPRESSED_TYPE = "DECISIONS_SUPPRESSED"
+
+
+@dataclass(frozen=True)
+class DecisionsSuppressed:
+    rule_id: str
+    stream: str
+    suppressed: int
+    first_t: int
+    last_t: int
+    ended_by: str
+
+    def to_event(self, t: int) -> Event:
+        payload: Dict[str, Any] = {
+            "rule_id": self.rule_id,
+            "stream": self.stream,
+            "suppressed": self.suppressed,
+            "first_t": self.first_t,
+            "last_t": self.last_t,
+            "ended_by": self.ended_by,
+        }
+        return Event(t=t, type=DECISIONS_SUPPRESSED_TYPE, payload=payload)
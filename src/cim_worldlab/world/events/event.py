@@ -16,34 +16,97 @@ event.py
 - 这是 EAP / CIM / 工程文明里最核心的思想之一：**留痕**
 """
 
-from dataclasses import dataclass, asdict
-from typing import Any, Dict
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Event:
     """
     Event 是一个“不可变”的数据对象（frozen=True）
     - frozen=True：创建后字段不能再被修改
       这样做的好处：事件一旦发生，就不能“篡改历史”
+    - slots=True：没有每个实例一份的 __dict__，字段直接存在对象里
+      （内存里常驻上百万个事件时，这能省下一大截 RSS）
 
     字段解释：
     - t: 世界时间（第几个 tick）
     - type: 事件类型（字符串），例如 "WORLD_TICK"
     - payload: 事件附带的数据（字典），要求是“可 JSON 化”的结构
       （也就是里面放 int/float/str/bool/list/dict 等）
+    - seq: 序号（这条事件在日志里是第几条，0-based，单调递增）
+      由 WorldRuntime 在留痕时分配；手工构造的事件可以不给（None）
+
+    关于 seq 与相等比较：
+    - seq 描述的是“事件在日志里的位置”，不是“发生了什么”，所以不参与 ==
+      （同样内容的事件无论写在第几行都相等，老的测试/回放比较不受影响）
+    - 稳定 id 由 seq 派生：见 id 属性（"ev-<seq>"）
+
+    - meta: 观测用的附加信息（例如 received_ns / recorded_ns 这类墙上时钟时间戳）
+      与 seq 一样不参与 ==，也不进入 payload：
+      reducer / 策略只看 payload，所以 replay 出来的状态与 meta 无关（确定性不受影响）
     """
     t: int
     type: str
     payload: Dict[str, Any]
+    seq: Optional[int] = field(default=None, compare=False)
+    meta: Optional[Dict[str, Any]] = field(default=None, compare=False)
+
+    @property
+    def id(self) -> Optional[str]:
+        """
+        事件的稳定 id（例如 "ev-42"）；还没分配 seq 的事件返回 None。
+
+        决策 / 动作事件在 payload["cause_id"] 里用这个 id 引用“是谁引起的”。
+        """
+        return event_id(self.seq) if self.seq is not None else None
+
+    def with_seq(self, seq: int, meta: Optional[Dict[str, Any]] = None) -> "Event":
+        """返回分配了 seq 的同一事件（payload 共享，不拷贝）；给了 meta 就替换 meta。"""
+        return Event(t=self.t, type=self.type, payload=self.payload, seq=seq, meta=self.meta if meta is None else meta)
 
     def to_dict(self) -> Dict[str, Any]:
         """
         把 Event 转为 dict，方便 json.dumps(...) 序列化。
 
-        dataclasses.asdict 会把 dataclass 递归转为 dict。
         例如：
         Event(t=1, type="WORLD_TICK", payload={"i": 0})
         -> {"t": 1, "type": "WORLD_TICK", "payload": {"i": 0}}
+        （分配了 seq 的事件多一个 "seq" 键，紧跟在 "t" 后面；有 meta 时最后多一个 "meta" 键，
+        与落盘格式一致）
+
+        注意：payload 是直接引用（浅拷贝），不像 dataclasses.asdict 那样递归深拷贝；
+        事件一旦产生就不应再修改 payload，所以没必要为序列化多拷一份。
+        落盘请用 events/codec.py（直接编码成 bytes，连这个 dict 都不用建）。
         """
-        return asdict(self)
\ No newline at end of file
+        if self.seq is None:
+            d = {"t": self.t, "type": self.type, "payload": self.payload}
+        else:
+            d = {"t": self.t, "seq": self.seq, "type": self.type, "payload": self.payload}
+        if self.meta is not None:
+            d["meta"] = self.meta
+        return d
+
+
+EVENT_ID_PREFIX = "ev-"
+
+
+def event_id(seq: int) -> str:
+    """seq -> 稳定 id。"""
+    return f"{EVENT_ID_PREFIX}{seq}"
+
+
+def parse_event_id(ref: str) -> int:
+    """
+    稳定 id -> seq（也接受纯数字字符串）。
+
+    例如："ev-42" -> 42，"42" -> 42
+    """
+    text = ref[len(EVENT_ID_PREFIX):] if ref.startswith(EVENT_ID_PREFIX) else ref
+    try:
+        seq = int(text)
+    except ValueError:
+        raise ValueError(f"Invalid event id: {ref!r}") from None
+    if seq < 0:
+        raise ValueError(f"Invalid event id: {ref!r}")
+    return seq
\ No newline at end of file
@@ -17,7 +17,7 @@ external_input.py
 - 人工操作：暂停/恢复、切换配方、确认放行
 """
 
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from typing import Any, Dict, Literal, Optional
 
 from cim_worldlab.world.events.event import Event
@@ -29,7 +29,7 @@ EXTERNAL_INPUT_TYPE = "EXTERNAL_INPUT"
 InputSource = Literal["plugin", "human", "system"]
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class ExternalInput:
     """
     ExternalInput 是 payload 的“结构化约定”。
@@ -44,12 +44,15 @@ class ExternalInput:
     - name: 事件名（例如 "TEMP_READING", "NEW_ORDER", "PAUSE"）
     - data: 具体数据（必须是可 JSON 化结构）
     - trace_id: 可选，用于把多条输入串成一次“外部事务”
+    - received_ns: 可选，HTTP 收到这条输入时的单调时钟（time.monotonic_ns）
+      只用于延迟观测：进入 Event.meta，不进 payload，不参与 ==
     """
     source: InputSource
     channel: str
     name: str
     data: Dict[str, Any]
     trace_id: Optional[str] = None
+    received_ns: Optional[int] = field(default=None, compare=False)
 
     def to_event(self, t: int) -> Event:
         """
@@ -67,4 +70,5 @@ class ExternalInput:
         if self.trace_id is not None:
             payload["trace_id"] = self.trace_id
 
-        return Event(t=t, type=EXTERNAL_INPUT_TYPE, payload=payload)
+        meta = {"received_ns": self.received_ns} if self.received_ns is not None else None
+        return Event(t=t, type=EXTERNAL_INPUT_TYPE, payload=payload, meta=meta)
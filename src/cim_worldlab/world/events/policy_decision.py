@@ -19,6 +19,7 @@ Step 17：策略决策事件（Policy Decision Event）
 - suggested_action：建议的动作（例如 PAUSE）
 - reason：一段人类可读解释（教学用）
 - evidence：用于解释的关键信息（例如 temp_c 与 threshold）
+- cause_id：触发它的事件 id（可选，runtime 记录时填写）
 """
 
 from __future__ import annotations
@@ -42,12 +43,15 @@ class PolicyDecision:
     reason: str
     evidence: Dict[str, Any]
 
-    def to_event(self, t: int, trace_id: Optional[str] = None) -> Event:
+    def to_event(self, t: int, trace_id: Optional[str] = None, cause_id: Optional[str] = None) -> Event:
         """
         把 PolicyDecision 包装成统一 Event，进入事件流留痕。
 
         trace_id：
         - 可选，方便把“输入 → 决策 → 动作”串在一起（后续会更重要）
+
+        cause_id：
+        - 可选，触发这条决策的事件 id（例如 "ev-41"），用于因果索引 O(1) 追溯
         """
         payload: Dict[str, Any] = {
             "rule_id": self.rule_id,
@@ -58,5 +62,7 @@ class PolicyDecision:
         }
         if trace_id is not None:
             payload["trace_id"] = trace_id
+        if cause_id is not None:
+            payload["cause_id"] = cause_id
 
         return Event(t=t, type=POLICY_DECISION_TYPE, payload=payload)
@@ -2,8 +2,9 @@
 metrics 包导出：
 - WorldMetrics：指标快照模型
 - compute_metrics：指标计算函数
+- MetricsAccumulator：增量指标（逐条喂事件）
 """
 from .world_metrics import WorldMetrics
-from .compute import compute_metrics
+from .compute import MetricsAccumulator, compute_metrics
 
-__all__ = ["WorldMetrics", "compute_metrics"]
+__all__ = ["WorldMetrics", "compute_metrics", "MetricsAccumulator"]
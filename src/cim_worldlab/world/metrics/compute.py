@@ -13,57 +13,84 @@ compute.py
 
 MVP：
 - inputs_by_channel：我们从 event_log 扫一遍统计
-  （事件少时很简单；事件多时未来可做增量缓存）
+  （事件少时很简单；事件多时用 MetricsAccumulator 增量维护）
 """
 
 from __future__ import annotations
 
-from typing import Dict, Optional
+from typing import Any, Dict, Iterable, Optional
 
+from cim_worldlab.world.events.event import Event
 from cim_worldlab.world.events.external_input import EXTERNAL_INPUT_TYPE
 from cim_worldlab.world.runtime.event_log import EventLog
 from cim_worldlab.world.state import WorldState
 from cim_worldlab.world.metrics.world_metrics import WorldMetrics
 
 
-def compute_metrics(state: WorldState, event_log: EventLog) -> WorldMetrics:
+class MetricsAccumulator:
     """
-    从 state + event_log 计算出一个指标快照 WorldMetrics。
+    增量指标：逐条 observe(e)，随时 metrics(state) 出一个快照。
+
+    compute_metrics 就是“把日志整个喂一遍”的特例；
+    只读副本（follower）跟读日志时逐条喂，不必每次重扫全部事件。
     """
-    # 1) 统计 inputs_by_channel
-    inputs_by_channel: Dict[str, int] = {}
 
-    for e in event_log.all():
+    def __init__(self) -> None:
+        self.inputs_by_channel: Dict[str, int] = {}
+
+    def observe(self, e: Event) -> None:
         if e.type != EXTERNAL_INPUT_TYPE:
-            continue
+            return
         channel = str(e.payload.get("channel", "UNKNOWN"))
-        inputs_by_channel[channel] = inputs_by_channel.get(channel, 0) + 1
-
-    # 2) last_input_summary：从 state.last_input 提炼简要信息（更适合“看板”）
-    last_input_summary: Optional[Dict[str, str]] = None
-    if state.last_input is not None:
-        last_input_summary = {
-            "source": str(state.last_input.get("source", "")),
-            "channel": str(state.last_input.get("channel", "")),
-            "name": str(state.last_input.get("name", "")),
-        }
-
-    # 3) last_action_summary：从 state.last_action 提炼成更适合看板/投屏的简要信息
-    last_action_summary = None
-    if state.last_action is not None:
-        last_action_summary = {
-            "action_type": str(state.last_action.get("action_type", "")),
-            "reason": str(state.last_action.get("reason", "")),
-            "from_policy_t": str(state.last_action.get("from_policy_t", "")),
-        }
-
-    return WorldMetrics(
-        t=state.t,
-        tick_count=state.tick_count,
-        input_count=state.input_count,
-        inputs_by_channel=inputs_by_channel,
-        last_input_summary=last_input_summary,
-        # ✅ Step18-3 新增
-        action_count=state.action_count,
-        last_action_summary=last_action_summary,
-    )
+        self.inputs_by_channel[channel] = self.inputs_by_channel.get(channel, 0) + 1
+
+    def extend(self, events: Iterable[Event]) -> None:
+        for e in events:
+            self.observe(e)
+
+    def snapshot_state(self) -> Dict[str, Any]:
+        """可 JSON 化的状态（随快照保存）。"""
+        return {"inputs_by_channel": dict(self.inputs_by_channel)}
+
+    def restore_state(self, obj: Dict[str, Any]) -> None:
+        self.inputs_by_channel = {str(k): int(v) for k, v in obj.get("inputs_by_channel", {}).items()}
+
+    def metrics(self, state: WorldState) -> WorldMetrics:
+        # last_input_summary：从 state.last_input 提炼简要信息（更适合“看板”）
+        last_input_summary: Optional[Dict[str, str]] = None
+        if state.last_input is not None:
+            last_input_summary = {
+                "source": str(state.last_input.get("source", "")),
+                "channel": str(state.last_input.get("channel", "")),
+                "name": str(state.last_input.get("name", "")),
+            }
+
+        # last_action_summary：从 state.last_action 提炼成更适合看板/投屏的简要信息
+        last_action_summary = None
+        if state.last_action is not None:
+            last_action_summary = {
+                "action_type": str(state.last_action.get("action_type", "")),
+                "reason": str(state.last_action.get("reason", "")),
+                "from_policy_t": str(state.last_action.get("from_policy_t", "")),
+            }
+
+        return WorldMetrics(
+            t=state.t,
+            tick_count=state.tick_count,
+            input_count=state.input_count,
+            inputs_by_channel=dict(self.inputs_by_channel),
+            last_input_summary=last_input_summary,
+            # ✅ Step18-3 新增
+            action_count=state.action_count,
+            last_action_summary=last_action_summary,
+        )
+
+
+def compute_metrics(state: WorldState, event_log: EventLog) -> WorldMetrics:
+    """
+    从 state + event_log 计算出一个指标快照 WorldMetrics。
+    （inputs_by_channel 扫一遍 event_log；其余来自 state）
+    """
+    acc = MetricsAccumulator()
+    acc.extend(event_log.all())
+    return acc.metrics(state)
@@ -18,10 +18,11 @@ MVP 我们先做几条最直观的指标：
 - input_count: 外部输入累计数（来自 state）
 - inputs_by_channel: 按 channel 统计输入数量（来自 event_log）
 - last_input_summary: 最近输入的简要信息（channel/name/source）
+- latency: 各段延迟分布（runtime 挂了 LatencyTracker 才有；墙上时钟数据，不由事件推导）
 """
 
 from dataclasses import dataclass
-from typing import Dict, Optional
+from typing import Any, Dict, Optional
 
 
 @dataclass(frozen=True)
@@ -36,3 +37,4 @@ class WorldMetrics:
     last_input_summary: Optional[Dict[str, str]]
     action_count: int
     last_action_summary: Optional[Dict[str, str]]
+    latency: Optional[Dict[str, Any]] = None
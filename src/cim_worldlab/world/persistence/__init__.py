@@ -2,9 +2,15 @@
 persistence 包：负责“把世界历史写下来”。
 
 - FileEventStore：事件写入 JSONL（append-only）
-- SnapshotStore：状态快照 JSON（回放加速）
+- MemoryEventStore / BufferedEventStore：只在内存里 / 攒批写 JSONL（模拟、回测用）
+- SnapshotStore / Snapshot：状态快照（版本化；JSON 或二进制；回放加速）
+- TraceIndex：trace_id -> 事件位置 的磁盘索引（哈希分桶，增量维护）
+- EventTailer：按字节偏移跟读事件文件（只读副本用，处理轮转）
 """
 from .file_event_store import FileEventStore
-from .snapshot_store import SnapshotStore
+from .memory_event_store import BufferedEventStore, MemoryEventStore
+from .snapshot_store import Snapshot, SnapshotStore
+from .trace_index import TraceIndex
+from .event_tailer import EventTailer
 
-__all__ = ["FileEventStore", "SnapshotStore"]
+__all__ = ["FileEventStore", "MemoryEventStore", "BufferedEventStore", "SnapshotStore", "Snapshot", "TraceIndex", "EventTailer"]
@@ -0,0 +1,116 @@
+"""
+event_tailer.py
+===============
+EventTailer：跟读（tail）events.jsonl —— 只读新增的部分
+
+用途：只读副本（follower）要跟上写入者，但不能去打扰它：
+- 不加锁、不和写入者共享任何状态，只读文件
+- 每次 poll 从上次读到的字节偏移继续（seek），只解码新增的完整行
+- 写到一半的最后一行（还没有换行符）不读，等下一次 poll
+
+文件轮转 / 截断（rotation）：
+- 文件的 inode 变了、文件比已读的偏移还短、或者第一行变了（inode 可能被复用）
+  -> 认为换了新文件，从头开始读
+- poll 的返回值里带 rotated=True，由调用方决定是“接着算”还是“重建”
+  （follower 的做法：新文件第一条事件的 seq 正好接上就接着算，否则从头重建）
+
+约定：
+- 老日志没有 seq 时按事件序号补上（空行不算，与 FileEventStore 一致；轮转后从新文件开头算）
+- offsets / event_nos：本文件里每条事件的字节偏移与事件序号（按需 seek 读取历史事件用）
+"""
+
+from __future__ import annotations
+
+import os
+from array import array
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from cim_worldlab.world.events.codec import decode_event
+from cim_worldlab.world.events.event import Event
+
+
+@dataclass
+class TailBatch:
+    """一次 poll 的结果。"""
+    events: List[Event] = field(default_factory=list)
+    rotated: bool = False
+
+
+class EventTailer:
+    """跟读一个事件文件：poll() 返回新增事件；read_at() 按位置读已跟上的历史事件。"""
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.offset = 0
+        self.event_no = 0
+        self.offsets = array("Q")
+        self.event_nos = array("Q")
+        self._file_id: Optional[Tuple[int, int]] = None
+        self._head = b""  # 本文件第一行（识别“还是不是同一个文件”）
+
+    def _reset(self) -> None:
+        self.offset = 0
+        self.event_no = 0
+        self.offsets = array("Q")
+        self.event_nos = array("Q")
+        self._head = b""
+
+    def _head_changed(self) -> bool:
+        with self.path.open("rb") as f:
+            return f.read(len(self._head)) != self._head
+
+    def poll(self, max_events: Optional[int] = None) -> TailBatch:
+        """
+        读取新增的完整行。max_events：一次最多读多少条（None = 全部）。
+        """
+        batch = TailBatch()
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return batch
+
+        file_id = (st.st_dev, st.st_ino)
+        if self._file_id is not None and (
+            file_id != self._file_id
+            or st.st_size < self.offset
+            or (st.st_size != self.offset and self._head and self._head_changed())
+        ):
+            self._reset()
+            batch.rotated = True
+        self._file_id = file_id
+        if st.st_size == self.offset:
+            return batch
+
+        with self.path.open("rb") as f:
+            f.seek(self.offset)
+            for raw in f:
+                if not raw.endswith(b"\n"):
+                    break  # 写到一半的行
+                if not self._head:
+                    self._head = raw
+                if raw.strip():
+                    self.offsets.append(self.offset)
+                    self.event_nos.append(self.event_no)
+                    batch.events.append(decode_event(raw, default_seq=self.event_no))
+                    self.event_no += 1
+                self.offset += len(raw)
+                if max_events is not None and len(batch.events) >= max_events:
+                    break
+        return batch
+
+    def read_at(self, index: int, limit: int) -> List[Event]:
+        """
+        读取本文件里第 index 条事件开始的最多 limit 条（按 offsets seek，不扫前面的行）。
+        只读已经 poll 过的部分，保证与 follower 的状态一致。
+        """
+        if index < 0 or index >= len(self.offsets) or limit <= 0:
+            return []
+        end = min(index + limit, len(self.offsets))
+        out: List[Event] = []
+        with self.path.open("rb") as f:
+            for i in range(index, end):
+                f.seek(self.offsets[i])
+                out.append(decode_event(f.readline(), default_seq=self.event_nos[i]))
+        return out
@@ -9,15 +9,21 @@ Step 8 我们已有：
 
 Step 12 新增：
 - load_from_index(start_index): 从第 start_index 条开始读取（用于快照后补事件）
+
+每行事件带 seq（= 第几条事件，由 WorldRuntime 分配）；没有 seq 的老日志在读取时按事件序号补上
+（空行不算事件、不占序号，与读取方 / 快照的 last_event_index 口径一致）。
+
+编解码统一走 events/codec.py：按类型预编译的编码器、可选 orjson、payload 零拷贝。
+文件按二进制读写（codec 直接产出/接收 bytes，省掉一次 str 编解码）。
 """
 
 from __future__ import annotations
 
-import json
 from dataclasses import dataclass
 from pathlib import Path
 from typing import List
 
+from cim_worldlab.world.events.codec import decode_event, encode_event
 from cim_worldlab.world.events.event import Event
 
 
@@ -27,16 +33,16 @@ class FileEventStore:
 
     def append(self, e: Event) -> None:
         self.path.parent.mkdir(parents=True, exist_ok=True)
-        line_json = json.dumps(e.to_dict(), ensure_ascii=False)
-        with self.path.open("a", encoding="utf-8") as f:
-            f.write(line_json + "\n")
+        line = encode_event(e) + b"\n"
+        with self.path.open("ab") as f:
+            f.write(line)
 
     def load_all(self) -> List[Event]:
         return self.load_from_index(0)
 
     def load_from_index(self, start_index: int) -> List[Event]:
         """
-        从 JSONL 文件中读取事件，从第 start_index 条开始（0-based）。
+        从 JSONL 文件中读取事件，从第 start_index 条开始（0-based，按事件计数，空行不算）。
 
         例子：
         - start_index=0：读全部
@@ -46,19 +52,13 @@ class FileEventStore:
             return []
 
         events: List[Event] = []
-        with self.path.open("r", encoding="utf-8") as f:
-            for idx, raw in enumerate(f):
-                if idx < start_index:
-                    continue
-                raw = raw.strip()
-                if not raw:
+        idx = 0
+        with self.path.open("rb") as f:
+            for raw in f:
+                if not raw.strip():
                     continue
-                obj = json.loads(raw)
-                events.append(
-                    Event(
-                        t=int(obj["t"]),
-                        type=str(obj["type"]),
-                        payload=dict(obj.get("payload", {})),
-                    )
-                )
+                if idx >= start_index:
+                    # 老日志（没有 seq）：读的时候按事件序号补上，之后的逻辑不用区分新老格式
+                    events.append(decode_event(raw, default_seq=idx))
+                idx += 1
         return events
@@ -17,6 +17,9 @@ FileInputQueue：文件输入队列（JSONL）
 - 生产者（HTTP server）：append(input)
 - 消费者（world runtime）：read_since(cursor) -> (items, new_cursor)
 
+received_ns（可选）：HTTP 收到输入的单调时钟时间戳，随队列带到 EXTERNAL_INPUT 事件的 meta 里，
+用来量“收到 -> 进入世界”的延迟。
+
 cursor 是一个整数：表示“已经消费到第几行”
 例如：
 - cursor=0：表示还没消费任何行
@@ -25,11 +28,11 @@ cursor 是一个整数：表示“已经消费到第几行”
 
 from __future__ import annotations
 
-import json
 from dataclasses import dataclass
 from pathlib import Path
 from typing import List, Tuple
 
+from cim_worldlab.world.events.codec import dumps, intern_input_fields, loads
 from cim_worldlab.world.events.external_input import ExternalInput
 
 
@@ -58,11 +61,13 @@ class FileInputQueue:
         }
         if inp.trace_id is not None:
             obj["trace_id"] = inp.trace_id
+        if inp.received_ns is not None:
+            obj["received_ns"] = inp.received_ns
 
-        line = json.dumps(obj, ensure_ascii=False)
+        line = dumps(obj) + b"\n"
 
-        with self.path.open("a", encoding="utf-8") as f:
-            f.write(line + "\n")
+        with self.path.open("ab") as f:
+            f.write(line)
 
     def read_since(self, cursor: int) -> Tuple[List[ExternalInput], int]:
         """
@@ -82,24 +87,26 @@ class FileInputQueue:
         inputs: List[ExternalInput] = []
         total_lines = 0
 
-        with self.path.open("r", encoding="utf-8") as f:
+        with self.path.open("rb") as f:
             for idx, raw in enumerate(f):
                 total_lines += 1
                 if idx < cursor:
                     continue
 
-                raw = raw.strip()
-                if not raw:
+                if not raw.strip():
                     continue
 
-                obj = json.loads(raw)
+                # 解码出来的 data 是全新对象，直接使用（不再 dict(...) 拷贝）
+                obj = loads(raw)
+                source, channel, name = intern_input_fields(obj["source"], obj["channel"], obj["name"])
                 inputs.append(
                     ExternalInput(
-                        source=obj["source"],
-                        channel=obj["channel"],
-                        name=obj["name"],
-                        data=dict(obj.get("data", {})),
+                        source=source,  # type: ignore[arg-type]
+                        channel=channel,
+                        name=name,
+                        data=obj.get("data") or {},
                         trace_id=obj.get("trace_id"),
+                        received_ns=obj.get("received_ns"),
                     )
                 )
 
@@ -0,0 +1,76 @@
+"""
+memory_event_store.py
+=====================
+不直接落盘的事件存储（接口同 FileEventStore：append / load_all / load_from_index）
+
+- MemoryEventStore：事件只留在内存里（list）。模拟 / 测试用：跑完可以直接拿去
+  replay_from_store、verify_snapshot，不碰磁盘
+- BufferedEventStore：写 JSONL 文件，但先攒在内存缓冲里，攒够 flush_bytes 才一次性写出
+  （FileEventStore 每条事件都 open + write 一次，快速模拟时这就是瓶颈）
+  - 读之前会先 flush，读到的总是完整的
+  - 进程崩溃会丢掉还没 flush 的事件：只适合“可以重跑”的场景（模拟 / 回测），不要给真实世界用
+"""
+
+from __future__ import annotations
+
+from pathlib import Path
+from typing import List
+
+from cim_worldlab.world.events.codec import encode_event
+from cim_worldlab.world.events.event import Event
+from cim_worldlab.world.persistence.file_event_store import FileEventStore
+
+
+class MemoryEventStore:
+    def __init__(self) -> None:
+        self._events: List[Event] = []
+
+    def append(self, e: Event) -> None:
+        self._events.append(e)
+
+    def load_all(self) -> List[Event]:
+        return list(self._events)
+
+    def load_from_index(self, start_index: int) -> List[Event]:
+        return self._events[start_index:]
+
+    def __len__(self) -> int:
+        return len(self._events)
+
+
+class BufferedEventStore:
+    """
+    path：JSONL 文件（格式与 FileEventStore 完全相同，可以互相读）
+    flush_bytes：缓冲攒到多少字节写一次
+    """
+
+    def __init__(self, path: Path, flush_bytes: int = 1 << 20) -> None:
+        if flush_bytes <= 0:
+            raise ValueError("flush_bytes must be positive")
+        self.path = path
+        self.flush_bytes = flush_bytes
+        self._buf = bytearray()
+
+    def append(self, e: Event) -> None:
+        self._buf += encode_event(e)
+        self._buf += b"\n"
+        if len(self._buf) >= self.flush_bytes:
+            self.flush()
+
+    def flush(self) -> None:
+        if not self._buf:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self.path.open("ab") as f:
+            f.write(self._buf)
+        self._buf.clear()
+
+    def close(self) -> None:
+        self.flush()
+
+    def load_all(self) -> List[Event]:
+        return self.load_from_index(0)
+
+    def load_from_index(self, start_index: int) -> List[Event]:
+        self.flush()
+        return FileEventStore(path=self.path).load_from_index(start_index)
@@ -8,51 +8,196 @@ snapshot_store.py
 - 快照 = “某个时间点的状态存档”
 - 回放时：先加载快照，再补上快照之后的事件，速度会大幅提升
 
-我们用最简单的方式实现：
-- 快照文件是 JSON
-- 内容包含：
-  - state: WorldState 的字段
-  - last_event_index: 这个快照覆盖到事件日志中的第几条（从 0 开始）
+快照格式（version 2）：
+    {
+      "version": 2,
+      "last_event_index": 这个快照覆盖到事件日志中的第几条（从 0 开始）,
+      "state": WorldState 的全部字段（按 dataclass 字段自动导出，新增字段不会再被漏掉）,
+      "sections": {            # 都是可选的，按名字存
+        "policy":      有状态策略（窗口规则）的内部状态,
+        "suppression": 决策压制器的状态（哪些设备正处于 hold-off / 锁存）,
+        "projections": 投影（每台设备的当前状态等）的列式数据,
+        "metrics":     增量指标（MetricsAccumulator）的状态
+      }
+    }
+
+老格式（version 1，没有 "version" 键）：
+- state 只存了 t / tick_count / input_count / last_input，漏了 action_count / last_action
+- 各部分状态放在顶层的 policy_state / suppression_state / projection_state 里
+- 仍然可以读（load_snapshot 会映射到 sections），但 complete=False：
+  回放方不应该拿它的 state 当起点（replay_fast_from_store 遇到老快照会全量回放）
+
+两种编码（load 时按文件头自动识别）：
+- JSON（默认）：紧凑 JSON，人可以直接打开看
+- 二进制（binary=True）：固定文件头 + zlib 压缩的紧凑 JSON + CRC32 校验
+  - 大状态（几千台设备的投影列）体积小很多；不用 pickle（读快照不会执行任意代码）
+  - 文件头：魔数 b"CIMSNAP\\x00"、版本、原始长度、CRC32
+
+写入是原子的：先写临时文件再 os.replace，进程中途崩溃不会留下半个快照。
 """
 
 from __future__ import annotations
 
-import json
-from dataclasses import dataclass
+import os
+import struct
+import zlib
+from dataclasses import dataclass, fields
 from pathlib import Path
 from typing import Any, Dict, Optional, Tuple
 
+from cim_worldlab.world.events.codec import dumps, loads
 from cim_worldlab.world.state import WorldState
 
+SNAPSHOT_VERSION = 2
+
+SECTION_POLICY = "policy"
+SECTION_SUPPRESSION = "suppression"
+SECTION_PROJECTIONS = "projections"
+SECTION_METRICS = "metrics"
+
+# 老格式顶层键 -> section 名
+_LEGACY_KEYS = {
+    "policy_state": SECTION_POLICY,
+    "suppression_state": SECTION_SUPPRESSION,
+    "projection_state": SECTION_PROJECTIONS,
+}
+
+BINARY_MAGIC = b"CIMSNAP\x00"
+# 魔数、格式版本、原始（解压后）长度、CRC32（对原始字节）
+_BINARY_HEADER = struct.Struct("<8sHII")
+_COMPRESS_LEVEL = 1  # 快照写得频繁：压缩率够用（约 5 倍），速度优先
+
+_STATE_FIELDS = tuple(f.name for f in fields(WorldState))
+
+
+@dataclass(frozen=True)
+class Snapshot:
+    """
+    读回来的快照：
+    - version：格式版本（老快照为 1）
+    - last_event_index：state 基于 event_log[0..last_event_index]
+    - state：WorldState
+    - sections：各部分的状态（按名字；没有的就不在里面）
+    - complete：state 是否覆盖了 WorldState 的全部字段（老快照为 False）
+    """
+    version: int
+    last_event_index: int
+    state: WorldState
+    sections: Dict[str, Any]
+    complete: bool
+
+    def section(self, name: str) -> Optional[Any]:
+        return self.sections.get(name)
+
+
+def encode_state(state: WorldState) -> Dict[str, Any]:
+    """WorldState -> dict（全部字段）。"""
+    return {name: getattr(state, name) for name in _STATE_FIELDS}
+
+
+def decode_state(obj: Dict[str, Any]) -> WorldState:
+    """dict -> WorldState（缺的字段用默认值）。"""
+    return WorldState(**{name: obj[name] for name in _STATE_FIELDS if name in obj})
+
+
+def encode_binary(obj: Any) -> bytes:
+    raw = dumps(obj)
+    header = _BINARY_HEADER.pack(BINARY_MAGIC, SNAPSHOT_VERSION, len(raw), zlib.crc32(raw))
+    return header + zlib.compress(raw, _COMPRESS_LEVEL)
+
+
+def decode_binary(data: bytes) -> Any:
+    if len(data) < _BINARY_HEADER.size:
+        raise ValueError("snapshot file is truncated")
+    magic, _version, size, crc = _BINARY_HEADER.unpack_from(data)
+    if magic != BINARY_MAGIC:
+        raise ValueError("not a binary snapshot")
+    try:
+        raw = zlib.decompress(data[_BINARY_HEADER.size:])
+    except zlib.error as exc:
+        raise ValueError(f"snapshot is corrupted: {exc}") from exc
+    if len(raw) != size or zlib.crc32(raw) != crc:
+        raise ValueError("snapshot checksum mismatch")
+    return loads(raw)
+
 
 @dataclass(frozen=True)
 class SnapshotStore:
     """
     path: 快照文件路径（例如 out/snapshot.json）
+    binary: 保存时用二进制编码（读取时自动识别，两种都能读）
     """
     path: Path
+    binary: bool = False
 
-    def save(self, state: WorldState, last_event_index: int) -> None:
+    def save(
+        self,
+        state: WorldState,
+        last_event_index: int,
+        policy_state: Optional[Dict[str, Any]] = None,
+        suppression_state: Optional[Dict[str, Any]] = None,
+        projection_state: Optional[Dict[str, Any]] = None,
+        metrics_state: Optional[Dict[str, Any]] = None,
+    ) -> None:
         """
-        保存快照到 JSON 文件。
+        保存快照（原子写入）。
 
         last_event_index：
         - 表示这份 state 是基于 event_log[0..last_event_index] 推导出来的
         - replay_fast 时就能从 last_event_index + 1 开始补事件
+
+        其余参数为 None 时，对应的 section 不写。
         """
-        self.path.parent.mkdir(parents=True, exist_ok=True)
+        sections: Dict[str, Any] = {}
+        for name, value in (
+            (SECTION_POLICY, policy_state),
+            (SECTION_SUPPRESSION, suppression_state),
+            (SECTION_PROJECTIONS, projection_state),
+            (SECTION_METRICS, metrics_state),
+        ):
+            if value is not None:
+                sections[name] = value
 
         obj: Dict[str, Any] = {
+            "version": SNAPSHOT_VERSION,
             "last_event_index": last_event_index,
-            "state": {
-                "t": state.t,
-                "tick_count": state.tick_count,
-                "input_count": state.input_count,
-                "last_input": state.last_input,
-            },
+            "state": encode_state(state),
+            "sections": sections,
         }
+        data = encode_binary(obj) if self.binary else dumps(obj)
 
-        self.path.write_text(json.dumps(obj, ensure_ascii=False, indent=2), encoding="utf-8")
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        tmp.write_bytes(data)
+        os.replace(tmp, self.path)
+
+    def load_snapshot(self) -> Optional[Snapshot]:
+        """
+        读取整个快照（只读一次文件）；没有快照时返回 None。
+        二进制快照损坏（截断 / 校验失败）时抛 ValueError。
+        """
+        if not self.path.exists():
+            return None
+
+        data = self.path.read_bytes()
+        obj = decode_binary(data) if data.startswith(BINARY_MAGIC) else loads(data)
+
+        version = int(obj.get("version", 1))
+        if version > SNAPSHOT_VERSION:
+            raise ValueError(f"unsupported snapshot version: {version}")
+        if version == 1:
+            sections = {name: obj[key] for key, name in _LEGACY_KEYS.items() if obj.get(key) is not None}
+        else:
+            sections = dict(obj.get("sections") or {})
+
+        s = obj["state"]
+        return Snapshot(
+            version=version,
+            last_event_index=int(obj["last_event_index"]),
+            state=decode_state(s),
+            sections=sections,
+            complete=all(name in s for name in _STATE_FIELDS),
+        )
 
     def load(self) -> Optional[Tuple[WorldState, int]]:
         """
@@ -62,17 +207,29 @@ class SnapshotStore:
         - None：文件不存在（没有快照）
         - (state, last_event_index)：成功读取
         """
-        if not self.path.exists():
+        snap = self.load_snapshot()
+        if snap is None:
             return None
+        return snap.state, snap.last_event_index
 
-        obj = json.loads(self.path.read_text(encoding="utf-8"))
-        s = obj["state"]
+    def _load_section(self, name: str) -> Optional[Dict[str, Any]]:
+        snap = self.load_snapshot()
+        return snap.section(name) if snap is not None else None
 
-        state = WorldState(
-            t=int(s["t"]),
-            tick_count=int(s["tick_count"]),
-            input_count=int(s["input_count"]),
-            last_input=s.get("last_input", None),
-        )
-        last_event_index = int(obj["last_event_index"])
-        return state, last_event_index
+    def load_policy_state(self) -> Optional[Dict[str, Any]]:
+        """
+        读取快照里的策略状态；没有快照或快照里没有策略状态时返回 None。
+        """
+        return self._load_section(SECTION_POLICY)
+
+    def load_suppression_state(self) -> Optional[Dict[str, Any]]:
+        """读取快照里的决策压制状态；没有时返回 None。"""
+        return self._load_section(SECTION_SUPPRESSION)
+
+    def load_projection_state(self) -> Optional[Dict[str, Any]]:
+        """读取快照里的投影状态；没有时返回 None。"""
+        return self._load_section(SECTION_PROJECTIONS)
+
+    def load_metrics_state(self) -> Optional[Dict[str, Any]]:
+        """读取快照里的增量指标状态；没有时返回 None。"""
+        return self._load_section(SECTION_METRICS)
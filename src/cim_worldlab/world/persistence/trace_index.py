@@ -0,0 +1,251 @@
+"""
+trace_index.py
+==============
+TraceIndex：trace_id -> 事件位置 的磁盘索引（增量维护）
+
+问题：
+- trace_id 从 ExternalInput 一路传到 POLICY_DECISION / ACTION_EXECUTED，
+  但想看一条 trace 的完整链路，只能把整个 events.jsonl 扫一遍
+- 日志到了上亿条时，扫一遍是分钟级；我们要的是毫秒级
+
+做法（哈希分桶 + 字节偏移）：
+- 索引目录里有 buckets 个桶文件（默认 4096）；trace_id 哈希成 64 位整数 h，落在 h % buckets 号桶
+- 每条记录是定长的 3 个 uint64：[h, 事件行的字节偏移, seq]（小端）
+- 查询：只读一个桶文件（日志 1 亿条时也就几百 KB），找出 h 相同的记录，
+  按偏移 seek 到 events.jsonl 读那几行，再核对 trace_id（防哈希碰撞）
+
+增量维护（sync）：
+- meta.json 记住“已经索引到日志的第几个字节 / 第几条事件”（空行不算事件）
+- 每次 sync 只读新增的部分；写到一半的最后一行（没有换行符）留到下次
+- 日志变短了或开头变了（被截断 / 轮转）：整个索引重建
+
+查询结果（trace）：按 seq 排好的事件链（输入 -> 决策 -> 动作），附带世界时间跨度；
+事件带观测时间戳（meta.received_ns / recorded_ns）时，再给出每一步距“收到输入”的毫秒数。
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import sys
+import time
+from array import array
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from cim_worldlab.world.events.codec import decode_event, loads
+from cim_worldlab.world.events.event import Event
+
+INDEX_VERSION = 2  # 2：seq 按事件计数（空行不算），与 FileEventStore 一致
+DEFAULT_BUCKETS = 4096
+_FIELDS = 3  # h, offset, seq
+_HEAD_BYTES = 256  # 用日志开头这么多字节识别“还是不是同一个文件”
+_TRACE_MARKER = b'"trace_id"'
+
+
+def trace_hash(trace_id: str) -> int:
+    """trace_id -> 稳定的 64 位哈希（跨进程一致，不受 PYTHONHASHSEED 影响）。"""
+    return int.from_bytes(hashlib.blake2b(trace_id.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def _to_le(a: array) -> bytes:
+    if sys.byteorder != "little":
+        a = array(a.typecode, a)
+        a.byteswap()
+    return a.tobytes()
+
+
+def _from_le(data: bytes) -> array:
+    a = array("Q")
+    a.frombytes(data[: len(data) - len(data) % (a.itemsize * _FIELDS)])
+    if sys.byteorder != "little":
+        a.byteswap()
+    return a
+
+
+class TraceIndex:
+    """
+    events_path 的 trace 索引。
+
+    - index_dir：索引目录（默认 events.jsonl 旁边的 events.jsonl.traces/）
+    - buckets：桶数（建索引时确定，之后以 meta.json 为准）
+    """
+
+    def __init__(self, events_path: Path, index_dir: Optional[Path] = None, buckets: int = DEFAULT_BUCKETS) -> None:
+        if buckets < 1:
+            raise ValueError("buckets must be >= 1")
+        self.events_path = events_path
+        self.index_dir = index_dir or events_path.with_name(events_path.name + ".traces")
+        self.buckets = buckets
+        self._meta = self._load_meta()
+
+    # -------------------------------
+    # 元数据
+    # -------------------------------
+
+    @property
+    def _meta_path(self) -> Path:
+        return self.index_dir / "meta.json"
+
+    def _fresh_meta(self) -> Dict[str, Any]:
+        return {"version": INDEX_VERSION, "buckets": self.buckets, "indexed_bytes": 0, "indexed_events": 0, "head": ""}
+
+    def _load_meta(self) -> Dict[str, Any]:
+        if not self._meta_path.exists():
+            return self._fresh_meta()
+        meta = json.loads(self._meta_path.read_text(encoding="utf-8"))
+        if meta.get("version") != INDEX_VERSION:
+            return self._fresh_meta()
+        self.buckets = int(meta["buckets"])
+        return meta
+
+    def _save_meta(self) -> None:
+        tmp = self._meta_path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(self._meta), encoding="utf-8")
+        os.replace(tmp, self._meta_path)
+
+    @property
+    def indexed_events(self) -> int:
+        return int(self._meta["indexed_events"])
+
+    def _bucket_path(self, bucket: int) -> Path:
+        return self.index_dir / f"{bucket:04x}.idx"
+
+    def _head_digest(self) -> str:
+        with self.events_path.open("rb") as f:
+            head = f.read(_HEAD_BYTES)
+        return hashlib.blake2b(head, digest_size=8).hexdigest()
+
+    def _reset(self) -> None:
+        if self.index_dir.exists():
+            for p in self.index_dir.glob("*.idx"):
+                p.unlink()
+        self._meta = self._fresh_meta()
+
+    # -------------------------------
+    # 增量维护
+    # -------------------------------
+
+    def sync(self) -> int:
+        """
+        把日志里新增的事件加进索引，返回这次新索引的事件数。
+        """
+        if not self.events_path.exists():
+            if self._meta["indexed_bytes"]:
+                self._reset()
+                self._save_meta()
+            return 0
+
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+        size = self.events_path.stat().st_size
+        start = int(self._meta["indexed_bytes"])
+        if start and (size < start or self._meta["head"] != self._head_digest()):
+            # 截断 / 轮转：已有的偏移都不可信了
+            self._reset()
+            start = 0
+        if size == start:
+            return 0
+
+        pending: Dict[int, array] = {}
+        seq = int(self._meta["indexed_events"])
+        offset = start
+        new_events = 0
+        with self.events_path.open("rb") as f:
+            f.seek(start)
+            for raw in f:
+                if not raw.endswith(b"\n"):
+                    break  # 写到一半的行，下次再索引
+                if not raw.strip():
+                    offset += len(raw)
+                    continue
+                if _TRACE_MARKER in raw:
+                    payload = loads(raw).get("payload")
+                    tid = payload.get("trace_id") if isinstance(payload, dict) else None
+                    if tid is not None:
+                        h = trace_hash(str(tid))
+                        bucket = pending.get(h % self.buckets)
+                        if bucket is None:
+                            bucket = pending[h % self.buckets] = array("Q")
+                        bucket.extend((h, offset, seq))
+                offset += len(raw)
+                seq += 1
+                new_events += 1
+
+        for b, records in pending.items():
+            with self._bucket_path(b).open("ab") as f:
+                f.write(_to_le(records))
+
+        if start == 0:
+            self._meta["head"] = self._head_digest()
+        self._meta["indexed_bytes"] = offset
+        self._meta["indexed_events"] = seq
+        self._save_meta()
+        return new_events
+
+    # -------------------------------
+    # 查询
+    # -------------------------------
+
+    def positions(self, trace_id: str) -> List[Tuple[int, int]]:
+        """trace_id 的候选位置 [(字节偏移, seq), ...]（按 seq 排序，可能含哈希碰撞）。"""
+        h = trace_hash(trace_id)
+        path = self._bucket_path(h % self.buckets)
+        if not path.exists():
+            return []
+        records = _from_le(path.read_bytes())
+        found = {(records[i + 1], records[i + 2]) for i in range(0, len(records), _FIELDS) if records[i] == h}
+        return sorted(found, key=lambda r: r[1])
+
+    def lookup(self, trace_id: str) -> List[Event]:
+        """trace_id 的全部事件（按 seq 排序）。"""
+        events: List[Event] = []
+        positions = self.positions(trace_id)
+        if not positions:
+            return events
+        with self.events_path.open("rb") as f:
+            for offset, seq in positions:
+                f.seek(offset)
+                e = decode_event(f.readline(), default_seq=seq)
+                if isinstance(e.payload, dict) and e.payload.get("trace_id") == trace_id:
+                    events.append(e)
+        return events
+
+    def trace(self, trace_id: str, sync: bool = True) -> Optional[Dict[str, Any]]:
+        """
+        一条 trace 的端到端视图（没有这个 trace_id 返回 None）：
+        - events：按 seq 排好的事件（输入 -> 决策 -> 动作）
+        - chain：事件类型序列
+        - first_t / last_t / span_t：世界时间跨度
+        - events[i].elapsed_ms：距第一条事件收到（或留痕）的毫秒数（有时间戳时才有）
+        - lookup_ms：这次查询的耗时（含增量 sync）
+        """
+        started = time.perf_counter()
+        if sync:
+            self.sync()
+        events = self.lookup(trace_id)
+        if not events:
+            return None
+        return {
+            "trace_id": trace_id,
+            "event_count": len(events),
+            "chain": [e.type for e in events],
+            "first_t": events[0].t,
+            "last_t": events[-1].t,
+            "span_t": events[-1].t - events[0].t,
+            "events": _with_elapsed(events),
+            "lookup_ms": (time.perf_counter() - started) * 1000.0,
+        }
+
+
+def _with_elapsed(events: List[Event]) -> List[Dict[str, Any]]:
+    meta0 = events[0].meta or {}
+    start = meta0.get("received_ns", meta0.get("recorded_ns"))
+    out = []
+    for e in events:
+        d = {"id": e.id, **e.to_dict()}
+        recorded = (e.meta or {}).get("recorded_ns")
+        if start is not None and recorded is not None:
+            d["elapsed_ms"] = (recorded - start) / 1e6
+        out.append(d)
+    return out
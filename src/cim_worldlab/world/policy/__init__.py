@@ -2,7 +2,42 @@
 policy 包（Step 17）：
 - PolicyConfig：阈值等配置
 - evaluate_event：纯函数策略评估（事件 -> 决策列表）
+- PolicyRule / RuleRegistry：规则注册表 + 分发索引（按 event_type/channel/name 只跑匹配的规则）
+- PolicyEvaluator：runtime 依赖的策略接口（evaluate(e) -> List[PolicyDecision]）
+- load_rule_file / PolicyFile：声明式 JSON 规则（编译成闭包，按内容哈希缓存，支持热加载）
+- WindowRule / StatefulPolicy：有状态窗口规则（k-of-n / SPC run / 变化率），状态随快照保存
+- PolicyChain：把多个策略按顺序串起来
+- DecisionSuppressor / SuppressionConfig：决策压制（hold-off / 锁存 / 汇总），runtime 的“决策 -> 动作”闸门
+- evaluate_events / BatchEvaluator：批量评估一批事件（阈值规则可用 NumPy 向量化，NumPy 可选）
 """
-from .engine import PolicyConfig, evaluate_event
+from .engine import PolicyConfig, default_registry, evaluate_event, evaluate_events, temp_high_rule, temp_high_threshold
+from .registry import PolicyChain, PolicyEvaluator, PolicyRule, RuleRegistry
+from .declarative import PolicyFile, ThresholdRule, compile_rule, compile_rules, load_rule_file, parse_rule, parse_rules
+from .batch import BatchEvaluator
+from .stateful import StatefulPolicy, WindowRule
+from .suppression import DecisionSuppressor, SuppressionConfig
 
-__all__ = ["PolicyConfig", "evaluate_event"]
+__all__ = [
+    "BatchEvaluator",
+    "DecisionSuppressor",
+    "PolicyChain",
+    "PolicyConfig",
+    "PolicyEvaluator",
+    "PolicyFile",
+    "PolicyRule",
+    "RuleRegistry",
+    "StatefulPolicy",
+    "SuppressionConfig",
+    "ThresholdRule",
+    "WindowRule",
+    "compile_rule",
+    "compile_rules",
+    "default_registry",
+    "evaluate_event",
+    "evaluate_events",
+    "load_rule_file",
+    "parse_rule",
+    "parse_rules",
+    "temp_high_rule",
+    "temp_high_threshold",
+]
@@ -0,0 +1,210 @@
+"""
+batch.py
+========
+批量（向量化）策略评估：一次评估一批事件
+
+问题：
+- 高频设备遥测（每秒成千上万个 TEMP_READING）下，逐事件跑 Python 闭包是瓶颈：
+  每个事件都要走一遍 “查分发索引 -> 取字段 -> 比较 -> 生成决策” 的解释器开销
+- 而绝大多数读数都不会命中规则，真正需要生成决策的只是极少数
+
+做法（evaluate_events）：
+1) 分组：按事件的 (type, channel, name) 找出每条规则要看的行（同一个 key 只匹配一次规则）
+2) 抽取：把每个字段（例如 data.temp_c）从这批事件里抽成一列数值（同一字段只抽一次）
+3) 比较：对整列做阈值 / 区间比较，得到命中的行号
+   - 装了 NumPy：数组比较（向量化）
+   - 没装 NumPy：纯 Python 列表推导（结果完全一样）
+4) 生成决策：只对命中的行调用 ThresholdRule.decision，按“事件顺序 + 规则注册顺序”排好
+
+正确性约定：
+- evaluate_events(events) == [d for e in events for d in 逐事件评估(e)]（决策内容、顺序都一致）
+- 决策里的数值用原始 Python float（不是 numpy 标量），写日志/比较时与逐事件路径无差别
+- 非数值规则（例如 == "ALARM"）不能向量化，按原值逐行比较，但仍参与同一个批次
+
+NumPy 是可选依赖：pip install numpy 之后自动启用（backend="auto"）。
+"""
+
+from __future__ import annotations
+
+import math
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from cim_worldlab.world.events.event import Event
+from cim_worldlab.world.events.policy_decision import PolicyDecision
+from cim_worldlab.world.policy.declarative import (
+    _COMPARATORS,
+    _MISSING,
+    ThresholdRule,
+    _as_float,
+    _compile_getter,
+    _compile_predicate,
+)
+from cim_worldlab.world.policy.registry import RuleRegistry
+
+try:
+    import numpy as np
+except ImportError:  # NumPy 是可选依赖
+    np = None
+
+HAS_NUMPY = np is not None
+BACKENDS = ("auto", "numpy", "python")
+
+# 行数太少时数组构造的开销比比较本身还大，直接走纯 Python
+MIN_NUMPY_ROWS = 32
+
+Key = Tuple[str, Optional[str], Optional[str]]
+
+
+def _subscribes(rule: ThresholdRule, key: Key) -> bool:
+    et, channel, name = key
+    return (
+        rule.event_type == et
+        and (rule.channel is None or rule.channel == channel)
+        and (rule.name is None or rule.name == name)
+    )
+
+
+def _array_mask(op: str, values: Any, threshold: Any) -> Any:
+    """NumPy 版本的比较（NaN 参与比较的结果与 Python float 一致）。"""
+    if op == "between":
+        lo, hi = threshold
+        return (values >= lo) & (values <= hi)
+    if op == "outside":
+        lo, hi = threshold
+        return (values < lo) | (values > hi)
+    return _COMPARATORS[op](values, threshold)
+
+
+class BatchEvaluator:
+    """
+    一组阈值规则的批量评估器（同时实现 PolicyEvaluator，可直接注入 WorldRuntime.policy）。
+
+    - evaluate(e)：逐事件评估（编译好的 RuleRegistry）
+    - evaluate_events(events)：批量评估，返回按事件顺序排列的决策列表
+    - evaluate_indexed(events)：同上，但每个决策带上所属事件的下标
+    - backend："auto"（有 NumPy 就用）/ "numpy" / "python"
+    """
+
+    def __init__(self, rules: Iterable[ThresholdRule], backend: str = "auto") -> None:
+        if backend not in BACKENDS:
+            raise ValueError(f"Unsupported backend: {backend!r} (expected one of {BACKENDS})")
+        if backend == "numpy" and not HAS_NUMPY:
+            raise ValueError("backend='numpy' requires NumPy (pip install numpy)")
+        self.rules: List[ThresholdRule] = list(rules)
+        self.backend = backend
+        self._use_numpy = HAS_NUMPY and backend != "python"
+        self._getters = {r.field: _compile_getter(r.field) for r in self.rules}
+        self._predicates = [_compile_predicate(r.op, r.threshold)[0] for r in self.rules]
+        self._registry = RuleRegistry(r.compile() for r in self.rules)
+        self._registry.compile()
+        self._key_rules: Dict[Key, List[int]] = {}
+
+    def evaluate(self, e: Event) -> List[PolicyDecision]:
+        return self._registry.evaluate(e)
+
+    def _rules_for(self, key: Key) -> List[int]:
+        idx = self._key_rules.get(key)
+        if idx is None:
+            idx = [j for j, r in enumerate(self.rules) if _subscribes(r, key)]
+            self._key_rules[key] = idx
+        return idx
+
+    def evaluate_indexed(self, events: Sequence[Event]) -> List[Tuple[int, PolicyDecision]]:
+        """
+        批量评估，返回 [(事件下标, 决策), ...]，按事件顺序、同一事件内按规则注册顺序排列。
+        （runtime 等需要“决策属于哪个事件”的调用方用这个）
+        """
+        if not events or not self.rules:
+            return []
+
+        # 1) 分组：按 (type, channel, name) 把行号分桶（每个事件只属于一个桶）
+        groups: Dict[Key, List[int]] = {}
+        for i, e in enumerate(events):
+            p = e.payload
+            key = (e.type, p.get("channel"), p.get("name"))
+            rows = groups.get(key)
+            if rows is None:
+                groups[key] = [i]
+            else:
+                rows.append(i)
+
+        hits: List[Tuple[int, int, PolicyDecision]] = []
+        for key, rows in groups.items():
+            rule_idx = self._rules_for(key)
+            if not rule_idx:
+                continue
+            payloads = [events[i].payload for i in rows]
+
+            # 2) 抽取：桶内同一字段只抽一次
+            raw_cols: Dict[str, List[Any]] = {}
+            num_cols: Dict[str, Any] = {}
+
+            # 3) + 4) 比较，只对命中的行生成决策
+            for j in rule_idx:
+                rule = self.rules[j]
+                raw = raw_cols.get(rule.field)
+                if raw is None:
+                    raw = raw_cols[rule.field] = _extract(rule.field, self._getters[rule.field], payloads)
+
+                decision = rule.decision
+                if rule.numeric:
+                    for k in self._numeric_hits(j, rule, raw, num_cols):
+                        hits.append((rows[k], j, decision(_as_float(raw[k]))))
+                else:
+                    pred = self._predicates[j]
+                    for k, x in enumerate(raw):
+                        if x is not _MISSING and pred(x):
+                            hits.append((rows[k], j, decision(x)))
+
+        hits.sort(key=lambda h: (h[0], h[1]))
+        return [(i, d) for i, _, d in hits]
+
+    def evaluate_events(self, events: Sequence[Event]) -> List[PolicyDecision]:
+        """
+        批量评估，返回按原始事件顺序排列的决策列表。
+        等价于：[d for e in events for d in self.evaluate(e)]
+        """
+        return [d for _, d in self.evaluate_indexed(events)]
+
+    def _numeric_hits(self, j: int, rule: ThresholdRule, raw: List[Any], num_cols: Dict[str, Any]) -> List[int]:
+        """返回 raw 中命中规则的下标（缺失 / 非数值永不命中，与 _as_float 的口径一致）。"""
+        pred = self._predicates[j]
+        if not (self._use_numpy and len(raw) >= MIN_NUMPY_ROWS):
+            return [k for k, v in enumerate(raw) if (x := _as_float(v)) is not None and pred(x)]
+
+        values = num_cols.get(rule.field)
+        if values is None:
+            values = num_cols[rule.field] = _to_array(raw)
+        mask = _array_mask(rule.op, values, rule.threshold)
+        # 数组只负责“粗筛”：命中的行再按逐事件的口径确认一次
+        # （缺失值编码成 NaN，而 NaN != thr 为 True；bool 会被 NumPy 当成 0/1）
+        return [k for k in np.flatnonzero(mask).tolist() if (x := _as_float(raw[k])) is not None and pred(x)]
+
+
+def _extract(field_path: str, getter: Any, payloads: List[Dict[str, Any]]) -> List[Any]:
+    """按列抽取字段；单层路径内联成列表推导（省掉每行一次函数调用）。"""
+    if "." not in field_path:
+        return [
+            d.get(field_path, _MISSING) if isinstance(d := p.get("data"), dict) else _MISSING
+            for p in payloads
+        ]
+    return [getter(p) for p in payloads]
+
+
+def _to_array(raw: List[Any]) -> Any:
+    """
+    把一列原始值转成 float64 数组。
+    快路径：整列都是数字时 NumPy 一次性转换；否则逐个 _as_float，缺失记为 NaN。
+    """
+    try:
+        values = np.array(raw, dtype=np.float64)
+        if values.ndim == 1:
+            return values
+    except (TypeError, ValueError):
+        pass
+    nan = math.nan
+    return np.fromiter(
+        (nan if x is None else x for x in map(_as_float, raw)),
+        dtype=np.float64,
+        count=len(raw),
+    )
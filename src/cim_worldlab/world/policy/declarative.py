@@ -0,0 +1,392 @@
+"""
+declarative.py
+==============
+声明式策略规则：从 JSON 文件加载，编译成 Python 闭包
+
+为什么要“声明式”？
+- 工艺工程师维护的是“限值表”（哪个参数、大于多少、报什么级别、建议什么动作）
+- 他们不应该为了改一个阈值去改 engine.py
+- 所以规则写在 JSON 文件里（例如 projects/P01_single_excursion/baseline/reference_policy.json）
+
+为什么要“编译”？
+- 如果每个事件都去解释一遍 JSON（查 op 字符串、拆字段路径…），很慢
+- 我们在加载时把每条规则编译成一个闭包：字段路径、比较函数、阈值都提前绑定好
+- 事件到来时只做：取值 -> 比较 -> 生成决策
+
+文件格式（version 1）：
+{
+  "version": 1,
+  "rules": [
+    {
+      "rule_id": "TEMP_HIGH_PAUSE",
+      "match": {"event_type": "EXTERNAL_INPUT", "channel": "equipment", "name": "TEMP_READING"},
+      "field": "temp_c",                 # payload["data"] 里的字段路径，可用 "a.b" 表示嵌套
+      "op": ">",                         # > >= < <= == != between outside
+      "value": 92.0,                     # between/outside 用 [lo, hi]
+      "severity": "ALERT",
+      "suggested_action": "PAUSE",
+      "reason": "TEMP too high: temp_c={value} > threshold={threshold}. Recommend PAUSE.",
+      "evidence_keys": {"value": "temp_c", "threshold": "threshold_c"}   # 可选
+    }
+  ]
+}
+
+缓存与热加载：
+- load_rule_file(path)：按文件内容缓存最近几份的编译结果（内容不变就不重新编译）
+- PolicyFile(path)：实现 PolicyEvaluator 接口，evaluate 时按间隔检查文件是否变化，
+  变化则重新加载；新文件有错误时保留旧规则继续运行（last_error 记录原因）
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import operator
+import time
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from cim_worldlab.world.events.event import Event
+from cim_worldlab.world.events.external_input import EXTERNAL_INPUT_TYPE
+from cim_worldlab.world.events.policy_decision import PolicyDecision
+from cim_worldlab.world.policy.registry import PolicyRule, RuleRegistry
+
+SUPPORTED_VERSION = 1
+
+_COMPARATORS: Dict[str, Callable[[Any, Any], bool]] = {
+    ">": operator.gt,
+    ">=": operator.ge,
+    "<": operator.lt,
+    "<=": operator.le,
+    "==": operator.eq,
+    "!=": operator.ne,
+}
+_RANGE_OPS = ("between", "outside")
+_ORDERING_OPS = (">", ">=", "<", "<=")
+
+_MISSING = object()
+
+
+def _compile_getter(field_path: str) -> Callable[[Dict[str, Any]], Any]:
+    """
+    把 "a.b.c" 编译成取值函数：payload -> payload["data"]["a"]["b"]["c"]。
+    单层路径（最常见）走专门的快路径。
+    """
+    parts = tuple(field_path.split("."))
+    if not field_path or any(not p for p in parts):
+        raise ValueError(f"Invalid field path: {field_path!r}")
+
+    if len(parts) == 1:
+        key = parts[0]
+
+        def get_one(payload: Dict[str, Any]) -> Any:
+            data = payload.get("data")
+            if not isinstance(data, dict):
+                return _MISSING
+            return data.get(key, _MISSING)
+
+        return get_one
+
+    def get_path(payload: Dict[str, Any]) -> Any:
+        cur: Any = payload.get("data")
+        for p in parts:
+            if not isinstance(cur, dict):
+                return _MISSING
+            cur = cur.get(p, _MISSING)
+            if cur is _MISSING:
+                return _MISSING
+        return cur
+
+    return get_path
+
+
+def _as_float(v: Any) -> Optional[float]:
+    if v is None or v is _MISSING or isinstance(v, bool):
+        return None
+    try:
+        return float(v)
+    except (TypeError, ValueError):
+        return None
+
+
+def _is_number(v: Any) -> bool:
+    return isinstance(v, (int, float)) and not isinstance(v, bool)
+
+
+def _compile_predicate(op: str, value: Any) -> Tuple[Callable[[Any], bool], bool]:
+    """
+    返回 (predicate, numeric)：
+    - numeric=True：比较前先把字段值转成 float（与内置规则一致）
+    - numeric=False：按原值比较（只有 == / != 可以，例如 == "ALARM"）
+
+    大小比较（> >= < <=）和区间必须给数值：否则运行时拿 3 去和 "B" 比，会在 runtime 里抛 TypeError。
+    """
+    if op in _RANGE_OPS:
+        if not isinstance(value, (list, tuple)) or len(value) != 2 or not all(_is_number(v) for v in value):
+            raise ValueError(f"op {op!r} requires numeric value [lo, hi], got {value!r}")
+        lo, hi = float(value[0]), float(value[1])
+        if op == "between":
+            return (lambda x: lo <= x <= hi), True
+        return (lambda x: x < lo or x > hi), True
+
+    cmp = _COMPARATORS.get(op)
+    if cmp is None:
+        raise ValueError(f"Unsupported op: {op!r}")
+
+    if _is_number(value):
+        threshold = float(value)
+        return (lambda x: cmp(x, threshold)), True
+    if op in _ORDERING_OPS:
+        raise ValueError(f"op {op!r} requires a numeric value, got {value!r}")
+    return (lambda x: cmp(x, value)), False
+
+
+@dataclass(frozen=True)
+class ThresholdRule:
+    """
+    解析后的阈值规则（编译前的中间形式）。
+
+    - compile()：编译成 PolicyRule（逐事件评估）
+    - 批量 / 列式评估器（backtest、向量化评估）直接读取 field/op/threshold 等字段
+    """
+    rule_id: str
+    event_type: str
+    channel: Optional[str]
+    name: Optional[str]
+    field: str
+    op: str
+    threshold: Any          # 数值规则是 float；between/outside 是 [lo, hi]；非数值规则是原值
+    numeric: bool
+    severity: str
+    suggested_action: str
+    reason_tpl: str
+    value_key: str
+    threshold_key: str
+
+    def decision(self, x: Any) -> PolicyDecision:
+        """规则命中时生成决策（逐事件 / 批量评估共用，保证结果完全一致）。"""
+        return PolicyDecision(
+            rule_id=self.rule_id,
+            severity=self.severity,
+            recommended_action=self.suggested_action,
+            reason=self.reason_tpl.format(value=x, threshold=self.threshold, field=self.field, rule_id=self.rule_id),
+            evidence={self.value_key: x, self.threshold_key: self.threshold},
+        )
+
+    def compile(self) -> PolicyRule:
+        getter = _compile_getter(self.field)
+        predicate, numeric = _compile_predicate(self.op, self.threshold)
+        decision = self.decision
+
+        def check(e: Event) -> Optional[PolicyDecision]:
+            raw = getter(e.payload)
+            if raw is _MISSING:
+                return None
+            if numeric:
+                x = _as_float(raw)
+                if x is None:
+                    return None
+            else:
+                x = raw
+            if not predicate(x):
+                return None
+            return decision(x)
+
+        return PolicyRule(
+            rule_id=self.rule_id,
+            check=check,
+            event_type=self.event_type,
+            channel=self.channel,
+            name=self.name,
+        )
+
+
+def parse_rule(spec: Dict[str, Any]) -> ThresholdRule:
+    """
+    校验并解析一条 JSON 规则。
+    规则不合法时抛出 ValueError（带 rule_id，方便定位）；形状不对（不是对象）也一样。
+    """
+    if not isinstance(spec, dict):
+        raise ValueError(f"Rule must be an object, got {spec!r}")
+    rule_id = spec.get("rule_id")
+    if not isinstance(rule_id, str) or not rule_id:
+        raise ValueError(f"Rule is missing rule_id: {spec!r}")
+
+    try:
+        match = spec.get("match", {}) or {}
+        field_path = str(spec["field"])
+        op = str(spec["op"])
+        value = spec["value"]
+        severity = str(spec.get("severity", "ALERT"))
+        action = str(spec["suggested_action"])
+    except KeyError as e:
+        raise ValueError(f"Rule {rule_id}: missing key {e.args[0]!r}") from None
+    if not isinstance(match, dict):
+        raise ValueError(f"Rule {rule_id}: match must be an object, got {match!r}")
+    for k in ("event_type", "channel", "name"):
+        if not isinstance(match.get(k), (str, type(None))):
+            raise ValueError(f"Rule {rule_id}: match.{k} must be a string, got {match[k]!r}")
+
+    _compile_getter(field_path)
+    _, numeric = _compile_predicate(op, value)
+
+    leaf = field_path.rsplit(".", 1)[-1]
+    threshold = [float(v) for v in value] if op in _RANGE_OPS else (float(value) if numeric else value)
+    reason_tpl = str(spec.get("reason", f"{rule_id}: {leaf}={{value}} {op} {{threshold}}. Recommend {action}."))
+    evidence_keys = spec.get("evidence_keys", {}) or {}
+    if not isinstance(evidence_keys, dict):
+        raise ValueError(f"Rule {rule_id}: evidence_keys must be an object, got {evidence_keys!r}")
+
+    # 提前用运行时同类型的值试一次模板（数值规则 check() 传的是 float），
+    # 占位符、属性访问、格式码不对都在加载时报错，而不是在 runtime 里第一次命中时才抛
+    probe = 0.0 if numeric else value
+    try:
+        reason_tpl.format(value=probe, threshold=threshold, field=field_path, rule_id=rule_id)
+    except Exception as e:
+        raise ValueError(f"Rule {rule_id}: bad reason template: {e!r}") from None
+
+    return ThresholdRule(
+        rule_id=rule_id,
+        event_type=str(match.get("event_type", EXTERNAL_INPUT_TYPE)),
+        channel=match.get("channel"),
+        name=match.get("name"),
+        field=field_path,
+        op=op,
+        threshold=threshold,
+        numeric=numeric,
+        severity=severity,
+        suggested_action=action,
+        reason_tpl=reason_tpl,
+        value_key=str(evidence_keys.get("value", leaf)),
+        threshold_key=str(evidence_keys.get("threshold", "threshold")),
+    )
+
+
+def compile_rule(spec: Dict[str, Any]) -> PolicyRule:
+    """把一条 JSON 规则编译成 PolicyRule（check 是提前绑定好一切的闭包）。"""
+    return parse_rule(spec).compile()
+
+
+def parse_rules(doc: Dict[str, Any]) -> List[ThresholdRule]:
+    """解析整份规则文档（校验形状、版本、rule_id 唯一）。"""
+    if not isinstance(doc, dict):
+        raise ValueError("Policy file must be a JSON object")
+    version = doc.get("version", SUPPORTED_VERSION)
+    if version != SUPPORTED_VERSION:
+        raise ValueError(f"Unsupported policy file version: {version!r}")
+    rules = doc.get("rules")
+    if not isinstance(rules, list):
+        raise ValueError("Policy file must contain a 'rules' list")
+
+    out: List[ThresholdRule] = []
+    seen = set()
+    for spec in rules:
+        rule = parse_rule(spec)
+        if rule.rule_id in seen:
+            raise ValueError(f"Duplicate rule_id: {rule.rule_id}")
+        seen.add(rule.rule_id)
+        out.append(rule)
+    return out
+
+
+def compile_rules(doc: Dict[str, Any]) -> RuleRegistry:
+    """把整份规则文档编译成 RuleRegistry。"""
+    reg = RuleRegistry(r.compile() for r in parse_rules(doc))
+    reg.compile()
+    return reg
+
+
+# 最近用过的几份文件内容 -> 编译好的注册表（有上限：长期热加载的进程不会无限攒旧版本）
+_COMPILE_CACHE_SIZE = 8
+
+
+@lru_cache(maxsize=_COMPILE_CACHE_SIZE)
+def _compile_bytes(raw: bytes) -> RuleRegistry:
+    try:
+        doc = json.loads(raw.decode("utf-8"))
+    except (UnicodeDecodeError, json.JSONDecodeError) as e:
+        raise ValueError(f"Policy file is not valid JSON: {e}") from None
+    return compile_rules(doc)
+
+
+def load_rule_bytes(raw: bytes) -> Tuple[str, RuleRegistry]:
+    """按内容查缓存；没命中才解析 + 编译。返回 (sha256 digest, registry)。"""
+    return hashlib.sha256(raw).hexdigest(), _compile_bytes(raw)
+
+
+def load_rule_file(path: Path) -> RuleRegistry:
+    """读取并编译规则文件（同内容只编译一次）。"""
+    return load_rule_bytes(path.read_bytes())[1]
+
+
+class PolicyFile:
+    """
+    支持热加载的规则文件（实现 PolicyEvaluator 接口，可直接注入 WorldRuntime.policy）。
+
+    - check_interval_s：最多每隔多久 stat 一次文件（0 表示每个事件都检查）
+    - 文件 mtime/size 变化 -> 读内容算哈希 -> 哈希变化才切换规则
+    - 新内容不合法：保留旧规则，last_error 记录错误信息
+    """
+
+    def __init__(self, path: Path, check_interval_s: float = 1.0) -> None:
+        self.path = path
+        self.check_interval_s = check_interval_s
+        self.digest: Optional[str] = None
+        self.last_error: Optional[str] = None
+        self.reload_count = 0
+        self._registry: RuleRegistry = RuleRegistry()
+        self._stat_key: Optional[Tuple[int, int]] = None
+        self._next_check = 0.0
+        self.reload(force=True)
+
+    @property
+    def registry(self) -> RuleRegistry:
+        return self._registry
+
+    def reload(self, force: bool = False) -> bool:
+        """
+        检查文件并在内容变化时切换规则。返回 True 表示切换了规则。
+        force=True：第一次加载，文件错误直接抛出（启动时就应该失败）。
+        """
+        try:
+            st = self.path.stat()
+            stat_key = (st.st_mtime_ns, st.st_size)
+            if not force and stat_key == self._stat_key:
+                return False
+            raw = self.path.read_bytes()  # stat 之后文件可能刚好被删 / 被替换
+        except FileNotFoundError:
+            if force:
+                raise
+            self.last_error = f"Policy file not found: {self.path}"
+            return False
+        self._stat_key = stat_key
+
+        try:
+            digest, reg = load_rule_bytes(raw)
+        except Exception as e:
+            # 热加载时任何解析 / 编译错误都不能抛进 runtime：保留旧规则，记下原因
+            if force:
+                raise
+            self.last_error = str(e) if isinstance(e, ValueError) else f"{type(e).__name__}: {e}"
+            return False
+
+        self.last_error = None
+        if digest == self.digest:
+            return False
+        self.digest = digest
+        self._registry = reg
+        self.reload_count += 1
+        return True
+
+    def _maybe_reload(self) -> None:
+        now = time.monotonic()
+        if now < self._next_check:
+            return
+        self._next_check = now + self.check_interval_s
+        self.reload()
+
+    def evaluate(self, e: Event) -> List[PolicyDecision]:
+        self._maybe_reload()
+        return self._registry.evaluate(e)
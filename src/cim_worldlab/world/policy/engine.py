@@ -20,16 +20,26 @@ MVP 只做一条规则：
 - 如果设备温度 temp_c > threshold
   -> recommended_action = "PAUSE"
   -> severity = "ALERT"
+
+规则组织方式：
+- 每条规则是一个 PolicyRule（声明订阅的 event_type/channel/name + check 函数）
+- 规则注册到 RuleRegistry，由分发索引决定“哪个事件只需要跑哪些规则”
+- evaluate_event 使用按 config 缓存的默认注册表（default_registry）
+- evaluate_events 是批量版本：一次评估一批事件（阈值规则可向量化，见 batch.py）
 """
 
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import Any, Dict, List, Optional
+from functools import lru_cache
+from typing import List, Sequence
 
 from cim_worldlab.world.events.event import Event
 from cim_worldlab.world.events.external_input import EXTERNAL_INPUT_TYPE
 from cim_worldlab.world.events.policy_decision import PolicyDecision
+from cim_worldlab.world.policy.batch import BatchEvaluator
+from cim_worldlab.world.policy.declarative import ThresholdRule
+from cim_worldlab.world.policy.registry import PolicyRule, RuleRegistry
 
 
 @dataclass(frozen=True)
@@ -41,31 +51,49 @@ class PolicyConfig:
     temp_high_threshold_c: float = 92.0  # 教学默认：92℃ 以上就算偏危险
 
 
-def _extract_temp_c(payload: Dict[str, Any]) -> Optional[float]:
+def temp_high_threshold(config: PolicyConfig) -> ThresholdRule:
     """
-    从 EXTERNAL_INPUT.payload 中提取 temp_c。
+    规则 TEMP_HIGH_PAUSE 的声明形式：payload["data"]["temp_c"] > 阈值 -> 建议 PAUSE。
 
-    设计说明：
-    - payload 结构来自 ExternalInput.to_event()
-      payload = {source, channel, name, data, trace_id?}
-    - temp_c 在 payload["data"]["temp_c"]
+    用 ThresholdRule 表达（而不是手写 check）的好处：
+    - 逐事件评估：compile() 成闭包
+    - 批量评估（evaluate_events）：直接读取 field/op/threshold 做向量化比较
+    两条路径共用 ThresholdRule.decision，决策内容完全一致。
+    """
+    threshold = float(config.temp_high_threshold_c)
+    return ThresholdRule(
+        rule_id="TEMP_HIGH_PAUSE",
+        event_type=EXTERNAL_INPUT_TYPE,
+        channel="equipment",
+        name="TEMP_READING",
+        field="temp_c",
+        op=">",
+        threshold=threshold,
+        numeric=True,
+        severity="ALERT",
+        suggested_action="PAUSE",
+        reason_tpl="TEMP too high: temp_c={value} > threshold={threshold}. Recommend PAUSE.",
+        value_key="temp_c",
+        threshold_key="threshold_c",
+    )
+
+
+def temp_high_rule(config: PolicyConfig) -> PolicyRule:
+    """
+    规则 TEMP_HIGH_PAUSE：设备温度超过阈值 -> 建议 PAUSE。
 
-    返回：
-    - float：提取到
-    - None：不存在或不可转换
+    订阅声明：EXTERNAL_INPUT / equipment / TEMP_READING
+    （分发索引保证只有这类事件才会进入 check，所以 check 里不再判断 channel/name）
     """
-    data = payload.get("data", {})
-    if not isinstance(data, dict):
-        return None
+    return temp_high_threshold(config).compile()
 
-    v = data.get("temp_c", None)
-    if v is None:
-        return None
 
-    try:
-        return float(v)
-    except (TypeError, ValueError):
-        return None
+@lru_cache(maxsize=32)
+def default_registry(config: PolicyConfig = PolicyConfig()) -> RuleRegistry:
+    """
+    内置规则的注册表（按 config 缓存：PolicyConfig 是 frozen 的，可以做 dict key）。
+    """
+    return RuleRegistry([temp_high_rule(config)])
 
 
 def evaluate_event(e: Event, config: PolicyConfig = PolicyConfig()) -> List[PolicyDecision]:
@@ -74,35 +102,21 @@ def evaluate_event(e: Event, config: PolicyConfig = PolicyConfig()) -> List[Poli
 
     目前只对 EXTERNAL_INPUT 感兴趣，其它事件返回空。
     """
-    if e.type != EXTERNAL_INPUT_TYPE:
-        return []
-
-    channel = e.payload.get("channel")
-    name = e.payload.get("name")
-
-    # 只关心设备温度输入
-    if channel != "equipment" or name != "TEMP_READING":
-        return []
-
-    temp_c = _extract_temp_c(e.payload)
-    if temp_c is None:
-        return []
-
-    threshold = config.temp_high_threshold_c
-
-    # 命中规则：温度超过阈值
-    if temp_c > threshold:
-        trace_id = e.payload.get("trace_id")  # 输入若有 trace_id，我们也带上，方便串联
-        reason = f"TEMP too high: temp_c={temp_c} > threshold={threshold}. Recommend PAUSE."
-
-        d = PolicyDecision(
-            rule_id="TEMP_HIGH_PAUSE",
-            severity="ALERT",
-            recommended_action="PAUSE",
-            reason=reason,
-            evidence={"temp_c": temp_c, "threshold_c": threshold},
-        )
-        # 注意：这里不生成 Event（保持纯），Event 由 runtime 负责写入事件流
-        return [d]
-
-    return []
+    return default_registry(config).evaluate(e)
+
+
+@lru_cache(maxsize=32)
+def default_batch_evaluator(config: PolicyConfig = PolicyConfig()) -> BatchEvaluator:
+    """内置规则的批量评估器（与 default_registry 同样按 config 缓存）。"""
+    return BatchEvaluator([temp_high_threshold(config)])
+
+
+def evaluate_events(events: Sequence[Event], config: PolicyConfig = PolicyConfig()) -> List[PolicyDecision]:
+    """
+    批量版 evaluate_event：返回按原始事件顺序排列的决策列表。
+
+    保证：evaluate_events(events) == [d for e in events for d in evaluate_event(e)]
+    （装了 NumPy 时数值比较走向量化，否则走纯 Python）。
+    需要知道决策属于哪个事件时，用 default_batch_evaluator(config).evaluate_indexed(events)。
+    """
+    return default_batch_evaluator(config).evaluate_events(events)
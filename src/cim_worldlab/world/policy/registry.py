@@ -0,0 +1,210 @@
+"""
+registry.py
+===========
+规则注册表 + 分发索引（Rule Registry / Dispatch Index）
+
+问题：
+- v0 的 evaluate_event 把唯一一条规则写死在 if 里：
+  channel == "equipment" and name == "TEMP_READING"
+- 规则一多（几百条），如果每个事件都把所有规则挨个试一遍（线性扫描），
+  每条事件的成本 = O(规则数)，很快就撑不住
+
+做法：
+- 每条规则声明自己“订阅”哪类事件：(event_type, channel, name)
+  channel / name 可以为 None，表示通配（任意 channel / 任意 name）
+- RuleRegistry.compile() 把规则按订阅 key 分组，建立分发索引
+- 事件到来时，用事件自己的 (type, channel, name) 查一次 dict（O(1)），
+  只评估真正匹配的规则
+
+通配规则怎么处理？
+- 一个具体事件 (T, C, N) 可能匹配 4 种声明：
+  (T, C, N) / (T, C, *) / (T, *, N) / (T, *, *)
+- 第一次遇到某个具体 key 时，把这 4 组规则按注册顺序合并并缓存，
+  之后同样 key 的事件直接命中缓存（缓存大小 = 实际出现过的 (type, channel, name) 组合数）
+
+规则评估顺序 = 注册顺序（保证决策顺序稳定，replay 可复现）。
+"""
+
+from __future__ import annotations
+
+import copy
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Optional, Protocol, Tuple
+
+from cim_worldlab.world.events.event import Event
+from cim_worldlab.world.events.external_input import EXTERNAL_INPUT_TYPE
+from cim_worldlab.world.events.policy_decision import PolicyDecision
+
+# (event_type, channel, name)；channel/name 为 None 表示通配
+DispatchKey = Tuple[str, Optional[str], Optional[str]]
+
+
+class PolicyEvaluator(Protocol):
+    """
+    runtime 依赖的策略接口：给一个事件，返回 0..N 个决策。
+    RuleRegistry 以及后续的各种策略实现都满足这个接口。
+    """
+
+    def evaluate(self, e: Event) -> List[PolicyDecision]: ...
+
+
+@dataclass(frozen=True)
+class PolicyRule:
+    """
+    一条策略规则。
+
+    - rule_id：规则编号（会写进 POLICY_DECISION.payload.rule_id）
+    - check：规则逻辑，输入事件，命中返回 PolicyDecision，否则返回 None
+    - event_type / channel / name：订阅声明（channel/name 为 None 表示通配）
+    """
+    rule_id: str
+    check: Callable[[Event], Optional[PolicyDecision]]
+    event_type: str = EXTERNAL_INPUT_TYPE
+    channel: Optional[str] = None
+    name: Optional[str] = None
+
+    @property
+    def key(self) -> DispatchKey:
+        return (self.event_type, self.channel, self.name)
+
+    def matches(self, e: Event) -> bool:
+        """逐条判断是否订阅了该事件（线性扫描时使用；索引分发不需要它）。"""
+        if e.type != self.event_type:
+            return False
+        if self.channel is not None and e.payload.get("channel") != self.channel:
+            return False
+        if self.name is not None and e.payload.get("name") != self.name:
+            return False
+        return True
+
+
+def event_dispatch_key(e: Event) -> DispatchKey:
+    """事件自己的具体 key。"""
+    p = e.payload
+    return (e.type, p.get("channel"), p.get("name"))
+
+
+class RuleRegistry:
+    """
+    规则注册表。
+
+    用法：
+        reg = RuleRegistry()
+        reg.register(PolicyRule(rule_id="R1", check=..., channel="equipment", name="TEMP_READING"))
+        decisions = reg.evaluate(event)
+
+    注册新规则后索引自动失效，下次 evaluate 时重新编译。
+    """
+
+    def __init__(self, rules: Iterable[PolicyRule] = ()) -> None:
+        self._rules: List[PolicyRule] = []
+        self._by_key: Optional[Dict[DispatchKey, List[Tuple[int, PolicyRule]]]] = None
+        self._event_types: frozenset = frozenset()
+        self._resolved: Dict[DispatchKey, Tuple[PolicyRule, ...]] = {}
+        for r in rules:
+            self.register(r)
+
+    def register(self, rule: PolicyRule) -> PolicyRule:
+        self._rules.append(rule)
+        self._by_key = None
+        self._resolved = {}
+        return rule
+
+    @property
+    def rules(self) -> List[PolicyRule]:
+        return list(self._rules)
+
+    def __len__(self) -> int:
+        return len(self._rules)
+
+    def compile(self) -> None:
+        """按订阅 key 分组（保留注册序号，合并通配规则时用来排序）。"""
+        by_key: Dict[DispatchKey, List[Tuple[int, PolicyRule]]] = {}
+        for pos, r in enumerate(self._rules):
+            by_key.setdefault(r.key, []).append((pos, r))
+        self._by_key = by_key
+        self._event_types = frozenset(k[0] for k in by_key)
+        self._resolved = {}
+
+    def rules_for(self, key: DispatchKey) -> Tuple[PolicyRule, ...]:
+        """
+        返回订阅了具体 key 的全部规则（按注册顺序）。
+        命中缓存时是一次 dict 查找。
+        """
+        hit = self._resolved.get(key)
+        if hit is not None:
+            return hit
+
+        if self._by_key is None:
+            self.compile()
+        assert self._by_key is not None
+
+        t, c, n = key
+        merged: List[Tuple[int, PolicyRule]] = []
+        for k in {(t, c, n), (t, c, None), (t, None, n), (t, None, None)}:
+            merged.extend(self._by_key.get(k, ()))
+        merged.sort(key=lambda pr: pr[0])
+
+        resolved = tuple(r for _, r in merged)
+        self._resolved[key] = resolved
+        return resolved
+
+    def evaluate(self, e: Event) -> List[PolicyDecision]:
+        if self._by_key is None:
+            self.compile()
+        # 快速拒绝：没有任何规则订阅这种事件类型（WORLD_TICK / POLICY_DECISION ...）
+        if e.type not in self._event_types:
+            return []
+
+        decisions: List[PolicyDecision] = []
+        for rule in self.rules_for(event_dispatch_key(e)):
+            d = rule.check(e)
+            if d is not None:
+                decisions.append(d)
+        return decisions
+
+
+class PolicyChain:
+    """
+    把多个策略按顺序串起来（例如：声明式阈值规则 + 有状态窗口规则）。
+
+    - evaluate：依次调用每个策略，决策按“策略顺序 + 各自规则顺序”拼接
+    - snapshot_state / restore_state：转发给有状态的子策略（按下标区分）
+    - fork：逐个 fork_policy 子策略
+    """
+
+    def __init__(self, policies: Iterable[PolicyEvaluator]) -> None:
+        self.policies: List[PolicyEvaluator] = list(policies)
+
+    def evaluate(self, e: Event) -> List[PolicyDecision]:
+        decisions: List[PolicyDecision] = []
+        for p in self.policies:
+            decisions.extend(p.evaluate(e))
+        return decisions
+
+    def snapshot_state(self) -> Dict[str, Any]:
+        out: Dict[str, Any] = {}
+        for i, p in enumerate(self.policies):
+            snap = getattr(p, "snapshot_state", None)
+            if snap is not None:
+                out[str(i)] = snap()
+        return out
+
+    def restore_state(self, data: Dict[str, Any]) -> None:
+        for i, p in enumerate(self.policies):
+            restore = getattr(p, "restore_state", None)
+            if restore is not None and str(i) in data:
+                restore(data[str(i)])
+
+    def fork(self) -> "PolicyChain":
+        return PolicyChain(fork_policy(p) for p in self.policies)
+
+
+def fork_policy(policy: Any) -> Any:
+    """
+    复制一份策略给 WorldRuntime.fork 用（两边的内部状态互不影响）：
+    - 有 fork() 的（状态藏在编译好的闭包里，deepcopy 复制不到）用它
+    - 其余的 deepcopy（无状态的闭包规则会被共享，这没关系）
+    """
+    fork = getattr(policy, "fork", None)
+    return fork() if fork is not None else copy.deepcopy(policy)
@@ -0,0 +1,274 @@
+"""
+stateful.py
+===========
+有状态的窗口规则（SPC / 连续超限 / 变化率）
+
+为什么需要“有状态”？
+- evaluate_event 是无状态的：只看当前这一条读数
+- 但真实的超限判定往往需要历史：
+  - "最近 5 次 TEMP_READING 里有 3 次超限"（k-of-n）
+  - "连续 8 个点落在均值同一侧"（SPC run rule）
+  - "相邻两次读数变化太快"（rate-of-change）
+
+设计要点：
+- 状态按 (rule_id, 设备) 分流：每台设备一条独立的“流”（stream）
+  设备 key 来自 payload["data"][key_field]（默认 equipment_id），取不到时退化为 channel
+- 每条流的状态是固定大小的小 list（位图 + 计数 / 方向 + 游程 / 上一个值 + 时间），
+  每个事件 O(1) 更新，内存不随历史长度增长
+- 可选 max_streams：单条规则最多保留多少条流，超出时淘汰最久未更新的（LRU）
+- 状态可以导出/恢复（snapshot_state / restore_state），与 WorldState 一起写进快照；
+  replay 时把事件重新喂给策略即可重建状态，之后的决策与“没重启过”完全一致
+
+规则的分发仍然复用 RuleRegistry（订阅 event_type/channel/name），
+只是每条 PolicyRule 的 check 闭包绑定了自己那一份状态表。
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from cim_worldlab.world.events.event import Event
+from cim_worldlab.world.events.external_input import EXTERNAL_INPUT_TYPE
+from cim_worldlab.world.events.policy_decision import PolicyDecision
+from cim_worldlab.world.policy.declarative import _MISSING, _as_float, _compile_getter, _compile_predicate
+from cim_worldlab.world.policy.registry import PolicyRule, RuleRegistry
+
+K_OF_N = "k_of_n"
+RUN = "run"
+RATE = "rate"
+_KINDS = (K_OF_N, RUN, RATE)
+
+# k-of-n 用一个 int 做位图，窗口最大 64（保证位运算是常数时间）
+MAX_WINDOW = 64
+
+StreamStates = Dict[str, List[Any]]
+
+
+@dataclass(frozen=True)
+class WindowRule:
+    """
+    一条有状态规则的声明。
+
+    kind=k_of_n：最近 n 个点里有 >= k 个满足 (field op value) 时命中
+    kind=run：   连续 run_length 个点落在 mean 同一侧时命中
+    kind=rate：  |x - 上一个 x| / max(1, t - 上一个 t) > max_rate 时命中
+
+    公共字段：
+    - match：订阅声明 {"event_type", "channel", "name"}
+    - key_field：data 里区分设备的字段（默认 equipment_id）
+    """
+    rule_id: str
+    kind: str
+    field: str
+    suggested_action: str
+    severity: str = "WARN"
+    match: Dict[str, Any] = field(default_factory=dict)
+    key_field: str = "equipment_id"
+    # k_of_n
+    op: str = ">"
+    value: Any = None
+    k: int = 0
+    n: int = 0
+    # run
+    mean: float = 0.0
+    run_length: int = 8
+    # rate
+    max_rate: float = 0.0
+
+    @staticmethod
+    def from_spec(spec: Dict[str, Any]) -> "WindowRule":
+        """从 dict（例如 JSON）构造，未知字段报 ValueError。"""
+        try:
+            rule = WindowRule(**spec)
+        except TypeError as e:
+            raise ValueError(f"Invalid window rule spec {spec.get('rule_id')!r}: {e}") from None
+        rule.validate()
+        return rule
+
+    def validate(self) -> None:
+        if self.kind not in _KINDS:
+            raise ValueError(f"Rule {self.rule_id}: unsupported kind {self.kind!r}")
+        if self.kind == K_OF_N:
+            if not (1 <= self.k <= self.n <= MAX_WINDOW):
+                raise ValueError(f"Rule {self.rule_id}: need 1 <= k <= n <= {MAX_WINDOW}")
+            if self.value is None:
+                raise ValueError(f"Rule {self.rule_id}: k_of_n requires value")
+        if self.kind == RUN and self.run_length < 2:
+            raise ValueError(f"Rule {self.rule_id}: run_length must be >= 2")
+        if self.kind == RATE and self.max_rate <= 0:
+            raise ValueError(f"Rule {self.rule_id}: max_rate must be > 0")
+
+
+def _stream_key_getter(key_field: str) -> Callable[[Dict[str, Any]], str]:
+    def key_of(payload: Dict[str, Any]) -> str:
+        data = payload.get("data")
+        if isinstance(data, dict):
+            k = data.get(key_field)
+            if k is not None:
+                return str(k)
+        return str(payload.get("channel", ""))
+    return key_of
+
+
+def _stream_slot(states: StreamStates, key: str, init: Callable[[], List[Any]], max_streams: Optional[int]) -> List[Any]:
+    """
+    取某条流的状态；不存在就初始化。
+    设了 max_streams 时按 LRU 维护（dict 的插入顺序 = 最近使用顺序）。
+    """
+    st = states.get(key)
+    if st is None:
+        st = init()
+        states[key] = st
+        if max_streams is not None and len(states) > max_streams:
+            del states[next(iter(states))]
+    elif max_streams is not None:
+        states[key] = states.pop(key)
+    return st
+
+
+def _compile_window_check(rule: WindowRule, states: StreamStates, max_streams: Optional[int]) -> Callable[[Event], Optional[PolicyDecision]]:
+    getter = _compile_getter(rule.field)
+    key_of = _stream_key_getter(rule.key_field)
+    rule_id, severity, action = rule.rule_id, rule.severity, rule.suggested_action
+
+    def decide(reason: str, evidence: Dict[str, Any]) -> PolicyDecision:
+        return PolicyDecision(rule_id=rule_id, severity=severity, recommended_action=action, reason=reason, evidence=evidence)
+
+    if rule.kind == K_OF_N:
+        predicate, _ = _compile_predicate(rule.op, rule.value)
+        k, n = rule.k, rule.n
+        mask = (1 << n) - 1
+        top = n - 1
+
+        def check_k_of_n(e: Event) -> Optional[PolicyDecision]:
+            x = _as_float(getter(e.payload))
+            if x is None:
+                return None
+            key = key_of(e.payload)
+            st = _stream_slot(states, key, lambda: [0, 0], max_streams)
+            bits, count = st
+            hit = 1 if predicate(x) else 0
+            # 滑出窗口的那一位（最老的点）减掉，新点加上：O(1)
+            count += hit - ((bits >> top) & 1)
+            st[0] = ((bits << 1) | hit) & mask
+            st[1] = count
+            if hit and count >= k:
+                return decide(
+                    f"{count} of last {n} {rule.field} readings {rule.op} {rule.value} on {key}. Recommend {action}.",
+                    {"stream": key, "value": x, "count": count, "k": k, "n": n},
+                )
+            return None
+
+        return check_k_of_n
+
+    if rule.kind == RUN:
+        mean, length = float(rule.mean), rule.run_length
+
+        def check_run(e: Event) -> Optional[PolicyDecision]:
+            x = _as_float(getter(e.payload))
+            if x is None:
+                return None
+            key = key_of(e.payload)
+            st = _stream_slot(states, key, lambda: [0, 0], max_streams)
+            side = 1 if x > mean else (-1 if x < mean else 0)
+            run = st[1] + 1 if (side != 0 and side == st[0]) else (1 if side != 0 else 0)
+            st[0] = side
+            st[1] = run
+            if run >= length:
+                where = "above" if side > 0 else "below"
+                return decide(
+                    f"{run} consecutive {rule.field} points {where} mean={mean} on {key}. Recommend {action}.",
+                    {"stream": key, "value": x, "run": run, "mean": mean},
+                )
+            return None
+
+        return check_run
+
+    max_rate = float(rule.max_rate)
+
+    def check_rate(e: Event) -> Optional[PolicyDecision]:
+        raw = getter(e.payload)
+        if raw is _MISSING:
+            return None
+        x = _as_float(raw)
+        if x is None:
+            return None
+        key = key_of(e.payload)
+        st = _stream_slot(states, key, lambda: [None, None], max_streams)
+        last_x, last_t = st
+        st[0] = x
+        st[1] = e.t
+        if last_x is None:
+            return None
+        rate = abs(x - last_x) / max(1, e.t - last_t)
+        if rate > max_rate:
+            return decide(
+                f"{rule.field} changed {last_x} -> {x} (rate={rate} > {max_rate}) on {key}. Recommend {action}.",
+                {"stream": key, "value": x, "previous": last_x, "rate": rate, "max_rate": max_rate},
+            )
+        return None
+
+    return check_rate
+
+
+class StatefulPolicy:
+    """
+    有状态规则集合（实现 PolicyEvaluator，可直接注入 WorldRuntime.policy，
+    或与无状态规则一起放进 PolicyChain）。
+
+    状态结构（可 JSON 化）：
+        {rule_id: {stream_key: [...固定大小的状态...]}}
+    """
+
+    def __init__(self, rules: Iterable[WindowRule], max_streams: Optional[int] = None) -> None:
+        self.rules: List[WindowRule] = list(rules)
+        self.max_streams = max_streams
+        self._states: Dict[str, StreamStates] = {}
+        self._registry = RuleRegistry()
+        for r in self.rules:
+            r.validate()
+            if r.rule_id in self._states:
+                raise ValueError(f"Duplicate rule_id: {r.rule_id}")
+            states: StreamStates = {}
+            self._states[r.rule_id] = states
+            self._registry.register(PolicyRule(
+                rule_id=r.rule_id,
+                check=_compile_window_check(r, states, max_streams),
+                event_type=str(r.match.get("event_type", EXTERNAL_INPUT_TYPE)),
+                channel=r.match.get("channel"),
+                name=r.match.get("name"),
+            ))
+        self._registry.compile()
+
+    @classmethod
+    def from_specs(cls, specs: Iterable[Dict[str, Any]], max_streams: Optional[int] = None) -> "StatefulPolicy":
+        return cls([WindowRule.from_spec(s) for s in specs], max_streams=max_streams)
+
+    def evaluate(self, e: Event) -> List[PolicyDecision]:
+        return self._registry.evaluate(e)
+
+    def stream_count(self) -> int:
+        return sum(len(s) for s in self._states.values())
+
+    def snapshot_state(self) -> Dict[str, Any]:
+        """导出状态（深拷贝成纯 list/dict，写快照用）。"""
+        return {rid: {k: list(v) for k, v in streams.items()} for rid, streams in self._states.items()}
+
+    def restore_state(self, data: Dict[str, Any]) -> None:
+        """
+        恢复状态。注意要“原地”更新：check 闭包持有的是各规则状态表的引用。
+        """
+        for rid, streams in self._states.items():
+            streams.clear()
+            for k, v in (data.get(rid) or {}).items():
+                streams[k] = list(v)
+
+    def fork(self) -> "StatefulPolicy":
+        """
+        复制一份（同样的规则 + 当前状态的拷贝）。check 闭包持有状态表的引用，
+        所以不能 deepcopy：要重新编译规则再 restore_state。
+        """
+        twin = StatefulPolicy(self.rules, max_streams=self.max_streams)
+        twin.restore_state(self.snapshot_state())
+        return twin
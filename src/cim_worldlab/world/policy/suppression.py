@@ -0,0 +1,172 @@
+"""
+suppression.py
+==============
+决策压制（decision suppression）：去重 + 告警风暴抑制
+
+问题：
+- 设备持续过热时，每个超限的 TEMP_READING 都会产生一条 POLICY_DECISION + 一条 ACTION_EXECUTED
+- 事件量在系统最吃紧的时候翻三倍，并且连续刷出一串重复的 PAUSE 动作
+
+做法：在 runtime 的“决策 -> 动作”路径上加一道闸门（DecisionSuppressor）
+- 按 (rule_id, 流) 分别计：流 = payload["data"][key_field]（默认 equipment_id，取不到时用 channel）
+- hold-off：某条决策放行后，holdoff_ticks 个世界时间内同一 (rule_id, 流) 的重复决策被压制
+- latch（锁存）：放行后一直压制，直到“清除条件”满足：
+  同一台设备、同一类事件（type/channel/name）连续 clear_count 次没有触发该规则（读数回到正常）
+- 每段压制结束（hold-off 到期 / 锁存清除）时，如果确实压制过决策，
+  就输出一条 DecisionsSuppressed 汇总（N 条被压制），由 runtime 写成 DECISIONS_SUPPRESSED 事件
+
+确定性：
+- 压制只依赖事件序列本身（事件的 t、决策、WORLD_TICK），不看墙上时钟
+- 状态可导出/恢复（snapshot_state / restore_state），随快照保存；
+  replay 时把事件重新评估一遍即可重建状态，之后的压制结果与“从没重启过”一致
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from cim_worldlab.world.events.decisions_suppressed import DecisionsSuppressed
+from cim_worldlab.world.events.event import Event
+from cim_worldlab.world.events.policy_decision import PolicyDecision
+from cim_worldlab.world.policy.stateful import _stream_key_getter
+
+HOLDOFF_EXPIRED = "holdoff_expired"
+CLEARED = "cleared"
+
+# 每个 (rule_id, 流) 的状态（list，方便 JSON 化）：
+# [until_t, latched, clear_run, suppressed, first_t, last_t, [event_type, channel, name]]
+_UNTIL, _LATCHED, _CLEAR_RUN, _SUPPRESSED, _FIRST_T, _LAST_T, _KIND = range(7)
+
+
+@dataclass(frozen=True)
+class SuppressionConfig:
+    """
+    - holdoff_ticks：放行一次后，多少个世界时间内压制重复决策（0 = 不做 hold-off）
+    - latch：放行一次后锁存，直到清除条件满足
+    - clear_count：锁存时，需要连续多少次“同类读数未触发规则”才清除
+    - key_field：data 里区分设备的字段
+    - rule_ids：只对这些规则做压制（None = 全部规则）
+    """
+    holdoff_ticks: int = 0
+    latch: bool = False
+    clear_count: int = 1
+    key_field: str = "equipment_id"
+    rule_ids: Optional[Tuple[str, ...]] = None
+
+    def validate(self) -> None:
+        if self.holdoff_ticks < 0:
+            raise ValueError("holdoff_ticks must be >= 0")
+        if self.clear_count < 1:
+            raise ValueError("clear_count must be >= 1")
+
+
+class DecisionSuppressor:
+    """
+    决策压制器：observe(e, decisions) -> (放行的决策, 需要写入的汇总)。
+
+    runtime 对每条记录的事件调用一次 observe（包括 WORLD_TICK：用来让 hold-off 到期）。
+    """
+
+    def __init__(self, config: SuppressionConfig = SuppressionConfig()) -> None:
+        config.validate()
+        self.config = config
+        self.suppressed_total = 0
+        self._enabled = config.holdoff_ticks > 0 or config.latch
+        self._rule_ids = frozenset(config.rule_ids) if config.rule_ids is not None else None
+        self._key_of = _stream_key_getter(config.key_field)
+        # 流 -> {rule_id -> 状态}
+        self._streams: Dict[str, Dict[str, List[Any]]] = {}
+
+    def active_count(self) -> int:
+        """当前处于压制期（hold-off 或锁存）的 (rule_id, 流) 数量。"""
+        return sum(len(v) for v in self._streams.values())
+
+    def observe(self, e: Event, decisions: Sequence[PolicyDecision]) -> Tuple[List[PolicyDecision], List[DecisionsSuppressed]]:
+        summaries: List[DecisionsSuppressed] = []
+        if e.type == "WORLD_TICK" and self._streams:
+            self._expire(e.t, summaries)
+
+        payload = e.payload if isinstance(e.payload, dict) else None
+        if payload is None or not self._enabled or (not decisions and not self._streams):
+            return list(decisions), summaries
+
+        stream = self._key_of(payload)
+        entries = self._streams.get(stream)
+        kind = [e.type, payload.get("channel"), payload.get("name")]
+        passed: List[PolicyDecision] = []
+        fired = set()
+
+        for d in decisions:
+            if self._rule_ids is not None and d.rule_id not in self._rule_ids:
+                passed.append(d)
+                continue
+            fired.add(d.rule_id)
+
+            st = entries.get(d.rule_id) if entries else None
+            if st is not None and not st[_LATCHED] and e.t >= st[_UNTIL]:
+                # 没有 WORLD_TICK 推动时，在这里让 hold-off 到期
+                self._close(d.rule_id, stream, st, HOLDOFF_EXPIRED, summaries)
+                del entries[d.rule_id]  # type: ignore[union-attr]
+                st = None
+
+            if st is None:
+                if entries is None:
+                    entries = self._streams.setdefault(stream, {})
+                entries[d.rule_id] = [e.t + self.config.holdoff_ticks, self.config.latch, 0, 0, None, None, kind]
+                passed.append(d)
+                continue
+
+            st[_CLEAR_RUN] = 0
+            st[_SUPPRESSED] += 1
+            if st[_FIRST_T] is None:
+                st[_FIRST_T] = e.t
+            st[_LAST_T] = e.t
+            self.suppressed_total += 1
+
+        # 锁存的清除条件：同类事件来了，但规则没有触发
+        if entries and self.config.latch:
+            for rule_id in [r for r, st in entries.items() if st[_LATCHED] and r not in fired and st[_KIND] == kind]:
+                st = entries[rule_id]
+                st[_CLEAR_RUN] += 1
+                if st[_CLEAR_RUN] >= self.config.clear_count:
+                    self._close(rule_id, stream, st, CLEARED, summaries)
+                    del entries[rule_id]
+
+        if entries is not None and not entries:
+            self._streams.pop(stream, None)
+        return passed, summaries
+
+    def _expire(self, t: int, summaries: List[DecisionsSuppressed]) -> None:
+        for stream in list(self._streams):
+            entries = self._streams[stream]
+            for rule_id in [r for r, st in entries.items() if not st[_LATCHED] and st[_UNTIL] <= t]:
+                self._close(rule_id, stream, entries.pop(rule_id), HOLDOFF_EXPIRED, summaries)
+            if not entries:
+                del self._streams[stream]
+
+    @staticmethod
+    def _close(rule_id: str, stream: str, st: List[Any], ended_by: str, summaries: List[DecisionsSuppressed]) -> None:
+        if st[_SUPPRESSED] > 0:
+            summaries.append(DecisionsSuppressed(
+                rule_id=rule_id,
+                stream=stream,
+                suppressed=st[_SUPPRESSED],
+                first_t=st[_FIRST_T],
+                last_t=st[_LAST_T],
+                ended_by=ended_by,
+            ))
+
+    def snapshot_state(self) -> Dict[str, Any]:
+        """导出状态（纯 list/dict，写快照用）。"""
+        return {
+            "suppressed_total": self.suppressed_total,
+            "streams": {s: {r: list(st) for r, st in entries.items()} for s, entries in self._streams.items()},
+        }
+
+    def restore_state(self, data: Dict[str, Any]) -> None:
+        self.suppressed_total = int(data.get("suppressed_total", 0))
+        self._streams = {
+            s: {r: list(st) for r, st in entries.items()}
+            for s, entries in (data.get("streams") or {}).items()
+        }
@@ -0,0 +1,12 @@
+"""
+projections 包：从事件流增量维护的物化视图（按 key O(1) 查询）
+
+- Projection：投影接口（observe / get / keys / reset / snapshot_state / restore_state）
+- ProjectionSet：按名字管理一组投影（runtime / follower 挂它）
+- KeyedProjection：按设备（data.equipment_id）或通道维护每个 key 的当前状态（列式紧凑存储）
+- default_projections：CLI / follower 默认挂的投影集合
+"""
+from .projection import Projection, ProjectionSet
+from .keyed import KeyedProjection, default_projections
+
+__all__ = ["Projection", "ProjectionSet", "KeyedProjection", "default_projections"]
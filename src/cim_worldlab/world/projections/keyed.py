@@ -0,0 +1,223 @@
+"""
+keyed.py
+========
+KeyedProjection：按 key（设备 / 通道）维护“每个 key 的当前状态”
+
+key 从哪里来？
+- 外部输入：payload["data"][key_field]（默认 equipment_id）；key_field=None 时按 channel 分
+- channel：只看这个通道的输入（None = 所有通道）
+- 决策 / 动作：沿 cause_id 找到触发它的输入，记到同一个 key 上
+  （决策紧跟在输入后面留痕，动作紧跟在决策后面，所以只需记住“最近一条输入”衍生出的 id；
+  没有 cause_id 的老日志：决策算最近一条输入的，动作算最近一条决策的 —— 与因果索引的推断一致）
+
+每个 key 记什么？
+- input_count / last_t：输入次数、最近一次输入的世界时间
+- fields：data 里要跟踪的数值字段的最新值（例如 temp_c）
+- action_count / last_action：动作次数、最近一次动作（类型 / 原因 / 世界时间）
+
+紧凑存储（5000 台设备 x 每台几个字段）：
+- key -> 槽位号（dict），每个字段一列（array('q') / array('d')），而不是每个 key 一个 dict
+- 数值字段缺失用 NaN；动作类型 / 原因用 sys.intern（取值就那么几种）
+"""
+
+from __future__ import annotations
+
+import math
+import sys
+from array import array
+from typing import Any, Dict, List, Optional, Sequence
+
+from cim_worldlab.world.events.action_executed import ACTION_EXECUTED_TYPE
+from cim_worldlab.world.events.event import Event
+from cim_worldlab.world.events.external_input import EXTERNAL_INPUT_TYPE
+from cim_worldlab.world.events.policy_decision import POLICY_DECISION_TYPE
+from cim_worldlab.world.projections.projection import ProjectionSet
+
+_NONE = -1
+
+
+class KeyedProjection:
+    """
+    - name：投影名
+    - key_field：data 里区分 key 的字段（None = 按 channel）
+    - channel：只看这个通道（None = 全部）
+    - fields：要跟踪最新值的数值字段
+    """
+
+    def __init__(
+        self,
+        name: str = "equipment",
+        key_field: Optional[str] = "equipment_id",
+        channel: Optional[str] = None,
+        fields: Sequence[str] = ("temp_c",),
+    ) -> None:
+        self.name = name
+        self.key_field = key_field
+        self.channel = channel
+        self.fields = tuple(fields)
+        self.reset()
+
+    def reset(self) -> None:
+        self._slot: Dict[str, int] = {}
+        self._keys: List[str] = []
+        self._input_count = array("q")
+        self._last_t = array("q")
+        self._values: Dict[str, array] = {f: array("d") for f in self.fields}
+        self._action_count = array("q")
+        self._action_t = array("q")
+        self._action_type: List[Optional[str]] = []
+        self._action_reason: List[Optional[str]] = []
+        # 最近一条输入衍生出的事件 id -> 槽位（决策 / 动作靠它归到设备上）
+        self._derived: Dict[str, int] = {}
+        self._last_input_slot = _NONE
+        self._last_decision_slot = _NONE
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def keys(self) -> List[str]:
+        return list(self._keys)
+
+    # -------------------------------
+    # 增量更新
+    # -------------------------------
+
+    def _key_of(self, payload: Dict[str, Any]) -> Optional[str]:
+        if self.channel is not None and payload.get("channel") != self.channel:
+            return None
+        if self.key_field is None:
+            ch = payload.get("channel")
+            return str(ch) if ch is not None else None
+        data = payload.get("data")
+        if not isinstance(data, dict):
+            return None
+        k = data.get(self.key_field)
+        return str(k) if k is not None else None
+
+    def _slot_for(self, key: str) -> int:
+        slot = self._slot.get(key)
+        if slot is None:
+            slot = self._slot[key] = len(self._keys)
+            self._keys.append(key)
+            self._input_count.append(0)
+            self._last_t.append(_NONE)
+            for col in self._values.values():
+                col.append(math.nan)
+            self._action_count.append(0)
+            self._action_t.append(_NONE)
+            self._action_type.append(None)
+            self._action_reason.append(None)
+        return slot
+
+    def observe(self, e: Event) -> None:
+        typ = e.type
+        if typ == EXTERNAL_INPUT_TYPE:
+            self._observe_input(e)
+        elif typ == POLICY_DECISION_TYPE:
+            slot = self._cause_slot(e, self._last_input_slot)
+            self._last_decision_slot = slot
+            if slot != _NONE and e.seq is not None:
+                self._derived[e.id] = slot
+        elif typ == ACTION_EXECUTED_TYPE:
+            slot = self._cause_slot(e, self._last_decision_slot)
+            if slot != _NONE:
+                payload = e.payload
+                self._action_count[slot] += 1
+                self._action_t[slot] = e.t
+                self._action_type[slot] = sys.intern(str(payload.get("action_type", "")))
+                self._action_reason[slot] = sys.intern(str(payload.get("reason", "")))
+
+    def _observe_input(self, e: Event) -> None:
+        self._derived.clear()
+        key = self._key_of(e.payload) if isinstance(e.payload, dict) else None
+        if key is None:
+            self._last_input_slot = _NONE
+            return
+        slot = self._slot_for(key)
+        self._last_input_slot = slot
+        if e.seq is not None:
+            self._derived[e.id] = slot
+        self._input_count[slot] += 1
+        self._last_t[slot] = e.t
+        data = e.payload.get("data")
+        if isinstance(data, dict):
+            for f, col in self._values.items():
+                v = data.get(f)
+                if isinstance(v, (int, float)) and not isinstance(v, bool):
+                    col[slot] = float(v)
+
+    def _cause_slot(self, e: Event, legacy: int) -> int:
+        cause = e.payload.get("cause_id") if isinstance(e.payload, dict) else None
+        if cause is None:
+            return legacy
+        return self._derived.get(cause, _NONE)
+
+    # -------------------------------
+    # 查询（按 key O(1)）
+    # -------------------------------
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        slot = self._slot.get(key)
+        if slot is None:
+            return None
+        values = {}
+        for f, col in self._values.items():
+            v = col[slot]
+            values[f] = None if math.isnan(v) else v
+        last_action = None
+        if self._action_count[slot]:
+            last_action = {
+                "t": self._action_t[slot],
+                "action_type": self._action_type[slot],
+                "reason": self._action_reason[slot],
+            }
+        return {
+            "key": key,
+            "input_count": self._input_count[slot],
+            "last_t": self._last_t[slot] if self._last_t[slot] != _NONE else None,
+            "values": values,
+            "action_count": self._action_count[slot],
+            "last_action": last_action,
+        }
+
+    # -------------------------------
+    # 快照（列式，可 JSON 化）
+    # -------------------------------
+
+    def snapshot_state(self) -> Dict[str, Any]:
+        return {
+            "keys": list(self._keys),
+            "input_count": self._input_count.tolist(),
+            "last_t": self._last_t.tolist(),
+            "values": {f: [None if math.isnan(v) else v for v in col] for f, col in self._values.items()},
+            "action_count": self._action_count.tolist(),
+            "action_t": self._action_t.tolist(),
+            "action_type": list(self._action_type),
+            "action_reason": list(self._action_reason),
+            "derived": dict(self._derived),
+            "last_input_slot": self._last_input_slot,
+            "last_decision_slot": self._last_decision_slot,
+        }
+
+    def restore_state(self, obj: Dict[str, Any]) -> None:
+        self.reset()
+        self._keys = [str(k) for k in obj["keys"]]
+        self._slot = {k: i for i, k in enumerate(self._keys)}
+        self._input_count = array("q", obj["input_count"])
+        self._last_t = array("q", obj["last_t"])
+        n = len(self._keys)
+        for f in self.fields:
+            col = obj["values"].get(f) or [None] * n
+            self._values[f] = array("d", (math.nan if v is None else float(v) for v in col))
+        self._action_count = array("q", obj["action_count"])
+        self._action_t = array("q", obj["action_t"])
+        self._action_type = [sys.intern(v) if v is not None else None for v in obj["action_type"]]
+        self._action_reason = [sys.intern(v) if v is not None else None for v in obj["action_reason"]]
+        self._derived = {str(k): int(v) for k, v in obj.get("derived", {}).items()}
+        self._last_input_slot = int(obj.get("last_input_slot", _NONE))
+        self._last_decision_slot = int(obj.get("last_decision_slot", _NONE))
+
+
+def default_projections() -> ProjectionSet:
+    """CLI / follower 默认挂的投影：按 equipment_id 的设备视图（跟踪 temp_c）。"""
+    return ProjectionSet([KeyedProjection("equipment", key_field="equipment_id", fields=("temp_c",))])
@@ -0,0 +1,111 @@
+"""
+projection.py
+=============
+投影（projection）：从事件流增量维护的“物化视图”
+
+WorldState 是一条扁平记录（计数器 + last_input / last_action），回答不了
+“5000 台设备各自的当前温度和最近一次动作是什么”——只能扫日志。
+
+投影就是为这类问题准备的：
+- 每条留痕的事件都喂给投影（observe），投影只更新自己关心的那一小块
+- 查询按 key O(1)：get(key)
+- 状态可导出 / 恢复（snapshot_state / restore_state），随快照保存；
+  replay 时先恢复快照里的投影，再喂快照之后的事件
+
+本文件：
+- Projection：投影接口（任何实现这几个方法的对象都可以挂到 runtime / follower 上）
+- ProjectionSet：按名字管理一组投影，一条事件分发给所有投影
+"""
+
+from __future__ import annotations
+
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Protocol
+
+from cim_worldlab.world.events.event import Event
+
+
+class Projection(Protocol):
+    """
+    投影接口：
+    - name：投影名（查询、快照里用）
+    - observe(e)：增量更新（按事件顺序调用）
+    - get(key)：按 key 查询，没有返回 None
+    - keys()：所有 key
+    - reset()：清空（follower 重建时用）
+    - snapshot_state() / restore_state(obj)：可 JSON 化的状态
+    """
+    name: str
+
+    def observe(self, e: Event) -> None: ...
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]: ...
+
+    def keys(self) -> List[str]: ...
+
+    def reset(self) -> None: ...
+
+    def snapshot_state(self) -> Dict[str, Any]: ...
+
+    def restore_state(self, obj: Dict[str, Any]) -> None: ...
+
+
+class ProjectionSet:
+    """
+    一组投影（按名字）。runtime / follower 只和它打交道。
+    """
+
+    def __init__(self, projections: Iterable[Projection] = ()) -> None:
+        self._by_name: Dict[str, Projection] = {}
+        for p in projections:
+            self.add(p)
+
+    def add(self, projection: Projection) -> None:
+        if projection.name in self._by_name:
+            raise ValueError(f"duplicate projection name: {projection.name!r}")
+        self._by_name[projection.name] = projection
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._by_name
+
+    def __iter__(self) -> Iterator[Projection]:
+        return iter(self._by_name.values())
+
+    def __len__(self) -> int:
+        return len(self._by_name)
+
+    def names(self) -> List[str]:
+        return list(self._by_name)
+
+    def projection(self, name: str) -> Optional[Projection]:
+        return self._by_name.get(name)
+
+    def get(self, name: str, key: str) -> Optional[Dict[str, Any]]:
+        p = self._by_name.get(name)
+        return p.get(key) if p is not None else None
+
+    def observe(self, e: Event) -> None:
+        for p in self._by_name.values():
+            p.observe(e)
+
+    def extend(self, events: Iterable[Event]) -> None:
+        projections = list(self._by_name.values())
+        for e in events:
+            for p in projections:
+                p.observe(e)
+
+    def reset(self) -> None:
+        for p in self._by_name.values():
+            p.reset()
+
+    def snapshot_state(self) -> Dict[str, Any]:
+        return {name: p.snapshot_state() for name, p in self._by_name.items()}
+
+    def restore_state(self, obj: Dict[str, Any]) -> bool:
+        """
+        从快照恢复；快照里缺了某个投影时返回 False（调用方应当用全部事件重建）。
+        """
+        if any(name not in obj for name in self._by_name):
+            return False
+        for name, p in self._by_name.items():
+            p.restore_state(obj[name])
+        return True
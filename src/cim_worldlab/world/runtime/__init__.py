@@ -2,8 +2,29 @@
 runtime 子包导出：
 - WorldRuntime：世界会动的心脏
 - EventLog：内存事件日志（调试/教学用）
+- ColumnarEventLog：列式内存事件日志（接口同 EventLog，省内存）
+- StageProfiler：分阶段计时器（可选，性能观测用）
+- CausalIndex：因果索引（seq -> 原因 seq，why() 用）
+- LatencyTracker：端到端延迟观测（可选）
+- Follower：只读副本（跟读 events.jsonl，维护自己的状态与指标）
+- EventBroadcaster / StreamFilter：把新事件、状态差量、指标推给订阅者（有界缓冲 + 过滤）
+- verify_snapshot / SnapshotCheck：校验“快照 + 补尾巴”的回放 == 全量回放
+- SnapshotScheduler / ReplayCost：按事件数 / 字节数 / 时间 / 预计回放耗时决定何时打快照
+- ShardedRuntime / shard_of：按 key 分片到多个进程的多世界运行时（确定性的全局顺序）
+- ForkedEventLog / run_forks：WorldRuntime.fork() 的写时复制事件日志；多进程并行跑很多个 what-if 分叉
+- Simulation / InputSchedule / SimulationResult：无头加速模拟（虚拟时间 + 按时刻排好的脚本输入）
 """
 from .runtime import WorldRuntime
-from .event_log import EventLog
+from .event_log import ColumnarEventLog, EventLog, ForkedEventLog
+from .profiling import StageProfiler
+from .causal_index import CausalIndex
+from .latency import LatencyTracker
+from .follower import Follower
+from .broadcast import EventBroadcaster, StreamFilter
+from .snapshot_check import SnapshotCheck, verify_snapshot
+from .snapshot_scheduler import ReplayCost, SnapshotScheduler
+from .sharded import ShardedRuntime, shard_of
+from .forks import run_forks
+from .simulation import InputSchedule, Simulation, SimulationResult
 
-__all__ = ["WorldRuntime", "EventLog"]
+__all__ = ["WorldRuntime", "EventLog", "ColumnarEventLog", "StageProfiler", "CausalIndex", "LatencyTracker", "Follower", "EventBroadcaster", "StreamFilter", "SnapshotCheck", "verify_snapshot", "SnapshotScheduler", "ReplayCost", "ShardedRuntime", "shard_of", "ForkedEventLog", "run_forks", "Simulation", "InputSchedule", "SimulationResult"]
@@ -0,0 +1,291 @@
+"""
+broadcast.py
+============
+EventBroadcaster：把新事件 / 状态变化 / 指标推给订阅者（看板、投屏）
+
+以前看板只能轮询 run-once --pretty 的输出；现在由只读副本（Follower）跟读日志，
+每读到一批新事件就 publish 一次，订阅者（SSE / WebSocket 连接）各自从缓冲区取。
+
+三个设计点：
+1) 每个事件只序列化一次：
+   - publish 时 encode_event 一次，得到一个 Frame（字节），所有订阅者共享同一个对象
+   - SSE 的 "id/event/data" 外壳、WebSocket 的文本也是第一次用到时生成一次，之后复用
+   - 过滤条件相同的订阅者归为一组：每个事件每组只判断一次
+2) 每个订阅者可以过滤：type / channel / trace_id（都是“任一匹配”；不给就是不过滤）
+   - channel 只有 EXTERNAL_INPUT 的 payload 里有；按 channel 过滤时决策 / 动作不会推送
+3) 每个订阅者的缓冲区有上限（慢消费者不能拖垮服务，也不能无限吃内存）：
+   - drop_oldest（默认）：满了丢最旧的
+   - drop_newest：满了丢新来的
+   - coalesce：状态 / 指标帧只保留最新的一份（状态差量合并成一份全量状态），
+     满了再丢最旧的事件
+   - 丢过帧的订阅者，下一次取数据时先收到一个 DROPPED 帧（告诉看板该重新拉 /v1/state 了）
+
+帧（Frame）的 data 都是自描述的 JSON（带 "type"）：
+- 事件：与 events.jsonl 的一行相同（t / seq / type / payload / meta）
+- STATE_DIFF：{"type", "last_index", "changed": {字段: 新值}}（coalesce 时是全量：带 "full": true）
+- METRICS：{"type", "last_index", "metrics": {...}}
+- DROPPED：{"type", "count"}
+"""
+
+from __future__ import annotations
+
+import threading
+from collections import deque
+from dataclasses import asdict, dataclass
+from typing import Any, Callable, Deque, Dict, FrozenSet, Iterable, List, Optional
+
+from cim_worldlab.world.events.codec import dumps, encode_event
+from cim_worldlab.world.events.event import Event
+
+STATE_DIFF_TYPE = "STATE_DIFF"
+METRICS_TYPE = "METRICS"
+DROPPED_TYPE = "DROPPED"
+
+DROP_OLDEST = "drop_oldest"
+DROP_NEWEST = "drop_newest"
+COALESCE = "coalesce"
+OVERFLOW_POLICIES = (DROP_OLDEST, DROP_NEWEST, COALESCE)
+_SNAPSHOT_KINDS = (STATE_DIFF_TYPE, METRICS_TYPE)
+
+
+class Frame:
+    """
+    一条推送（所有订阅者共享，不可变）。
+
+    - kind：事件类型 / STATE_DIFF / METRICS / DROPPED
+    - data：JSON 字节（只序列化一次）
+    - full：状态差量帧对应的全量状态帧（只有 coalesce 合并时才用到，第一次用到时才序列化）
+    """
+
+    __slots__ = ("kind", "id", "data", "_make_full", "_full", "_sse", "_text")
+
+    def __init__(
+        self,
+        kind: str,
+        data: bytes,
+        id: Optional[str] = None,
+        make_full: Optional[Callable[[], "Frame"]] = None,
+    ) -> None:
+        self.kind = kind
+        self.id = id
+        self.data = data
+        self._make_full = make_full
+        self._full: Optional[Frame] = None
+        self._sse: Optional[bytes] = None
+        self._text: Optional[str] = None
+
+    @property
+    def full(self) -> Optional["Frame"]:
+        if self._full is None and self._make_full is not None:
+            self._full = self._make_full()
+            self._make_full = None
+        return self._full
+
+    @property
+    def sse(self) -> bytes:
+        """Server-Sent Events 格式（第一次用到时拼一次）。"""
+        if self._sse is None:
+            head = b"id: " + self.id.encode() + b"\n" if self.id is not None else b""
+            self._sse = head + b"event: " + self.kind.encode() + b"\ndata: " + self.data + b"\n\n"
+        return self._sse
+
+    @property
+    def text(self) -> str:
+        """WebSocket 文本帧。"""
+        if self._text is None:
+            self._text = self.data.decode("utf-8")
+        return self._text
+
+
+@dataclass(frozen=True)
+class StreamFilter:
+    """
+    订阅过滤条件（None = 不过滤）。frozen + 可哈希：相同条件的订阅者归为一组。
+
+    - snapshots：是否接收 STATE_DIFF / METRICS 帧
+    """
+    types: Optional[FrozenSet[str]] = None
+    channels: Optional[FrozenSet[str]] = None
+    trace_ids: Optional[FrozenSet[str]] = None
+    snapshots: bool = True
+
+    @staticmethod
+    def of(
+        types: Optional[Iterable[str]] = None,
+        channels: Optional[Iterable[str]] = None,
+        trace_ids: Optional[Iterable[str]] = None,
+        snapshots: bool = True,
+    ) -> "StreamFilter":
+        """空列表当作“不过滤”（方便直接传 HTTP 查询参数）。"""
+        def norm(values: Optional[Iterable[str]]) -> Optional[FrozenSet[str]]:
+            return frozenset(values) if values else None
+        return StreamFilter(norm(types), norm(channels), norm(trace_ids), snapshots)
+
+    def matches(self, e: Event) -> bool:
+        if self.types is not None and e.type not in self.types:
+            return False
+        if self.channels is None and self.trace_ids is None:
+            return True
+        payload = e.payload if isinstance(e.payload, dict) else {}
+        if self.channels is not None and payload.get("channel") not in self.channels:
+            return False
+        if self.trace_ids is not None and payload.get("trace_id") not in self.trace_ids:
+            return False
+        return True
+
+
+class Subscription:
+    """
+    一个订阅者的有界缓冲区。publish 线程 push，连接（SSE / WebSocket）drain。
+    """
+
+    def __init__(self, stream_filter: StreamFilter, max_frames: int = 1000, policy: str = DROP_OLDEST) -> None:
+        if max_frames < 1:
+            raise ValueError("max_frames must be >= 1")
+        if policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"unknown overflow policy: {policy!r} (expected one of {OVERFLOW_POLICIES})")
+        self.filter = stream_filter
+        self.max_frames = max_frames
+        self.policy = policy
+        self.dropped = 0  # 累计丢弃的帧数
+        self.delivered = 0  # 累计交付的帧数
+        self._pending_dropped = 0
+        self._buf: Deque[Frame] = deque()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._buf)
+
+    def push(self, frame: Frame) -> None:
+        with self._lock:
+            buf = self._buf
+            if self.policy == COALESCE and frame.kind in _SNAPSHOT_KINDS:
+                frame = self._coalesce(frame)
+            if len(buf) >= self.max_frames:
+                self.dropped += 1
+                self._pending_dropped += 1
+                if self.policy == DROP_NEWEST:
+                    return
+                buf.popleft()
+            buf.append(frame)
+
+    def _coalesce(self, frame: Frame) -> Frame:
+        # 缓冲区里还有同类的快照帧没被取走：去掉旧的，换成最新的
+        # （状态差量要换成全量，合并后才不丢字段；放到队尾，保持在它之前的事件之后）
+        for i, pending in enumerate(self._buf):
+            if pending.kind == frame.kind:
+                del self._buf[i]
+                return frame.full if frame.full is not None else frame
+        return frame
+
+    def drain(self, max_frames: Optional[int] = None) -> List[Frame]:
+        """取走缓冲区里的帧（最多 max_frames 条）；丢过帧时先给一个 DROPPED 帧。"""
+        with self._lock:
+            out: List[Frame] = []
+            if self._pending_dropped:
+                out.append(Frame(DROPPED_TYPE, dumps({"type": DROPPED_TYPE, "count": self._pending_dropped})))
+                self._pending_dropped = 0
+            n = len(self._buf) if max_frames is None else min(max_frames, len(self._buf))
+            for _ in range(n):
+                out.append(self._buf.popleft())
+            self.delivered += len(out)
+            return out
+
+
+class EventBroadcaster:
+    """
+    扇出（fan-out）：publish 一批事件，按过滤条件分发到所有订阅者的缓冲区。
+
+    - encoded：累计序列化了多少帧（与订阅者数量无关，用来验证“只序列化一次”）
+    """
+
+    def __init__(self) -> None:
+        self._groups: Dict[StreamFilter, List[Subscription]] = {}
+        self._lock = threading.Lock()
+        self._last_state: Optional[Dict[str, Any]] = None
+        self._last_metrics: Optional[Dict[str, Any]] = None
+        self.encoded = 0
+
+    @property
+    def subscriber_count(self) -> int:
+        return sum(len(subs) for subs in self._groups.values())
+
+    def subscribe(
+        self,
+        stream_filter: Optional[StreamFilter] = None,
+        max_frames: int = 1000,
+        policy: str = DROP_OLDEST,
+    ) -> Subscription:
+        sub = Subscription(stream_filter or StreamFilter(), max_frames=max_frames, policy=policy)
+        with self._lock:
+            self._groups.setdefault(sub.filter, []).append(sub)
+        return sub
+
+    def unsubscribe(self, sub: Subscription) -> None:
+        with self._lock:
+            subs = self._groups.get(sub.filter)
+            if subs is not None and sub in subs:
+                subs.remove(sub)
+                if not subs:
+                    del self._groups[sub.filter]
+
+    def event_frame(self, e: Event) -> Frame:
+        self.encoded += 1
+        return Frame(e.type, encode_event(e), id=str(e.seq) if e.seq is not None else None)
+
+    def publish(self, events: Iterable[Event], state: Any = None, metrics: Any = None) -> None:
+        """
+        分发一批新事件；state / metrics（dataclass）有变化时再各推一帧快照。
+        """
+        with self._lock:
+            groups = [(f, list(subs)) for f, subs in self._groups.items()]
+        if not groups:
+            return
+
+        last_index = None
+        for e in events:
+            last_index = e.seq
+            frame: Optional[Frame] = None
+            for f, subs in groups:
+                if not f.matches(e):
+                    continue
+                if frame is None:
+                    frame = self.event_frame(e)
+                for sub in subs:
+                    sub.push(frame)
+
+        snapshot_subs = [sub for f, subs in groups if f.snapshots for sub in subs]
+        if state is not None:
+            frame = self._state_frame(asdict(state), last_index)
+            if frame is not None:
+                for sub in snapshot_subs:
+                    sub.push(frame)
+        if metrics is not None:
+            frame = self._metrics_frame(asdict(metrics), last_index)
+            if frame is not None:
+                for sub in snapshot_subs:
+                    sub.push(frame)
+
+    def state_frame(self, state: Dict[str, Any], last_index: Optional[int]) -> Frame:
+        """全量状态帧（新订阅者连上时先给一份；coalesce 合并差量时也用它）。"""
+        self.encoded += 1
+        data = dumps({"type": STATE_DIFF_TYPE, "last_index": last_index, "full": True, "changed": state})
+        return Frame(STATE_DIFF_TYPE, data)
+
+    def _state_frame(self, state: Dict[str, Any], last_index: Optional[int]) -> Optional[Frame]:
+        prev = self._last_state or {}
+        changed = {k: v for k, v in state.items() if k not in prev or prev[k] != v}
+        self._last_state = state
+        if not changed:
+            return None
+        self.encoded += 1
+        diff = dumps({"type": STATE_DIFF_TYPE, "last_index": last_index, "changed": changed})
+        # 全量帧只给 coalesce 合并用：没人合并就不序列化第二遍
+        return Frame(STATE_DIFF_TYPE, diff, make_full=lambda: self.state_frame(state, last_index))
+
+    def _metrics_frame(self, metrics: Dict[str, Any], last_index: Optional[int]) -> Optional[Frame]:
+        if metrics == self._last_metrics:
+            return None
+        self._last_metrics = metrics
+        self.encoded += 1
+        return Frame(METRICS_TYPE, dumps({"type": METRICS_TYPE, "last_index": last_index, "metrics": metrics}))
@@ -0,0 +1,223 @@
+"""
+causal_index.py
+===============
+CausalIndex：因果索引（“这个动作为什么会发生？”O(1) 回答）
+
+问题：
+- ActionExecuted.from_policy_t 只记录了决策的世界时间 t
+- 同一个 tick 里 ingest 的所有输入都是同一个 t，可能产生多条决策
+  -> 只靠 t 追溯因果，只能扫描日志再去猜
+
+做法：
+- 每条事件都有 seq（日志里的序号）和稳定 id（"ev-<seq>"）
+- 决策事件 payload["cause_id"] = 触发它的输入事件 id
+  动作事件 payload["cause_id"] = 触发它的决策事件 id
+- CausalIndex 按 seq 存“原因的 seq”（紧凑数组，-1 表示没有原因）：
+  - cause_of(seq)：O(1)
+  - chain(seq)：沿着原因一路往回走（动作 -> 决策 -> 输入），链长是常数
+  - effects_of(seq)：反向（这个输入引起了哪些决策 / 动作）
+
+持久化（可选，path 不为 None 时）：
+- 文件是定长记录：第 seq 条记录在偏移 seq*8 处（int64，小端），append-only
+- 不加载整个文件也能 O(1) 查：read_cause(path, seq) 直接 seek
+- add 只追加到内存缓冲，flush() 一次写出（WorldRuntime 在每次 tick / ingest_inputs 结束时 flush），
+  不在每条事件上 open 文件；进程在 flush 前崩溃时文件比日志短，下次 open 会按日志重建
+
+分叉（fork，给 WorldRuntime.fork 用）：
+- 分叉出来的索引共享父索引到分叉点为止的部分，自己只存分叉之后的记录（不复制原因数组）
+- 父索引之后继续追加不影响分叉（查询都截在分叉点）；分叉不写文件
+
+老日志升级（读的时候做）：
+- 没有 cause_id 的 POLICY_DECISION / ACTION_EXECUTED 按 runtime 的留痕顺序推断原因：
+  - 决策的原因 = 它之前最近的一条“非派生”事件（不是决策 / 动作 / 压制汇总）
+  - 动作的原因 = 它之前最近的一条决策
+  runtime 总是“记录输入 -> 紧接着记录它的决策 -> 紧接着记录动作”，所以推断是精确的
+"""
+
+from __future__ import annotations
+
+import sys
+from array import array
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+from cim_worldlab.world.events.action_executed import ACTION_EXECUTED_TYPE
+from cim_worldlab.world.events.decisions_suppressed import DECISIONS_SUPPRESSED_TYPE
+from cim_worldlab.world.events.event import Event, parse_event_id
+from cim_worldlab.world.events.policy_decision import POLICY_DECISION_TYPE
+
+NO_CAUSE = -1
+_RECORD = array("q").itemsize
+_DERIVED_TYPES = frozenset((POLICY_DECISION_TYPE, ACTION_EXECUTED_TYPE, DECISIONS_SUPPRESSED_TYPE))
+
+
+class CausalIndex:
+    """
+    seq -> 原因 seq 的索引（事件按 seq 顺序 add）。
+
+    - add(e)：e.seq 必须等于 len(index)（逐条追加，不允许跳号）
+    - path：可选的持久化文件（每 add 一条记 8 字节，flush 时一起追加）
+    """
+
+    def __init__(self, path: Optional[Path] = None) -> None:
+        self.path = path
+        self._causes = array("q")
+        self._unflushed = bytearray()
+        self._effects: Dict[int, List[int]] = {}
+        # 推断老日志用：最近一条非派生事件 / 最近一条决策
+        self._last_source = NO_CAUSE
+        self._last_decision = NO_CAUSE
+        # 分叉：父索引 + 分叉点（之前的 seq 查父索引，_causes 只存 >= 分叉点的部分）
+        self._parent: Optional[CausalIndex] = None
+        self._fork_at = 0
+
+    def __len__(self) -> int:
+        return self._fork_at + len(self._causes)
+
+    def fork(self) -> "CausalIndex":
+        """写时复制的分叉：O(1)，不复制原因数组与反查表。"""
+        child = CausalIndex()
+        child._parent = self
+        child._fork_at = len(self)
+        child._last_source = self._last_source
+        child._last_decision = self._last_decision
+        return child
+
+    def add(self, e: Event) -> Optional[int]:
+        """记录一条事件的原因，返回原因的 seq（没有则 None）。"""
+        seq = len(self)
+        if e.seq != seq:
+            raise ValueError(f"CausalIndex expects seq={seq}, got {e.seq}")
+
+        if e.type in _DERIVED_TYPES:
+            cause = self._resolve(e)
+            if cause != NO_CAUSE:
+                self._effects.setdefault(cause, []).append(seq)
+            if e.type == POLICY_DECISION_TYPE:
+                self._last_decision = seq
+        else:
+            # 输入 / tick 等“源头”事件没有原因（最常见的情况，走最短路径）
+            cause = NO_CAUSE
+            self._last_source = seq
+        self._causes.append(cause)
+
+        if self.path is not None:
+            self._unflushed += cause.to_bytes(_RECORD, "little", signed=True)
+        return cause if cause != NO_CAUSE else None
+
+    def flush(self) -> None:
+        """把缓冲的记录追加到文件（一次 open）；没有 path 或没有新记录时什么都不做。"""
+        if self.path is None or not self._unflushed:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self.path.open("ab") as f:
+            f.write(self._unflushed)
+        self._unflushed.clear()
+
+    def _resolve(self, e: Event) -> int:
+        ref = e.payload.get("cause_id") if isinstance(e.payload, dict) else None
+        if ref is not None:
+            cause = parse_event_id(str(ref))
+            if cause >= len(self):
+                raise ValueError(f"Event {e.id} references a future event {ref!r}")
+            return cause
+        # 老日志：按留痕顺序推断
+        if e.type == POLICY_DECISION_TYPE:
+            return self._last_source
+        if e.type == ACTION_EXECUTED_TYPE:
+            return self._last_decision
+        return NO_CAUSE
+
+    def extend(self, events: Iterable[Event]) -> None:
+        for e in events:
+            self.add(e)
+
+    def cause_of(self, seq: int) -> Optional[int]:
+        """seq 这条事件的直接原因（seq），没有原因返回 None。"""
+        if not 0 <= seq < len(self):
+            raise IndexError(f"Unknown event seq: {seq}")
+        if seq < self._fork_at:
+            return self._parent.cause_of(seq)  # type: ignore[union-attr]
+        cause = self._causes[seq - self._fork_at]
+        return cause if cause != NO_CAUSE else None
+
+    def chain(self, seq: int) -> List[int]:
+        """
+        因果链（从根原因到 seq 本身），例如动作的链：[输入, 决策, 动作]。
+        """
+        out = [seq]
+        cause = self.cause_of(seq)
+        while cause is not None:
+            out.append(cause)
+            cause = self.cause_of(cause)
+        out.reverse()
+        return out
+
+    def effects_of(self, seq: int) -> List[int]:
+        """seq 这条事件直接引起的事件（按 seq 升序）。"""
+        own = list(self._effects.get(seq, ()))
+        if self._parent is not None and seq < self._fork_at:
+            # 父索引在分叉之后可能又给 seq 记了新的结果，截掉
+            return [s for s in self._parent.effects_of(seq) if s < self._fork_at] + own
+        return own
+
+    @classmethod
+    def from_events(cls, events: Iterable[Event]) -> "CausalIndex":
+        idx = cls()
+        idx.extend(events)
+        return idx
+
+    @classmethod
+    def open(cls, path: Path, events: List[Event]) -> "CausalIndex":
+        """
+        打开持久化的索引，并与事件日志对齐：
+        - 文件与日志条数一致：直接加载（不解析 payload）
+        - 不一致（老日志第一次打开、索引文件损坏/落后）：用全部事件重建并重写文件
+        """
+        idx = cls()
+        data = path.read_bytes() if path.exists() else b""
+        if data and len(data) == len(events) * _RECORD:
+            causes = array("q")
+            causes.frombytes(data)
+            if sys.byteorder != "little":
+                causes.byteswap()
+            idx._load(causes, events)
+        else:
+            idx.extend(events)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_bytes(idx._to_bytes())
+        idx.path = path
+        return idx
+
+    def _load(self, causes: array, events: List[Event]) -> None:
+        self._causes = causes
+        for seq, cause in enumerate(causes):
+            if cause != NO_CAUSE:
+                self._effects.setdefault(cause, []).append(seq)
+        for e in reversed(events):
+            if e.type == POLICY_DECISION_TYPE and self._last_decision == NO_CAUSE:
+                self._last_decision = e.seq  # type: ignore[assignment]
+            elif e.type not in _DERIVED_TYPES and self._last_source == NO_CAUSE:
+                self._last_source = e.seq  # type: ignore[assignment]
+            if self._last_decision != NO_CAUSE and self._last_source != NO_CAUSE:
+                break
+
+    def _to_bytes(self) -> bytes:
+        if sys.byteorder == "little":
+            return self._causes.tobytes()
+        swapped = array("q", self._causes)
+        swapped.byteswap()
+        return swapped.tobytes()
+
+
+def read_cause(path: Path, seq: int) -> Optional[int]:
+    """
+    不加载整个索引，直接从文件读 seq 的原因（seek 到 seq*8，O(1)）。
+    """
+    with path.open("rb") as f:
+        f.seek(seq * _RECORD)
+        raw = f.read(_RECORD)
+    if len(raw) != _RECORD:
+        raise IndexError(f"Unknown event seq: {seq}")
+    cause = int.from_bytes(raw, "little", signed=True)
+    return cause if cause != NO_CAUSE else None
@@ -14,11 +14,20 @@ event_log.py
 后续升级方向：
 - persistence：把事件写入磁盘文件 / 数据库（真正留痕）
 - replay：从事件日志重建世界状态（像“回放录像”）
+
+两种实现（接口相同，WorldRuntime(event_log=...) 可任选）：
+- EventLog：list[Event]，最简单，访问最快
+- ColumnarEventLog：列式存储（t / 类型编码 / payload 字节），每个事件的内存占用小一个数量级
+
+另外还有 ForkedEventLog：WorldRuntime.fork() 用的写时复制视图（共享父日志，只存分叉之后的新事件）
 """
 
+from array import array
+from collections.abc import Sequence
 from dataclasses import dataclass, field
-from typing import List, Optional
+from typing import Any, Dict, Iterator, List, Optional
 
+from cim_worldlab.world.events.codec import dumps, event_from_obj, loads
 from cim_worldlab.world.events.event import Event
 
 
@@ -63,9 +72,179 @@ class EventLog:
         """
         return self._events[-1] if self._events else None
 
+    def __getitem__(self, i: int) -> Event:
+        """按位置取事件（runtime 从 seq 0 开始记录时，位置 == seq）。"""
+        return self._events[i]
+
     def __len__(self) -> int:
         """
         让 len(event_log) 可以工作。
         Python 会在调用 len(x) 时，尝试执行 x.__len__().
         """
-        return len(self._events)
\ No newline at end of file
+        return len(self._events)
+
+class ColumnarEventLog:
+    """
+    列式（struct-of-arrays）事件日志：与 EventLog 接口相同，内存占用小得多。
+
+    为什么？
+    - list[Event] 里每个事件都是一串 Python 对象：Event + payload dict + data dict + 各种 str/float
+      上百万个事件时，这些对象头和指针占掉了大部分 RSS
+    - 列式存法把“同一个字段”放进一个紧凑数组：
+      - _t / _seq：array('q')，每个事件各 8 字节（没有 seq 记为 -1）
+      - _type：array('H')，事件类型编码（类型名只存一份在 _types 里）
+      - _buf + _off：所有 payload 的 JSON 字节首尾相接，_off[i].._off[i+1] 是第 i 个事件的 payload
+
+    代价：
+    - 取事件时要现场解码 payload（all() / 下标访问返回的是新建的 Event，值相等但不是同一个对象）
+    - payload 必须能 JSON 化（与落盘的要求一样）
+
+    适用场景：长时间运行、需要把全部历史留在内存里（可视化 / metrics），但很少随机访问。
+    """
+
+    def __init__(self) -> None:
+        self._t = array("q")
+        self._seq = array("q")
+        self._type = array("H")
+        self._off = array("Q", [0])
+        self._buf = bytearray()
+        self._types: List[str] = []
+        self._type_codes: Dict[str, int] = {}
+        # meta 很少见（只有开了延迟观测才有），用稀疏 dict：位置 -> meta
+        self._meta: Dict[int, Dict[str, Any]] = {}
+
+    def append(self, e: Event) -> None:
+        code = self._type_codes.get(e.type)
+        if code is None:
+            code = self._type_codes[e.type] = len(self._types)
+            self._types.append(e.type)
+        if e.meta is not None:
+            self._meta[len(self._t)] = e.meta
+        self._t.append(e.t)
+        self._seq.append(-1 if e.seq is None else e.seq)
+        self._type.append(code)
+        self._buf += dumps(e.payload)
+        self._off.append(len(self._buf))
+
+    def _event_at(self, i: int) -> Event:
+        et = self._types[self._type[i]]
+        raw = memoryview(self._buf)[self._off[i]:self._off[i + 1]]
+        seq = self._seq[i]
+        obj = {"t": self._t[i], "seq": seq if seq >= 0 else None, "type": et, "payload": loads(raw)}
+        if i in self._meta:
+            obj["meta"] = self._meta[i]
+        return event_from_obj(obj)
+
+    def __getitem__(self, i: int) -> Event:
+        n = len(self._t)
+        if i < 0:
+            i += n
+        if not 0 <= i < n:
+            raise IndexError("event index out of range")
+        return self._event_at(i)
+
+    def __iter__(self) -> Iterator[Event]:
+        for i in range(len(self._t)):
+            yield self._event_at(i)
+
+    def all(self) -> Sequence[Event]:
+        """
+        返回所有事件（只读的序列视图：可迭代、可 len、可下标访问；访问时才解码）。
+        """
+        return _EventView(self)
+
+    def last(self) -> Optional[Event]:
+        return self._event_at(len(self._t) - 1) if self._t else None
+
+    def __len__(self) -> int:
+        return len(self._t)
+
+    def type_counts(self) -> Dict[str, int]:
+        """按事件类型计数（只看类型列，不解码 payload）。"""
+        counts = [0] * len(self._types)
+        for code in self._type:
+            counts[code] += 1
+        return {self._types[c]: n for c, n in enumerate(counts) if n}
+
+    def nbytes(self) -> int:
+        """列数据本身占用的字节数（不含 Python 对象头）。"""
+        return (
+            len(self._t) * self._t.itemsize
+            + len(self._seq) * self._seq.itemsize
+            + len(self._type) * self._type.itemsize
+            + len(self._off) * self._off.itemsize
+            + len(self._buf)
+        )
+
+
+class ForkedEventLog:
+    """
+    写时复制的事件日志视图（WorldRuntime.fork 用）。
+
+    - 分叉点之前的事件直接读父日志（不复制任何事件）：父日志是 append-only 的，
+      分叉之后父日志继续追加也看不到（长度在分叉时就定下了）
+    - 分叉之后 append 的事件只存在自己的 list 里，父日志完全不受影响
+    - 父日志可以是任何实现（EventLog / ColumnarEventLog / 另一个 ForkedEventLog）
+
+    注意：父日志不能被截断或替换（compact 之类），否则分叉点之前的下标就对不上了。
+    """
+
+    def __init__(self, base: Any) -> None:
+        self._base = base
+        self._base_len = len(base)
+        self._tail: List[Event] = []
+
+    @property
+    def fork_point(self) -> int:
+        """分叉时父日志的长度（第一条自己的事件的下标）。"""
+        return self._base_len
+
+    def append(self, e: Event) -> None:
+        self._tail.append(e)
+
+    def branch(self) -> List[Event]:
+        """分叉之后自己追加的事件。"""
+        return self._tail
+
+    def __getitem__(self, i: int) -> Event:
+        n = len(self)
+        if i < 0:
+            i += n
+        if not 0 <= i < n:
+            raise IndexError("event index out of range")
+        return self._base[i] if i < self._base_len else self._tail[i - self._base_len]
+
+    def __iter__(self) -> Iterator[Event]:
+        for i in range(self._base_len):
+            yield self._base[i]
+        yield from self._tail
+
+    def all(self) -> Sequence[Event]:
+        """只读的序列视图（同 ColumnarEventLog.all）。"""
+        return _EventView(self)
+
+    def last(self) -> Optional[Event]:
+        if self._tail:
+            return self._tail[-1]
+        return self._base[self._base_len - 1] if self._base_len else None
+
+    def __len__(self) -> int:
+        return self._base_len + len(self._tail)
+
+
+class _EventView(Sequence):
+    """ColumnarEventLog.all() / ForkedEventLog.all() 返回的只读视图。"""
+
+    def __init__(self, log: Any) -> None:
+        self._log = log
+
+    def __len__(self) -> int:
+        return len(self._log)
+
+    def __getitem__(self, i):  # type: ignore[override]
+        if isinstance(i, slice):
+            return [self._log[j] for j in range(*i.indices(len(self._log)))]
+        return self._log[i]
+
+    def __iter__(self) -> Iterator[Event]:
+        return iter(self._log)
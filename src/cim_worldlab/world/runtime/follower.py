@@ -0,0 +1,151 @@
+"""
+follower.py
+===========
+Follower：只读副本（read replica）—— 跟读 events.jsonl，自己维护一份世界状态
+
+为什么需要它？
+- replay / metrics 命令每次都从磁盘回放一遍：事件多了以后很慢
+- 看板想随时查“现在世界什么样”，但不能去打扰写入者（runtime）
+- 事件溯源的好处在这里体现出来：写入者只管往日志追加，
+  任何人都可以跟读日志，用同一个 apply_event 推导出一模一样的状态
+
+做法：
+- EventTailer 按字节偏移增量读取新增的完整行（不锁文件、不碰写入者）
+- 每批新事件：state = apply_events(state, batch)（与逐条 apply_event 结果相同）；MetricsAccumulator 增量更新指标
+- 轮转 / 截断：新文件第一条事件的 seq 正好接上 -> 接着算；否则从头重建（generation + 1）
+
+投影（可选）：
+- Follower(path, projections=default_projections())：每批新事件也更新投影，project(name, key) 查询
+
+推送（可选）：
+- follower.broadcaster = EventBroadcaster()：每批新事件 publish 一次（SSE / WebSocket 订阅者用）
+
+last_index / etag：
+- last_index：已经应用的最后一条事件的 seq（还没有事件时为 -1）
+- etag："<generation>-<last_index>"，没有新事件时不变 —— HTTP 层据此返回 304
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from dataclasses import asdict
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, TypeVar
+
+from cim_worldlab.world.events.event import Event
+from cim_worldlab.world.persistence.event_tailer import EventTailer
+from cim_worldlab.world.projections.projection import ProjectionSet
+from cim_worldlab.world.runtime.broadcast import EventBroadcaster
+from cim_worldlab.world.state import WorldState, apply_events
+
+if TYPE_CHECKING:
+    from cim_worldlab.world.metrics import MetricsAccumulator, WorldMetrics
+
+T = TypeVar("T")
+
+
+def _new_accumulator() -> MetricsAccumulator:
+    # 延迟导入：metrics.compute 依赖 runtime.event_log（与 WorldRuntime.metrics 同样的做法，避免循环导入）
+    from cim_worldlab.world.metrics import MetricsAccumulator
+    return MetricsAccumulator()
+
+
+class Follower:
+    """
+    跟读 events_path 的只读副本。
+
+    - poll()：把日志里新增的事件应用到自己的状态上，返回这次应用的条数
+    - state_dict() / metrics() / events(from_seq, limit)：只读查询
+    线程安全：poll 与查询共用一把锁（HTTP 服务可能多线程处理请求）。
+    需要几样东西彼此一致（例如 ETag 与正文）时用 read(fn)：fn 整个在锁里执行，中间不会插进 poll。
+    """
+
+    def __init__(self, events_path: Path, projections: Optional[ProjectionSet] = None) -> None:
+        self.events_path = events_path
+        self.projections = projections
+        self.tailer = EventTailer(events_path)
+        self.state = WorldState.initial()
+        self.accumulator = _new_accumulator()
+        self.next_seq = 0
+        self.generation = 0
+        self.base_seq = 0  # 当前文件第一条事件的 seq（轮转后不一定是 0）
+        self.broadcaster: Optional[EventBroadcaster] = None
+        self._rotated = False
+        self._last_poll = 0.0
+        self._lock = threading.RLock()  # 可重入：read(fn) 里还会调用 state_dict() 等查询
+
+    def _rebuild(self) -> None:
+        self.state = WorldState.initial()
+        self.accumulator = _new_accumulator()
+        self.next_seq = 0
+        self.generation += 1
+        if self.projections is not None:
+            self.projections.reset()
+
+    def poll(self, max_events: Optional[int] = None) -> int:
+        with self._lock:
+            batch = self.tailer.poll(max_events=max_events)
+            self._rotated = self._rotated or batch.rotated
+            if not batch.events:
+                return 0
+
+            if self._rotated:
+                # 新文件：第一条事件接得上就接着算，接不上（截断 / 换了一份日志）就重建
+                first = batch.events[0]
+                if first.seq != self.next_seq:
+                    self._rebuild()
+                self.base_seq = first.seq if first.seq is not None else 0
+                self._rotated = False
+
+            self.state = apply_events(self.state, batch.events)
+            self.accumulator.extend(batch.events)
+            if self.projections is not None:
+                self.projections.extend(batch.events)
+            last = batch.events[-1].seq
+            self.next_seq = last + 1 if last is not None else self.next_seq + len(batch.events)
+            if self.broadcaster is not None and self.broadcaster.subscriber_count:
+                self.broadcaster.publish(batch.events, self.state, self.accumulator.metrics(self.state))
+            return len(batch.events)
+
+    def maybe_poll(self, min_interval: float) -> int:
+        """
+        距上次 poll 不到 min_interval 秒就跳过（很多连接同时等新事件时，只让一个去读文件）。
+        """
+        now = time.monotonic()
+        if now - self._last_poll < min_interval:
+            return 0
+        self._last_poll = now
+        return self.poll()
+
+    def read(self, fn: Callable[[], T]) -> T:
+        """在一次加锁里执行 fn（fn 里的多次查询看到的是同一个版本）。"""
+        with self._lock:
+            return fn()
+
+    @property
+    def last_index(self) -> int:
+        return self.next_seq - 1
+
+    def etag(self) -> str:
+        return f'"{self.generation}-{self.last_index}"'
+
+    def state_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            return asdict(self.state)
+
+    def metrics(self) -> WorldMetrics:
+        with self._lock:
+            return self.accumulator.metrics(self.state)
+
+    def project(self, name: str, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            return self.projections.get(name, key) if self.projections is not None else None
+
+    def events(self, from_seq: int = 0, limit: int = 100) -> List[Event]:
+        """
+        seq >= from_seq 的事件，最多 limit 条（按字节偏移 seek，不扫前面的行）。
+        轮转前的事件已不在当前文件里：from_seq 比 base_seq 小时从当前文件开头给起。
+        """
+        with self._lock:
+            return self.tailer.read_at(max(from_seq - self.base_seq, 0), limit)
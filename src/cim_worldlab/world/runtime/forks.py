@@ -0,0 +1,65 @@
+"""
+forks.py
+========
+run_forks：从同一个时刻分出很多个分叉，在多个进程里并行跑 what-if
+
+例子：“从现在起分别换成策略 A / B / C，再跑 100 个 tick，各自会触发多少动作？”
+
+    def simulate(rt: WorldRuntime) -> int:
+        for _ in range(100):
+            rt.tick()
+            rt.ingest_inputs()
+        return rt.state.action_count
+
+    results = run_forks(live_rt, simulate, [{"policy": a}, {"policy": b}, {"policy": c}])
+
+做法：
+- 工作进程用 fork 方式启动：父 runtime（事件日志、状态、投影）、fn、variants 都不经过 pickle，
+  操作系统按页写时复制，几百个分叉共享同一份历史
+  （所以 variant 里可以放编译成闭包的策略；只有 fn 的返回值要能 pickle）
+- 每个任务只传一个下标：工作进程里 rt.fork(**variants[i])，把分叉交给 fn，只把返回值传回来
+- 平台不支持 fork（Windows）或 workers <= 1 时，在当前进程里逐个跑（结果相同）
+"""
+
+from __future__ import annotations
+
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from cim_worldlab.world.runtime.runtime import WorldRuntime
+
+# 工作进程从父进程继承的任务（fork 启动时不经过 pickle）：(runtime, fn, variants)
+_TASK: Optional[Tuple[WorldRuntime, Callable[[WorldRuntime], Any], Sequence[Dict[str, Any]]]] = None
+
+
+def _run_one(i: int) -> Any:
+    assert _TASK is not None
+    rt, fn, variants = _TASK
+    return fn(rt.fork(**variants[i]))
+
+
+def run_forks(
+    rt: WorldRuntime,
+    fn: Callable[[WorldRuntime], Any],
+    variants: Sequence[Dict[str, Any]],
+    workers: Optional[int] = None,
+) -> List[Any]:
+    """
+    对每个 variant（fork() 的参数）分出一个分叉跑 fn，按 variants 的顺序返回结果。
+    workers：进程数（None = CPU 核数）。
+    """
+    global _TASK
+    n_workers = min(workers or os.cpu_count() or 1, len(variants))
+    if n_workers <= 1 or "fork" not in multiprocessing.get_all_start_methods():
+        return [fn(rt.fork(**v)) for v in variants]
+
+    _TASK = (rt, fn, variants)
+    try:
+        ctx = multiprocessing.get_context("fork")
+        with ProcessPoolExecutor(max_workers=n_workers, mp_context=ctx) as pool:
+            chunksize = max(1, len(variants) // (n_workers * 4))
+            return list(pool.map(_run_one, range(len(variants)), chunksize=chunksize))
+    finally:
+        _TASK = None
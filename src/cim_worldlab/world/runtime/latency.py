@@ -0,0 +1,125 @@
+"""
+latency.py
+==========
+LatencyTracker：端到端延迟观测（设备 POST -> ACTION_EXECUTED 花了多久？）
+
+时间戳从哪里来？
+- received_ns：HTTP 收到输入时打的（plugins/http_ingest_app.py），随 FileInputQueue 带进 EXTERNAL_INPUT
+- recorded_ns：runtime 留痕时打的（挂了 LatencyTracker 才打）
+- 都放在 Event.meta 里：不进 payload、不参与 ==，reducer / 策略看不到，replay 结果不变
+
+用单调时钟（time.monotonic_ns）：不受系统校时影响；同一台机器上的不同进程可以直接相减
+（跨机器部署时 received_ns 不可比，负的差值会被丢弃，不会污染直方图）
+
+统计哪些段（每段一个 StageHistogram，log2 分桶，近似分位数）：
+- receive_to_ingest：HTTP 收到 -> 输入事件留痕（排队等待 + 网关拉取）
+- ingest_to_decision：输入留痕 -> 决策留痕（策略评估 + 留痕开销）
+- decision_to_action：决策留痕 -> 动作留痕
+- receive_to_action：HTTP 收到 -> 动作留痕（端到端）
+
+因果靠 cause_id / 因果索引串起来：动作 -> 决策 -> 输入，不靠 t 猜。
+
+两种用法：
+- 在线：WorldRuntime(latency=LatencyTracker())，metrics() 里带上延迟分布
+- 离线：LatencyTracker.from_events(events_jsonl 读出来的事件) —— latency 报告命令用
+"""
+
+from __future__ import annotations
+
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from cim_worldlab.world.events.action_executed import ACTION_EXECUTED_TYPE
+from cim_worldlab.world.events.event import Event
+from cim_worldlab.world.events.external_input import EXTERNAL_INPUT_TYPE
+from cim_worldlab.world.events.policy_decision import POLICY_DECISION_TYPE
+from cim_worldlab.world.runtime.causal_index import CausalIndex
+from cim_worldlab.world.runtime.profiling import StageHistogram
+
+RECEIVED = "received_ns"
+RECORDED = "recorded_ns"
+
+RECEIVE_TO_INGEST = "receive_to_ingest"
+INGEST_TO_DECISION = "ingest_to_decision"
+DECISION_TO_ACTION = "decision_to_action"
+RECEIVE_TO_ACTION = "receive_to_action"
+SEGMENTS = (RECEIVE_TO_INGEST, INGEST_TO_DECISION, DECISION_TO_ACTION, RECEIVE_TO_ACTION)
+
+CauseOf = Callable[[Event], Optional[Event]]
+
+
+def _meta_ns(e: Optional[Event], key: str) -> Optional[int]:
+    if e is None or not e.meta:
+        return None
+    v = e.meta.get(key)
+    return int(v) if v is not None else None
+
+
+class LatencyTracker:
+    """
+    按段统计延迟的直方图集合。
+
+    - stamp(e, seq)：留痕时给事件打 recorded_ns（返回带 seq + meta 的新事件）
+    - observe(e, cause_of)：事件留痕后，按类型和原因算出各段延迟
+    """
+
+    def __init__(self, clock: Callable[[], int] = time.monotonic_ns) -> None:
+        self.clock = clock
+        self.segments: Dict[str, StageHistogram] = {name: StageHistogram() for name in SEGMENTS}
+
+    def stamp(self, e: Event, seq: int) -> Event:
+        meta = dict(e.meta) if e.meta else {}
+        meta[RECORDED] = self.clock()
+        return e.with_seq(seq, meta=meta)
+
+    def _add(self, segment: str, start: Optional[int], end: Optional[int]) -> None:
+        if start is None or end is None or end < start:
+            return
+        self.segments[segment].add(end - start)
+
+    def observe(self, e: Event, cause_of: CauseOf) -> None:
+        if e.type == EXTERNAL_INPUT_TYPE:
+            self._add(RECEIVE_TO_INGEST, _meta_ns(e, RECEIVED), _meta_ns(e, RECORDED))
+        elif e.type == POLICY_DECISION_TYPE:
+            self._add(INGEST_TO_DECISION, _meta_ns(cause_of(e), RECORDED), _meta_ns(e, RECORDED))
+        elif e.type == ACTION_EXECUTED_TYPE:
+            decision = cause_of(e)
+            if decision is None:
+                return
+            end = _meta_ns(e, RECORDED)
+            self._add(DECISION_TO_ACTION, _meta_ns(decision, RECORDED), end)
+            self._add(RECEIVE_TO_ACTION, _meta_ns(cause_of(decision), RECEIVED), end)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {name: h.to_dict() for name, h in self.segments.items()}
+
+    @classmethod
+    def from_events(cls, events: List[Event]) -> "LatencyTracker":
+        """
+        离线统计：用事件日志（带 meta 时间戳）重算各段延迟。
+        events 的位置必须等于 seq（FileEventStore.load_all 读出来的就是）。
+        """
+        tracker = cls()
+        index = CausalIndex.from_events(events)
+
+        def cause_of(e: Event) -> Optional[Event]:
+            c = index.cause_of(e.seq)  # type: ignore[arg-type]
+            return events[c] if c is not None else None
+
+        for e in events:
+            if e.meta:
+                tracker.observe(e, cause_of)
+        return tracker
+
+
+def latency_report(events: Iterable[Event]) -> Dict[str, Any]:
+    """
+    延迟报告：每段的 count / mean / p50 / p90 / p99（微秒），以及带时间戳的事件数。
+    """
+    events = list(events)
+    tracker = LatencyTracker.from_events(events)
+    return {
+        "events": len(events),
+        "stamped_events": sum(1 for e in events if e.meta and RECORDED in e.meta),
+        "segments": tracker.to_dict(),
+    }
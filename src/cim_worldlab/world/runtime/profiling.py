@@ -0,0 +1,208 @@
+"""
+profiling.py
+============
+StageProfiler：运行时“分阶段计时”（可选开启的性能观测）
+
+为什么需要它？
+- 一次 tick 慢了，到底慢在哪里？
+  写盘（FileEventStore.append）？reducer（apply_event）？策略评估（evaluate_event）？快照？
+- cProfile 能看到函数级耗时，但噪音很大，而且不能长期开着
+- 我们需要一个“低开销、按阶段聚合”的计时器：默认关闭，需要时挂到 WorldRuntime 上
+
+设计要点：
+- 每个阶段（stage）一个直方图 StageHistogram：按 2 的幂分桶（log2 buckets），
+  只做整数运算，开销很低，还能近似估算 p50/p90/p99
+- 阶段可以嵌套（_record 会递归记录 POLICY_DECISION / ACTION_EXECUTED），
+  我们维护一个“阶段栈”，同时统计每条调用栈的 self time
+- 输出两种格式：
+  1) JSON：给人看 / 给脚本比较
+  2) collapsed stack（"a;b;c 123"）：可直接喂给 flamegraph.pl / speedscope 画火焰图
+
+用法：
+    prof = StageProfiler()
+    rt = WorldRuntime(profiler=prof)
+    ...
+    prof.dump_json(Path("out/profile/stages.json"))
+    prof.dump_collapsed(Path("out/profile/stages.collapsed"))
+"""
+
+from __future__ import annotations
+
+import json
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+# 直方图桶数：bucket i 覆盖 [2^i, 2^(i+1)) 纳秒；2^40ns ≈ 18 分钟，足够了
+_BUCKETS = 41
+
+
+@dataclass
+class StageHistogram:
+    """
+    单个阶段的耗时直方图（单位：纳秒）。
+
+    - count / total_ns / min_ns / max_ns：精确值
+    - buckets：log2 分桶计数，用来近似分位数（误差在 2 倍以内，定位瓶颈足够）
+    """
+    count: int = 0
+    total_ns: int = 0
+    min_ns: int = 0
+    max_ns: int = 0
+    buckets: List[int] = field(default_factory=lambda: [0] * _BUCKETS)
+
+    def add(self, ns: int) -> None:
+        if self.count == 0 or ns < self.min_ns:
+            self.min_ns = ns
+        if ns > self.max_ns:
+            self.max_ns = ns
+        self.count += 1
+        self.total_ns += ns
+        # int.bit_length() 就是 floor(log2(ns)) + 1，纯整数运算
+        idx = ns.bit_length() - 1 if ns > 0 else 0
+        if idx >= _BUCKETS:
+            idx = _BUCKETS - 1
+        self.buckets[idx] += 1
+
+    def quantile_ns(self, q: float) -> int:
+        """
+        近似分位数：返回第一个累计占比 >= q 的桶的上界。
+        """
+        if self.count == 0:
+            return 0
+        target = q * self.count
+        acc = 0
+        for i, c in enumerate(self.buckets):
+            acc += c
+            if acc >= target:
+                return min(2 ** (i + 1), self.max_ns)
+        return self.max_ns
+
+    def to_dict(self) -> Dict[str, Any]:
+        mean_ns = self.total_ns / self.count if self.count else 0.0
+        return {
+            "count": self.count,
+            "total_ms": self.total_ns / 1e6,
+            "mean_us": mean_ns / 1e3,
+            "min_us": self.min_ns / 1e3,
+            "max_us": self.max_ns / 1e3,
+            "p50_us": self.quantile_ns(0.50) / 1e3,
+            "p90_us": self.quantile_ns(0.90) / 1e3,
+            "p99_us": self.quantile_ns(0.99) / 1e3,
+            # 只输出非空桶，key 是桶下界（ns）
+            "buckets_ns": {str(2 ** i): c for i, c in enumerate(self.buckets) if c},
+        }
+
+
+class _StageTimer:
+    """
+    with prof.stage("x"): ... 返回的上下文对象（__slots__ 保持轻量）。
+    """
+    __slots__ = ("_prof", "_name")
+
+    def __init__(self, prof: "StageProfiler", name: str) -> None:
+        self._prof = prof
+        self._name = name
+
+    def __enter__(self) -> None:
+        self._prof._push(self._name)
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self._prof._pop()
+
+
+class StageProfiler:
+    """
+    分阶段计时器。
+
+    内部结构：
+    - stages：stage 名 -> StageHistogram（包含子阶段在内的总耗时）
+    - stacks：调用栈（元组）-> self time 纳秒（不含子阶段，用于火焰图）
+    - _frames：当前正在计时的阶段栈，每帧是 [name, start_ns, child_ns]
+    """
+
+    def __init__(self) -> None:
+        self.stages: Dict[str, StageHistogram] = {}
+        self.stacks: Dict[Tuple[str, ...], int] = {}
+        self._frames: List[List[Any]] = []
+        self._clock = time.perf_counter_ns
+
+    def stage(self, name: str) -> _StageTimer:
+        return _StageTimer(self, name)
+
+    def _push(self, name: str) -> None:
+        self._frames.append([name, self._clock(), 0])
+
+    def _pop(self) -> None:
+        end = self._clock()
+        frames = self._frames
+        path = tuple(f[0] for f in frames)
+        name, start, child_ns = frames.pop()
+        elapsed = end - start
+
+        hist = self.stages.get(name)
+        if hist is None:
+            hist = self.stages[name] = StageHistogram()
+        hist.add(elapsed)
+
+        self.stacks[path] = self.stacks.get(path, 0) + (elapsed - child_ns)
+        if frames:
+            frames[-1][2] += elapsed
+
+    def reset(self) -> None:
+        self.stages.clear()
+        self.stacks.clear()
+        self._frames.clear()
+
+    # -------------------------------
+    # 输出
+    # -------------------------------
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "stages": {name: h.to_dict() for name, h in sorted(self.stages.items())},
+            "stacks_us": {";".join(p): ns / 1e3 for p, ns in sorted(self.stacks.items())},
+        }
+
+    def collapsed_lines(self) -> List[str]:
+        """
+        flamegraph 的 collapsed 格式：每行 "frame1;frame2;frame3 <value>"。
+        value 用微秒（整数），0 的栈省略。
+        """
+        lines: List[str] = []
+        for path, ns in sorted(self.stacks.items()):
+            us = ns // 1000
+            if us > 0:
+                lines.append(f"{';'.join(path)} {us}")
+        return lines
+
+    def dump_json(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(self.to_dict(), ensure_ascii=False, indent=2), encoding="utf-8")
+
+    def dump_collapsed(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text("\n".join(self.collapsed_lines()) + "\n", encoding="utf-8")
+
+
+def stage_of(profiler: Optional[StageProfiler], name: str):
+    """
+    给调用方用的小工具：profiler 为 None 时返回一个“什么都不做”的上下文。
+    """
+    if profiler is None:
+        return _NULL_STAGE
+    return profiler.stage(name)
+
+
+class _NullStage:
+    __slots__ = ()
+
+    def __enter__(self) -> None:
+        return None
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        return None
+
+
+_NULL_STAGE = _NullStage()
@@ -14,21 +14,82 @@ Step 12: snapshot（快照）+ replay 加速
 本文件新增：
 - maybe_snapshot(snapshot_store, every_n_events)
 - replay_fast_from_store(event_store, snapshot_store)
+
+性能观测（可选）：
+- profiler：挂一个 StageProfiler，就能按阶段统计 _record / apply_event /
+  evaluate_event / event_store.append / gateway.pull_inputs / maybe_snapshot 的耗时
+- 默认 None：不计时，开销几乎为 0
+
+策略注入（可选）：
+- policy：任何实现 evaluate(e) -> List[PolicyDecision] 的对象（例如 RuleRegistry）
+- 默认 None：使用内置规则 evaluate_event
+- 有状态策略（实现 snapshot_state/restore_state，例如 StatefulPolicy）的状态
+  会随快照保存；replay 时把事件重新喂给策略重建状态
+
+决策压制（可选）：
+- suppressor：DecisionSuppressor，位于“决策 -> 动作”路径上
+  （按 (rule_id, 设备) 做 hold-off / 锁存，被压制的决策不写 POLICY_DECISION / ACTION_EXECUTED，
+  每段压制结束时写一条 DECISIONS_SUPPRESSED 汇总）
+- 状态随快照保存；replay 时重新评估事件重建
+
+序号与因果（seq / id / causal_index）：
+- 每条留痕的事件都分配一个单调递增的 seq（next_seq），稳定 id = "ev-<seq>"
+- 决策事件的 payload["cause_id"] 指向触发它的事件，动作事件指向它的决策
+- causal_index：seq -> 原因 seq 的索引，why(动作) 直接给出 [输入, 决策, 动作]
+  （挂了文件时，tick / ingest_inputs 结束时整批写出）
+
+延迟观测（可选）：
+- latency：LatencyTracker；挂上后每条事件留痕时在 Event.meta 里打 recorded_ns，
+  并统计 收到 -> 留痕 -> 决策 -> 动作 各段延迟（metrics().latency）
+- meta 不进 payload、不参与 ==：state / replay 完全不受影响
+
+投影（可选）：
+- projections：ProjectionSet；每条留痕的事件都增量更新（例如每台设备的当前温度 / 最近动作）
+- project(name, key)：按 key O(1) 查询；投影状态随快照保存，replay 时恢复后补剩余事件
+
+快照（version 2）：
+- WorldState 全部字段 + 策略 / 压制器 / 投影 / 增量指标的状态，一次读出（load_snapshot）
+- 老快照（漏了 action_count / last_action）不能当回放起点，replay_fast 遇到时退化为全量回放
+- maybe_snapshot 按“距上次快照的事件数”触发；按字节 / 时间 / 预计回放耗时触发见 SnapshotScheduler
+- metrics() 的按通道计数是增量维护的（只补上次之后的新事件），随快照保存
+
+分叉（what-if）：
+- fork()：从当前时刻分出一个隔离的 runtime（例如“从现在起换成策略 B 会怎样”），真实世界不受影响
+- WorldState 不可变，直接共享；事件日志 / 因果索引是写时复制视图（不复制任何事件）
+- 并行跑很多个分叉见 run_forks（forks.py）
 """
 
-from dataclasses import dataclass, field
-from typing import Dict, Any, Optional, List, Tuple
+import copy
+
+from dataclasses import dataclass, field, replace
+from typing import Dict, Any, Optional, List, Tuple, Union
 
-from cim_worldlab.world.events.event import Event
+from cim_worldlab.world.events.event import Event, parse_event_id
 from cim_worldlab.world.events.action_executed import ActionExecuted
 from cim_worldlab.world.events.external_input import ExternalInput, EXTERNAL_INPUT_TYPE
-from cim_worldlab.world.runtime.event_log import EventLog
+from cim_worldlab.world.events.policy_decision import PolicyDecision
+from cim_worldlab.world.runtime.causal_index import CausalIndex
+from cim_worldlab.world.runtime.event_log import EventLog, ForkedEventLog
+from cim_worldlab.world.runtime.latency import LatencyTracker
 from cim_worldlab.world.persistence.file_event_store import FileEventStore
-from cim_worldlab.world.persistence.snapshot_store import SnapshotStore
+from cim_worldlab.world.persistence.snapshot_store import (
+    SECTION_METRICS,
+    SECTION_POLICY,
+    SECTION_PROJECTIONS,
+    SECTION_SUPPRESSION,
+    SnapshotStore,
+)
 from cim_worldlab.world.gateway.plugin_gateway import PluginGateway
+from cim_worldlab.world.runtime.profiling import StageProfiler, stage_of
+from cim_worldlab.world.policy.registry import PolicyEvaluator, fork_policy
+from cim_worldlab.world.policy.suppression import DecisionSuppressor
+from cim_worldlab.world.projections.projection import ProjectionSet
 
 from cim_worldlab.world.state import WorldState, apply_event, apply_events
 
+# fork() 参数的默认值：沿用父 runtime 的（复制一份）
+INHERIT: Any = object()
+
 
 @dataclass
 class WorldRuntime:
@@ -37,21 +98,59 @@ class WorldRuntime:
     event_log: EventLog = field(default_factory=EventLog)
     event_store: Optional[FileEventStore] = None
     gateway: Optional[PluginGateway] = None
+    profiler: Optional[StageProfiler] = None
+    policy: Optional[PolicyEvaluator] = None
+    suppressor: Optional[DecisionSuppressor] = None
+    next_seq: int = 0
+    causal_index: CausalIndex = field(default_factory=CausalIndex)
+    latency: Optional[LatencyTracker] = None
+    projections: Optional[ProjectionSet] = None
+    # 增量指标：MetricsAccumulator（懒创建）+ 已经喂到 event_log 的第几条
+    _metrics: Any = field(default=None, init=False, repr=False, compare=False)
+    _metrics_upto: int = field(default=0, init=False, repr=False, compare=False)
+    # 最近一次快照覆盖到的事件数（快照回放时取自快照；没有快照为 0）
+    events_at_snapshot: int = field(default=0, init=False, compare=False)
+
+    def _stage(self, name: str):
+        """
+        阶段计时入口：没挂 profiler 时返回空上下文（不计时）。
+        """
+        return stage_of(self.profiler, name)
 
-    def _record(self, e: Event) -> None:
+    def _record(self, e: Event) -> Event:
         """
         统一留痕入口：
+        - 分配 seq（返回的是带 seq 的事件）
         - event_log.append
         - event_store.append（可选）
+        - causal_index.add
         - state = apply_event(state, e)
+        - projections.observe（可选）
         - t 与 state.t 同步
         """
+        with self._stage("record"):
+            return self._record_inner(e)
+
+    def _record_inner(self, e: Event) -> Event:
+        if self.latency is not None:
+            e = self.latency.stamp(e, self.next_seq)
+        elif e.seq != self.next_seq:
+            e = e.with_seq(self.next_seq)
+        self.next_seq += 1
         self.event_log.append(e)
         if self.event_store is not None:
-            self.event_store.append(e)
-
-        self.state = apply_event(self.state, e)
+            with self._stage("event_store.append"):
+                self.event_store.append(e)
+        self.causal_index.add(e)
+        if self.latency is not None:
+            self.latency.observe(e, self._cause_event)
+
+        with self._stage("apply_event"):
+            self.state = apply_event(self.state, e)
         self.t = self.state.t
+        if self.projections is not None:
+            with self._stage("projections"):
+                self.projections.observe(e)
 
         # ----------------------------------------
         # Step 17: Policy Engine Hook（事件 -> 决策）
@@ -65,23 +164,30 @@ class WorldRuntime:
         #
         # 注意：evaluate_event 只对 EXTERNAL_INPUT 生效；
         # 对 POLICY_DECISION / WORLD_TICK 等会返回空，不会形成循环。
-        from cim_worldlab.world.policy import evaluate_event
+        with self._stage("evaluate_event"):
+            decisions = self._evaluate(self.policy, e)
+
+        # 决策压制：重复的决策在这里被拦下；压制结束时先写汇总事件
+        if self.suppressor is not None:
+            with self._stage("suppress"):
+                decisions, summaries = self.suppressor.observe(e, decisions)
+            for s in summaries:
+                self._record(s.to_event(t=self.t))
 
-        decisions = evaluate_event(e)
         for d in decisions:
             # 如果输入里有 trace_id，我们把它从原事件传递过去（便于串联因果链）
             trace_id = None
             if isinstance(e.payload, dict):
                 trace_id = e.payload.get("trace_id")
 
-            decision_event = d.to_event(t=self.t, trace_id=trace_id)
+            decision_event = d.to_event(t=self.t, trace_id=trace_id, cause_id=e.id)
 
             # ✅ 关键改动 1：决策事件也走统一留痕入口
             # 这样它会：
             # - append 到 event_log
             # - append 到 event_store（如果启用）
             # - 更新 state（目前 reducer 可选择忽略 POLICY_DECISION，但流程统一更稳）
-            self._record(decision_event)
+            decision_event = self._record(decision_event)
 
             # ✅ 关键改动 2：紧跟着生成 ACTION_EXECUTED（仅留痕，不接真实设备）
             dp = decision_event.payload if isinstance(decision_event.payload, dict) else {}
@@ -95,39 +201,145 @@ class WorldRuntime:
                 reason=str(reason),
                 from_policy_t=decision_event.t,
                 trace_id=str(trace_id) if trace_id is not None else None,
+                cause_id=decision_event.id,
             ).to_event(t=self.t)
 
             self._record(action_event)
 
+        return e
+
 
-    def tick(self, payload: Optional[Dict[str, Any]] = None) -> Event:
-        next_t = self.t + 1
-        e = Event(t=next_t, type="WORLD_TICK", payload=payload or {})
-        self._record(e)
+    @staticmethod
+    def _evaluate(policy: Optional[PolicyEvaluator], e: Event) -> List[PolicyDecision]:
+        from cim_worldlab.world.policy import evaluate_event
+
+        return policy.evaluate(e) if policy is not None else evaluate_event(e)
+
+    def tick(self, payload: Optional[Dict[str, Any]] = None, to: Optional[int] = None) -> Event:
+        """
+        世界时间前进一步（t + 1）。
+        to：直接跳到这个世界时间（必须大于当前 t；虚拟时间模拟跳过空闲时段用，中间不留 tick 事件）。
+        """
+        if to is not None and to <= self.t:
+            raise ValueError(f"tick target {to} must be after t={self.t}")
+        next_t = self.t + 1 if to is None else to
+        e = Event(t=next_t, type="WORLD_TICK", payload=payload or {}, seq=self.next_seq)
+        with self._stage("tick"):
+            e = self._record(e)
+        self.causal_index.flush()
         return e
 
     def ingest_inputs(self) -> List[Event]:
         if self.gateway is None:
             return []
 
-        inputs: List[ExternalInput] = self.gateway.pull_inputs()
-        events: List[Event] = []
+        with self._stage("ingest_inputs"):
+            with self._stage("gateway.pull_inputs"):
+                inputs: List[ExternalInput] = self.gateway.pull_inputs()
+            events: List[Event] = []
 
-        for inp in inputs:
-            e = inp.to_event(t=self.t)
-            assert e.type == EXTERNAL_INPUT_TYPE
-            self._record(e)
-            events.append(e)
+            for inp in inputs:
+                e = inp.to_event(t=self.t)
+                assert e.type == EXTERNAL_INPUT_TYPE
+                events.append(self._record(e))
 
+        # 因果索引文件按批写（一次 ingest 一次 open），不在每条事件上碰文件
+        self.causal_index.flush()
         return events
 
+    def _cause_event(self, e: Event) -> Optional[Event]:
+        cause = self.causal_index.cause_of(e.seq)  # type: ignore[arg-type]
+        return self.event_log[cause] if cause is not None else None
+
+    def why(self, ref: Union[int, str]) -> List[Event]:
+        """
+        “这条事件为什么会发生？”——返回因果链（根原因在前，ref 本身在最后）。
+
+        ref：seq（int）或稳定 id（"ev-42"）。
+        例如对一个 ACTION_EXECUTED：[EXTERNAL_INPUT, POLICY_DECISION, ACTION_EXECUTED]
+        """
+        seq = parse_event_id(ref) if isinstance(ref, str) else ref
+        return [self.event_log[s] for s in self.causal_index.chain(seq)]
+
+    def project(self, name: str, key: str) -> Optional[Dict[str, Any]]:
+        """
+        查询投影：project("equipment", "EQ-7") -> 这台设备的当前状态（没有返回 None）。
+        """
+        if self.projections is None:
+            return None
+        return self.projections.get(name, key)
+
     def metrics(self):
         """
         返回当前世界指标快照（WorldMetrics）。
         这里使用“函数内 import”避免潜在循环依赖。
         """
-        from cim_worldlab.world.metrics import compute_metrics
-        return compute_metrics(self.state, self.event_log)
+        m = self._metrics_accumulator().metrics(self.state)
+        if self.latency is not None:
+            m = replace(m, latency=self.latency.to_dict())
+        return m
+
+    def _metrics_accumulator(self):
+        """
+        增量指标：只把上次之后新留痕的事件喂给 MetricsAccumulator
+        （结果与 compute_metrics 扫全部日志相同）。event_log 被换掉 / 变短时从头重建。
+        """
+        n = len(self.event_log)
+        if self._metrics is None or n < self._metrics_upto:
+            from cim_worldlab.world.metrics import MetricsAccumulator
+            self._metrics = MetricsAccumulator()
+            self._metrics_upto = 0
+        log = self.event_log
+        for i in range(self._metrics_upto, n):
+            self._metrics.observe(log[i])
+        self._metrics_upto = n
+        return self._metrics
+
+    # -------------------------------
+    # 分叉（what-if 模拟）
+    # -------------------------------
+
+    def fork(
+        self,
+        policy: Any = INHERIT,
+        suppressor: Any = INHERIT,
+        event_store: Optional[FileEventStore] = None,
+        gateway: Optional[PluginGateway] = None,
+    ) -> "WorldRuntime":
+        """
+        从当前时刻分出一个隔离的 runtime：之后两边各走各的，互不影响。
+
+        - state：直接共享（WorldState 不可变）
+        - event_log / causal_index：写时复制视图，分叉点之前的部分读父 runtime 的，不复制事件
+        - 投影、增量指标：复制一份（大小与设备数 / 通道数有关，与事件数无关）
+        - policy / suppressor：不传就复制父 runtime 的（连同有状态规则的窗口状态，见 fork_policy）；
+          传入新的就从现在起换成它（例如“改用策略 B”；新策略的内部状态从空开始）
+        - event_store：分叉的新事件写到哪里；默认 None = 只在内存里。
+          给一个临时的 FileEventStore 时，里面只有分叉之后的事件（seq 接着分叉点往下编）
+        - gateway：分叉的输入来源（默认没有；可以挂 FakePluginGateway 喂假想的输入）
+        - 不带 profiler / latency（分叉是模拟，墙钟延迟没有意义）
+
+        父 runtime 的事件日志在分叉之后仍然只能追加（不能 compact / 替换）。
+        """
+        n = len(self.event_log)
+        child = WorldRuntime(
+            t=self.t,
+            state=self.state,
+            event_log=ForkedEventLog(self.event_log),  # type: ignore[arg-type]
+            event_store=event_store,
+            gateway=gateway,
+            policy=fork_policy(self.policy) if policy is INHERIT else policy,
+            suppressor=copy.deepcopy(self.suppressor) if suppressor is INHERIT else suppressor,
+            next_seq=self.next_seq,
+            causal_index=self.causal_index.fork(),
+            projections=copy.deepcopy(self.projections),
+        )
+        from cim_worldlab.world.metrics import MetricsAccumulator
+        child._metrics = MetricsAccumulator()
+        child._metrics.restore_state(self._metrics_accumulator().snapshot_state())
+        child._metrics_upto = n
+        child.events_at_snapshot = self.events_at_snapshot
+        return child
 
     # -------------------------------
     # Step 12: 快照相关能力
@@ -139,47 +351,111 @@ class WorldRuntime:
 
         参数：
         - snapshot_store：快照存储
-        - every_n_events：每累计 N 条事件保存一次
+        - every_n_events：距离上次快照累计 N 条事件就保存一次
 
         返回：
         - True：这次保存了快照
         - False：这次没保存（事件数量还没到阈值）
 
-        规则（MVP）：
-        - 当 len(event_log) 是 every_n_events 的倍数时保存
-        - last_event_index = len(event_log) - 1
+        规则：
+        - len(event_log) - events_at_snapshot >= every_n_events 时保存
+          （以前是“len 恰好是 N 的倍数”：一次留痕 1~3 条事件时经常正好跳过倍数，快照就永远不来）
+        - 更多触发条件（字节数 / 时间 / 预计回放耗时）见 SnapshotScheduler
+        """
+        with self._stage("maybe_snapshot"):
+            if len(self.event_log) - self.events_at_snapshot < every_n_events:
+                return False
+            return self.save_snapshot(snapshot_store)
+
+    def save_snapshot(self, snapshot_store: SnapshotStore) -> bool:
+        """
+        立即保存快照（覆盖到当前最后一条事件）；event_log 为空时不保存，返回 False。
         """
         n = len(self.event_log)
         if n == 0:
             return False
-        if n % every_n_events != 0:
-            return False
-
-        last_event_index = n - 1
-        snapshot_store.save(self.state, last_event_index=last_event_index)
+        snapshot_store.save(
+            self.state,
+            last_event_index=n - 1,
+            policy_state=self._policy_state(),
+            suppression_state=self.suppressor.snapshot_state() if self.suppressor is not None else None,
+            projection_state=self.projections.snapshot_state() if self.projections is not None else None,
+            metrics_state=self._metrics_accumulator().snapshot_state(),
+        )
+        self.events_at_snapshot = n
         return True
 
+    def _policy_state(self) -> Optional[Dict[str, Any]]:
+        snap = getattr(self.policy, "snapshot_state", None)
+        return snap() if snap is not None else None
+
+    def _load_history(self, events: List[Event]) -> None:
+        """
+        回放后装入历史事件：event_log、因果索引（老日志在这里推断因果），
+        并让 next_seq 接着最后一条事件往下编号。
+        """
+        for e in events:
+            self.event_log.append(e)
+        self.causal_index.extend(events)
+        self.next_seq = events[-1].seq + 1 if events else 0  # type: ignore[operator]
+
     @classmethod
-    def replay_from_store(cls, store: FileEventStore) -> "WorldRuntime":
+    def _warm(cls, policy: Optional[PolicyEvaluator], suppressor: Optional[DecisionSuppressor], events: List[Event]) -> None:
+        """
+        把历史事件重新喂给策略（丢弃决策，决策事件已经在日志里了），
+        只为重建有状态规则 / 决策压制器的内部状态。两者都没有状态时跳过。
+        """
+        if suppressor is not None:
+            for e in events:
+                suppressor.observe(e, cls._evaluate(policy, e))
+            return
+        if policy is None or getattr(policy, "snapshot_state", None) is None:
+            return
+        for e in events:
+            policy.evaluate(e)
+
+    @classmethod
+    def replay_from_store(
+        cls,
+        store: FileEventStore,
+        policy: Optional[PolicyEvaluator] = None,
+        suppressor: Optional[DecisionSuppressor] = None,
+        projections: Optional[ProjectionSet] = None,
+    ) -> "WorldRuntime":
         """
         传统 replay：从第一条事件开始回放（慢但简单）。
+
+        policy / suppressor（可选）：回放后继续运行时要用的策略与压制器；
+        有状态的会用全部事件重建状态。
+        projections（可选）：用全部事件重建投影。
         """
         events = store.load_all()
         final_state = apply_events(WorldState.initial(), events)
-
-        rt = cls(t=final_state.t, state=final_state, event_store=store, gateway=None)
-        for e in events:
-            rt.event_log.append(e)
+        cls._warm(policy, suppressor, events)
+        if projections is not None:
+            projections.reset()
+            projections.extend(events)
+
+        rt = cls(t=final_state.t, state=final_state, event_store=store, gateway=None, policy=policy, suppressor=suppressor,
+                 projections=projections)
+        rt._load_history(events)
         return rt
 
     @classmethod
-    def replay_fast_from_store(cls, store: FileEventStore, snapshot_store: SnapshotStore) -> "WorldRuntime":
+    def replay_fast_from_store(
+        cls,
+        store: FileEventStore,
+        snapshot_store: SnapshotStore,
+        policy: Optional[PolicyEvaluator] = None,
+        suppressor: Optional[DecisionSuppressor] = None,
+        projections: Optional[ProjectionSet] = None,
+    ) -> "WorldRuntime":
         """
         快速 replay：优先使用快照，再补快照之后的事件。
 
         流程：
-        1) 尝试读取快照：
-           - 没快照：退化为 replay_from_store（全量回放）
+        1) 尝试读取快照（整个文件只读一次）：
+           - 没快照 / 老格式快照（state 不完整）：退化为 replay_from_store（全量回放）
         2) 有快照：
            - 从快照拿到 state + last_event_index
            - 从事件存储读取 last_event_index+1 之后的事件
@@ -188,21 +464,52 @@ class WorldRuntime:
            - state/t 与最终结果对齐
            - event_log 仍然装入所有事件（为了教学可视化）
              （未来可做：只装一部分，或按需加载）
+        4) 有状态策略 / 压制器：从快照恢复状态，再喂剩余事件；
+           快照里缺少需要的状态时，用全部事件重建
+        5) 投影：同上（快照里有就恢复再补剩余事件，没有就用全部事件重建）
+        6) 增量指标：快照里有就恢复，剩余事件在第一次 metrics() 时补上
         """
-        snap = snapshot_store.load()
-        if snap is None:
-            return cls.replay_from_store(store)
-
-        base_state, last_event_index = snap
+        snap = snapshot_store.load_snapshot()
+        if snap is None or not snap.complete:
+            return cls.replay_from_store(store, policy=policy, suppressor=suppressor, projections=projections)
 
-        remaining = store.load_from_index(last_event_index + 1)
-        final_state = apply_events(base_state, remaining)
+        last_event_index = snap.last_event_index
+        all_events = store.load_all()
+        remaining = all_events[last_event_index + 1:]
+        final_state = apply_events(snap.state, remaining)
 
-        rt = cls(t=final_state.t, state=final_state, event_store=store, gateway=None)
+        rt = cls(t=final_state.t, state=final_state, event_store=store, gateway=None, policy=policy, suppressor=suppressor,
+                 projections=projections)
 
         # 为了保持“event_log 可视化”，我们仍加载全部事件
         # （MVP：简单清晰；未来：可以优化为懒加载）
-        for e in store.load_all():
-            rt.event_log.append(e)
-
+        rt._load_history(all_events)
+        rt.events_at_snapshot = last_event_index + 1
+
+        restore = getattr(policy, "restore_state", None)
+        policy_state = snap.section(SECTION_POLICY) if restore is not None else None
+        suppression_state = snap.section(SECTION_SUPPRESSION) if suppressor is not None else None
+        if (restore is None or policy_state is not None) and (suppressor is None or suppression_state is not None):
+            if policy_state is not None:
+                restore(policy_state)
+            if suppression_state is not None:
+                suppressor.restore_state(suppression_state)  # type: ignore[union-attr]
+            cls._warm(policy, suppressor, remaining)
+        else:
+            cls._warm(policy, suppressor, all_events)
+
+        if projections is not None:
+            projection_state = snap.section(SECTION_PROJECTIONS)
+            if projection_state is not None and projections.restore_state(projection_state):
+                projections.extend(remaining)
+            else:
+                projections.reset()
+                projections.extend(all_events)
+
+        metrics_state = snap.section(SECTION_METRICS)
+        if metrics_state is not None and last_event_index < len(all_events):
+            from cim_worldlab.world.metrics import MetricsAccumulator
+            rt._metrics = MetricsAccumulator()
+            rt._metrics.restore_state(metrics_state)
+            rt._metrics_upto = last_event_index + 1
         return rt
@@ -0,0 +1,447 @@
+"""
+sharded.py
+==========
+ShardedRuntime：按 key 分片、每片一个进程的多世界运行时
+
+为什么？
+- 一个 WorldRuntime 在一个核上串行处理所有设备的输入
+- 但“每台设备”的逻辑（温度规则、窗口规则、压制、设备投影）彼此独立：
+  按 equipment_id 把输入分到 N 个分片，每片各跑各的，就能用上 N 个核
+
+结构：
+- 协调者（ShardedRuntime，在当前进程）：
+  - 给每条输入分配全局序号 gseq（到达顺序），按 key 的稳定哈希（crc32）分到分片
+  - 每一步（step）：所有分片一起 tick（世界时间一致），再各自处理分到的那批输入
+    （先把命令发给所有分片，再收结果：分片之间并行）
+  - 合并指标（计数相加；last_input / last_action 取 gseq 最大的那片）
+- 分片（每片一个工作进程，各自拥有）：
+  - 一个 WorldRuntime（策略 / 投影由工厂函数在进程里创建）
+  - 自己的事件存储段：<base_dir>/shard-00/events.jsonl
+  - 自己的快照：<base_dir>/shard-00/snapshot.json（snapshot_every 条事件一次）
+  - 输入事件的 Event.meta["gseq"] 记下全局序号（meta 不参与 ==，不影响状态与回放）
+
+全局顺序（global_events）：确定性的合并回放
+- 排序键：(t, gseq, 分片号, 片内位置)；tick 阶段的事件 gseq 记为 -1
+- 决策 / 动作沿用触发它的输入的 gseq，所以紧跟在那条输入后面
+- 每个世界时间只保留一条 WORLD_TICK（各分片的 tick 是同一个 tick）
+- 重新编号 seq，cause_id 改写成全局 id
+- 结果与“一个 WorldRuntime 按到达顺序处理同样的输入”逐条相同（分片 key 与规则的 key 一致时）
+
+重启：同一个 base_dir 再开一次，各分片从自己的快照 + 事件段恢复，gseq / 世界时间接着往下走。
+分片数写在 <base_dir>/shards.json 里，不能改（重新分片需要重写事件段，这里不做）。
+
+processes=False：所有分片在当前进程里串行跑（调试 / 测试用，接口完全相同）。
+
+出错：某个分片执行命令失败时，先把所有分片的回复都收完（管道里不留旧回复），再抛出错误。
+step 失败时各分片可能已经各走了一半（有的 tick 了、有的没有），这里不回滚：
+runtime 标记为失败，之后的调用都抛 RuntimeError；重新打开 base_dir 从磁盘恢复
+（分片的世界时间对不上时会明确报错，而不是悄悄合并出错误的状态）。
+"""
+
+from __future__ import annotations
+
+import heapq
+import json
+import multiprocessing
+import zlib
+from dataclasses import dataclass, replace
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from cim_worldlab.world.events.action_executed import ACTION_EXECUTED_TYPE
+from cim_worldlab.world.events.event import Event, event_id, parse_event_id
+from cim_worldlab.world.events.external_input import EXTERNAL_INPUT_TYPE, ExternalInput
+from cim_worldlab.world.persistence.file_event_store import FileEventStore
+from cim_worldlab.world.persistence.snapshot_store import SnapshotStore
+from cim_worldlab.world.projections.projection import ProjectionSet
+from cim_worldlab.world.runtime.runtime import WorldRuntime
+from cim_worldlab.world.state import WorldState
+
+if TYPE_CHECKING:
+    from cim_worldlab.world.metrics import WorldMetrics
+
+GSEQ = "gseq"
+WORLD_TICK_TYPE = "WORLD_TICK"
+MANIFEST = "shards.json"
+
+PolicyFactory = Callable[[], Any]
+ProjectionsFactory = Callable[[], ProjectionSet]
+
+
+def shard_of(key: str, shards: int) -> int:
+    """key -> 分片号（crc32：跨进程、跨重启稳定；内置 hash() 每个进程随机化，不能用）。"""
+    return zlib.crc32(key.encode("utf-8")) % shards
+
+
+def shard_key(inp: ExternalInput, key_field: Optional[str]) -> str:
+    """
+    输入的分片 key：data[key_field]（默认 equipment_id）；没有这个字段（或 key_field=None）时用 channel。
+    """
+    if key_field is not None and isinstance(inp.data, dict):
+        k = inp.data.get(key_field)
+        if k is not None:
+            return str(k)
+    return inp.channel
+
+
+def shard_dir(base_dir: Path, index: int) -> Path:
+    return base_dir / f"shard-{index:02d}"
+
+
+@dataclass(frozen=True)
+class ShardConfig:
+    """发给工作进程的分片配置（要能 pickle：工厂函数必须是模块级函数）。"""
+    index: int
+    path: Path
+    policy_factory: Optional[PolicyFactory] = None
+    projections_factory: Optional[ProjectionsFactory] = None
+    snapshot_every: int = 0
+
+
+def _scan_gseq(events: Sequence[Event]) -> Tuple[int, int]:
+    """(最后一条输入的 gseq, 最后一条动作所属输入的 gseq)；没有时为 -1。"""
+    current = last_action = -1
+    for e in events:
+        if e.type == EXTERNAL_INPUT_TYPE and e.meta and GSEQ in e.meta:
+            current = int(e.meta[GSEQ])
+        elif e.type == ACTION_EXECUTED_TYPE:
+            last_action = current
+    return current, last_action
+
+
+class _ShardWorker:
+    """一个分片：自己的 WorldRuntime + 事件段 + 快照。工作进程里只有它。"""
+
+    def __init__(self, cfg: ShardConfig) -> None:
+        self.cfg = cfg
+        self.store = FileEventStore(path=cfg.path / "events.jsonl")
+        self.snapshots = SnapshotStore(path=cfg.path / "snapshot.json")
+        self.rt = WorldRuntime.replay_fast_from_store(
+            self.store,
+            self.snapshots,
+            policy=cfg.policy_factory() if cfg.policy_factory is not None else None,
+            projections=cfg.projections_factory() if cfg.projections_factory is not None else None,
+        )
+        self.last_gseq, self.last_action_gseq = _scan_gseq(self.rt.event_log.all())
+
+    def step(self, tick: bool, batch: Sequence[Tuple[int, ExternalInput]]) -> int:
+        rt = self.rt
+        before = len(rt.event_log)
+        if tick:
+            rt.tick()
+        for gseq, inp in batch:
+            e = inp.to_event(t=rt.t)
+            meta = dict(e.meta) if e.meta else {}
+            meta[GSEQ] = gseq
+            actions = rt.state.action_count
+            rt._record(replace(e, meta=meta))
+            self.last_gseq = gseq
+            if rt.state.action_count != actions:
+                self.last_action_gseq = gseq
+        if self.cfg.snapshot_every > 0:
+            rt.maybe_snapshot(self.snapshots, every_n_events=self.cfg.snapshot_every)
+        return len(rt.event_log) - before
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "state": self.rt.state,
+            "inputs_by_channel": dict(self.rt._metrics_accumulator().inputs_by_channel),
+            "last_gseq": self.last_gseq,
+            "last_action_gseq": self.last_action_gseq,
+            "events": len(self.rt.event_log),
+        }
+
+    def project(self, name: str, key: str) -> Optional[Dict[str, Any]]:
+        return self.rt.project(name, key)
+
+    def snapshot(self) -> bool:
+        return self.rt.save_snapshot(self.snapshots)
+
+
+def _worker_main(conn: Any, cfg: ShardConfig) -> None:
+    """工作进程主循环：收 (命令, 参数)，回 (是否成功, 结果 / 错误)。"""
+    try:
+        worker = _ShardWorker(cfg)
+        conn.send((True, None))
+    except Exception as exc:  # 启动失败也要告诉协调者，不能让它一直等
+        conn.send((False, f"{type(exc).__name__}: {exc}"))
+        return
+    while True:
+        cmd, args = conn.recv()
+        if cmd == "close":
+            conn.send((True, None))
+            return
+        try:
+            conn.send((True, getattr(worker, cmd)(*args)))
+        except Exception as exc:
+            conn.send((False, f"{type(exc).__name__}: {exc}"))
+
+
+class _ProcessShard:
+    def __init__(self, cfg: ShardConfig, ctx: Any) -> None:
+        self.conn, child = ctx.Pipe()
+        self.proc = ctx.Process(target=_worker_main, args=(child, cfg), daemon=True, name=f"shard-{cfg.index:02d}")
+        self.proc.start()
+        child.close()
+
+    def send(self, cmd: str, args: Tuple[Any, ...]) -> None:
+        self.conn.send((cmd, args))
+
+    def recv(self) -> Any:
+        ok, value = self.conn.recv()
+        if not ok:
+            raise RuntimeError(f"{self.proc.name} failed: {value}")
+        return value
+
+    def close(self) -> None:
+        try:
+            self.send("close", ())
+            self.conn.recv()
+        except (EOFError, OSError, BrokenPipeError):
+            pass
+        self.proc.join(timeout=5)
+        if self.proc.is_alive():
+            self.proc.terminate()
+
+
+class _InlineShard:
+    """同一进程里的分片：接口与 _ProcessShard 相同（send 时就执行，recv 取结果 / 抛出错误）。"""
+
+    def __init__(self, cfg: ShardConfig) -> None:
+        self.worker = _ShardWorker(cfg)
+        self._result: Any = None
+        self._error: Optional[Exception] = None
+
+    def send(self, cmd: str, args: Tuple[Any, ...]) -> None:
+        self._result, self._error = None, None
+        try:
+            self._result = getattr(self.worker, cmd)(*args)
+        except Exception as exc:
+            self._error = exc
+
+    def recv(self) -> Any:
+        if self._error is not None:
+            raise self._error
+        return self._result
+
+    def close(self) -> None:
+        pass
+
+
+class ShardedRuntime:
+    """
+    - base_dir：所有分片的目录（shard-00/ shard-01/ ... + shards.json）
+    - shards：分片数
+    - key_field：按 data 里哪个字段分片（None = 按 channel）
+    - policy_factory / projections_factory：每个分片各造一份（模块级函数，要能 pickle）
+    - snapshot_every：每个分片每攒够 N 条事件打一次快照（0 = 不自动打）
+    - processes：True = 每片一个进程；False = 当前进程里串行跑
+    - start_method：multiprocessing 启动方式（None = 平台默认）
+    """
+
+    def __init__(
+        self,
+        base_dir: Path,
+        shards: int = 4,
+        key_field: Optional[str] = "equipment_id",
+        policy_factory: Optional[PolicyFactory] = None,
+        projections_factory: Optional[ProjectionsFactory] = None,
+        snapshot_every: int = 0,
+        processes: bool = True,
+        start_method: Optional[str] = None,
+    ) -> None:
+        if shards < 1:
+            raise ValueError("shards must be >= 1")
+        self.base_dir = Path(base_dir)
+        self.shards = shards
+        self.key_field = key_field
+        self.failed: Optional[str] = None
+        self._check_manifest()
+
+        ctx = multiprocessing.get_context(start_method) if processes else None
+        self._shards: List[Any] = []
+        try:
+            for i in range(shards):
+                cfg = ShardConfig(i, shard_dir(self.base_dir, i), policy_factory, projections_factory, snapshot_every)
+                self._shards.append(_ProcessShard(cfg, ctx) if ctx is not None else _InlineShard(cfg))
+            if ctx is not None:
+                for s in self._shards:
+                    s.recv()  # 等各分片恢复完
+            statuses = self._call_all("status")
+        except BaseException:
+            self.close()
+            raise
+
+        ts = {st["state"].t for st in statuses}
+        if len(ts) != 1:
+            self.close()
+            raise ValueError(f"shards are out of step (world times {sorted(ts)})")
+        self.t = ts.pop()
+        self.next_gseq = max(st["last_gseq"] for st in statuses) + 1
+
+    def _check_manifest(self) -> None:
+        path = self.base_dir / MANIFEST
+        manifest = {"shards": self.shards, "key_field": self.key_field}
+        if path.exists():
+            existing = json.loads(path.read_text(encoding="utf-8"))
+            if existing != manifest:
+                raise ValueError(f"{self.base_dir} was created with {existing}, not {manifest}")
+            return
+        self.base_dir.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(manifest), encoding="utf-8")
+
+    def _check_usable(self) -> None:
+        if self.failed is not None:
+            raise RuntimeError(f"sharded runtime failed ({self.failed}); reopen {self.base_dir} to recover")
+
+    def _call_all(self, cmd: str, args: Optional[Sequence[Tuple[Any, ...]]] = None) -> List[Any]:
+        """
+        先把命令发给所有分片，再依次收结果（进程模式下分片并行执行）。
+        有分片失败时也把其余分片的回复收完，再抛出第一个错误；step 失败会把 runtime 标记为失败。
+        """
+        self._check_usable()
+        errors: List[BaseException] = []
+        sent = []
+        for i, s in enumerate(self._shards):
+            try:
+                s.send(cmd, args[i] if args is not None else ())
+            except (OSError, EOFError) as exc:
+                errors.append(exc)
+                break
+            sent.append(s)
+        results: List[Any] = []
+        for s in sent:
+            try:
+                results.append(s.recv())
+            except Exception as exc:
+                results.append(None)
+                errors.append(exc)
+        if errors:
+            if cmd == "step" or len(sent) < len(self._shards) or any(isinstance(e, (OSError, EOFError)) for e in errors):
+                self.failed = f"{cmd}: {errors[0]}"
+            raise errors[0]
+        return results
+
+    def close(self) -> None:
+        for s in self._shards:
+            s.close()
+        self._shards = []
+
+    def __enter__(self) -> "ShardedRuntime":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+    # -------------------------------
+    # 写入
+    # -------------------------------
+
+    def shard_for(self, inp: ExternalInput) -> int:
+        return shard_of(shard_key(inp, self.key_field), self.shards)
+
+    def step(self, inputs: Sequence[ExternalInput] = (), tick: bool = True) -> int:
+        """
+        一步：（可选）所有分片 tick，再把这批输入按 key 分给各分片处理。
+        返回所有分片这一步留痕的事件总数。
+        """
+        batches: List[List[Tuple[int, ExternalInput]]] = [[] for _ in range(self.shards)]
+        gseq = self.next_gseq
+        for inp in inputs:
+            batches[self.shard_for(inp)].append((gseq, inp))
+            gseq += 1
+        counts = self._call_all("step", [(tick, b) for b in batches])
+        self.next_gseq = gseq
+        if tick:
+            self.t += 1
+        return sum(counts)
+
+    def tick(self) -> int:
+        return self.step((), tick=True)
+
+    def ingest(self, inputs: Sequence[ExternalInput]) -> int:
+        return self.step(inputs, tick=False)
+
+    def snapshot(self) -> None:
+        """让每个分片立即打一次快照。"""
+        self._call_all("snapshot")
+
+    # -------------------------------
+    # 查询
+    # -------------------------------
+
+    def project(self, name: str, key: str) -> Optional[Dict[str, Any]]:
+        """
+        投影查询：投影的 key 与分片 key 相同（例如都是 equipment_id）时，只问拥有这个 key 的分片。
+        """
+        self._check_usable()
+        s = self._shards[shard_of(key, self.shards)]
+        s.send("project", (name, key))
+        return s.recv()
+
+    def state(self) -> WorldState:
+        """合并后的世界状态（与按全局顺序回放 global_events() 得到的相同）。"""
+        return self._merged_state(self._call_all("status"))
+
+    @staticmethod
+    def _merged_state(statuses: List[Dict[str, Any]]) -> WorldState:
+        states = [st["state"] for st in statuses]
+        last_in = max(statuses, key=lambda st: st["last_gseq"])["state"]
+        last_act = max(statuses, key=lambda st: st["last_action_gseq"])["state"]
+        return WorldState(
+            t=states[0].t,
+            tick_count=states[0].tick_count,
+            input_count=sum(s.input_count for s in states),
+            last_input=last_in.last_input,
+            action_count=sum(s.action_count for s in states),
+            last_action=last_act.last_action,
+        )
+
+    def metrics(self) -> WorldMetrics:
+        """合并指标：计数相加，按通道计数合并，last_* 取全局最近的那片。"""
+        from cim_worldlab.world.metrics import MetricsAccumulator
+
+        statuses = self._call_all("status")
+        acc = MetricsAccumulator()
+        for st in statuses:
+            for ch, n in st["inputs_by_channel"].items():
+                acc.inputs_by_channel[ch] = acc.inputs_by_channel.get(ch, 0) + n
+        return acc.metrics(self._merged_state(statuses))
+
+    def global_events(self) -> Iterator[Event]:
+        """
+        按确定性的全局顺序合并所有分片的事件段（从磁盘读，不经过工作进程）。
+        """
+        streams = [
+            self._keyed(i, FileEventStore(path=shard_dir(self.base_dir, i) / "events.jsonl").load_all())
+            for i in range(self.shards)
+        ]
+        local_to_global: List[Dict[int, int]] = [{} for _ in range(self.shards)]
+        seq = 0
+        last_tick_t: Optional[int] = None
+        for _key, shard, e in heapq.merge(*streams):
+            if e.type == WORLD_TICK_TYPE:
+                if e.t == last_tick_t:
+                    continue
+                last_tick_t = e.t
+            payload = e.payload
+            cause = payload.get("cause_id") if isinstance(payload, dict) else None
+            if cause is not None:
+                mapped = local_to_global[shard].get(parse_event_id(cause))
+                if mapped is not None:
+                    payload = {**payload, "cause_id": event_id(mapped)}
+            if e.seq is not None:
+                local_to_global[shard][e.seq] = seq
+            yield Event(t=e.t, type=e.type, payload=payload, seq=seq, meta=e.meta)
+            seq += 1
+
+    @staticmethod
+    def _keyed(shard: int, events: Sequence[Event]) -> Iterator[Tuple[Tuple[int, int, int, int], int, Event]]:
+        gseq = -1
+        last_t: Optional[int] = None
+        for pos, e in enumerate(events):
+            if e.t != last_t:
+                gseq, last_t = -1, e.t
+            if e.type == EXTERNAL_INPUT_TYPE and e.meta and GSEQ in e.meta:
+                gseq = int(e.meta[GSEQ])
+            yield (e.t, gseq, shard, pos), shard, e
@@ -0,0 +1,187 @@
+"""
+simulation.py
+=============
+无头加速模拟：虚拟时间，CPU 有多快就跑多快
+
+cmd_run 是给真实世界用的：每步 sleep、每条事件落盘一次。想知道“这套策略在产线上跑一周会怎样”，
+就得真等一周。模拟模式把这些都去掉：
+- 世界时间就是虚拟时间：一个 tick = 虚拟时间 +1，没有 sleep
+- 脚本输入：InputSchedule（最小堆）按虚拟时间排好，到点由网关交给 runtime（走正常的 ingest 路径，
+  决策 / 压制 / 动作与真实运行完全一样）
+- 事件存储：默认只在内存里（event_store=None）；要留下结果就给 MemoryEventStore / BufferedEventStore
+- skip_idle=True：两次输入之间没事发生，一次 tick 直接跳到下一个输入的时刻（tick(to=...)）
+  决策 / 动作（时刻、规则、证据）与逐 tick 跑完全相同；不同的只有 tick 事件的条数
+  （因此 seq / cause_id 的编号不同），以及压制汇总落在哪个 tick 上
+- 跑完返回 SimulationResult：最终状态、指标、决策事件、跑了多少 tick、墙钟耗时
+
+想从真实世界的当前时刻开始模拟：Simulation(runtime=live_rt.fork(policy=...), ...)。
+
+脚本文件（JSONL，每行一个输入，at = 虚拟时间）：
+    {"at": 120, "source": "plugin", "channel": "equipment", "name": "TEMP_READING",
+     "data": {"equipment_id": "EQ-1", "temp_c": 95.0}}
+"""
+
+from __future__ import annotations
+
+import heapq
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Iterable, List, Optional, Tuple
+
+from cim_worldlab.world.events.codec import loads
+from cim_worldlab.world.events.event import Event
+from cim_worldlab.world.events.external_input import ExternalInput
+from cim_worldlab.world.events.policy_decision import POLICY_DECISION_TYPE
+from cim_worldlab.world.runtime.runtime import WorldRuntime
+from cim_worldlab.world.state import WorldState
+
+if TYPE_CHECKING:
+    from cim_worldlab.world.metrics import WorldMetrics
+
+
+class InputSchedule:
+    """
+    按虚拟时间排好的脚本输入（最小堆）。同一时刻的输入按加入顺序交付。
+    """
+
+    def __init__(self, items: Iterable[Tuple[int, ExternalInput]] = ()) -> None:
+        # (at, 加入序号, 输入)：序号保证同一时刻先进先出，也避免比较 ExternalInput
+        self._heap: List[Tuple[int, int, ExternalInput]] = []
+        self._added = 0
+        self.extend(items)
+
+    def add(self, at: int, inp: ExternalInput) -> None:
+        heapq.heappush(self._heap, (at, self._added, inp))
+        self._added += 1
+
+    def extend(self, items: Iterable[Tuple[int, ExternalInput]]) -> None:
+        for at, inp in items:
+            self.add(at, inp)
+
+    def next_time(self) -> Optional[int]:
+        """下一个输入的时刻（没有了返回 None）。"""
+        return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, t: int) -> List[ExternalInput]:
+        """取出所有 at <= t 的输入（过了点的也在这里交付）。"""
+        heap = self._heap
+        if not heap or heap[0][0] > t:
+            return []
+        out = []
+        while heap and heap[0][0] <= t:
+            out.append(heapq.heappop(heap)[2])
+        return out
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    @classmethod
+    def from_jsonl(cls, path: Path) -> "InputSchedule":
+        """读脚本文件（见模块说明）；缺 at 的行抛 ValueError。"""
+        schedule = cls()
+        with path.open("rb") as f:
+            for lineno, raw in enumerate(f, start=1):
+                if not raw.strip():
+                    continue
+                obj = loads(raw)
+                if "at" not in obj:
+                    raise ValueError(f"{path}:{lineno}: scripted input needs an 'at' time")
+                schedule.add(int(obj["at"]), ExternalInput(
+                    source=obj["source"],
+                    channel=obj["channel"],
+                    name=obj["name"],
+                    data=obj.get("data") or {},
+                    trace_id=obj.get("trace_id"),
+                ))
+        return schedule
+
+
+@dataclass
+class ScheduleGateway:
+    """把 InputSchedule 接成 runtime 的网关：每次 pull 交出到当前世界时间为止的输入。"""
+    schedule: InputSchedule
+    runtime: WorldRuntime
+
+    def pull_inputs(self) -> List[ExternalInput]:
+        return self.schedule.pop_due(self.runtime.t)
+
+
+@dataclass(frozen=True)
+class SimulationResult:
+    """
+    - state / metrics：模拟结束时的世界状态与指标
+    - decisions：这次模拟产生的 POLICY_DECISION 事件
+    - start_t / t：开始 / 结束时的虚拟时间
+    - ticks / events：这次留痕的 tick 事件数 / 事件总数
+    - seconds：墙钟耗时
+    """
+    state: WorldState
+    metrics: "WorldMetrics"
+    decisions: List[Event]
+    start_t: int
+    t: int
+    ticks: int
+    events: int
+    seconds: float
+
+    @property
+    def speed(self) -> float:
+        """每墙钟秒推进多少虚拟时间。"""
+        return (self.t - self.start_t) / self.seconds if self.seconds > 0 else float("inf")
+
+
+class Simulation:
+    """
+    - runtime：要模拟的世界（默认新建一个，不落盘）；它的 gateway 会被换成脚本网关
+    - schedule：脚本输入
+    - skip_idle：跳过没有输入的时段（见模块说明）
+
+    用法：
+        sim = Simulation(schedule=InputSchedule.from_jsonl(Path("week.jsonl")), skip_idle=True)
+        result = sim.run(until=7 * 24 * 3600)
+    """
+
+    def __init__(
+        self,
+        runtime: Optional[WorldRuntime] = None,
+        schedule: Optional[InputSchedule] = None,
+        skip_idle: bool = False,
+    ) -> None:
+        self.runtime = runtime if runtime is not None else WorldRuntime()
+        self.schedule = schedule if schedule is not None else InputSchedule()
+        self.skip_idle = skip_idle
+        self.runtime.gateway = ScheduleGateway(self.schedule, self.runtime)
+
+    def run(self, until: int) -> SimulationResult:
+        """跑到虚拟时间 until（已经到了就什么都不做）。"""
+        rt, schedule = self.runtime, self.schedule
+        start_t, start_ticks, start_events = rt.t, rt.state.tick_count, len(rt.event_log)
+        started = time.perf_counter()
+
+        while rt.t < until:
+            if self.skip_idle:
+                nxt = schedule.next_time()
+                target = until if nxt is None else min(until, nxt)
+                rt.tick(to=target if target > rt.t + 1 else None)
+            else:
+                rt.tick()
+            rt.ingest_inputs()
+
+        flush = getattr(rt.event_store, "flush", None)
+        if flush is not None:
+            flush()
+        seconds = time.perf_counter() - started
+
+        log = rt.event_log
+        decisions = [e for e in (log[i] for i in range(start_events, len(log))) if e.type == POLICY_DECISION_TYPE]
+        return SimulationResult(
+            state=rt.state,
+            metrics=rt.metrics(),
+            decisions=decisions,
+            start_t=start_t,
+            t=rt.t,
+            ticks=rt.state.tick_count - start_ticks,
+            events=len(log) - start_events,
+            seconds=seconds,
+        )
@@ -0,0 +1,96 @@
+"""
+snapshot_check.py
+=================
+快照校验：快照 + 补尾巴的回放结果，必须和全量回放完全一样
+
+快照是“性能优化”，不能改变结果。但快照漏存一个字段（例如以前漏掉的 action_count），
+回放出来的世界就悄悄变了 —— 单看哪一边都发现不了。
+
+verify_snapshot 把同一份日志回放两次：
+- fast：replay_fast_from_store（快照 + 快照之后的事件）
+- full：replay_from_store（从第一条事件开始）
+然后逐项比较：WorldState、t、next_seq、指标、投影、策略状态、压制器状态。
+
+有状态的策略 / 压制器 / 投影会被回放改写，所以这里收的是“工厂”（每次回放造一个新的）。
+"""
+
+from __future__ import annotations
+
+from dataclasses import asdict, dataclass
+from typing import Any, Callable, List, Optional, Tuple
+
+from cim_worldlab.world.persistence.file_event_store import FileEventStore
+from cim_worldlab.world.persistence.snapshot_store import SnapshotStore
+from cim_worldlab.world.runtime.runtime import WorldRuntime
+
+
+@dataclass(frozen=True)
+class SnapshotCheck:
+    """
+    - ok：快照回放 == 全量回放（没有快照时也是 True，两边都是全量回放）
+    - snapshot_found：有没有快照
+    - last_event_index：快照覆盖到第几条事件（没有快照时为 None）
+    - tail_events：快照之后补了多少条事件
+    - mismatches：不一致的项（例如 "state.action_count"、"projections"）；
+      老格式快照（state 不完整，回放时会被跳过）记为 "snapshot.incomplete"
+    """
+    ok: bool
+    snapshot_found: bool
+    last_event_index: Optional[int]
+    tail_events: int
+    mismatches: Tuple[str, ...]
+
+
+def _component_state(obj: Any) -> Any:
+    snap = getattr(obj, "snapshot_state", None)
+    return snap() if snap is not None else None
+
+
+def verify_snapshot(
+    store: FileEventStore,
+    snapshot_store: SnapshotStore,
+    policy_factory: Optional[Callable[[], Any]] = None,
+    suppressor_factory: Optional[Callable[[], Any]] = None,
+    projections_factory: Optional[Callable[[], Any]] = None,
+) -> SnapshotCheck:
+    """
+    用快照回放一次、全量回放一次，比较结果。
+    """
+    def build(fast: bool) -> WorldRuntime:
+        kwargs = {
+            "policy": policy_factory() if policy_factory is not None else None,
+            "suppressor": suppressor_factory() if suppressor_factory is not None else None,
+            "projections": projections_factory() if projections_factory is not None else None,
+        }
+        if fast:
+            return WorldRuntime.replay_fast_from_store(store, snapshot_store, **kwargs)
+        return WorldRuntime.replay_from_store(store, **kwargs)
+
+    snap = snapshot_store.load_snapshot()
+    fast = build(fast=True)
+    full = build(fast=False)
+
+    mismatches: List[str] = []
+    if snap is not None and not snap.complete:
+        mismatches.append("snapshot.incomplete")
+    fast_state, full_state = asdict(fast.state), asdict(full.state)
+    mismatches += [f"state.{k}" for k in full_state if fast_state[k] != full_state[k]]
+    if fast.t != full.t:
+        mismatches.append("t")
+    if fast.next_seq != full.next_seq:
+        mismatches.append("next_seq")
+    if asdict(fast.metrics()) != asdict(full.metrics()):
+        mismatches.append("metrics")
+    for name in ("projections", "policy", "suppressor"):
+        if _component_state(getattr(fast, name)) != _component_state(getattr(full, name)):
+            mismatches.append(name)
+
+    last_event_index = snap.last_event_index if snap is not None else None
+    tail = len(full.event_log) - (last_event_index + 1) if last_event_index is not None else len(full.event_log)
+    return SnapshotCheck(
+        ok=not mismatches,
+        snapshot_found=snap is not None,
+        last_event_index=last_event_index,
+        tail_events=tail,
+        mismatches=tuple(mismatches),
+    )
@@ -0,0 +1,200 @@
+"""
+snapshot_scheduler.py
+=====================
+SnapshotScheduler：什么时候该打快照？
+
+maybe_snapshot(every_n_events) 只看事件条数。但“该打快照了”真正的意思是：
+“再不打，下次冷启动（快照 + 补尾巴）就太慢了”。尾巴有多慢取决于：
+- 条数：每条事件都要 reduce / 喂投影
+- 字节数：大事件解码更慢（同样 1000 条，大 payload 的日志解码慢得多）
+- 机器本身的速度
+
+所以调度器支持四种触发条件（任意一个满足就打，都可选）：
+- every_n_events：距上次快照 >= N 条事件
+- every_bytes：距上次快照事件文件增长 >= N 字节（需要落盘的 event_store）
+- every_seconds：距上次快照 >= N 秒
+- max_replay_seconds：预计冷启动补尾巴的耗时 >= 目标值
+
+预计回放耗时 = 尾巴字节数 x 解码速度 + 尾巴条数 x reduce 速度
+- 速度是实测的（ReplayCost.measure：把最近的一批事件编码后再解码、fold 一遍计时）
+- 第一次需要时用 runtime 最近的事件测一次；每次打快照后重新测（事件的形态会变）
+- 没有 event_store 时，尾巴字节数用“采样事件的平均大小 x 条数”估算
+"""
+
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass
+from typing import Callable, Optional, Sequence
+
+from cim_worldlab.world.events.codec import decode_event, encode_event
+from cim_worldlab.world.events.event import Event
+from cim_worldlab.world.persistence.snapshot_store import SnapshotStore
+from cim_worldlab.world.runtime.runtime import WorldRuntime
+from cim_worldlab.world.state import WorldState, apply_events
+
+REASON_EVENTS = "events"
+REASON_BYTES = "bytes"
+REASON_TIME = "time"
+REASON_REPLAY_COST = "replay_cost"
+
+CALIBRATION_SAMPLE = 2_000
+
+
+@dataclass(frozen=True)
+class ReplayCost:
+    """
+    实测的回放速度：
+    - seconds_per_byte：解码（一行 JSON -> Event）每字节耗时
+    - seconds_per_event：reduce（apply_events）每条耗时
+    - bytes_per_event：采样事件的平均行长（含换行），没有文件大小时用来估字节数
+    """
+    seconds_per_byte: float
+    seconds_per_event: float
+    bytes_per_event: float
+
+    @classmethod
+    def measure(cls, events: Sequence[Event]) -> "ReplayCost":
+        if not events:
+            raise ValueError("need at least one event to measure replay cost")
+        lines = [encode_event(e) for e in events]
+        nbytes = sum(len(line) + 1 for line in lines)
+        t0 = time.perf_counter()
+        decoded = [decode_event(line) for line in lines]
+        t1 = time.perf_counter()
+        apply_events(WorldState.initial(), decoded)
+        t2 = time.perf_counter()
+        return cls(
+            seconds_per_byte=(t1 - t0) / nbytes,
+            seconds_per_event=(t2 - t1) / len(events),
+            bytes_per_event=nbytes / len(events),
+        )
+
+    def estimate(self, events: int, nbytes: Optional[int] = None) -> float:
+        """补 events 条（共 nbytes 字节）事件预计要多少秒。"""
+        if nbytes is None:
+            nbytes = int(events * self.bytes_per_event)
+        return nbytes * self.seconds_per_byte + events * self.seconds_per_event
+
+
+class SnapshotScheduler:
+    """
+    参数（都是“距上次快照”；None = 不用这个条件，至少要给一个）：
+    - every_n_events / every_bytes / every_seconds / max_replay_seconds：见模块说明
+    - cost：预先测好的 ReplayCost（不给就在第一次需要时实测）
+    - clock：时钟（测试里可以换成假的）
+
+    用法：
+        scheduler = SnapshotScheduler(every_n_events=10_000, max_replay_seconds=0.5)
+        ...每批事件之后...
+        scheduler.maybe_snapshot(rt, snapshot_store)
+    """
+
+    def __init__(
+        self,
+        every_n_events: Optional[int] = None,
+        every_bytes: Optional[int] = None,
+        every_seconds: Optional[float] = None,
+        max_replay_seconds: Optional[float] = None,
+        cost: Optional[ReplayCost] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        limits = (every_n_events, every_bytes, every_seconds, max_replay_seconds)
+        if all(v is None for v in limits):
+            raise ValueError("SnapshotScheduler needs at least one trigger")
+        if any(v is not None and v <= 0 for v in limits):
+            raise ValueError("snapshot triggers must be positive")
+        self.every_n_events = every_n_events
+        self.every_bytes = every_bytes
+        self.every_seconds = every_seconds
+        self.max_replay_seconds = max_replay_seconds
+        self.cost = cost
+        self.clock = clock
+        self._measure_cost = cost is None
+
+        self._last_time = clock()
+        # 上次快照时事件文件的大小（第一次用到时确定起点，见 _bytes_since）
+        self._last_size: Optional[int] = None
+        self.snapshots = 0
+        self.last_reason: Optional[str] = None
+
+    @staticmethod
+    def _file_size(rt: WorldRuntime) -> Optional[int]:
+        path = getattr(rt.event_store, "path", None)  # MemoryEventStore 没有文件
+        if path is None:
+            return None
+        try:
+            return path.stat().st_size
+        except FileNotFoundError:
+            return 0
+
+    def _bytes_since(self, rt: WorldRuntime, tail: int) -> Optional[int]:
+        """
+        距上次快照事件文件增长了多少字节（没有 event_store 时返回 None）。
+        起点未知（第一次见到这个 runtime / 文件被轮转）时：尾巴为空就以现在的大小为起点，
+        否则按“采样平均行长 x 尾巴条数”倒推一个起点，之后都是精确值。
+        """
+        size = self._file_size(rt)
+        if size is None:
+            return None
+        if self._last_size is None or size < self._last_size:
+            cost = self._cost(rt) if tail > 0 else None
+            self._last_size = max(0, size - int(tail * cost.bytes_per_event)) if cost is not None else size
+        return size - self._last_size
+
+    def _cost(self, rt: WorldRuntime) -> Optional[ReplayCost]:
+        if self.cost is None:
+            log = rt.event_log
+            n = len(log)
+            if n == 0:
+                return None
+            self.cost = ReplayCost.measure([log[i] for i in range(max(0, n - CALIBRATION_SAMPLE), n)])
+        return self.cost
+
+    def estimated_replay_seconds(self, rt: WorldRuntime) -> float:
+        """现在冷启动，补快照之后的尾巴预计要多少秒（还没法估时返回 0）。"""
+        tail = len(rt.event_log) - rt.events_at_snapshot
+        cost = self._cost(rt) if tail > 0 else None
+        if cost is None:
+            return 0.0
+        return cost.estimate(tail, self._bytes_since(rt, tail))
+
+    def due(self, rt: WorldRuntime) -> Optional[str]:
+        """
+        该打快照了吗？返回触发的原因（REASON_*），不该打返回 None。
+        """
+        tail = len(rt.event_log) - rt.events_at_snapshot
+        if tail <= 0:
+            if self._last_size is None:
+                self._bytes_since(rt, 0)
+            return None
+        if self.every_n_events is not None and tail >= self.every_n_events:
+            return REASON_EVENTS
+        if self.every_bytes is not None:
+            nbytes = self._bytes_since(rt, tail)
+            if nbytes is not None and nbytes >= self.every_bytes:
+                return REASON_BYTES
+        if self.every_seconds is not None and self.clock() - self._last_time >= self.every_seconds:
+            return REASON_TIME
+        if self.max_replay_seconds is not None and self.estimated_replay_seconds(rt) >= self.max_replay_seconds:
+            return REASON_REPLAY_COST
+        return None
+
+    def maybe_snapshot(self, rt: WorldRuntime, snapshot_store: SnapshotStore) -> bool:
+        """
+        条件满足就保存快照，返回是否保存了。
+        保存后重置计数起点，并用最近的事件重新测一次回放速度
+        （只在用到 max_replay_seconds、且 cost 不是调用方给的时候）。
+        """
+        with rt._stage("maybe_snapshot"):
+            reason = self.due(rt)
+            if reason is None or not rt.save_snapshot(snapshot_store):
+                return False
+            self.snapshots += 1
+            self.last_reason = reason
+            self._last_time = self.clock()
+            self._last_size = self._file_size(rt)
+            if self._measure_cost and self.max_replay_seconds is not None:
+                self.cost = None
+                self._cost(rt)
+            return True
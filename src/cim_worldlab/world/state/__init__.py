@@ -1,9 +1,12 @@
 """
 state 包导出：
 - WorldState：世界状态
-- apply_event / apply_events：状态推导规则（reducer）
+- apply_event / apply_events：状态推导规则（reducer；apply_events 是批量折叠，replay 用）
+- register_reducer / reducer_for：按事件类型注册 / 查找状态处理器
+- PMap / PVector：持久化（结构共享）映射 / 向量，给状态里的大集合用
 """
 from .world_state import WorldState
-from .reducer import apply_event, apply_events
+from .persistent import PMap, PVector
+from .reducer import apply_event, apply_events, reducer_for, register_reducer
 
-__all__ = ["WorldState", "apply_event", "apply_events"]
+__all__ = ["WorldState", "apply_event", "apply_events", "register_reducer", "reducer_for", "PMap", "PVector"]
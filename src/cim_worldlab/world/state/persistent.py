@@ -0,0 +1,422 @@
+"""
+persistent.py
+=============
+持久化数据结构（persistent data structures）：PMap / PVector
+
+问题：
+- WorldState 是 frozen 的，更新靠 dataclasses.replace —— 标量字段没问题
+- 一旦状态里放了大集合（每台设备的状态、WIP 列表、订单簿），
+  “改一个元素”就得把整个 dict / list 复制一遍（纯函数不能原地改），10 万个 key 时每次复制几毫秒
+
+做法（结构共享 structural sharing）：
+- 把集合拆成一棵 32 叉树；改一个元素只复制“根 -> 叶子”这一条路径上的节点（路径复制 path copying），
+  其它子树新旧版本共用
+- 树高 = log32(n)：10 万个元素只有 4 层，每次更新只复制 4 个最多 32 格的小节点
+- 旧版本完全不受影响：reducer 仍然是纯函数；快照直接拿引用即可（不需要深拷贝）
+
+PMap：HAMT（Hash Array Mapped Trie）
+- key 的哈希每 5 位选一个分支；节点用位图（bitmap）记录哪些分支存在，只存存在的分支（紧凑）
+- 哈希完全相同的 key 放进冲突节点（collision node）
+- 删除后只剩一个条目的子树会被收回上一层（树不会越删越深）
+
+PVector：32 叉的持久化向量（append / 按下标 get / set 都是 O(log32 n)）
+
+两者都是不可变的：set / delete / append 返回新对象；copy.copy / copy.deepcopy 直接返回自己
+（dataclasses.asdict 对未知类型会 deepcopy —— 这样快照 WorldState 时不会把整棵树复制一遍）。
+"""
+
+from __future__ import annotations
+
+from collections.abc import Mapping, Sequence
+from typing import Any, Iterable, Iterator, Tuple, Union
+
+_BITS = 5
+_WIDTH = 1 << _BITS
+_MASK = _WIDTH - 1
+_HASH_BITS = 64
+_HASH_MASK = (1 << _HASH_BITS) - 1
+
+_MISSING = object()
+
+
+def _hash(key: Any) -> int:
+    return hash(key) & _HASH_MASK
+
+
+# -------------------------------
+# HAMT 节点
+# 叶子条目就是一个 tuple：(hash, key, value)
+# -------------------------------
+
+class _Node:
+    __slots__ = ("bitmap", "items")
+
+    def __init__(self, bitmap: int, items: tuple) -> None:
+        self.bitmap = bitmap
+        self.items = items
+
+
+class _Collision:
+    """哈希完全相同的几个 key：entries = ((key, value), ...)"""
+    __slots__ = ("h", "entries")
+
+    def __init__(self, h: int, entries: tuple) -> None:
+        self.h = h
+        self.entries = entries
+
+
+_EMPTY_NODE = _Node(0, ())
+
+
+def _hash_of(item: Union[tuple, _Collision]) -> int:
+    return item[0] if type(item) is tuple else item.h  # type: ignore[union-attr]
+
+
+def _merge(a: Union[tuple, _Collision], b: tuple, shift: int) -> Union[_Node, _Collision]:
+    """把两个落在同一格的条目（或冲突节点）放进一个新的子树。"""
+    ha, hb = _hash_of(a), b[0]
+    if ha == hb:
+        if type(a) is tuple:
+            return _Collision(ha, ((a[1], a[2]), (b[1], b[2])))
+        return _Collision(ha, a.entries + ((b[1], b[2]),))  # type: ignore[union-attr]
+    ia, ib = (ha >> shift) & _MASK, (hb >> shift) & _MASK
+    if ia == ib:
+        return _Node(1 << ia, (_merge(a, b, shift + _BITS),))
+    if ia < ib:
+        return _Node((1 << ia) | (1 << ib), (a, b))
+    return _Node((1 << ia) | (1 << ib), (b, a))
+
+
+def _get(node: Any, h: int, key: Any) -> Any:
+    shift = 0
+    while True:
+        if type(node) is _Collision:
+            if node.h == h:
+                for k, v in node.entries:
+                    if k == key:
+                        return v
+            return _MISSING
+        bit = 1 << ((h >> shift) & _MASK)
+        bitmap = node.bitmap
+        if not bitmap & bit:
+            return _MISSING
+        item = node.items[(bitmap & (bit - 1)).bit_count()]
+        if type(item) is tuple:
+            return item[2] if item[0] == h and (item[1] is key or item[1] == key) else _MISSING
+        node = item
+        shift += _BITS
+
+
+def _set(node: Any, shift: int, entry: tuple) -> Tuple[Any, bool]:
+    """返回 (新节点, 是否新增了 key)；值没变时返回原节点。"""
+    h, key, value = entry
+    if type(node) is _Collision:
+        if node.h != h:
+            return _merge(node, entry, shift), True
+        for i, (k, v) in enumerate(node.entries):
+            if k == key:
+                if v is value:
+                    return node, False
+                return _Collision(h, node.entries[:i] + ((key, value),) + node.entries[i + 1:]), False
+        return _Collision(h, node.entries + ((key, value),)), True
+
+    bit = 1 << ((h >> shift) & _MASK)
+    bitmap = node.bitmap
+    idx = (bitmap & (bit - 1)).bit_count()
+    items = node.items
+    if not bitmap & bit:
+        return _Node(bitmap | bit, items[:idx] + (entry,) + items[idx:]), True
+
+    item = items[idx]
+    if type(item) is tuple:
+        if item[0] == h and (item[1] is key or item[1] == key):
+            if item[2] is value:
+                return node, False
+            new_item: Any = entry
+            added = False
+        else:
+            new_item = _merge(item, entry, shift + _BITS)
+            added = True
+    else:
+        new_item, added = _set(item, shift + _BITS, entry)
+        if new_item is item:
+            return node, False
+    return _Node(bitmap, items[:idx] + (new_item,) + items[idx + 1:]), added
+
+
+def _delete(node: Any, shift: int, h: int, key: Any) -> Any:
+    """返回新节点；key 不存在返回 _MISSING；删空了返回 None。"""
+    if type(node) is _Collision:
+        if node.h != h:
+            return _MISSING
+        rest = tuple((k, v) for k, v in node.entries if k != key)
+        if len(rest) == len(node.entries):
+            return _MISSING
+        if len(rest) == 1:
+            return (h, rest[0][0], rest[0][1])
+        return _Collision(h, rest)
+
+    bit = 1 << ((h >> shift) & _MASK)
+    bitmap = node.bitmap
+    if not bitmap & bit:
+        return _MISSING
+    idx = (bitmap & (bit - 1)).bit_count()
+    items = node.items
+    item = items[idx]
+    if type(item) is tuple:
+        if not (item[0] == h and (item[1] is key or item[1] == key)):
+            return _MISSING
+        new_item = None
+    else:
+        new_item = _delete(item, shift + _BITS, h, key)
+        if new_item is _MISSING:
+            return _MISSING
+
+    if new_item is None:
+        if len(items) == 1:
+            return None
+        rest = items[:idx] + items[idx + 1:]
+        if shift and len(rest) == 1 and type(rest[0]) is tuple:
+            return rest[0]  # 只剩一个条目：收回上一层
+        return _Node(bitmap ^ bit, rest)
+    if shift and len(items) == 1 and type(new_item) is tuple:
+        return new_item
+    return _Node(bitmap, items[:idx] + (new_item,) + items[idx + 1:])
+
+
+def _iter(node: Any) -> Iterator[Tuple[Any, Any]]:
+    if type(node) is _Collision:
+        yield from node.entries
+        return
+    for item in node.items:
+        if type(item) is tuple:
+            yield item[1], item[2]
+        else:
+            yield from _iter(item)
+
+
+class PMap(Mapping):
+    """
+    不可变映射（HAMT）。
+
+    - m.set(k, v) / m.delete(k) / m.update(...)：返回新 PMap，m 本身不变
+    - 读接口与 dict 相同（m[k]、m.get(k)、len(m)、in、items() ...）
+    - PMap.of(mapping) / PMap.of(k=v)：从已有数据构造
+    """
+
+    __slots__ = ("_root", "_len")
+
+    def __init__(self) -> None:
+        self._root: Any = _EMPTY_NODE
+        self._len = 0
+
+    @classmethod
+    def _make(cls, root: Any, length: int) -> "PMap":
+        m = cls.__new__(cls)
+        m._root = root
+        m._len = length
+        return m
+
+    @classmethod
+    def of(cls, items: Union[Mapping, Iterable[Tuple[Any, Any]], None] = None, **kwargs: Any) -> "PMap":
+        return cls().update(items or (), **kwargs)
+
+    # 读
+    def __len__(self) -> int:
+        return self._len
+
+    def __getitem__(self, key: Any) -> Any:
+        v = _get(self._root, _hash(key), key)
+        if v is _MISSING:
+            raise KeyError(key)
+        return v
+
+    def get(self, key: Any, default: Any = None) -> Any:
+        v = _get(self._root, _hash(key), key)
+        return default if v is _MISSING else v
+
+    def __contains__(self, key: Any) -> bool:
+        return _get(self._root, _hash(key), key) is not _MISSING
+
+    def __iter__(self) -> Iterator[Any]:
+        for k, _ in _iter(self._root):
+            yield k
+
+    def items(self) -> Iterator[Tuple[Any, Any]]:  # type: ignore[override]
+        return _iter(self._root)
+
+    # 写（返回新对象）
+    def set(self, key: Any, value: Any) -> "PMap":
+        root, added = _set(self._root, 0, (_hash(key), key, value))
+        if root is self._root:
+            return self
+        return PMap._make(root, self._len + 1 if added else self._len)
+
+    def delete(self, key: Any) -> "PMap":
+        root = _delete(self._root, 0, _hash(key), key)
+        if root is _MISSING:
+            raise KeyError(key)
+        if root is None:
+            return PMap()
+        return PMap._make(root, self._len - 1)
+
+    def discard(self, key: Any) -> "PMap":
+        return self.delete(key) if key in self else self
+
+    def update(self, items: Union[Mapping, Iterable[Tuple[Any, Any]]] = (), **kwargs: Any) -> "PMap":
+        pairs = items.items() if isinstance(items, Mapping) else items
+        root, n = self._root, self._len
+        for k, v in pairs:
+            root, added = _set(root, 0, (_hash(k), k, v))
+            n += added
+        for k, v in kwargs.items():
+            root, added = _set(root, 0, (_hash(k), k, v))
+            n += added
+        return PMap._make(root, n) if root is not self._root else self
+
+    def to_dict(self) -> dict:
+        return dict(_iter(self._root))
+
+    # 其它
+    def __eq__(self, other: Any) -> bool:
+        if self is other:
+            return True
+        if not isinstance(other, Mapping):
+            return NotImplemented
+        if len(other) != self._len:
+            return False
+        for k, v in _iter(self._root):
+            if other.get(k, _MISSING) != v:
+                return False
+        return True
+
+    __hash__ = None  # type: ignore[assignment]
+
+    def __repr__(self) -> str:
+        return f"PMap({self.to_dict()!r})"
+
+    def __copy__(self) -> "PMap":
+        return self
+
+    def __deepcopy__(self, memo: dict) -> "PMap":
+        return self
+
+    def __reduce__(self):
+        return (PMap.of, (list(_iter(self._root)),))
+
+
+# -------------------------------
+# PVector：32 叉 trie（叶子层是值的 tuple）
+# -------------------------------
+
+def _push(node: tuple, shift: int, index: int, value: Any) -> tuple:
+    if shift == 0:
+        return node + (value,)
+    sub = (index >> shift) & _MASK
+    if sub < len(node):
+        return node[:sub] + (_push(node[sub], shift - _BITS, index, value),)
+    return node + (_new_path(shift - _BITS, value),)
+
+
+def _new_path(shift: int, value: Any) -> tuple:
+    return (value,) if shift == 0 else (_new_path(shift - _BITS, value),)
+
+
+def _assoc(node: tuple, shift: int, index: int, value: Any) -> tuple:
+    sub = (index >> shift) & _MASK
+    new = value if shift == 0 else _assoc(node[sub], shift - _BITS, index, value)
+    return node[:sub] + (new,) + node[sub + 1:]
+
+
+def _leaves(node: tuple, shift: int) -> Iterator[Any]:
+    if shift == 0:
+        yield from node
+        return
+    for child in node:
+        yield from _leaves(child, shift - _BITS)
+
+
+class PVector(Sequence):
+    """
+    不可变向量：v.append(x) / v.set(i, x) / v.extend(xs) 返回新 PVector；读接口与 tuple 相同。
+    """
+
+    __slots__ = ("_root", "_size", "_shift")
+
+    def __init__(self, items: Iterable[Any] = ()) -> None:
+        self._root: tuple = ()
+        self._size = 0
+        self._shift = 0
+        if items:
+            v = self.extend(items)
+            self._root, self._size, self._shift = v._root, v._size, v._shift
+
+    @classmethod
+    def _make(cls, root: tuple, size: int, shift: int) -> "PVector":
+        v = cls.__new__(cls)
+        v._root, v._size, v._shift = root, size, shift
+        return v
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _index(self, i: int) -> int:
+        if i < 0:
+            i += self._size
+        if not 0 <= i < self._size:
+            raise IndexError("PVector index out of range")
+        return i
+
+    def __getitem__(self, i: Any) -> Any:
+        if isinstance(i, slice):
+            return PVector(list(self)[i])
+        i = self._index(i)
+        node = self._root
+        shift = self._shift
+        while shift:
+            node = node[(i >> shift) & _MASK]
+            shift -= _BITS
+        return node[i & _MASK]
+
+    def __iter__(self) -> Iterator[Any]:
+        return _leaves(self._root, self._shift)
+
+    def append(self, value: Any) -> "PVector":
+        root, shift, size = self._root, self._shift, self._size
+        if size and size == 1 << (shift + _BITS):
+            root, shift = (root,), shift + _BITS  # 满了：加一层
+        return PVector._make(_push(root, shift, size, value), size + 1, shift)
+
+    def extend(self, values: Iterable[Any]) -> "PVector":
+        v = self
+        for x in values:
+            v = v.append(x)
+        return v
+
+    def set(self, i: int, value: Any) -> "PVector":
+        i = self._index(i)
+        return PVector._make(_assoc(self._root, self._shift, i, value), self._size, self._shift)
+
+    def to_list(self) -> list:
+        return list(self)
+
+    def __eq__(self, other: Any) -> bool:
+        if self is other:
+            return True
+        if not isinstance(other, Sequence) or isinstance(other, (str, bytes)):
+            return NotImplemented
+        return len(other) == self._size and all(a == b for a, b in zip(self, other))
+
+    __hash__ = None  # type: ignore[assignment]
+
+    def __repr__(self) -> str:
+        return f"PVector({list(self)!r})"
+
+    def __copy__(self) -> "PVector":
+        return self
+
+    def __deepcopy__(self, memo: dict) -> "PVector":
+        return self
+
+    def __reduce__(self):
+        return (PVector, (list(self),))
@@ -12,18 +12,88 @@ reducer.py
 工程意义：
 - 你把“世界怎么变化”的规则写成纯函数
 - 纯函数最容易测试：给定输入，输出一定确定
+
+处理器注册表（handler registry）：
+- 每种事件类型一个处理器：@register_reducer("TYPE") 注册，apply_event 查一次 dict 分发
+  （以前是一串 if e.type == ...，类型越多越慢，也没法从外面扩展）
+- 新的事件类型（FDC/SPC/OMS ...）在自己的模块里注册处理器即可，不用改这个文件
+- 没有注册处理器的事件类型：不改变状态
+
+批量折叠（batch fold）：apply_events —— replay 用
+- 逐条 apply_event：每个事件都 replace 出一个新 WorldState，外部输入还要复制一次 payload
+- 批量：计数器放在局部变量里累加，last_input / last_action 只记住“最后一条是哪个事件”，
+  整批结束时才生成一次 dict、一个 WorldState
+- 内置的三种事件走这条快路径；其它注册了处理器的类型（或者内置类型的处理器被替换了），
+  先把局部变量落成 WorldState，再调用处理器 —— 结果与逐条 apply_event 完全一致
 """
 
 from __future__ import annotations
 
 from dataclasses import replace
-from typing import Any, Dict
+from typing import Any, Callable, Dict, Iterable, Optional
 
 from cim_worldlab.world.events.event import Event
 from cim_worldlab.world.events.external_input import EXTERNAL_INPUT_TYPE
 from cim_worldlab.world.state.world_state import WorldState
 from cim_worldlab.world.events.action_executed import ACTION_EXECUTED_TYPE
 
+WORLD_TICK_TYPE = "WORLD_TICK"
+
+Reducer = Callable[[WorldState, Event], WorldState]
+
+# 事件类型 -> 处理器
+REDUCERS: Dict[str, Reducer] = {}
+
+
+def register_reducer(event_type: str) -> Callable[[Reducer], Reducer]:
+    """注册（或替换）某种事件类型的状态处理器。"""
+    def deco(fn: Reducer) -> Reducer:
+        REDUCERS[event_type] = fn
+        return fn
+    return deco
+
+
+def reducer_for(event_type: str) -> Optional[Reducer]:
+    return REDUCERS.get(event_type)
+
+
+# -------------------------------
+# 内置事件的处理器
+# -------------------------------
+
+@register_reducer(WORLD_TICK_TYPE)
+def apply_tick(state: WorldState, e: Event) -> WorldState:
+    # 在我们的约定里：WORLD_TICK 事件的 t 就是新的世界时间
+    # tick_count 也随之 +1（MVP）
+    return replace(state, t=e.t, tick_count=state.tick_count + 1)
+
+
+@register_reducer(EXTERNAL_INPUT_TYPE)
+def apply_external_input(state: WorldState, e: Event) -> WorldState:
+    # last_input：为了教学可读性，我们保存 payload 的摘要
+    # 你也可以只保留部分字段，这里先保留整份 payload（MVP）
+    return replace(
+        state,
+        input_count=state.input_count + 1,
+        last_input=dict(e.payload),  # 复制一份，避免引用被外部改动
+    )
+
+
+def _last_action(e: Event) -> Dict[str, Any]:
+    # last_action 只存“可 JSON 化”的 dict，方便落盘与投屏
+    payload = e.payload or {}
+    return {
+        "t": e.t,
+        "action_type": str(payload.get("action_type", "")),
+        "reason": str(payload.get("reason", "")),
+        "from_policy_t": payload.get("from_policy_t"),
+        "trace_id": payload.get("trace_id"),
+    }
+
+
+@register_reducer(ACTION_EXECUTED_TYPE)
+def apply_action_executed(state: WorldState, e: Event) -> WorldState:
+    return replace(state, action_count=state.action_count + 1, last_action=_last_action(e))
 
 
 def apply_event(state: WorldState, e: Event) -> WorldState:
@@ -34,57 +104,74 @@ def apply_event(state: WorldState, e: Event) -> WorldState:
     - 它会“基于旧对象复制出一个新对象”
     - 非常适合 immutable state 的更新方式
     """
-    # 1) 世界 tick：推进时间与计数
-    if e.type == "WORLD_TICK":
-        # 在我们的约定里：WORLD_TICK 事件的 t 就是新的世界时间
-        # tick_count 也随之 +1（MVP）
-        return replace(
-            state,
-            t=e.t,
-            tick_count=state.tick_count + 1,
-        )
-
-    # 2) 外部输入：只改变 input_count 和 last_input
-    if e.type == EXTERNAL_INPUT_TYPE:
-        # last_input：为了教学可读性，我们保存 payload 的摘要
-        # 你也可以只保留部分字段，这里先保留整份 payload（MVP）
-        return replace(
-            state,
-            input_count=state.input_count + 1,
-            last_input=dict(e.payload),  # 复制一份，避免引用被外部改动
-        )
-    
-    # 3) 其他事件类型：MVP 先“不改变状态”
-    # 以后你加 FDC/SPC/OMS 事件类型时，再在这里扩展规则
-
-    if e.type == ACTION_EXECUTED_TYPE:
-    # 教学注释：
-    # - reducer 必须是“纯函数”：返回新 state，不偷偷改旧对象
-    # - last_action 只存“可 JSON 化”的 dict，方便落盘与投屏
-        payload = e.payload or {}
-        new_last_action = {
-            "t": e.t,
-            "action_type": str(payload.get("action_type", "")),
-            "reason": str(payload.get("reason", "")),
-            "from_policy_t": payload.get("from_policy_t"),
-            "trace_id": payload.get("trace_id"),
-        }
-        return replace(
-            state,
-            action_count=state.action_count + 1,
-            last_action=new_last_action,
-        )
-    return state
-
-
-def apply_events(initial: WorldState, events: list[Event]) -> WorldState:
+    handler = REDUCERS.get(e.type)
+    return handler(state, e) if handler is not None else state
+
+
+# -------------------------------
+# 批量折叠
+# -------------------------------
+
+_FAST_TICK, _FAST_INPUT, _FAST_ACTION = 1, 2, 3
+_BUILTIN = (
+    (WORLD_TICK_TYPE, apply_tick, _FAST_TICK),
+    (EXTERNAL_INPUT_TYPE, apply_external_input, _FAST_INPUT),
+    (ACTION_EXECUTED_TYPE, apply_action_executed, _FAST_ACTION),
+)
+
+
+def apply_events(initial: WorldState, events: Iterable[Event]) -> WorldState:
     """
     把一串事件按顺序应用到状态上，得到最终状态。
 
     这就是 replay 的核心：
     - 初始状态 + 事件序列 = 最终状态
+    结果与逐条 apply_event 相同，但中间不生成 WorldState（见文件头“批量折叠”）。
     """
-    s = initial
+    # 只有处理器还是内置的那个，才走快路径（被替换了就按注册表来）
+    fast = {t: code for t, fn, code in _BUILTIN if REDUCERS.get(t) is fn}
+    reducers = REDUCERS
+
+    base = initial
+    t, ticks, inputs, actions = initial.t, initial.tick_count, initial.input_count, initial.action_count
+    last_input, last_action = initial.last_input, initial.last_action
+    input_ev: Optional[Event] = None  # 最后一条外部输入（还没生成 last_input）
+    action_ev: Optional[Event] = None  # 最后一条动作（还没生成 last_action）
+
     for e in events:
-        s = apply_event(s, e)
-    return s
+        code = fast.get(e.type)
+        if code == _FAST_TICK:
+            t = e.t
+            ticks += 1
+        elif code == _FAST_INPUT:
+            inputs += 1
+            input_ev = e
+        elif code == _FAST_ACTION:
+            actions += 1
+            action_ev = e
+        else:
+            handler = reducers.get(e.type)
+            if handler is None:
+                continue
+            # 其它处理器：先把局部变量落成状态，再交给它；之后从它的结果继续累加
+            if input_ev is not None:
+                last_input, input_ev = dict(input_ev.payload), None
+            if action_ev is not None:
+                last_action, action_ev = _last_action(action_ev), None
+            base = handler(
+                replace(base, t=t, tick_count=ticks, input_count=inputs, last_input=last_input,
+                        action_count=actions, last_action=last_action),
+                e,
+            )
+            t, ticks, inputs, actions = base.t, base.tick_count, base.input_count, base.action_count
+            last_input, last_action = base.last_input, base.last_action
+
+    if input_ev is not None:
+        last_input = dict(input_ev.payload)
+    if action_ev is not None:
+        last_action = _last_action(action_ev)
+    if (t, ticks, inputs, actions) == (base.t, base.tick_count, base.input_count, base.action_count) \
+            and last_input is base.last_input and last_action is base.last_action:
+        return base
+    return replace(base, t=t, tick_count=ticks, input_count=inputs, last_input=last_input,
+                   action_count=actions, last_action=last_action)
@@ -0,0 +1,22 @@
+"""
+helpers.py
+==========
+测试共用的小工具（普通模块，pytest 会把 tests/ 放进 sys.path：测试文件里 `from helpers import temp_reading`）。
+"""
+
+from typing import Any, Dict, Optional
+
+from cim_worldlab.world.events.external_input import ExternalInput
+
+
+def temp_reading(
+    temp: float,
+    equipment_id: Optional[str] = None,
+    trace_id: Optional[str] = None,
+    channel: str = "equipment",
+    received_ns: Optional[int] = None,
+) -> ExternalInput:
+    """一条设备温度读数（TEMP_READING）；equipment_id 为 None 时 data 里只有 temp_c。"""
+    data: Dict[str, Any] = {"temp_c": temp} if equipment_id is None else {"equipment_id": equipment_id, "temp_c": temp}
+    return ExternalInput(source="plugin", channel=channel, name="TEMP_READING", data=data,
+                         trace_id=trace_id, received_ns=received_ns)
@@ -0,0 +1,103 @@
+"""
+test_backtest.py
+================
+验证并行回测：
+
+1) 列式缓存只解码外部输入，源文件不变时复用
+2) 回测的决策数与“逐事件跑编译好的规则”完全一致
+3) 阈值扫描 + 多进程结果与单进程一致；truth 指标（误报/漏报/延迟）正确
+"""
+
+import json
+from pathlib import Path
+
+from cim_worldlab.backtest import (
+    Candidate,
+    EvaluationSpec,
+    ensure_columns,
+    format_table,
+    load_candidate,
+    load_evaluation,
+    open_columns,
+    run_backtest,
+    threshold_sweep,
+)
+from cim_worldlab.benchmarks import synthetic_events
+from cim_worldlab.world.events.external_input import EXTERNAL_INPUT_TYPE
+from cim_worldlab.world.persistence import FileEventStore
+from cim_worldlab.world.policy import load_rule_file
+
+PROJECT = Path(__file__).resolve().parents[1] / "projects" / "P01_single_excursion"
+REFERENCE_POLICY = PROJECT / "baseline" / "reference_policy.json"
+EVALUATION = PROJECT / "evaluation.yaml"
+
+
+def _events_file(tmp_path: Path, n: int = 2000) -> Path:
+    store = FileEventStore(path=tmp_path / "events.jsonl")
+    for e in synthetic_events(n, seed=7, hot_ratio=0.2):
+        store.append(e)
+    return store.path
+
+
+def test_columnar_cache_is_reused(tmp_path: Path):
+    events = _events_file(tmp_path)
+    cache = tmp_path / "events.jsonl.cols"
+    ensure_columns(events, cache, ["temp_c"])
+    mtime = cache.stat().st_mtime_ns
+
+    ensure_columns(events, cache, ["temp_c"])
+    assert cache.stat().st_mtime_ns == mtime
+
+    cols = open_columns(cache)
+    inputs = [e for e in FileEventStore(path=events).load_all() if e.type == EXTERNAL_INPUT_TYPE]
+    assert cols.n == len(inputs)
+    assert list(cols.t[:5]) == [e.t for e in inputs[:5]]
+
+
+def test_decision_count_matches_compiled_rules(tmp_path: Path):
+    events = _events_file(tmp_path)
+    reg = load_rule_file(REFERENCE_POLICY)
+    expected = sum(len(reg.evaluate(e)) for e in FileEventStore(path=events).load_all())
+    assert expected > 0
+
+    [row] = run_backtest(events, [load_candidate(REFERENCE_POLICY)], workers=1)
+    assert row["decision_count"] == expected
+    assert row["decisions_by_rule"] == {"TEMP_HIGH_PAUSE": expected}
+
+
+def test_threshold_sweep_parallel_matches_serial(tmp_path: Path):
+    events = _events_file(tmp_path)
+    cands = threshold_sweep(load_candidate(REFERENCE_POLICY), [90.0, 92.0, 94.0, 96.0])
+    spec = load_evaluation(EVALUATION)
+    assert spec.truth is not None
+
+    serial = run_backtest(events, cands, spec, workers=1)
+    parallel = run_backtest(events, cands, spec, workers=2)
+    assert serial == parallel
+
+    counts = [r["decision_count"] for r in serial]
+    assert counts == sorted(counts, reverse=True)
+
+    # 阈值 <= truth(95) 的候选不漏报；阈值更高的候选不误报
+    by_name = {r["candidate"]: r for r in serial}
+    assert by_name["TEMP_HIGH_PAUSE@94"]["missed"] == 0
+    assert by_name["TEMP_HIGH_PAUSE@96"]["false_alarms"] == 0
+    assert by_name["TEMP_HIGH_PAUSE@90"]["alert_delay"] <= 0
+    assert "TEMP_HIGH_PAUSE@92" in format_table(serial)
+
+
+def test_rejects_non_numeric_rules(tmp_path: Path):
+    events = _events_file(tmp_path, n=10)
+    doc = {"version": 1, "rules": [{
+        "rule_id": "STATE_ALARM", "match": {"channel": "equipment"},
+        "field": "state", "op": "==", "value": "ALARM", "suggested_action": "PAUSE",
+    }]}
+    p = tmp_path / "policy.json"
+    p.write_text(json.dumps(doc), encoding="utf-8")
+    try:
+        run_backtest(events, [load_candidate(p)], EvaluationSpec(), workers=1)
+    except ValueError as e:
+        assert "numeric" in str(e)
+    else:
+        raise AssertionError("expected ValueError")
+    assert isinstance(load_candidate(p), Candidate)
@@ -0,0 +1,51 @@
+"""
+test_benchmarks.py
+==================
+验证基准套件本身（不关心快慢，只关心“尺子”是否可靠）：
+
+1) 合成数据是确定性的（同一 seed 得到同样的事件）
+2) run_suite 能跑通并产出结构完整的结果
+3) compare_results 能正确标记 regression / improvement / new / missing
+"""
+
+from pathlib import Path
+
+from cim_worldlab.benchmarks import BenchContext, compare_results, has_regression, run_suite, synthetic_events
+
+
+def test_synthetic_events_are_deterministic():
+    a = synthetic_events(500, seed=7)
+    b = synthetic_events(500, seed=7)
+    assert len(a) == 500
+    assert a == b
+    assert {"WORLD_TICK", "EXTERNAL_INPUT"} <= {e.type for e in a}
+
+
+def test_run_suite_produces_results(tmp_path: Path):
+    ctx = BenchContext(work_dir=tmp_path, sizes=[200], repeat=1)
+    out = run_suite(ctx, only=["replay.*", "store.*", "metrics.compute"])
+
+    keys = {r["key"] for r in out["results"]}
+    assert "replay.full[n=200]" in keys
+    assert "replay.fast[n=200]" in keys
+    assert "store.load[n=200]" in keys
+    assert all(r["seconds"] >= 0 for r in out["results"])
+    assert out["meta"]["sizes"] == [200]
+
+
+def test_compare_flags_regressions():
+    baseline = {"results": [
+        {"key": "a", "seconds": 1.0},
+        {"key": "b", "seconds": 1.0},
+        {"key": "gone", "seconds": 1.0},
+    ]}
+    current = {"results": [
+        {"key": "a", "seconds": 1.5},
+        {"key": "b", "seconds": 0.5},
+        {"key": "new", "seconds": 1.0},
+    ]}
+
+    by_key = {c.key: c.status for c in compare_results(current, baseline, threshold=0.2)}
+    assert by_key == {"a": "regression", "b": "improvement", "gone": "missing", "new": "new"}
+    assert has_regression(compare_results(current, baseline, threshold=0.2))
+    assert not has_regression(compare_results(current, baseline, threshold=1.0))
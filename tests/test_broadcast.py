@@ -0,0 +1,156 @@
+"""
+test_broadcast.py
+=================
+验证事件推送（EventBroadcaster）：
+
+1) 扇出：每个事件只序列化一次，所有订阅者共享同一帧
+2) 过滤：type / channel / trace_id
+3) 有界缓冲：drop_oldest / drop_newest / coalesce，丢帧后先收到 DROPPED
+4) 挂在 Follower 上：新事件 + 状态差量 + 指标
+5) HTTP：SSE /v1/stream
+"""
+
+import json
+from pathlib import Path
+
+import pytest
+
+from cim_worldlab.world.events.event import Event
+from cim_worldlab.world.gateway import FakePluginGateway
+from cim_worldlab.world.persistence import FileEventStore
+from cim_worldlab.world.runtime import EventBroadcaster, Follower, StreamFilter, WorldRuntime
+from cim_worldlab.world.runtime.broadcast import COALESCE, DROP_NEWEST, DROPPED_TYPE, METRICS_TYPE, STATE_DIFF_TYPE
+from cim_worldlab.world.state import WorldState
+
+from helpers import temp_reading
+
+
+def _events(n: int):
+    inputs = [temp_reading(20.0, trace_id=f"TR-{i}", channel="equipment" if i % 2 else "lot") for i in range(n)]
+    return [inp.to_event(t=1).with_seq(i) for i, inp in enumerate(inputs)]
+
+
+def test_each_event_is_serialized_once():
+    b = EventBroadcaster()
+    subs = [b.subscribe() for _ in range(50)]
+    events = _events(10)
+    b.publish(events)
+
+    assert b.encoded == len(events)
+    drained = [sub.drain() for sub in subs]
+    assert all(len(frames) == 10 for frames in drained)
+    assert all(a is c for a, c in zip(drained[0], drained[-1]))
+    assert json.loads(drained[0][3].data)["seq"] == 3
+    assert drained[0][3].sse.startswith(b"id: 3\nevent: EXTERNAL_INPUT\ndata: {")
+
+    b.unsubscribe(subs[0])
+    assert b.subscriber_count == 49
+
+
+def test_filters():
+    b = EventBroadcaster()
+    by_channel = b.subscribe(StreamFilter.of(channels=["lot"]))
+    by_trace = b.subscribe(StreamFilter.of(trace_ids=["TR-3", "TR-4"]))
+    by_type = b.subscribe(StreamFilter.of(types=["WORLD_TICK"]))
+    b.publish([Event(t=1, type="WORLD_TICK", payload={}, seq=99)] + _events(6))
+
+    assert [json.loads(f.data)["seq"] for f in by_channel.drain()] == [0, 2, 4]
+    assert [json.loads(f.data)["seq"] for f in by_trace.drain()] == [3, 4]
+    assert [f.kind for f in by_type.drain()] == ["WORLD_TICK"]
+    assert StreamFilter.of(types=[], channels=None) == StreamFilter()
+
+
+def test_bounded_buffers():
+    b = EventBroadcaster()
+    oldest = b.subscribe(max_frames=3)
+    newest = b.subscribe(StreamFilter(snapshots=True), max_frames=3, policy=DROP_NEWEST)
+    b.publish(_events(5))
+
+    frames = oldest.drain()
+    assert json.loads(frames[0].data) == {"type": DROPPED_TYPE, "count": 2}
+    assert [json.loads(f.data)["seq"] for f in frames[1:]] == [2, 3, 4]
+    assert [json.loads(f.data)["seq"] for f in newest.drain()[1:]] == [0, 1, 2]
+    assert oldest.drain() == [] and oldest.dropped == 2
+
+    with pytest.raises(ValueError):
+        b.subscribe(policy="nope")
+
+
+def test_coalesce_keeps_latest_snapshot():
+    b = EventBroadcaster()
+    sub = b.subscribe(max_frames=10, policy=COALESCE)
+    s0 = WorldState.initial()
+    b.publish(_events(1), state=s0)
+    b.publish([], state=WorldState(t=5, tick_count=5, input_count=0, last_input=None))
+    b.publish([], state=WorldState(t=5, tick_count=5, input_count=2, last_input=None))
+
+    frames = sub.drain()
+    assert [f.kind for f in frames] == ["EXTERNAL_INPUT", STATE_DIFF_TYPE]
+    merged = json.loads(frames[1].data)
+    assert merged["full"] is True
+    assert merged["changed"]["t"] == 5 and merged["changed"]["input_count"] == 2
+
+
+def test_full_state_frame_is_encoded_only_when_coalescing():
+    b = EventBroadcaster()
+    plain = b.subscribe()
+    b.publish([], state=WorldState.initial())
+    b.publish([], state=WorldState(t=5, tick_count=5, input_count=0, last_input=None))
+    assert b.encoded == 2  # 两个差量帧，没有全量帧
+    assert len(plain.drain()) == 2
+
+    subs = [b.subscribe(policy=COALESCE) for _ in range(3)]
+    b.publish([], state=WorldState(t=6, tick_count=6, input_count=0, last_input=None))
+    assert b.encoded == 3  # 缓冲区里没有旧快照：不用合并
+    b.publish([], state=WorldState(t=7, tick_count=7, input_count=0, last_input=None))
+    assert b.encoded == 5  # 合并：全量帧序列化一次，三个订阅者共享
+    assert len({id(sub.drain()[0]) for sub in subs}) == 1
+
+
+def test_follower_publishes_events_and_diffs(tmp_path: Path):
+    store = FileEventStore(path=tmp_path / "events.jsonl")
+    rt = WorldRuntime(event_store=store)
+    follower = Follower(store.path)
+    follower.broadcaster = EventBroadcaster()
+    actions = follower.broadcaster.subscribe(StreamFilter.of(types=["ACTION_EXECUTED"], snapshots=False))
+    everything = follower.broadcaster.subscribe()
+
+    rt.gateway = FakePluginGateway(queued=[temp_reading(99.0, trace_id="TR-1"), temp_reading(20.0, trace_id="TR-2")])
+    rt.tick()
+    rt.ingest_inputs()
+    follower.poll()
+
+    assert [f.kind for f in actions.drain()] == ["ACTION_EXECUTED"]
+    frames = everything.drain()
+    assert len(frames) == len(rt.event_log) + 2
+    diff = json.loads(frames[-2].data)
+    assert frames[-2].kind == STATE_DIFF_TYPE and diff["last_index"] == rt.next_seq - 1
+    assert diff["changed"]["input_count"] == 2 and "action_count" in diff["changed"]
+    assert frames[-1].kind == METRICS_TYPE
+    assert json.loads(frames[-1].data)["metrics"]["inputs_by_channel"] == {"equipment": 2}
+
+    # 没有新事件：不推
+    follower.poll()
+    assert everything.drain() == []
+
+
+def test_http_sse_stream(tmp_path: Path):
+    pytest.importorskip("fastapi")
+    from fastapi.testclient import TestClient
+
+    from cim_worldlab.plugins.follower_app import create_follower_app
+
+    store = FileEventStore(path=tmp_path / "events.jsonl")
+    rt = WorldRuntime(event_store=store, gateway=FakePluginGateway(queued=[temp_reading(99.0, trace_id="TR-1")]))
+    rt.tick()
+    rt.ingest_inputs()
+    client = TestClient(create_follower_app(Follower(store.path), poll_interval=0.01))
+
+    resp = client.get("/v1/stream", params={"type": "ACTION_EXECUTED", "snapshots": "false", "limit": 1})
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("text/event-stream")
+    assert b"event: ACTION_EXECUTED" in resp.content
+
+    resp = client.get("/v1/stream", params={"limit": 1})
+    assert b"event: STATE_DIFF" in resp.content
+    assert client.get("/v1/stream", params={"policy": "bogus"}).status_code == 400
@@ -0,0 +1,165 @@
+"""
+test_causal_index.py
+====================
+验证事件序号与因果索引：
+
+1) runtime 给每条事件分配连续的 seq；决策 / 动作用 cause_id 引用原因
+2) 同一个 tick 里多条决策时，why(动作) 能精确找到它自己的输入（不靠 t）
+3) 老日志（没有 seq / cause_id）读取时升级：seq 按事件序号补上（空行不算），因果按留痕顺序推断
+4) 持久化索引：CLI 多次运行后，文件与日志对齐，read_cause 直接 seek 查询；记录按批写出
+"""
+
+from pathlib import Path
+
+import pytest
+
+from cim_worldlab.cli.commands import cmd_replay, cmd_run_once
+from cim_worldlab.cli.config import CliPaths
+from cim_worldlab.world.events.codec import encode_event
+from cim_worldlab.world.events.event import Event, event_id, parse_event_id
+from cim_worldlab.world.gateway import FakePluginGateway
+from cim_worldlab.world.persistence import EventTailer, FileEventStore, TraceIndex
+from cim_worldlab.world.persistence.file_input_queue import FileInputQueue
+from cim_worldlab.world.runtime import CausalIndex, WorldRuntime
+from cim_worldlab.world.runtime.causal_index import read_cause
+
+from helpers import temp_reading
+
+
+def _run(tmp_path: Path) -> WorldRuntime:
+    rt = WorldRuntime(
+        gateway=FakePluginGateway(queued=[temp_reading(99.0, "EQ-0", "TR-0"), temp_reading(20.0, "EQ-1", "TR-1"), temp_reading(99.0, "EQ-2", "TR-2")]),
+        event_store=FileEventStore(path=tmp_path / "events.jsonl"),
+    )
+    rt.tick()
+    rt.ingest_inputs()
+    return rt
+
+
+def test_event_ids_round_trip():
+    assert event_id(42) == "ev-42"
+    assert parse_event_id("ev-42") == 42 and parse_event_id("7") == 7
+    with pytest.raises(ValueError):
+        parse_event_id("ev-x")
+    e = Event(t=1, type="WORLD_TICK", payload={})
+    assert e.id is None and e.with_seq(3).id == "ev-3"
+    # seq 不参与相等比较
+    assert e.with_seq(3) == e
+
+
+def test_runtime_assigns_seq_and_links_causes(tmp_path: Path):
+    rt = _run(tmp_path)
+    events = rt.event_log.all()
+    assert [e.seq for e in events] == list(range(len(events)))
+    assert rt.next_seq == len(events)
+
+    actions = [e for e in events if e.type == "ACTION_EXECUTED"]
+    assert len(actions) == 2
+    for action in actions:
+        inp, decision, act = rt.why(action.id)
+        assert (inp.type, decision.type, act) == ("EXTERNAL_INPUT", "POLICY_DECISION", action)
+        # 同一个 t 下有多条决策：因果链按 id 精确对应，而不是按 t
+        assert inp.t == decision.t == action.t
+        assert inp.payload["trace_id"] == action.payload["trace_id"]
+        assert decision.payload["cause_id"] == inp.id
+        assert action.payload["cause_id"] == decision.id
+
+    cold = next(e for e in events if e.type == "EXTERNAL_INPUT" and e.payload["trace_id"] == "TR-1")
+    assert rt.causal_index.effects_of(cold.seq) == []
+    assert rt.why(cold.seq) == [cold]
+
+
+def test_replay_continues_numbering(tmp_path: Path):
+    rt = _run(tmp_path)
+    rep = WorldRuntime.replay_from_store(rt.event_store)
+    assert rep.next_seq == rt.next_seq
+    assert rep.event_log.all() == rt.event_log.all()
+    assert [e.seq for e in rep.event_log.all()] == [e.seq for e in rt.event_log.all()]
+    assert rep.tick().seq == rt.next_seq
+
+
+def test_legacy_log_is_upgraded_on_read(tmp_path: Path):
+    rt = _run(tmp_path)
+    legacy = tmp_path / "legacy.jsonl"
+    # 模拟老格式：去掉 seq 和 cause_id
+    lines = []
+    for e in rt.event_log.all():
+        payload = {k: v for k, v in e.payload.items() if k != "cause_id"}
+        lines.append(encode_event(Event(t=e.t, type=e.type, payload=payload)))
+    legacy.write_bytes(b"\n".join(lines) + b"\n")
+    assert b'"seq"' not in legacy.read_bytes()
+
+    old = FileEventStore(path=legacy).load_all()
+    assert [e.seq for e in old] == list(range(len(old)))
+
+    upgraded = CausalIndex.from_events(old)
+    for seq in range(len(old)):
+        assert upgraded.cause_of(seq) == rt.causal_index.cause_of(seq)
+
+
+def test_legacy_log_with_blank_lines(tmp_path: Path):
+    rt = _run(tmp_path)
+    paths = CliPaths(base_dir=tmp_path / "out")
+    paths.base_dir.mkdir()
+    # 老格式 + 中间夹着空行：空行不占序号
+    lines = [encode_event(Event(t=e.t, type=e.type, payload={k: v for k, v in e.payload.items() if k != "cause_id"}))
+             for e in rt.event_log.all()]
+    paths.events.write_bytes(lines[0] + b"\n\n" + b"\n".join(lines[1:]) + b"\n\n")
+
+    n = len(lines)
+    assert [e.seq for e in FileEventStore(path=paths.events).load_all()] == list(range(n))
+    assert FileEventStore(path=paths.events).load_from_index(1)[0].seq == 1
+    assert [e.seq for e in EventTailer(paths.events).poll().events] == list(range(n))
+    index = TraceIndex(paths.events)
+    assert index.sync() == n
+    assert [e.seq for e in index.lookup("TR-2")] == [e.seq for e in rt.event_log.all() if e.payload.get("trace_id") == "TR-2"]
+
+    assert cmd_replay(paths, fast=False)["state"] == cmd_replay(paths, fast=True)["state"]
+    FileInputQueue(path=paths.input_queue).append(temp_reading(99.0, "EQ-3", "TR-3"))
+    cmd_run_once(paths=paths, snapshot_every=0)
+    events = FileEventStore(path=paths.events).load_all()
+    assert [e.seq for e in events] == list(range(len(events)))
+
+
+def test_cli_runs_persist_an_aligned_index(tmp_path: Path):
+    paths = CliPaths(base_dir=tmp_path / "out")
+    q = FileInputQueue(path=paths.input_queue)
+    q.append(temp_reading(99.0, "EQ-0", "TR-0"))
+    cmd_run_once(paths=paths, snapshot_every=0)
+    q.append(temp_reading(99.0, "EQ-1", "TR-1"))
+    cmd_run_once(paths=paths, snapshot_every=0)
+
+    events = FileEventStore(path=paths.events).load_all()
+    # 第二次运行接着上次的 seq / 世界时间
+    assert [e.seq for e in events] == list(range(len(events)))
+    assert [e.t for e in events if e.type == "WORLD_TICK"] == [1, 2]
+
+    assert paths.causal_index.stat().st_size == 8 * len(events)
+    last_action = [e for e in events if e.type == "ACTION_EXECUTED"][-1]
+    decision_seq = read_cause(paths.causal_index, last_action.seq)
+    assert events[decision_seq].type == "POLICY_DECISION"
+    assert events[read_cause(paths.causal_index, decision_seq)].payload["trace_id"] == "TR-1"
+
+
+def test_index_file_is_written_per_batch(tmp_path: Path):
+    rt = _run(tmp_path)
+    events = rt.event_log.all()
+    path = tmp_path / "causal_index.bin"
+
+    idx = CausalIndex(path=path)
+    idx.extend(events)
+    assert not path.exists()  # 只在缓冲里，还没碰文件
+    idx.flush()
+    assert path.stat().st_size == 8 * len(events)
+
+    rt = WorldRuntime(gateway=FakePluginGateway(queued=[temp_reading(99.0, "EQ-0", "TR-0")]))
+    rt.causal_index = CausalIndex.open(path, [])
+    rt.tick()
+    rt.ingest_inputs()
+    assert path.stat().st_size == 8 * len(rt.event_log)
+
+    # flush 之前“崩溃”：文件比日志短，重新打开时按日志重建
+    path.write_bytes(path.read_bytes()[:8])
+    reopened = CausalIndex.open(path, rt.event_log.all())
+    assert path.stat().st_size == 8 * len(rt.event_log)
+    assert [reopened.cause_of(e.seq) for e in rt.event_log.all()] == [rt.causal_index.cause_of(e.seq) for e in rt.event_log.all()]
@@ -10,7 +10,9 @@ test_cli_commands.py
 from pathlib import Path
 
 from cim_worldlab.cli.config import CliPaths
-from cim_worldlab.cli.commands import cmd_run_once, cmd_replay
+from cim_worldlab.cli import commands
+from cim_worldlab.cli.commands import cmd_run, cmd_run_once, cmd_replay
+from cim_worldlab.world.persistence import FileEventStore
 from cim_worldlab.world.persistence.file_input_queue import FileInputQueue
 from cim_worldlab.world.events.external_input import ExternalInput
 
@@ -47,3 +49,27 @@ def test_cmd_replay_returns_state_and_metrics(tmp_path: Path):
     assert rep["event_count"] >= 1
     assert "metrics" in rep
     assert "state" in rep
+
+
+def test_cmd_run_restores_once_and_matches_run_once(tmp_path: Path, monkeypatch):
+    looped, single = CliPaths(base_dir=tmp_path / "looped"), CliPaths(base_dir=tmp_path / "single")
+    for paths in (looped, single):
+        q = FileInputQueue(path=paths.input_queue)
+        for i in range(3):
+            q.append(ExternalInput(source="plugin", channel="equipment", name="TEMP_READING",
+                                   data={"equipment_id": "EQ-1", "temp_c": 90.0 + 3 * i}, trace_id=f"T{i}"))
+
+    for _ in range(4):
+        cmd_run_once(paths=single, snapshot_every=2)
+
+    # cmd_run 只恢复一次 runtime（不每步重读 events.jsonl）
+    builds = []
+    original = commands.build_runtime_for_cli
+    monkeypatch.setattr(commands, "build_runtime_for_cli", lambda *a, **kw: builds.append(1) or original(*a, **kw))
+    cmd_run(ticks=4, sleep_s=0, paths=looped, snapshot_every=2)
+    assert len(builds) == 1
+
+    # Event 的 == 不比较 meta（留痕时间戳每次都不同）
+    assert FileEventStore(path=looped.events).load_all() == FileEventStore(path=single.events).load_all()
+    assert looped.cursor.read_text() == single.cursor.read_text()
+    assert cmd_replay(paths=looped)["state"] == cmd_replay(paths=single)["state"]
@@ -0,0 +1,93 @@
+"""
+test_event_codec.py
+===================
+验证事件编解码器：
+
+1) 各类事件 encode -> decode 往返不变（含中文、嵌套、未知类型）
+2) orjson 与标准库输出完全相同的字节（文件可以混着读写）
+3) 零拷贝：to_dict 不深拷贝 payload；解码出的已知类型名是同一个 str 对象
+4) 队列 / 事件存储 / 快照 走同一套编解码
+"""
+
+import json
+from pathlib import Path
+
+import pytest
+
+from cim_worldlab.world.events import codec
+from cim_worldlab.world.events.action_executed import ActionExecuted
+from cim_worldlab.world.events.decisions_suppressed import DecisionsSuppressed
+from cim_worldlab.world.events.event import Event
+from cim_worldlab.world.events.external_input import ExternalInput
+from cim_worldlab.world.events.policy_decision import PolicyDecision
+from cim_worldlab.world.persistence import FileEventStore, SnapshotStore
+from cim_worldlab.world.persistence.file_input_queue import FileInputQueue
+from cim_worldlab.world.state import WorldState
+
+
+def _samples():
+    inp = ExternalInput(source="plugin", channel="equipment", name="TEMP_READING",
+                        data={"equipment_id": "EQ-1", "temp_c": 95.5, "备注": "过热", "nested": {"a": [1, 2.5, None, True]}},
+                        trace_id="TR-1")
+    return [
+        Event(t=1, type="WORLD_TICK", payload={}),
+        Event(t=2, type="WORLD_TICK", payload={"cli": "run-once"}),
+        inp.to_event(t=2),
+        PolicyDecision("TEMP_HIGH_PAUSE", "ALERT", "PAUSE", "too hot", {"temp_c": 95.5}).to_event(t=2, trace_id="TR-1"),
+        ActionExecuted(action_type="PAUSE", reason="too hot", from_policy_t=2, trace_id="TR-1").to_event(t=2),
+        DecisionsSuppressed("TEMP_HIGH_PAUSE", "EQ-1", 3, 2, 4, "cleared").to_event(t=5),
+        Event(t=6, type="CUSTOM_TYPE", payload={"x": 1}),
+    ]
+
+
+def test_round_trip_all_types():
+    for e in _samples():
+        raw = codec.encode_event(e)
+        assert b"\n" not in raw
+        assert codec.decode_event(raw) == e
+        assert codec.decode_event(raw.decode("utf-8")) == e
+        # 与通用 JSON 的结构完全一致
+        assert json.loads(raw) == e.to_dict()
+
+
+def test_backends_produce_identical_bytes():
+    for e in _samples():
+        std = codec._std_dumps(e.to_dict())
+        assert codec.encode_event(e) == std
+        assert codec.dumps(e.to_dict()) == std
+
+
+@pytest.mark.skipif(not codec.HAS_ORJSON, reason="orjson not installed")
+def test_orjson_falls_back_for_unsupported_payload():
+    e = Event(t=1, type="CUSTOM_TYPE", payload={"counts": {1: "a"}})
+    assert json.loads(codec.encode_event(e)) == {"t": 1, "type": "CUSTOM_TYPE", "payload": {"counts": {"1": "a"}}}
+
+
+def test_zero_copy_and_interned_types():
+    e = _samples()[2]
+    assert e.to_dict()["payload"] is e.payload
+
+    a = codec.decode_event(codec.encode_event(e))
+    b = codec.decode_event(codec.encode_event(e))
+    assert a.type is b.type is codec._INTERNED["EXTERNAL_INPUT"]
+
+
+def test_stores_share_codec(tmp_path: Path):
+    store = FileEventStore(path=tmp_path / "events.jsonl")
+    events = _samples()
+    for e in events:
+        store.append(e)
+    assert store.load_all() == events
+    assert store.load_from_index(5) == events[5:]
+    lines = (tmp_path / "events.jsonl").read_bytes().splitlines()
+    assert lines == [codec.encode_event(e) for e in events]
+
+    q = FileInputQueue(path=tmp_path / "queue.jsonl")
+    inp = ExternalInput(source="human", channel="ops", name="PAUSE", data={"who": "张三"})
+    q.append(inp)
+    assert q.read_since(0) == ([inp], 1)
+
+    snap = SnapshotStore(path=tmp_path / "snapshot.json")
+    snap.save(WorldState.initial(), last_event_index=3, policy_state={"k": [1, 2]})
+    assert snap.load() == (WorldState.initial(), 3)
+    assert snap.load_policy_state() == {"k": [1, 2]}
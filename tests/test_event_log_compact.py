@@ -0,0 +1,85 @@
+"""
+test_event_log_compact.py
+=========================
+验证紧凑的事件表示：
+
+1) Event 使用 __slots__（没有 __dict__）
+2) 解码出的重复字符串被驻留（多个事件共享同一个 str 对象）
+3) ColumnarEventLog 与 EventLog 内容一致，runtime 换成列式日志后行为不变
+4) 列式日志每个事件占用的内存明显更少
+"""
+
+import tracemalloc
+
+from cim_worldlab.world.events.codec import decode_event, encode_event
+from cim_worldlab.world.events.event import Event
+from cim_worldlab.world.gateway import FakePluginGateway
+from cim_worldlab.world.runtime import ColumnarEventLog, EventLog, WorldRuntime
+
+from helpers import temp_reading
+
+
+def test_event_has_no_instance_dict():
+    e = Event(t=1, type="WORLD_TICK", payload={})
+    assert not hasattr(e, "__dict__")
+    assert e == Event(t=1, type="WORLD_TICK", payload={})
+
+
+def test_decoded_strings_are_interned():
+    # 两个事件分别从各自的字节解码：不驻留的话每个字符串都是新对象
+    a = decode_event(encode_event(temp_reading(91.0, "EQ-1", "TR-1").to_event(t=1)))
+    b = decode_event(encode_event(temp_reading(92.0, "EQ-2", "TR-2").to_event(t=2)))
+    assert a.type is b.type
+    assert a.payload["channel"] is b.payload["channel"]
+    assert a.payload["name"] is b.payload["name"]
+    assert list(a.payload["data"])[0] is list(b.payload["data"])[0]
+
+
+def test_columnar_log_round_trips():
+    events = [Event(t=1, type="WORLD_TICK", payload={})]
+    events += [temp_reading(90.0 + i, f"EQ-{i % 3}", f"TR-{i}").to_event(t=1 + i // 2) for i in range(6)]
+    events.append(Event(t=9, type="CUSTOM", payload={"备注": "中文", "xs": [1, 2.5, None]}))
+
+    plain, col = EventLog(), ColumnarEventLog()
+    for e in events:
+        plain.append(e)
+        col.append(e)
+
+    assert len(col) == len(plain) == len(events)
+    assert list(col.all()) == plain.all()
+    assert col[0] == events[0] and col[-1] == events[-1]
+    assert col.all()[2:4] == events[2:4]
+    assert col.last() == plain.last()
+    assert col.type_counts() == {"WORLD_TICK": 1, "EXTERNAL_INPUT": 6, "CUSTOM": 1}
+    assert ColumnarEventLog().last() is None
+
+
+def test_runtime_with_columnar_log_behaves_the_same():
+    def run(log):
+        inputs = [temp_reading(90.0 + i, f"EQ-{i % 3}", f"TR-{i}") for i in range(8)]
+        rt = WorldRuntime(gateway=FakePluginGateway(queued=inputs), event_log=log)
+        rt.tick()
+        rt.ingest_inputs()
+        rt.tick()
+        return rt
+
+    a = run(EventLog())
+    b = run(ColumnarEventLog())
+    assert list(b.event_log.all()) == a.event_log.all()
+    assert b.state == a.state
+    assert b.metrics() == a.metrics()
+
+
+def test_columnar_log_uses_less_memory():
+    lines = [encode_event(temp_reading(90.0 + i, f"EQ-{i % 3}", f"TR-{i}").to_event(t=i)) for i in range(5000)]
+
+    def retained(log):
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        for line in lines:
+            log.append(decode_event(line))
+        after = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        return after - before
+
+    assert retained(ColumnarEventLog()) * 2 < retained(EventLog())
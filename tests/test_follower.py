@@ -0,0 +1,149 @@
+"""
+test_follower.py
+================
+验证只读副本（Follower）：
+
+1) 跟读写入者的日志：状态 == 回放状态，指标 == compute_metrics
+2) 增量：只应用新增的完整行；写到一半的行留到下次
+3) 日志被截断 / 换了一份：从头重建（generation + 1）；轮转后 seq 接得上则接着算
+4) events(from) 分页
+5) HTTP：ETag / If-None-Match -> 304；ETag 与正文在同一次加锁里取（read）
+"""
+
+import os
+import threading
+from pathlib import Path
+
+import pytest
+
+from cim_worldlab.world.gateway import FakePluginGateway
+from cim_worldlab.world.metrics import compute_metrics
+from cim_worldlab.world.persistence import FileEventStore
+from cim_worldlab.world.runtime import Follower, WorldRuntime
+
+from helpers import temp_reading
+
+
+def _run(rt: WorldRuntime, inputs) -> WorldRuntime:
+    rt.gateway = FakePluginGateway(queued=list(inputs))
+    rt.tick()
+    rt.ingest_inputs()
+    return rt
+
+
+def test_follower_matches_writer(tmp_path: Path):
+    store = FileEventStore(path=tmp_path / "events.jsonl")
+    rt = WorldRuntime(event_store=store)
+    follower = Follower(store.path)
+    assert follower.poll() == 0 and follower.last_index == -1
+
+    _run(rt, [temp_reading(99.0 if i % 2 else 20.0, trace_id=f"TR-{i}", channel="equipment" if i % 3 else "lot")
+              for i in range(9)])
+    assert follower.poll() == len(rt.event_log)
+    _run(rt, [temp_reading(99.0, trace_id="TR-100")])
+    follower.poll()
+
+    assert follower.state == rt.state
+    assert follower.metrics() == compute_metrics(rt.state, rt.event_log)
+    assert follower.last_index == rt.next_seq - 1
+    assert follower.etag() == f'"0-{rt.next_seq - 1}"'
+
+
+def test_partial_line_waits_for_next_poll(tmp_path: Path):
+    store = FileEventStore(path=tmp_path / "events.jsonl")
+    rt = _run(WorldRuntime(event_store=store), [temp_reading(20.0, trace_id="TR-0")])
+    follower = Follower(store.path)
+    follower.poll()
+    etag = follower.etag()
+
+    full = store.path.read_bytes()
+    _run(rt, [temp_reading(20.0, trace_id="TR-1")])
+    added = store.path.read_bytes()[len(full):]
+    store.path.write_bytes(full + added[:10])
+    assert follower.poll() == 0
+    assert follower.etag() == etag
+
+    store.path.write_bytes(full + added)
+    assert follower.poll() == 2
+    assert follower.state == rt.state
+
+
+def test_truncation_rebuilds_and_rotation_continues(tmp_path: Path):
+    path = tmp_path / "events.jsonl"
+    rt = _run(WorldRuntime(event_store=FileEventStore(path=path)), [temp_reading(20.0, trace_id=f"TR-{i}") for i in range(3)])
+    follower = Follower(path)
+    follower.poll()
+
+    # 轮转：旧文件挪走，写入者接着往新文件写（seq 接得上）
+    os.replace(path, tmp_path / "events.1.jsonl")
+    _run(rt, [temp_reading(20.0, trace_id="TR-9")])
+    follower.poll()
+    assert follower.generation == 0
+    assert follower.state == rt.state
+    assert [e.seq for e in follower.events(0, 10)] == [4, 5]  # 轮转前的事件不在当前文件里
+
+    # 截断：换成一份全新的日志 -> 重建
+    path.unlink()
+    fresh = _run(WorldRuntime(event_store=FileEventStore(path=path)), [temp_reading(99.0, trace_id="TR-0")])
+    follower.poll()
+    assert follower.generation == 1
+    assert follower.state == fresh.state
+    assert follower.etag() == f'"1-{fresh.next_seq - 1}"'
+
+
+def test_events_paging(tmp_path: Path):
+    store = FileEventStore(path=tmp_path / "events.jsonl")
+    rt = _run(WorldRuntime(event_store=store), [temp_reading(20.0, trace_id=f"TR-{i}") for i in range(7)])
+    follower = Follower(store.path)
+    follower.poll()
+
+    page = follower.events(from_seq=2, limit=3)
+    assert [e.seq for e in page] == [2, 3, 4]
+    assert page == rt.event_log.all()[2:5]
+    assert follower.events(from_seq=rt.next_seq, limit=3) == []
+
+
+def test_http_etag_and_304(tmp_path: Path):
+    pytest.importorskip("fastapi")
+    from fastapi.testclient import TestClient
+
+    from cim_worldlab.plugins.follower_app import create_follower_app
+
+    store = FileEventStore(path=tmp_path / "events.jsonl")
+    rt = _run(WorldRuntime(event_store=store), [temp_reading(99.0, trace_id="TR-1")])
+    client = TestClient(create_follower_app(Follower(store.path)))
+
+    resp = client.get("/v1/state")
+    assert resp.status_code == 200
+    assert resp.json()["state"]["action_count"] == rt.state.action_count
+    etag = resp.headers["etag"]
+    assert client.get("/v1/state", headers={"If-None-Match": etag}).status_code == 304
+
+    _run(rt, [temp_reading(20.0, trace_id="TR-2")])
+    resp = client.get("/v1/state", headers={"If-None-Match": etag})
+    assert resp.status_code == 200 and resp.headers["etag"] != etag
+
+    assert client.get("/v1/metrics").json()["metrics"]["input_count"] == 2
+    page = client.get("/v1/events", params={"from": 1, "limit": 2}).json()
+    assert [e["seq"] for e in page["events"]] == [1, 2] and page["next"] == 3
+
+
+def test_read_holds_off_poll(tmp_path: Path):
+    store = FileEventStore(path=tmp_path / "events.jsonl")
+    rt = _run(WorldRuntime(event_store=store), [temp_reading(20.0, trace_id="TR-0")])
+    follower = Follower(store.path)
+    follower.poll()
+    seen = follower.etag()
+    _run(rt, [temp_reading(20.0, trace_id="TR-1")])
+
+    def etag_and_state():
+        poller = threading.Thread(target=follower.poll)
+        poller.start()
+        poller.join(timeout=0.1)
+        assert poller.is_alive()  # 并发的 poll 要等 read 结束
+        return follower.etag(), follower.state_dict(), poller
+
+    etag, state, poller = follower.read(etag_and_state)
+    poller.join()
+    assert etag == seen and state["input_count"] == 1
+    assert follower.etag() == f'"0-{rt.next_seq - 1}"'
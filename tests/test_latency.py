@@ -0,0 +1,105 @@
+"""
+test_latency.py
+===============
+验证端到端延迟观测：
+
+1) received_ns 随队列进入 EXTERNAL_INPUT 的 meta（不进 payload、不参与 ==）
+2) runtime 挂 LatencyTracker 后按段统计（用假时钟，数值可精确断言）
+3) 时间戳落盘后，离线报告与在线统计一致；replay 出来的状态不受影响
+4) CLI latency 报告
+"""
+
+from pathlib import Path
+
+from cim_worldlab.cli.commands import cmd_latency, cmd_run_once
+from cim_worldlab.cli.config import CliPaths
+from cim_worldlab.world.gateway import FakePluginGateway
+from cim_worldlab.world.persistence import FileEventStore
+from cim_worldlab.world.persistence.file_input_queue import FileInputQueue
+from cim_worldlab.world.runtime import LatencyTracker, WorldRuntime
+from cim_worldlab.world.runtime.latency import latency_report
+
+from helpers import temp_reading
+
+
+class FakeClock:
+    """每次读取前进 step 纳秒。"""
+
+    def __init__(self, start: int, step: int) -> None:
+        self.now = start
+        self.step = step
+
+    def __call__(self) -> int:
+        self.now += self.step
+        return self.now
+
+
+def test_received_ns_travels_through_queue_outside_payload(tmp_path: Path):
+    q = FileInputQueue(path=tmp_path / "q.jsonl")
+    q.append(temp_reading(20.0, trace_id="TR-1", received_ns=123))
+    (read,), _ = q.read_since(0)
+    assert read.received_ns == 123
+    assert read == temp_reading(20.0, trace_id="TR-1")
+
+    e = read.to_event(t=1)
+    assert e.meta == {"received_ns": 123}
+    assert "received_ns" not in e.payload
+    assert e == temp_reading(20.0, trace_id="TR-1").to_event(t=1)
+
+
+def test_runtime_tracks_segments(tmp_path: Path):
+    store = FileEventStore(path=tmp_path / "events.jsonl")
+    tracker = LatencyTracker(clock=FakeClock(start=1_000, step=500))
+    rt = WorldRuntime(
+        gateway=FakePluginGateway(queued=[temp_reading(99.0, trace_id="TR-1", received_ns=0), temp_reading(20.0, trace_id="TR-2", received_ns=0)]),
+        event_store=store,
+        latency=tracker,
+    )
+    rt.tick()
+    rt.ingest_inputs()
+
+    seg = rt.metrics().latency
+    assert seg["receive_to_ingest"]["count"] == 2
+    assert seg["ingest_to_decision"]["count"] == 1
+    assert seg["decision_to_action"]["count"] == 1
+    assert seg["receive_to_action"]["count"] == 1
+    # 每次打点前进 500ns：输入留痕 -> 决策留痕 -> 动作留痕 各差一步
+    assert seg["ingest_to_decision"]["min_us"] == 0.5
+    assert seg["decision_to_action"]["min_us"] == 0.5
+
+    # 离线报告（读落盘的 meta）与在线统计一致
+    offline = latency_report(store.load_all())
+    assert offline["segments"] == tracker.to_dict()
+    assert offline["stamped_events"] == len(rt.event_log)
+
+
+def test_timestamps_do_not_affect_state_or_replay(tmp_path: Path):
+    def run(latency):
+        store = FileEventStore(path=tmp_path / f"events_{latency is not None}.jsonl")
+        rt = WorldRuntime(gateway=FakePluginGateway(queued=[temp_reading(90.0 + i, trace_id=f"TR-{i}", received_ns=i) for i in range(6)]),
+                          event_store=store, latency=latency)
+        rt.tick()
+        rt.ingest_inputs()
+        return rt
+
+    plain = run(None)
+    timed = run(LatencyTracker())
+    assert timed.state == plain.state
+    assert timed.event_log.all() == plain.event_log.all()
+    assert plain.metrics().latency is None
+
+    replayed = WorldRuntime.replay_from_store(timed.event_store)
+    assert replayed.state == plain.state
+    assert all(e.meta and "recorded_ns" in e.meta for e in replayed.event_log.all())
+
+
+def test_cli_latency_report(tmp_path: Path):
+    paths = CliPaths(base_dir=tmp_path / "out")
+    q = FileInputQueue(path=paths.input_queue)
+    q.append(temp_reading(99.0, trace_id="TR-1", received_ns=1))
+    cmd_run_once(paths=paths, snapshot_every=0)
+
+    out = cmd_latency(paths=paths)
+    assert out["stamped_events"] == out["events"] > 0
+    assert out["segments"]["decision_to_action"]["count"] == 1
+    assert out["segments"]["ingest_to_decision"]["count"] == 1
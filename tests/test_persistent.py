@@ -0,0 +1,108 @@
+"""
+test_persistent.py
+==================
+验证持久化数据结构 PMap / PVector：
+
+1) 差分测试：随机 set / delete 序列，结果 == dict（包括哈希完全相同的 key）
+2) 结构共享：旧版本不受后续更新影响
+3) 不可变：copy / deepcopy 返回自己；放进 frozen 状态里 asdict 不复制整棵树；可 pickle
+4) PVector：append / set / 切片 / 负下标 == list
+"""
+
+import copy
+import pickle
+import random
+from dataclasses import asdict, dataclass
+
+import pytest
+
+from cim_worldlab.world.state import PMap, PVector
+
+
+class _SameHash:
+    """哈希全部相同的 key：强制走冲突节点。"""
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+
+    def __hash__(self) -> int:
+        return 42
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, _SameHash) and other.name == self.name
+
+    def __reduce__(self):
+        return (_SameHash, (self.name,))
+
+
+def test_pmap_matches_dict_under_random_ops():
+    rng = random.Random(5)
+    keys = [f"EQ-{i}" for i in range(300)] + list(range(200)) + [_SameHash(f"c{i}") for i in range(8)]
+    m, d = PMap(), {}
+    for step in range(5_000):
+        k = rng.choice(keys)
+        if rng.random() < 0.3:
+            m = m.discard(k)
+            d.pop(k, None)
+        else:
+            m = m.set(k, step)
+            d[k] = step
+        if step % 500 == 0:
+            assert m == d and len(m) == len(d)
+    assert m.to_dict() == d and dict(m.items()) == d
+    assert all(m[k] == v for k, v in d.items())
+    assert all((k in m) == (k in d) for k in keys)
+
+    for k in list(d):
+        m = m.delete(k)
+    assert len(m) == 0 and m == PMap()
+    with pytest.raises(KeyError):
+        m.delete("EQ-0")
+    with pytest.raises(KeyError):
+        m["EQ-0"]
+
+
+def test_pmap_old_versions_are_untouched():
+    v1 = PMap.of({f"k{i}": i for i in range(1_000)})
+    v2 = v1.set("k1", -1).delete("k2").update({"new": 1})
+    assert v1["k1"] == 1 and "k2" in v1 and "new" not in v1 and len(v1) == 1_000
+    assert v2["k1"] == -1 and "k2" not in v2 and v2["new"] == 1 and len(v2) == 1_000
+    assert v1.set("k1", 1) == v1
+
+
+@dataclass(frozen=True)
+class _State:
+    t: int
+    equipment: PMap
+
+
+def test_pmap_inside_frozen_state_is_not_copied():
+    eq = PMap.of(EQ1={"temp_c": 20.0})
+    state = _State(t=1, equipment=eq)
+    assert copy.copy(eq) is eq and copy.deepcopy(eq) is eq
+    assert asdict(state)["equipment"] is eq
+
+    restored = pickle.loads(pickle.dumps(PMap.of({_SameHash("a"): 1, _SameHash("b"): 2, "x": 3})))
+    assert restored == {_SameHash("a"): 1, _SameHash("b"): 2, "x": 3}
+
+
+def test_pvector_matches_list():
+    rng = random.Random(9)
+    v, ref = PVector(), []
+    for i in range(3_000):
+        v = v.append(i)
+        ref.append(i)
+    for _ in range(500):
+        i = rng.randrange(len(ref))
+        v = v.set(i, -i)
+        ref[i] = -i
+    assert v == ref and v.to_list() == ref
+    assert v[-1] == ref[-1] and v[100:2_100:7] == ref[100:2_100:7]
+    assert isinstance(v[1:3], PVector)
+    with pytest.raises(IndexError):
+        v[len(ref)]
+
+    old = PVector(range(40))
+    new = old.set(33, "x").extend(["y", "z"])
+    assert old == list(range(40)) and new[33] == "x" and len(new) == 42
+    assert pickle.loads(pickle.dumps(new)) == new and copy.deepcopy(new) is new
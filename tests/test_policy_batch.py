@@ -0,0 +1,88 @@
+"""
+test_policy_batch.py
+====================
+验证批量策略评估：
+
+1) evaluate_events 与逐事件 evaluate_event 结果完全一致（内容 + 顺序），evaluate_indexed 下标正确
+2) 多条规则（阈值 / 区间 / 非数值 / 缺失字段 / 不匹配的事件）混在一个批次里也一致
+3) NumPy 后端与纯 Python 后端结果一致（没装 NumPy 时跳过对比）
+"""
+
+import math
+
+import pytest
+
+from cim_worldlab.benchmarks import synthetic_events
+from cim_worldlab.world.events.external_input import ExternalInput
+from cim_worldlab.world.policy import BatchEvaluator, PolicyConfig, evaluate_event, evaluate_events, parse_rules
+from cim_worldlab.world.policy.batch import HAS_NUMPY
+
+RULES = parse_rules({"version": 1, "rules": [
+    {"rule_id": "TEMP_HIGH", "match": {"channel": "equipment", "name": "TEMP_READING"},
+     "field": "temp_c", "op": ">", "value": 92.0, "suggested_action": "PAUSE"},
+    {"rule_id": "TEMP_BAND", "match": {"channel": "equipment"},
+     "field": "temp_c", "op": "outside", "value": [70, 90], "suggested_action": "OBSERVE"},
+    {"rule_id": "TEMP_NOT_80", "match": {"channel": "equipment"},
+     "field": "temp_c", "op": "!=", "value": 80, "suggested_action": "OBSERVE"},
+    {"rule_id": "STATE_ALARM", "field": "state", "op": "==", "value": "ALARM", "suggested_action": "PAUSE"},
+]})
+
+
+def _mixed_events(n: int):
+    out = []
+    for i in range(n):
+        data = {"equipment_id": f"EQ-{i % 7}"}
+        if i % 11 != 0:
+            data["temp_c"] = [80.0, 95.5, 60, "91", None, math.nan, 89.9][i % 7]
+        if i % 13 == 0:
+            data["state"] = "ALARM"
+        name = "TEMP_READING" if i % 5 else "STATUS"
+        channel = "equipment" if i % 17 else "mes"
+        out.append(ExternalInput(source="plugin", channel=channel, name=name, data=data).to_event(t=1 + i // 10))
+    return out
+
+
+def _per_event(evaluator, events):
+    return [d for e in events for d in evaluator.evaluate(e)]
+
+
+def _reprs(decisions):
+    # NaN != NaN，用 repr 比较更稳妥
+    return [repr(d) for d in decisions]
+
+
+def test_evaluate_events_matches_evaluate_event():
+    events = list(synthetic_events(2000, seed=3, hot_ratio=0.3))
+    for cfg in (PolicyConfig(), PolicyConfig(temp_high_threshold_c=95.0)):
+        batch = evaluate_events(events, cfg)
+        assert batch == [d for e in events for d in evaluate_event(e, cfg)]
+        assert len(batch) > 0
+
+
+@pytest.mark.parametrize("backend", ["python", "auto"])
+def test_mixed_rules_match_per_event(backend):
+    ev = BatchEvaluator(RULES, backend=backend)
+    events = _mixed_events(500)
+    batch = ev.evaluate_events(events)
+    assert _reprs(batch) == _reprs(_per_event(ev, events))
+    assert {d.rule_id for d in batch} == {r.rule_id for r in RULES}
+    assert ev.evaluate_events([]) == []
+
+    indexed = ev.evaluate_indexed(events)
+    expected = [(i, d) for i, e in enumerate(events) for d in ev.evaluate(e)]
+    assert [(i, repr(d)) for i, d in indexed] == [(i, repr(d)) for i, d in expected]
+
+
+@pytest.mark.skipif(not HAS_NUMPY, reason="NumPy not installed")
+def test_numpy_backend_matches_python_backend():
+    events = _mixed_events(1000)
+    fast = BatchEvaluator(RULES, backend="numpy").evaluate_events(events)
+    slow = BatchEvaluator(RULES, backend="python").evaluate_events(events)
+    assert _reprs(fast) == _reprs(slow)
+    # 决策里的数值是 Python float，不是 numpy 标量
+    assert all(type(d.evidence["temp_c"]) is float for d in fast if "temp_c" in d.evidence)
+
+
+def test_unknown_backend_rejected():
+    with pytest.raises(ValueError):
+        BatchEvaluator(RULES, backend="gpu")
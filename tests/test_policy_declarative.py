@@ -0,0 +1,160 @@
+"""
+test_policy_declarative.py
+==========================
+验证声明式规则：
+
+1) 基线规则文件 reference_policy.json 与内置 evaluate_event 决策完全一致
+2) 各种比较算子 / 嵌套字段路径 / 非数值字段都能正确编译
+3) 同内容只编译一次（按内容缓存，最多留最近几份）
+4) 文件修改后 PolicyFile 热加载；新文件有错（包括 JSON 合法但形状不对）或 stat 后文件消失时保留旧规则
+"""
+
+import json
+import os
+from pathlib import Path
+
+import pytest
+
+from cim_worldlab.world.events.external_input import ExternalInput
+from cim_worldlab.world.policy import PolicyFile, compile_rules, evaluate_event, load_rule_file
+from cim_worldlab.world.policy.declarative import _COMPILE_CACHE_SIZE, load_rule_bytes
+
+REFERENCE_POLICY = Path("projects/P01_single_excursion/baseline/reference_policy.json")
+
+
+def _temp(v, name="TEMP_READING", **extra):
+    data = {"temp_c": v, **extra}
+    return ExternalInput(source="plugin", channel="equipment", name=name, data=data, trace_id="T").to_event(t=3)
+
+
+def test_reference_policy_matches_builtin_rule():
+    reg = load_rule_file(REFERENCE_POLICY)
+    for v in [80, 92, 92.0001, 99.5, "97", "bad", None]:
+        e = _temp(v)
+        assert reg.evaluate(e) == evaluate_event(e)
+    assert reg.evaluate(_temp(99, name="PRESSURE")) == []
+
+
+def test_operators_and_nested_paths():
+    reg = compile_rules({"version": 1, "rules": [
+        {"rule_id": "RANGE", "match": {"channel": "equipment"}, "field": "temp_c", "op": "outside",
+         "value": [60, 90], "severity": "WARN", "suggested_action": "OBSERVE"},
+        {"rule_id": "NESTED", "field": "chamber.pressure_kpa", "op": ">=", "value": 120,
+         "suggested_action": "PAUSE"},
+        {"rule_id": "STATE", "field": "state", "op": "==", "value": "ALARM", "suggested_action": "STOP"},
+    ]})
+
+    assert [d.rule_id for d in reg.evaluate(_temp(55))] == ["RANGE"]
+    assert reg.evaluate(_temp(75)) == []
+
+    nested = _temp(75, chamber={"pressure_kpa": 120})
+    ds = reg.evaluate(nested)
+    assert [d.rule_id for d in ds] == ["NESTED"]
+    assert ds[0].evidence == {"pressure_kpa": 120.0, "threshold": 120.0}
+
+    assert [d.rule_id for d in reg.evaluate(_temp(75, state="ALARM"))] == ["STATE"]
+
+
+@pytest.mark.parametrize("bad", [
+    {"rules": [{"rule_id": "X", "field": "a", "op": "~", "value": 1, "suggested_action": "P"}]},
+    {"rules": [{"rule_id": "X", "field": "a", "op": "between", "value": 1, "suggested_action": "P"}]},
+    {"rules": [{"rule_id": "X", "field": "a", "op": ">", "value": 1}]},
+    {"rules": [{"rule_id": "X", "field": "a", "op": ">", "value": 1, "suggested_action": "P", "reason": "{nope}"}]},
+    {"version": 2, "rules": []},
+    {"rules": [{"rule_id": "X", "field": "state", "op": ">", "value": "B", "suggested_action": "P"}]},
+    {"rules": [{"rule_id": "X", "field": "a", "op": "between", "value": [1, None], "suggested_action": "P"}]},
+    {"rules": [{"rule_id": "X", "match": {"channel": ["equipment"]}, "field": "a", "op": ">", "value": 1,
+                "suggested_action": "P"}]},
+    {"rules": [{"rule_id": "X", "field": "a", "op": ">", "value": 1, "suggested_action": "P", "reason": "{value.foo}"}]},
+    {"rules": [{"rule_id": "X", "field": "a", "op": ">", "value": 1, "suggested_action": "P", "reason": "{value:d}"}]},
+])
+def test_invalid_rules_raise_value_error(bad):
+    with pytest.raises(ValueError):
+        compile_rules(bad)
+
+
+def test_same_content_is_compiled_once(tmp_path: Path):
+    a = tmp_path / "a.json"
+    b = tmp_path / "b.json"
+    raw = REFERENCE_POLICY.read_bytes()
+    a.write_bytes(raw)
+    b.write_bytes(raw)
+    assert load_rule_file(a) is load_rule_file(b)
+
+
+def test_compile_cache_is_bounded():
+    def raw(threshold):
+        doc = json.loads(REFERENCE_POLICY.read_text(encoding="utf-8"))
+        doc["rules"][0]["value"] = threshold
+        return json.dumps(doc).encode("utf-8")
+
+    first = load_rule_bytes(raw(50.0))[1]
+    assert load_rule_bytes(raw(50.0))[1] is first
+    for i in range(_COMPILE_CACHE_SIZE):
+        load_rule_bytes(raw(60.0 + i))
+    assert load_rule_bytes(raw(50.0))[1] is not first  # 最久没用的已被淘汰
+
+
+def test_policy_file_hot_reload(tmp_path: Path):
+    path = tmp_path / "policy.json"
+
+    def write(threshold):
+        doc = json.loads(REFERENCE_POLICY.read_text(encoding="utf-8"))
+        doc["rules"][0]["value"] = threshold
+        path.write_text(json.dumps(doc), encoding="utf-8")
+
+    write(92.0)
+    pf = PolicyFile(path, check_interval_s=0)
+    assert pf.evaluate(_temp(90)) == []
+
+    # 修改阈值：不重启 runtime，下一次 evaluate 就生效
+    write(85.0)
+    st = path.stat()
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+    assert [d.rule_id for d in pf.evaluate(_temp(90))] == ["TEMP_HIGH_PAUSE"]
+    assert pf.reload_count == 2
+
+    # 写坏文件：保留旧规则继续运行，并记录错误
+    path.write_text("{not json", encoding="utf-8")
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 2_000_000))
+    assert [d.rule_id for d in pf.evaluate(_temp(90))] == ["TEMP_HIGH_PAUSE"]
+    assert pf.last_error is not None
+
+
+@pytest.mark.parametrize("content", [
+    "[]",
+    '{"rules": [1]}',
+    '{"rules": [{"rule_id": "X", "match": "x", "field": "temp_c", "op": ">", "value": 1, "suggested_action": "P"}]}',
+    '{"rules": [{"rule_id": "X", "field": "temp_c", "op": ">", "value": 1, "suggested_action": "P", "evidence_keys": "v"}]}',
+    '{"rules": [{"rule_id": "X", "match": {"channel": ["equipment"]}, "field": "temp_c", "op": ">", "value": 1, '
+    '"suggested_action": "P"}]}',
+    '{"rules": [{"rule_id": "X", "field": "temp_c", "op": ">", "value": 1, "suggested_action": "P", "reason": "{value.foo}"}]}',
+    '{"rules": [{"rule_id": "X", "field": "temp_c", "op": ">", "value": 1, "suggested_action": "P", "reason": "{value:d}"}]}',
+])
+def test_hot_reload_keeps_old_rules_on_wrong_shape(tmp_path: Path, content):
+    path = tmp_path / "policy.json"
+    path.write_bytes(REFERENCE_POLICY.read_bytes())
+    pf = PolicyFile(path, check_interval_s=0)
+
+    # 合法 JSON、形状不对：同样是“文件有错”，不能把异常抛进 runtime
+    path.write_text(content, encoding="utf-8")
+    st = path.stat()
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+    assert [d.rule_id for d in pf.evaluate(_temp(99))] == ["TEMP_HIGH_PAUSE"]
+    assert pf.last_error is not None
+    assert pf.reload_count == 1
+
+
+def test_hot_reload_tolerates_file_vanishing_after_stat(tmp_path: Path, monkeypatch):
+    path = tmp_path / "policy.json"
+    path.write_bytes(REFERENCE_POLICY.read_bytes())
+    pf = PolicyFile(path, check_interval_s=0)
+
+    def vanished(self):
+        raise FileNotFoundError(str(self))
+
+    st = path.stat()
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+    monkeypatch.setattr(type(path), "read_bytes", vanished)
+    assert [d.rule_id for d in pf.evaluate(_temp(99))] == ["TEMP_HIGH_PAUSE"]
+    assert pf.last_error is not None
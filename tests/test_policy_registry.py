@@ -0,0 +1,86 @@
+"""
+test_policy_registry.py
+=======================
+验证规则注册表 + 分发索引：
+
+1) 事件只会交给订阅了它的规则（精确 key + 通配 key 都要覆盖）
+2) 多条规则命中时，决策顺序 = 注册顺序
+3) runtime 可以注入自定义 RuleRegistry
+4) 内置 evaluate_event 行为不变
+"""
+
+from cim_worldlab.world.events.event import Event
+from cim_worldlab.world.events.external_input import ExternalInput
+from cim_worldlab.world.events.policy_decision import POLICY_DECISION_TYPE, PolicyDecision
+from cim_worldlab.world.gateway import FakePluginGateway
+from cim_worldlab.world.policy import PolicyRule, RuleRegistry, evaluate_event
+from cim_worldlab.world.runtime import WorldRuntime
+
+
+def _always(rule_id: str, seen: list):
+    def check(e: Event):
+        seen.append(rule_id)
+        return PolicyDecision(rule_id=rule_id, severity="INFO", recommended_action="OBSERVE", reason=rule_id, evidence={})
+    return check
+
+
+def test_dispatch_only_runs_subscribed_rules():
+    seen: list = []
+    reg = RuleRegistry([
+        PolicyRule(rule_id="ANY_INPUT", check=_always("ANY_INPUT", seen)),
+        PolicyRule(rule_id="EQ_TEMP", check=_always("EQ_TEMP", seen), channel="equipment", name="TEMP_READING"),
+        PolicyRule(rule_id="EQ_ANY", check=_always("EQ_ANY", seen), channel="equipment"),
+        PolicyRule(rule_id="ANY_PAUSE", check=_always("ANY_PAUSE", seen), name="PAUSE"),
+        PolicyRule(rule_id="ORDER", check=_always("ORDER", seen), channel="order"),
+    ])
+
+    temp = ExternalInput(source="plugin", channel="equipment", name="TEMP_READING", data={}).to_event(t=1)
+    decisions = reg.evaluate(temp)
+    assert [d.rule_id for d in decisions] == ["ANY_INPUT", "EQ_TEMP", "EQ_ANY"]
+
+    seen.clear()
+    pause = ExternalInput(source="human", channel="ops", name="PAUSE", data={}).to_event(t=1)
+    assert [d.rule_id for d in reg.evaluate(pause)] == ["ANY_INPUT", "ANY_PAUSE"]
+    assert seen == ["ANY_INPUT", "ANY_PAUSE"]
+
+    # 没有规则订阅 WORLD_TICK：直接返回空
+    seen.clear()
+    assert reg.evaluate(Event(t=1, type="WORLD_TICK", payload={})) == []
+    assert seen == []
+
+
+def test_register_after_compile_rebuilds_index():
+    seen: list = []
+    reg = RuleRegistry([PolicyRule(rule_id="A", check=_always("A", seen), channel="equipment")])
+    e = ExternalInput(source="plugin", channel="equipment", name="X", data={}).to_event(t=1)
+    assert [d.rule_id for d in reg.evaluate(e)] == ["A"]
+
+    reg.register(PolicyRule(rule_id="B", check=_always("B", seen), channel="equipment", name="X"))
+    assert [d.rule_id for d in reg.evaluate(e)] == ["A", "B"]
+
+
+def test_runtime_uses_injected_registry():
+    reg = RuleRegistry([PolicyRule(rule_id="ORDER_SEEN", check=_always("ORDER_SEEN", []), channel="order")])
+    fake = FakePluginGateway(queued=[
+        ExternalInput(source="system", channel="order", name="NEW_ORDER", data={"id": "O1"}),
+        ExternalInput(source="plugin", channel="equipment", name="TEMP_READING", data={"temp_c": 99.0}),
+    ])
+    rt = WorldRuntime(gateway=fake, policy=reg)
+    rt.tick()
+    rt.ingest_inputs()
+
+    decisions = [e for e in rt.event_log.all() if e.type == POLICY_DECISION_TYPE]
+    # 注入的注册表替代了内置规则：只有 ORDER_SEEN，没有 TEMP_HIGH_PAUSE
+    assert [e.payload["rule_id"] for e in decisions] == ["ORDER_SEEN"]
+
+
+def test_builtin_temp_rule_unchanged():
+    hot = ExternalInput(source="plugin", channel="equipment", name="TEMP_READING", data={"temp_c": 93}).to_event(t=1)
+    cool = ExternalInput(source="plugin", channel="equipment", name="TEMP_READING", data={"temp_c": 80}).to_event(t=1)
+    other = ExternalInput(source="plugin", channel="equipment", name="PRESSURE", data={"temp_c": 99}).to_event(t=1)
+
+    ds = evaluate_event(hot)
+    assert len(ds) == 1 and ds[0].rule_id == "TEMP_HIGH_PAUSE"
+    assert ds[0].evidence == {"temp_c": 93.0, "threshold_c": 92.0}
+    assert evaluate_event(cool) == []
+    assert evaluate_event(other) == []
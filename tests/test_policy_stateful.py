@@ -0,0 +1,126 @@
+"""
+test_policy_stateful.py
+=======================
+验证有状态窗口规则：
+
+1) k-of-n / run / rate 三种规则的判定逻辑，且不同设备的流互不干扰
+2) max_streams 限制流的数量（内存有上界）
+3) 状态随快照保存：快照回放 / 全量回放后继续运行，决策与“从没重启过”完全一致
+"""
+
+from pathlib import Path
+
+from cim_worldlab.world.events.policy_decision import POLICY_DECISION_TYPE
+from cim_worldlab.world.gateway import FakePluginGateway
+from cim_worldlab.world.persistence import FileEventStore, SnapshotStore
+from cim_worldlab.world.policy import PolicyChain, StatefulPolicy, WindowRule, default_registry
+from cim_worldlab.world.runtime import WorldRuntime
+
+from helpers import temp_reading
+
+MATCH = {"channel": "equipment", "name": "TEMP_READING"}
+
+
+def _reading(eq: str, temp: float, t: int = 1):
+    return temp_reading(temp, eq).to_event(t=t)
+
+
+def _rules():
+    return [
+        WindowRule(rule_id="TEMP_3_OF_5", kind="k_of_n", field="temp_c", op=">", value=92.0, k=3, n=5,
+                   suggested_action="PAUSE", severity="ALERT", match=MATCH),
+        WindowRule(rule_id="TEMP_RUN_4", kind="run", field="temp_c", mean=85.0, run_length=4,
+                   suggested_action="OBSERVE", match=MATCH),
+        WindowRule(rule_id="TEMP_RATE", kind="rate", field="temp_c", max_rate=10.0,
+                   suggested_action="OBSERVE", match=MATCH),
+    ]
+
+
+def _fired(policy, e):
+    return [d.rule_id for d in policy.evaluate(e)]
+
+
+def test_k_of_n_counts_per_equipment():
+    p = StatefulPolicy(_rules()[:1])
+    seq = [93, 80, 93, 80, 93]
+    fired = [_fired(p, _reading("A", v)) for v in seq]
+    # 第 5 个点时：最近 5 个里 3 个超限
+    assert fired == [[], [], [], [], ["TEMP_3_OF_5"]]
+
+    # 另一台设备的流独立计数
+    assert _fired(p, _reading("B", 99)) == []
+
+    # A 继续：93 滑出窗口后 [80,93,80,93,80] 只有 2 个
+    assert _fired(p, _reading("A", 80)) == []
+
+
+def test_run_and_rate_rules():
+    p = StatefulPolicy(_rules()[1:2])
+    fired = [_fired(p, _reading("A", v)) for v in [86, 87, 86, 88, 84]]
+    assert fired == [[], [], [], ["TEMP_RUN_4"], []]
+
+    r = StatefulPolicy(_rules()[2:])
+    assert _fired(r, _reading("A", 80, t=1)) == []
+    assert _fired(r, _reading("A", 85, t=2)) == []
+    assert _fired(r, _reading("A", 99, t=3)) == ["TEMP_RATE"]
+    # 间隔 2 个 tick：变化率 = 18 / 2 = 9，未超限
+    assert _fired(r, _reading("A", 81, t=5)) == []
+
+
+def test_max_streams_bounds_memory():
+    p = StatefulPolicy(_rules()[:1], max_streams=100)
+    for i in range(1000):
+        p.evaluate(_reading(f"EQ-{i}", 90))
+    assert p.stream_count() == 100
+
+
+def _inputs(count: int, offset: int = 0):
+    out = []
+    for i in range(offset, offset + count):
+        eq = f"EQ-{i % 3}"
+        temp = 95.0 if (i // 3) % 2 == 0 else 84.0
+        out.append(temp_reading(temp + (i % 5), eq))
+    return out
+
+
+def _policy():
+    return PolicyChain([default_registry(), StatefulPolicy(_rules())])
+
+
+def _drive(rt: WorldRuntime, inputs, per_tick: int = 4):
+    for i in range(0, len(inputs), per_tick):
+        rt.gateway = FakePluginGateway(queued=list(inputs[i:i + per_tick]))
+        rt.tick()
+        rt.ingest_inputs()
+
+
+def _decisions(rt: WorldRuntime):
+    return [(e.t, e.payload["rule_id"], e.payload["evidence"]) for e in rt.event_log.all() if e.type == POLICY_DECISION_TYPE]
+
+
+def test_replay_restores_policy_state(tmp_path: Path):
+    first, second = _inputs(24), _inputs(24, offset=24)
+
+    # 参照组：一个从不重启的 runtime
+    ref = WorldRuntime(policy=_policy())
+    _drive(ref, first + second)
+
+    # 实验组：跑前半段 -> 快照 -> 快照回放 -> 继续后半段
+    store = FileEventStore(path=tmp_path / "events.jsonl")
+    snap = SnapshotStore(path=tmp_path / "snapshot.json")
+    rt = WorldRuntime(event_store=store, policy=_policy())
+    _drive(rt, first)
+    assert rt.maybe_snapshot(snap, every_n_events=len(rt.event_log))
+    assert snap.load_policy_state() is not None
+
+    fast = WorldRuntime.replay_fast_from_store(store, snap, policy=_policy())
+    _drive(fast, second)
+    assert _decisions(fast) == _decisions(ref)
+
+    # 全量回放（不看快照）也一样
+    full_store = FileEventStore(path=tmp_path / "events_full.jsonl")
+    rt2 = WorldRuntime(event_store=full_store, policy=_policy())
+    _drive(rt2, first)
+    full = WorldRuntime.replay_from_store(full_store, policy=_policy())
+    _drive(full, second)
+    assert _decisions(full) == _decisions(ref)
@@ -0,0 +1,118 @@
+"""
+test_policy_suppression.py
+==========================
+验证决策压制（runtime 的“决策 -> 动作”闸门）：
+
+1) hold-off：同一 (rule_id, 设备) 在窗口内只放行一次，到期时写 N 条被压制的汇总
+2) latch：锁存直到读数恢复正常（清除条件），不同设备互不影响
+3) 告警风暴时事件量显著下降
+4) 快照回放 / 全量回放后继续运行，事件流与“从没重启过”完全一致
+"""
+
+from pathlib import Path
+
+from cim_worldlab.world.events import DECISIONS_SUPPRESSED_TYPE
+from cim_worldlab.world.events.action_executed import ACTION_EXECUTED_TYPE
+from cim_worldlab.world.events.policy_decision import POLICY_DECISION_TYPE
+from cim_worldlab.world.gateway import FakePluginGateway
+from cim_worldlab.world.persistence import FileEventStore, SnapshotStore
+from cim_worldlab.world.policy import DecisionSuppressor, SuppressionConfig
+from cim_worldlab.world.runtime import WorldRuntime
+
+from helpers import temp_reading
+
+
+def _drive(rt: WorldRuntime, batches):
+    for batch in batches:
+        rt.gateway = FakePluginGateway(queued=list(batch))
+        rt.tick()
+        rt.ingest_inputs()
+
+
+def _of_type(rt: WorldRuntime, type_: str):
+    return [e for e in rt.event_log.all() if e.type == type_]
+
+
+def test_holdoff_passes_once_per_window_and_summarizes():
+    rt = WorldRuntime(suppressor=DecisionSuppressor(SuppressionConfig(holdoff_ticks=3)))
+    # 每个 tick：EQ-1 两个超限读数；EQ-2 只在第 1 个 tick 超限
+    batches = [[temp_reading(95, "EQ-1"), temp_reading(96, "EQ-1")] + ([temp_reading(99, "EQ-2")] if t == 0 else []) for t in range(7)]
+    _drive(rt, batches)
+
+    decisions = [(e.t, e.payload["evidence"]["temp_c"]) for e in _of_type(rt, POLICY_DECISION_TYPE)]
+    # t=1 放行（EQ-1 + EQ-2），t=4 hold-off 到期后再放行 EQ-1，t=7 再一次
+    assert decisions == [(1, 95.0), (1, 99.0), (4, 95.0), (7, 95.0)]
+    assert len(_of_type(rt, ACTION_EXECUTED_TYPE)) == 4
+
+    summaries = [(e.t, e.payload["stream"], e.payload["suppressed"], e.payload["first_t"], e.payload["last_t"])
+                 for e in _of_type(rt, DECISIONS_SUPPRESSED_TYPE)]
+    # t=1: 1 条（第二个读数）；t=2、t=3: 各 2 条 -> 共 5 条，在 t=4 的 tick 上汇总
+    assert summaries == [(4, "EQ-1", 5, 1, 3), (7, "EQ-1", 5, 4, 6)]
+    assert rt.suppressor.suppressed_total == 11
+
+
+def test_latch_until_clear_condition():
+    rt = WorldRuntime(suppressor=DecisionSuppressor(SuppressionConfig(latch=True, clear_count=2)))
+    temps = [95, 96, 97, 80, 98, 80, 81, 99]
+    _drive(rt, [[temp_reading(v, "EQ-1")] for v in temps])
+
+    passed = [e.payload["evidence"]["temp_c"] for e in _of_type(rt, POLICY_DECISION_TYPE)]
+    # 80 只出现一次不够清除（clear_count=2），80, 81 连续两次才清除；之后 99 放行
+    assert passed == [95.0, 99.0]
+    [summary] = _of_type(rt, DECISIONS_SUPPRESSED_TYPE)
+    assert summary.payload["suppressed"] == 3
+    assert summary.payload["ended_by"] == "cleared"
+    assert rt.suppressor.active_count() == 1
+
+
+def test_storm_cuts_event_volume():
+    storm = [[temp_reading(95 + i % 3, f"EQ-{i % 4}") for i in range(20)] for _ in range(10)]
+    plain = WorldRuntime()
+    _drive(plain, storm)
+    quiet = WorldRuntime(suppressor=DecisionSuppressor(SuppressionConfig(holdoff_ticks=5)))
+    _drive(quiet, storm)
+    assert len(quiet.event_log) < len(plain.event_log) / 2
+
+
+def _inputs(count: int, offset: int = 0):
+    out = []
+    for i in range(offset, offset + count):
+        hot = (i // 6) % 3 != 2
+        out.append(temp_reading((95.0 if hot else 85.0) + i % 4, f"EQ-{i % 3}"))
+    return out
+
+
+def _events(rt: WorldRuntime):
+    return [(e.t, e.type, e.payload) for e in rt.event_log.all()]
+
+
+def _suppressor():
+    return DecisionSuppressor(SuppressionConfig(holdoff_ticks=2, latch=True))
+
+
+def test_replay_restores_suppression_state(tmp_path: Path):
+    first, second = _inputs(30), _inputs(30, offset=30)
+    batches = lambda xs: [xs[i:i + 3] for i in range(0, len(xs), 3)]
+
+    ref = WorldRuntime(suppressor=_suppressor())
+    _drive(ref, batches(first + second))
+    assert _of_type(ref, DECISIONS_SUPPRESSED_TYPE)
+
+    store = FileEventStore(path=tmp_path / "events.jsonl")
+    snap = SnapshotStore(path=tmp_path / "snapshot.json")
+    rt = WorldRuntime(event_store=store, suppressor=_suppressor())
+    _drive(rt, batches(first))
+    assert rt.maybe_snapshot(snap, every_n_events=len(rt.event_log))
+    assert snap.load_suppression_state() is not None
+    full_store = FileEventStore(path=tmp_path / "events_full.jsonl")
+    for e in store.load_all():
+        full_store.append(e)
+
+    fast = WorldRuntime.replay_fast_from_store(store, snap, suppressor=_suppressor())
+    _drive(fast, batches(second))
+    assert _events(fast) == _events(ref)
+
+    # 全量回放（不看快照）也一样
+    full = WorldRuntime.replay_from_store(full_store, suppressor=_suppressor())
+    _drive(full, batches(second))
+    assert _events(full) == _events(ref)
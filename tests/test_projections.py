@@ -0,0 +1,115 @@
+"""
+test_projections.py
+===================
+验证投影（每台设备的当前状态）：
+
+1) runtime 留痕时增量更新；project(name, key) 查询
+2) 增量结果 == 用全部事件重建的结果；按 channel 分的投影
+3) 动作沿 cause_id 归到触发它的设备；老日志（没有 cause_id）按顺序推断
+4) 投影随快照保存：快照回放 == 全量回放
+5) follower 与 HTTP 查询
+"""
+
+from pathlib import Path
+
+import pytest
+
+from cim_worldlab.world.events.event import Event
+from cim_worldlab.world.events.external_input import ExternalInput
+from cim_worldlab.world.gateway import FakePluginGateway
+from cim_worldlab.world.persistence import FileEventStore, SnapshotStore
+from cim_worldlab.world.projections import KeyedProjection, ProjectionSet, default_projections
+from cim_worldlab.world.runtime import Follower, WorldRuntime
+
+from helpers import temp_reading
+
+
+def _order(i: int) -> ExternalInput:
+    return ExternalInput(source="system", channel="order", name="NEW_ORDER", data={"order_id": f"O-{i}"})
+
+
+def _run(rt: WorldRuntime, inputs) -> WorldRuntime:
+    rt.gateway = FakePluginGateway(queued=list(inputs))
+    rt.tick()
+    rt.ingest_inputs()
+    return rt
+
+
+def test_runtime_maintains_equipment_view(tmp_path: Path):
+    rt = WorldRuntime(projections=default_projections())
+    _run(rt, [temp_reading(20.0, "EQ-1", "TR-0"), temp_reading(99.0, "EQ-2", "TR-1"), _order(2), temp_reading(21.5, "EQ-1", "TR-3")])
+    _run(rt, [temp_reading(30.0, "EQ-3", "TR-4")])
+
+    eq1 = rt.project("equipment", "EQ-1")
+    assert eq1["input_count"] == 2 and eq1["values"] == {"temp_c": 21.5}
+    assert eq1["action_count"] == 0 and eq1["last_action"] is None
+
+    eq2 = rt.project("equipment", "EQ-2")
+    assert eq2["action_count"] == 1
+    assert eq2["last_action"]["action_type"] == rt.state.last_action["action_type"]
+    assert rt.project("equipment", "EQ-404") is None
+    assert rt.project("nope", "EQ-1") is None
+    assert WorldRuntime().project("equipment", "EQ-1") is None
+
+    rebuilt = default_projections()
+    rebuilt.extend(rt.event_log.all())
+    assert rebuilt.snapshot_state() == rt.projections.snapshot_state()
+
+
+def test_channel_projection_and_duplicate_names():
+    ps = ProjectionSet([KeyedProjection("by_channel", key_field=None, fields=())])
+    ps.extend(e.with_seq(i) for i, e in enumerate(inp.to_event(t=1) for inp in [_order(0), temp_reading(20.0, "EQ-1", "TR-1"), _order(2)]))
+    assert ps.get("by_channel", "order")["input_count"] == 2
+    assert ps.get("by_channel", "equipment")["input_count"] == 1
+    with pytest.raises(ValueError):
+        ps.add(KeyedProjection("by_channel"))
+
+
+def test_legacy_events_without_cause_id():
+    p = KeyedProjection()
+    p.observe(temp_reading(99.0, "EQ-9", "TR-0").to_event(t=1))
+    p.observe(Event(t=1, type="POLICY_DECISION", payload={"rule_id": "R"}))
+    p.observe(Event(t=1, type="ACTION_EXECUTED", payload={"action_type": "PAUSE", "reason": "hot"}))
+    assert p.get("EQ-9")["last_action"] == {"t": 1, "action_type": "PAUSE", "reason": "hot"}
+
+
+def test_projection_state_survives_snapshot_replay(tmp_path: Path):
+    store = FileEventStore(path=tmp_path / "events.jsonl")
+    snap = SnapshotStore(path=tmp_path / "snapshot.json")
+    rt = WorldRuntime(event_store=store, projections=default_projections())
+    for i in range(6):
+        _run(rt, [temp_reading(99.0 if i % 2 else 20.0, f"EQ-{i % 3}", f"TR-{i}")])
+        rt.maybe_snapshot(snap, every_n_events=2)
+    assert snap.load_projection_state() is not None
+
+    fast = WorldRuntime.replay_fast_from_store(store, snap, projections=default_projections())
+    full = WorldRuntime.replay_from_store(store, projections=default_projections())
+    assert fast.projections.snapshot_state() == rt.projections.snapshot_state()
+    assert full.projections.snapshot_state() == rt.projections.snapshot_state()
+
+    # 快照里没有投影（老快照）：用全部事件重建
+    snap.save(rt.state, last_event_index=len(rt.event_log) - 1)
+    rebuilt = WorldRuntime.replay_fast_from_store(store, snap, projections=default_projections())
+    assert rebuilt.projections.snapshot_state() == rt.projections.snapshot_state()
+
+
+def test_follower_projection_and_http(tmp_path: Path):
+    store = FileEventStore(path=tmp_path / "events.jsonl")
+    _run(WorldRuntime(event_store=store), [temp_reading(99.0, "EQ-1", "TR-0"), temp_reading(20.0, "EQ-2", "TR-1")])
+    follower = Follower(store.path, projections=default_projections())
+    follower.poll()
+    assert follower.project("equipment", "EQ-1")["action_count"] == 1
+    assert follower.project("equipment", "EQ-2")["values"]["temp_c"] == 20.0
+
+    pytest.importorskip("fastapi")
+    from fastapi.testclient import TestClient
+
+    from cim_worldlab.plugins.follower_app import create_follower_app
+
+    client = TestClient(create_follower_app(follower))
+    assert client.get("/v1/projections").json()["projections"] == {"equipment": 2}
+    resp = client.get("/v1/projections/equipment/EQ-1")
+    assert resp.status_code == 200 and resp.json()["value"]["action_count"] == 1
+    assert client.get("/v1/projections/equipment/EQ-1", headers={"If-None-Match": resp.headers["etag"]}).status_code == 304
+    assert client.get("/v1/projections/equipment/EQ-404").status_code == 404
+    assert client.get("/v1/projections/nope/EQ-1").status_code == 404
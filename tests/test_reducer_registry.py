@@ -0,0 +1,90 @@
+"""
+test_reducer_registry.py
+========================
+验证 reducer 注册表与批量折叠：
+
+1) 差分测试：apply_events（批量折叠）== 逐条 apply_event（随机事件序列、任意起始状态）
+2) 注册新事件类型的处理器：两条路径都生效，且与内置事件交错时结果一致
+3) 替换内置处理器：批量折叠不再走快路径，按注册表来
+"""
+
+import random
+from dataclasses import replace
+
+import pytest
+
+from cim_worldlab.benchmarks.generators import synthetic_events
+from cim_worldlab.world.events.event import Event
+from cim_worldlab.world.state import WorldState, apply_event, apply_events, reducer_for, register_reducer
+from cim_worldlab.world.state.reducer import REDUCERS
+
+
+def _one_by_one(state: WorldState, events) -> WorldState:
+    for e in events:
+        state = apply_event(state, e)
+    return state
+
+
+@pytest.fixture
+def restore_reducers():
+    saved = dict(REDUCERS)
+    yield
+    REDUCERS.clear()
+    REDUCERS.update(saved)
+
+
+def _random_events(rng: random.Random, n: int):
+    out = []
+    for i in range(n):
+        kind = rng.choice(["WORLD_TICK", "EXTERNAL_INPUT", "ACTION_EXECUTED", "POLICY_DECISION", "CUSTOM"])
+        if kind == "WORLD_TICK":
+            out.append(Event(t=i, type=kind, payload={}))
+        elif kind == "EXTERNAL_INPUT":
+            out.append(Event(t=i, type=kind, payload={"channel": "equipment", "name": f"N{i}", "data": {"v": i}}))
+        elif kind == "ACTION_EXECUTED":
+            out.append(Event(t=i, type=kind, payload={"action_type": "HOLD", "reason": f"r{i}", "trace_id": f"TR-{i}"}))
+        else:
+            out.append(Event(t=i, type=kind, payload={"n": i}))
+    return out
+
+
+def test_fold_matches_per_event_reducer():
+    rng = random.Random(7)
+    start = replace(WorldState.initial(), t=3, input_count=5, last_input={"old": True}, action_count=1)
+    for n in (0, 1, 2, 10, 200):
+        events = _random_events(rng, n)
+        assert apply_events(start, events) == _one_by_one(start, events)
+        assert apply_events(WorldState.initial(), events) == _one_by_one(WorldState.initial(), events)
+
+    events = synthetic_events(2_000, seed=3)
+    assert apply_events(WorldState.initial(), events) == _one_by_one(WorldState.initial(), events)
+
+
+def test_fold_does_not_share_payloads():
+    e = Event(t=1, type="EXTERNAL_INPUT", payload={"name": "A"})
+    state = apply_events(WorldState.initial(), [e])
+    assert state.last_input == {"name": "A"} and state.last_input is not e.payload
+
+
+def test_registered_handler_runs_in_both_paths(restore_reducers):
+    assert reducer_for("CUSTOM") is None
+
+    @register_reducer("CUSTOM")
+    def bump(state: WorldState, e: Event) -> WorldState:
+        # 读到折叠中途的状态：证明批量路径把局部变量先落成了 WorldState
+        return replace(state, tick_count=state.tick_count + state.input_count + e.payload["n"])
+
+    assert reducer_for("CUSTOM") is bump
+    events = _random_events(random.Random(11), 300)
+    assert any(e.type == "CUSTOM" for e in events)
+    assert apply_events(WorldState.initial(), events) == _one_by_one(WorldState.initial(), events)
+
+
+def test_replaced_builtin_handler_is_respected(restore_reducers):
+    @register_reducer("WORLD_TICK")
+    def double_tick(state: WorldState, e: Event) -> WorldState:
+        return replace(state, t=e.t, tick_count=state.tick_count + 2)
+
+    events = [Event(t=i, type="WORLD_TICK", payload={}) for i in range(1, 4)]
+    assert apply_events(WorldState.initial(), events).tick_count == 6
+    assert _one_by_one(WorldState.initial(), events).tick_count == 6
@@ -0,0 +1,126 @@
+"""
+test_runtime_fork.py
+====================
+验证 WorldRuntime.fork()（what-if 分叉）：
+
+1) 隔离：分叉之后两边各自跑，父 runtime 的日志 / 状态 / 投影 / 指标 / 因果索引都不受影响
+2) 分叉接着跑的结果 == 从头一直跑（同样的输入序列）的结果；why() 能跨分叉点追溯
+3) 换策略：fork(policy=...) 只影响分叉；有状态策略的窗口状态被复制，父 runtime 的不变
+4) 临时 event_store 里只有分叉之后的事件；run_forks 多进程结果 == 逐个跑
+"""
+
+from dataclasses import asdict
+from pathlib import Path
+
+from cim_worldlab.world.events.action_executed import ACTION_EXECUTED_TYPE
+from cim_worldlab.world.gateway import FakePluginGateway
+from cim_worldlab.world.persistence import FileEventStore
+from cim_worldlab.world.policy import StatefulPolicy, WindowRule
+from cim_worldlab.world.projections import default_projections
+from cim_worldlab.world.runtime import ForkedEventLog, WorldRuntime, run_forks
+
+from helpers import temp_reading
+
+MATCH = {"channel": "equipment", "name": "TEMP_READING"}
+
+
+def _run(rt: WorldRuntime, start: int, count: int) -> WorldRuntime:
+    for i in range(start, start + count):
+        rt.tick()
+        rt.gateway = FakePluginGateway(queued=[temp_reading(99.0 if i % 4 == 0 else 80.0 + i % 5, f"EQ-{i % 3}", f"TR-{i}")])
+        rt.ingest_inputs()
+    return rt
+
+
+def _window_policy(k: int) -> StatefulPolicy:
+    return StatefulPolicy([WindowRule(rule_id="HOT_K_OF_5", kind="k_of_n", field="temp_c", op=">", value=90.0,
+                                      k=k, n=5, suggested_action="PAUSE", match=MATCH)])
+
+
+def _actions(rt: WorldRuntime) -> int:
+    return rt.state.action_count
+
+
+def _simulate(rt: WorldRuntime) -> int:
+    return _actions(_run(rt, 20, 20))
+
+
+def test_fork_is_isolated_from_parent():
+    parent = _run(WorldRuntime(projections=default_projections()), 0, 10)
+    n, state = len(parent.event_log), parent.state
+    eq0 = parent.project("equipment", "EQ-0")
+    metrics = asdict(parent.metrics())
+
+    fork = parent.fork()
+    assert isinstance(fork.event_log, ForkedEventLog)
+    assert fork.state is parent.state  # 不可变状态直接共享
+    _run(fork, 10, 10)
+
+    assert len(parent.event_log) == n
+    assert parent.state == state
+    assert parent.project("equipment", "EQ-0") == eq0
+    assert asdict(parent.metrics()) == metrics
+    assert len(parent.causal_index) == n
+
+    # 父 runtime 之后继续跑也看不到分叉的事件，反之亦然
+    fork_len = len(fork.event_log)
+    _run(parent, 100, 3)
+    assert len(fork.event_log) == fork_len
+    assert fork.event_log[n - 1] == parent.event_log[n - 1]
+    assert fork.event_log[n + 1] != parent.event_log[n + 1]
+
+
+def test_fork_matches_uninterrupted_run():
+    straight = _run(WorldRuntime(projections=default_projections()), 0, 20)
+
+    parent = _run(WorldRuntime(projections=default_projections()), 0, 10)
+    fork = _run(parent.fork(), 10, 10)
+
+    assert list(fork.event_log.all()) == straight.event_log.all()
+    assert fork.state == straight.state
+    assert fork.next_seq == straight.next_seq
+    assert asdict(fork.metrics()) == asdict(straight.metrics())
+    assert fork.project("equipment", "EQ-1") == straight.project("equipment", "EQ-1")
+
+    action = next(e for e in reversed(list(fork.event_log.all())) if e.type == ACTION_EXECUTED_TYPE)
+    assert [e.type for e in fork.why(action.id)] == [e.type for e in straight.why(action.id)]
+    first_input = fork.why(action.id)[0].seq
+    assert fork.causal_index.effects_of(first_input) == straight.causal_index.effects_of(first_input)
+
+
+def test_fork_with_another_policy():
+    parent = _run(WorldRuntime(policy=_window_policy(k=2)), 0, 10)
+    policy_state = parent.policy.snapshot_state()  # type: ignore[union-attr]
+
+    same = _run(parent.fork(), 10, 20)
+    strict = _run(parent.fork(policy=_window_policy(k=5)), 10, 20)
+
+    assert _actions(same) > _actions(strict)
+    assert parent.policy.snapshot_state() == policy_state  # type: ignore[union-attr]
+    assert same.policy is not parent.policy
+
+
+def test_fork_scratch_store_only_has_branch(tmp_path: Path):
+    parent = _run(WorldRuntime(), 0, 5)
+    store = FileEventStore(path=tmp_path / "fork_events.jsonl")
+    fork = _run(parent.fork(event_store=store), 5, 3)
+
+    branch = store.load_all()
+    assert branch == fork.event_log.branch()
+    assert branch[0].seq == len(parent.event_log)
+
+
+def test_run_forks_in_processes_matches_inline():
+    parent = _run(WorldRuntime(policy=_window_policy(k=2)), 0, 20)
+    n = len(parent.event_log)
+
+    def variants():
+        # 传入的策略对象会被分叉直接使用（会被改写），每次都造新的
+        return [{}, {"policy": _window_policy(k=3)}, {"policy": _window_policy(k=5)}, {"policy": None}]
+
+    inline = run_forks(parent, _simulate, variants(), workers=1)
+    parallel = run_forks(parent, _simulate, variants(), workers=2)
+
+    assert parallel == inline
+    assert inline[0] == _simulate(parent.fork())
+    assert len(parent.event_log) == n
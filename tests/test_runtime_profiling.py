@@ -0,0 +1,60 @@
+"""
+test_runtime_profiling.py
+=========================
+验证分阶段计时（StageProfiler）：
+
+1) 挂上 profiler 后，_record / apply_event / evaluate_event / gateway.pull_inputs 都有计数
+2) 嵌套阶段（决策/动作在 _record 里递归记录）能正确形成调用栈
+3) cmd_profile 能写出 JSON / collapsed / cProfile 报告
+"""
+
+import json
+from pathlib import Path
+
+from cim_worldlab.cli.commands import cmd_profile
+from cim_worldlab.cli.config import CliPaths
+from cim_worldlab.world.events.external_input import ExternalInput
+from cim_worldlab.world.gateway import FakePluginGateway
+from cim_worldlab.world.persistence import FileEventStore
+from cim_worldlab.world.runtime import StageProfiler, WorldRuntime
+
+
+def test_profiler_counts_each_stage(tmp_path: Path):
+    fake = FakePluginGateway(queued=[
+        ExternalInput(source="plugin", channel="equipment", name="TEMP_READING", data={"temp_c": 99.0}),
+    ])
+    prof = StageProfiler()
+    rt = WorldRuntime(gateway=fake, event_store=FileEventStore(path=tmp_path / "events.jsonl"), profiler=prof)
+
+    rt.tick()
+    rt.ingest_inputs()
+
+    # WORLD_TICK + EXTERNAL_INPUT + POLICY_DECISION + ACTION_EXECUTED = 4 次 _record
+    assert prof.stages["record"].count == 4
+    assert prof.stages["apply_event"].count == 4
+    assert prof.stages["event_store.append"].count == 4
+    assert prof.stages["evaluate_event"].count == 4
+    assert prof.stages["gateway.pull_inputs"].count == 1
+
+    # 决策事件是在输入事件的 _record 里递归记录的
+    assert ("ingest_inputs", "record", "record", "apply_event") in prof.stacks
+
+    lines = prof.collapsed_lines()
+    assert all(len(line.rsplit(" ", 1)) == 2 for line in lines)
+
+
+def test_cmd_profile_writes_reports(tmp_path: Path):
+    paths = CliPaths(base_dir=tmp_path / "out")
+    report_dir = tmp_path / "report"
+
+    out = cmd_profile(ticks=5, paths=paths, out_dir=report_dir, inputs_per_tick=2)
+
+    assert out["ticks"] == 5
+    assert (report_dir / "stages.json").exists()
+    assert (report_dir / "stages.collapsed").exists()
+    assert (report_dir / "cprofile.txt").exists()
+    assert (report_dir / "tracemalloc.txt").exists()
+
+    stages = json.loads((report_dir / "stages.json").read_text(encoding="utf-8"))["stages"]
+    assert stages["tick"]["count"] == 5
+    assert stages["record"]["count"] >= 15
@@ -0,0 +1,116 @@
+"""
+test_scenario.py
+================
+验证场景运行器（projects/<Pxx>/ 案例）：
+
+1) 案例解析与校验；同一个种子生成的输入完全相同，不同种子带扰动
+2) 单次模拟的打分 == 按同样口径手算（truth 逐条判断，报警 = 触发了决策的输入）
+3) 多进程结果与单进程一致；基线 / 候选的汇总与差值
+4) 缓存：第二次全部命中；换策略只重跑新策略；CLI 跑 P01
+"""
+
+import json
+from pathlib import Path
+
+import pytest
+
+from cim_worldlab.backtest import load_evaluation
+from cim_worldlab.cli.commands import cmd_scenario_run
+from cim_worldlab.scenario import generate_inputs, load_case, load_project, parse_case, run_scenario, run_seed
+
+PROJECT = Path(__file__).resolve().parents[1] / "projects" / "P01_single_excursion"
+REFERENCE_POLICY = PROJECT / "baseline" / "reference_policy.json"
+
+
+def _strict_policy(tmp_path: Path, value: float = 94.0) -> Path:
+    doc = json.loads(REFERENCE_POLICY.read_text(encoding="utf-8"))
+    doc["rules"][0]["value"] = value
+    path = tmp_path / "strict.json"
+    path.write_text(json.dumps(doc), encoding="utf-8")
+    return path
+
+
+def test_case_generation_is_deterministic_per_seed():
+    case = load_case(PROJECT / "case_input.json")
+    assert case.case_id == "P01_single_excursion"
+    a, b, c = generate_inputs(case, 1), generate_inputs(case, 1), generate_inputs(case, 2)
+    assert a == b
+    assert a != c
+    assert len(a) == len(case.equipment) * (case.until // case.every)
+    assert [t for t, _ in a] == sorted(t for t, _ in a)
+
+    hottest = max(inp.data["temp_c"] for _, inp in a)
+    assert hottest > 90.0  # 超限确实出现了
+    assert max(inp.data["temp_c"] for _, inp in a if inp.data["equipment_id"] == "EQ-2") < 90.0
+
+    with pytest.raises(ValueError):
+        parse_case({})
+    with pytest.raises(ValueError):
+        parse_case({"until": 10, "readings": {"equipment": ["EQ-1"]},
+                    "excursions": [{"equipment_id": "EQ-9", "start": 1, "ramp": 1, "peak_temp_c": 99}]})
+
+
+def test_run_seed_scores_like_manual_count():
+    case = load_case(PROJECT / "case_input.json")
+    spec = load_evaluation(PROJECT / "evaluation.yaml")
+    row = run_seed(case, REFERENCE_POLICY.read_bytes(), spec.truth, seed=3, name="baseline")
+
+    temps = [inp.data["temp_c"] for _, inp in generate_inputs(case, 3)]
+    alerted = [x > 92.0 for x in temps]
+    truth = [x > 95.0 for x in temps]
+    assert row["inputs"] == len(temps)
+    assert row["decision_count"] == row["actions"] == sum(alerted)
+    assert row["true_excursions"] == sum(truth)
+    assert row["false_alarms"] == sum(1 for a, t in zip(alerted, truth) if a and not t)
+    assert row["missed"] == 0  # truth 比策略阈值高，不可能漏报
+    assert row["ticks"] < case.until  # skip_idle
+
+
+def test_parallel_matches_inline_and_deltas(tmp_path: Path):
+    strict = _strict_policy(tmp_path)
+    inline = run_scenario(PROJECT, [strict], seeds=6, workers=1)
+    parallel = run_scenario(PROJECT, [strict], seeds=6, workers=3)
+
+    def strip(report):
+        return {name: [{k: v for k, v in r.items() if k != "seconds"} for r in rows]
+                for name, rows in report["runs"].items()}
+
+    assert strip(parallel) == strip(inline)
+    base, cand = inline["summary"]
+    assert (base["candidate"], cand["candidate"]) == ("baseline", "strict")
+    assert base["runs"] == cand["runs"] == 6
+    assert cand["decision_count"] < base["decision_count"]
+    assert cand["d_false_alarm_rate"] == pytest.approx(cand["false_alarm_rate"] - base["false_alarm_rate"])
+    assert "d_miss_rate" not in base
+
+    with pytest.raises(ValueError):
+        run_scenario(PROJECT, [strict, strict], seeds=1)  # 策略重名
+
+
+def test_cache_hits_and_invalidation(tmp_path: Path):
+    cache = tmp_path / "cache"
+    strict = _strict_policy(tmp_path)
+    first = run_scenario(PROJECT, [strict], seeds=4, workers=1, cache_dir=cache)
+    assert (first["computed"], first["cached"]) == (8, 0)
+
+    again = run_scenario(PROJECT, [strict], seeds=4, workers=1, cache_dir=cache)
+    assert (again["computed"], again["cached"]) == (0, 8)
+    assert again["summary"] == first["summary"]
+
+    _strict_policy(tmp_path, value=93.0)  # 同名文件，内容变了：只重跑这个策略
+    changed = run_scenario(PROJECT, [strict], seeds=4, workers=1, cache_dir=cache)
+    assert (changed["computed"], changed["cached"]) == (4, 4)
+
+
+def test_cmd_scenario_run(tmp_path: Path):
+    out_path = tmp_path / "report.json"
+    out = cmd_scenario_run(PROJECT, seeds=3, workers=1, cache_dir=tmp_path / "cache", out_path=out_path)
+    assert out["table"].splitlines()[0].startswith("case P01_single_excursion")
+    assert "baseline" in out["table"]
+    assert json.loads(out_path.read_text(encoding="utf-8"))["seeds"] == [0, 1, 2]
+
+    project = load_project(PROJECT)
+    assert project.evaluation.truth is not None and project.baseline_path == REFERENCE_POLICY
+
+    uncached = cmd_scenario_run(PROJECT, seeds=3, workers=1, use_cache=False)
+    assert uncached["report"]["computed"] == 3
@@ -0,0 +1,114 @@
+"""
+test_sharded_runtime.py
+=======================
+验证分片运行时：
+
+1) 全局顺序回放 == 一个 WorldRuntime 按到达顺序处理同样的输入（逐条事件、状态、指标都相同）
+2) 多进程与单进程（processes=False）结果一致；投影按 key 路由到所属分片
+3) 重启：从各分片的快照 + 事件段恢复，gseq / 世界时间接着走；分片数不能改
+4) 分片出错：错误抛给调用方，其它分片的回复不会留在管道里，runtime 标记为失败
+"""
+
+from pathlib import Path
+
+import pytest
+
+from cim_worldlab.world.gateway import FakePluginGateway
+from cim_worldlab.world.projections import default_projections
+from cim_worldlab.world.runtime import ShardedRuntime, WorldRuntime, shard_of
+from cim_worldlab.world.state import WorldState, apply_events
+
+from helpers import temp_reading
+
+
+def _steps(count: int, per_step: int = 6, offset: int = 0):
+    ks = [[offset + s * per_step + j for j in range(per_step)] for s in range(count)]
+    return [[temp_reading(99.0 if k % 7 == 0 else 20.0 + k % 5, f"EQ-{k % 11}", f"TR-{k}") for k in row] for row in ks]
+
+
+def _single(steps) -> WorldRuntime:
+    rt = WorldRuntime(projections=default_projections())
+    for batch in steps:
+        rt.tick()
+        rt.gateway = FakePluginGateway(queued=list(batch))
+        rt.ingest_inputs()
+    return rt
+
+
+def test_shard_of_is_stable():
+    assert shard_of("EQ-1", 4) == shard_of("EQ-1", 4)
+    assert {shard_of(f"EQ-{i}", 4) for i in range(50)} == {0, 1, 2, 3}
+
+
+@pytest.mark.parametrize("processes", [False, True])
+def test_global_order_matches_single_runtime(tmp_path: Path, processes: bool):
+    steps = _steps(12)
+    ref = _single(steps)
+    with ShardedRuntime(tmp_path / "world", shards=3, projections_factory=default_projections,
+                        processes=processes) as sharded:
+        for batch in steps:
+            sharded.step(batch)
+
+        merged = list(sharded.global_events())
+        assert merged == ref.event_log.all()
+        assert [e.seq for e in merged] == list(range(len(merged)))
+        assert [e.payload.get("cause_id") for e in merged] == [e.payload.get("cause_id") for e in ref.event_log.all()]
+
+        assert apply_events(WorldState.initial(), merged) == ref.state
+        assert sharded.state() == ref.state
+        assert sharded.metrics() == ref.metrics()
+        assert sharded.t == ref.t
+        for eq in ("EQ-0", "EQ-3", "EQ-10"):
+            assert sharded.project("equipment", eq) == ref.project("equipment", eq)
+
+
+def test_restart_resumes_from_segments(tmp_path: Path):
+    first, second = _steps(5), _steps(5, offset=30)
+    ref = _single(first + second)
+    base = tmp_path / "world"
+
+    with ShardedRuntime(base, shards=2, processes=False, snapshot_every=4) as sharded:
+        for batch in first:
+            sharded.step(batch)
+    assert (base / "shard-00" / "snapshot.json").exists()
+
+    with ShardedRuntime(base, shards=2, processes=False) as sharded:
+        assert sharded.t == 5 and sharded.next_gseq == 30
+        for batch in second:
+            sharded.step(batch)
+        assert list(sharded.global_events()) == ref.event_log.all()
+        assert sharded.state() == ref.state
+
+    with pytest.raises(ValueError):
+        ShardedRuntime(base, shards=3, processes=False)
+
+
+class _ExplodingPolicy:
+    """处理到 EQ-BOOM 的输入时抛错（模拟某个分片里的策略 bug）。"""
+
+    def evaluate(self, e):
+        if isinstance(e.payload, dict) and e.payload.get("data", {}).get("equipment_id") == "EQ-BOOM":
+            raise KeyError("boom")
+        return []
+
+
+def _exploding_policy() -> _ExplodingPolicy:
+    return _ExplodingPolicy()
+
+
+@pytest.mark.parametrize("processes", [False, True])
+def test_shard_failure_marks_runtime_failed(tmp_path: Path, processes: bool):
+    boom = temp_reading(20.0, "EQ-BOOM")
+    with ShardedRuntime(tmp_path / "world", shards=3, policy_factory=_exploding_policy,
+                        processes=processes) as sharded:
+        sharded.step(_steps(1)[0])
+        gseq = sharded.next_gseq
+
+        with pytest.raises((RuntimeError, KeyError)):
+            sharded.step([temp_reading(20.0, "EQ-1"), boom, temp_reading(20.0, "EQ-2")])
+        assert sharded.failed is not None
+        assert sharded.next_gseq == gseq and sharded.t == 1
+        # 之后的调用明确失败，而不是读到上一条命令的旧回复
+        for call in (sharded.state, sharded.metrics, sharded.tick, lambda: sharded.project("equipment", "EQ-1")):
+            with pytest.raises(RuntimeError, match="failed"):
+                call()
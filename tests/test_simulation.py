@@ -0,0 +1,112 @@
+"""
+test_simulation.py
+==================
+验证无头加速模拟：
+
+1) InputSchedule：按虚拟时间出队，同一时刻先进先出；脚本文件缺 at 报错
+2) Simulation 逐 tick 跑 == 手写的 tick + ingest 循环（状态、事件数、决策数相同）
+3) skip_idle：决策 / 动作与逐 tick 跑完全一致，tick 事件少得多
+4) MemoryEventStore / BufferedEventStore：模拟结果能直接回放；缓冲写出的文件与 FileEventStore 一致
+"""
+
+import json
+from pathlib import Path
+
+import pytest
+
+from cim_worldlab.cli.commands import cmd_simulate
+from cim_worldlab.world.gateway import FakePluginGateway
+from cim_worldlab.world.persistence import BufferedEventStore, FileEventStore, MemoryEventStore
+from cim_worldlab.world.runtime import InputSchedule, Simulation, WorldRuntime
+
+from helpers import temp_reading
+
+
+def _script(count: int = 30, spacing: int = 7):
+    return [(3 + i * spacing, temp_reading(99.0 if i % 3 == 0 else 20.0, f"EQ-{i % 4}", f"TR-{i}")) for i in range(count)]
+
+
+def test_schedule_orders_by_time_then_insertion(tmp_path: Path):
+    a, b, c = temp_reading(20.0, "EQ-1"), temp_reading(20.0, "EQ-2"), temp_reading(99.0, "EQ-3")
+    schedule = InputSchedule([(5, a), (2, b), (5, c)])
+    assert schedule.next_time() == 2
+    assert schedule.pop_due(1) == []
+    assert schedule.pop_due(5) == [b, a, c]
+    assert len(schedule) == 0 and schedule.next_time() is None
+
+    script = tmp_path / "script.jsonl"
+    script.write_text(json.dumps({"at": 4, "source": "plugin", "channel": "equipment", "name": "TEMP_READING",
+                                  "data": {"temp_c": 1.0}}) + "\n\n")
+    assert InputSchedule.from_jsonl(script).next_time() == 4
+    script.write_text(json.dumps({"source": "plugin", "channel": "equipment", "name": "TEMP_READING"}) + "\n")
+    with pytest.raises(ValueError):
+        InputSchedule.from_jsonl(script)
+
+
+def test_dense_simulation_matches_manual_loop():
+    script = _script()
+    result = Simulation(schedule=InputSchedule(script)).run(until=250)
+
+    manual = WorldRuntime()
+    by_time = {}
+    for at, inp in script:
+        by_time.setdefault(at, []).append(inp)
+    for _ in range(250):
+        manual.tick()
+        manual.gateway = FakePluginGateway(queued=list(by_time.get(manual.t, [])))
+        manual.ingest_inputs()
+
+    assert result.state == manual.state
+    assert result.ticks == 250 and result.t == 250
+    assert result.events == len(manual.event_log)
+    assert len(result.decisions) == manual.state.action_count
+
+
+def _decision_keys(result):
+    # seq / cause_id 会因 tick 事件少了而不同，比较决策本身
+    return [(e.t, e.payload["rule_id"], e.payload["trace_id"], e.payload["evidence"]) for e in result.decisions]
+
+
+def test_skip_idle_keeps_decisions():
+    dense = Simulation(schedule=InputSchedule(_script())).run(until=1_000)
+    sparse = Simulation(schedule=InputSchedule(_script()), skip_idle=True).run(until=1_000)
+
+    assert _decision_keys(sparse) == _decision_keys(dense)
+    assert sparse.state.action_count == dense.state.action_count
+    assert sparse.state.input_count == dense.state.input_count == 30
+    assert sparse.t == dense.t == 1_000
+    assert sparse.ticks == 31  # 每个输入时刻一次 + 最后跳到 until
+    assert dense.ticks == 1_000
+
+    # 已经到了 until：什么都不做
+    again = Simulation(WorldRuntime(t=1_000)).run(until=10)
+    assert again.ticks == 0 and again.events == 0
+
+    with pytest.raises(ValueError):
+        WorldRuntime(t=5).tick(to=5)
+
+
+def test_simulation_stores(tmp_path: Path):
+    memory = MemoryEventStore()
+    result = Simulation(WorldRuntime(event_store=memory), InputSchedule(_script())).run(until=300)
+    assert len(memory) == result.events
+    assert WorldRuntime.replay_from_store(memory).state == result.state  # type: ignore[arg-type]
+
+    buffered = BufferedEventStore(tmp_path / "buffered.jsonl", flush_bytes=4096)
+    direct = FileEventStore(tmp_path / "direct.jsonl")
+    Simulation(WorldRuntime(event_store=buffered), InputSchedule(_script())).run(until=300)
+    Simulation(WorldRuntime(event_store=direct), InputSchedule(_script())).run(until=300)
+    assert buffered.path.read_bytes() == direct.path.read_bytes()
+
+
+def test_cmd_simulate(tmp_path: Path):
+    script = tmp_path / "script.jsonl"
+    script.write_text("".join(
+        json.dumps({"at": at, "source": inp.source, "channel": inp.channel, "name": inp.name, "data": inp.data}) + "\n"
+        for at, inp in _script()
+    ))
+    out_path = tmp_path / "sim_events.jsonl"
+    out = cmd_simulate(script, until=500, skip_idle=True, events_out=out_path)
+    assert out["t"] == 500 and out["state"]["input_count"] == 30
+    assert out["actions"] == out["decisions"] > 0
+    assert len(FileEventStore(out_path).load_all()) == out["events"]
@@ -0,0 +1,115 @@
+"""
+test_snapshot_format.py
+=======================
+验证版本化快照：
+
+1) WorldState 全部字段都进快照（action_count / last_action 不再丢）：快照回放 == 全量回放
+2) 二进制编码：与 JSON 读回来的内容相同、体积更小；损坏的文件报错而不是读出脏数据
+3) 老格式快照（version 1）仍能读，但不拿来当回放起点
+4) verify_snapshot：一致时 ok；快照内容被改坏时指出哪一项不一致
+"""
+
+from pathlib import Path
+
+import pytest
+
+from cim_worldlab.cli.commands import cmd_replay, cmd_run_once
+from cim_worldlab.cli.config import CliPaths
+from cim_worldlab.world.events.codec import dumps, loads
+from cim_worldlab.world.gateway import FakePluginGateway
+from cim_worldlab.world.persistence import FileEventStore, SnapshotStore
+from cim_worldlab.world.projections import default_projections
+from cim_worldlab.world.runtime import WorldRuntime, verify_snapshot
+
+from helpers import temp_reading
+
+
+def _world(tmp_path: Path, snap: SnapshotStore, steps: int = 8) -> WorldRuntime:
+    rt = WorldRuntime(event_store=FileEventStore(path=tmp_path / "events.jsonl"), projections=default_projections())
+    for i in range(steps):
+        rt.gateway = FakePluginGateway(queued=[temp_reading(99.0 if i % 3 == 0 else 20.0, f"EQ-{i % 4}", f"TR-{i}")])
+        rt.tick()
+        rt.ingest_inputs()
+        if i == steps // 2:
+            assert rt.maybe_snapshot(snap, every_n_events=1)
+    return rt
+
+
+@pytest.mark.parametrize("binary", [False, True])
+def test_snapshot_covers_every_state_field(tmp_path: Path, binary: bool):
+    snap = SnapshotStore(path=tmp_path / "snapshot.bin", binary=binary)
+    rt = _world(tmp_path, snap)
+    loaded = snap.load_snapshot()
+    assert loaded is not None and loaded.version == 2 and loaded.complete
+    assert loaded.state.action_count > 0 and loaded.state.last_action is not None
+    assert set(loaded.sections) == {"projections", "metrics"}
+
+    fast = WorldRuntime.replay_fast_from_store(rt.event_store, snap, projections=default_projections())
+    assert fast.state == rt.state
+    assert fast.metrics() == rt.metrics()
+    assert fast.projections.snapshot_state() == rt.projections.snapshot_state()
+
+    check = verify_snapshot(rt.event_store, snap, projections_factory=default_projections)
+    assert check.ok and check.snapshot_found and check.tail_events > 0
+
+
+def test_binary_matches_json_and_detects_corruption(tmp_path: Path):
+    as_json = SnapshotStore(path=tmp_path / "snapshot.json")
+    as_bin = SnapshotStore(path=tmp_path / "snapshot.bin", binary=True)
+    rt = _world(tmp_path, as_json)
+    state = rt.projections.snapshot_state()
+    for store in (as_json, as_bin):
+        store.save(rt.state, last_event_index=len(rt.event_log) - 1, projection_state=state)
+    assert as_bin.load_snapshot() == as_json.load_snapshot()
+    assert as_bin.path.stat().st_size < as_json.path.stat().st_size
+
+    data = bytearray(as_bin.path.read_bytes())
+    as_bin.path.write_bytes(bytes(data[:20]))
+    with pytest.raises(ValueError):
+        as_bin.load_snapshot()
+    data[-1] ^= 0xFF
+    as_bin.path.write_bytes(bytes(data))
+    with pytest.raises(ValueError):
+        as_bin.load_snapshot()
+
+
+def test_legacy_snapshot_is_readable_but_not_trusted(tmp_path: Path):
+    snap = SnapshotStore(path=tmp_path / "snapshot.json")
+    rt = _world(tmp_path, snap)
+    s = rt.state
+    legacy = {
+        "last_event_index": len(rt.event_log) - 1,
+        "state": {"t": s.t, "tick_count": s.tick_count, "input_count": s.input_count, "last_input": s.last_input},
+        "projection_state": rt.projections.snapshot_state(),
+    }
+    snap.path.write_bytes(dumps(legacy))
+
+    loaded = snap.load_snapshot()
+    assert loaded.version == 1 and not loaded.complete and loaded.state.action_count == 0
+    assert snap.load_projection_state() == rt.projections.snapshot_state()
+
+    fast = WorldRuntime.replay_fast_from_store(rt.event_store, snap)
+    assert fast.state == rt.state
+    check = verify_snapshot(rt.event_store, snap)
+    assert not check.ok and check.mismatches == ("snapshot.incomplete",)
+
+
+def test_verify_reports_tampered_sections(tmp_path: Path):
+    snap = SnapshotStore(path=tmp_path / "snapshot.json")
+    rt = _world(tmp_path, snap)
+    obj = loads(snap.path.read_bytes())
+    obj["state"]["action_count"] += 1
+    obj["sections"]["metrics"]["inputs_by_channel"]["equipment"] += 1
+    snap.path.write_bytes(dumps(obj))
+
+    check = verify_snapshot(rt.event_store, snap, projections_factory=default_projections)
+    assert not check.ok
+    assert check.mismatches == ("state.action_count", "metrics")
+
+
+def test_cli_replay_verify(tmp_path: Path):
+    paths = CliPaths(base_dir=tmp_path / "out")
+    cmd_run_once(paths=paths, snapshot_every=1)
+    out = cmd_replay(paths=paths, fast=True, verify=True)
+    assert out["verify"]["ok"] and out["verify"]["snapshot_found"]
+    assert "action_count" in out["state"]
@@ -0,0 +1,106 @@
+"""
+test_snapshot_scheduler.py
+==========================
+验证快照调度：
+
+1) maybe_snapshot 按“距上次快照的事件数”触发：一次留痕好几条事件时不会跳过
+2) SnapshotScheduler：事件数 / 字节数 / 时间 / 预计回放耗时 四种触发条件
+3) 快照回放后，计数起点接着快照往下算
+"""
+
+from pathlib import Path
+
+import pytest
+
+from cim_worldlab.world.gateway import FakePluginGateway
+from cim_worldlab.world.persistence import FileEventStore, SnapshotStore
+from cim_worldlab.world.runtime import ReplayCost, SnapshotScheduler, WorldRuntime
+
+from helpers import temp_reading
+
+
+def _step(rt: WorldRuntime, i: int) -> None:
+    # 命中内置规则：一次 ingest 留痕 输入 + 决策 + 动作 三条事件
+    rt.gateway = FakePluginGateway(queued=[temp_reading(99.0, f"EQ-{i}")])
+    rt.ingest_inputs()
+
+
+def test_maybe_snapshot_does_not_skip_multiples(tmp_path: Path):
+    snap = SnapshotStore(path=tmp_path / "snapshot.json")
+    rt = WorldRuntime()
+    saved = []
+    for i in range(6):
+        _step(rt, i)
+        if rt.maybe_snapshot(snap, every_n_events=5):
+            saved.append(len(rt.event_log))
+    # 事件数 3, 6, 9, ...：以前只有恰好落在 5 的倍数（15）时才会打；现在每攒够 5 条就打
+    assert saved == [6, 12, 18]
+    assert snap.load()[1] == 17
+
+
+class _Clock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_scheduler_triggers(tmp_path: Path):
+    snap = SnapshotStore(path=tmp_path / "snapshot.json")
+    with pytest.raises(ValueError):
+        SnapshotScheduler()
+    with pytest.raises(ValueError):
+        SnapshotScheduler(every_n_events=0)
+
+    rt = WorldRuntime(event_store=FileEventStore(path=tmp_path / "events.jsonl"))
+    by_bytes = SnapshotScheduler(every_bytes=1_000)
+    assert not by_bytes.maybe_snapshot(rt, snap)  # 空日志：什么都不做
+    while not by_bytes.maybe_snapshot(rt, snap):
+        _step(rt, len(rt.event_log))
+    assert by_bytes.last_reason == "bytes" and rt.events_at_snapshot == len(rt.event_log)
+    assert rt.event_store.path.stat().st_size >= 1_000
+
+    clock = _Clock()
+    by_time = SnapshotScheduler(every_seconds=10, clock=clock)
+    _step(rt, 0)
+    assert by_time.due(rt) is None
+    clock.now = 11
+    assert by_time.maybe_snapshot(rt, snap) and by_time.last_reason == "time"
+    clock.now = 30
+    assert by_time.due(rt) is None  # 没有新事件，不必再打
+
+
+def test_replay_cost_target(tmp_path: Path):
+    snap = SnapshotStore(path=tmp_path / "snapshot.json")
+    rt = WorldRuntime()
+    # 每条事件“回放”要 1ms：目标 10ms -> 大约每 10 条事件一个快照
+    slow = ReplayCost(seconds_per_byte=0.0, seconds_per_event=0.001, bytes_per_event=100)
+    scheduler = SnapshotScheduler(max_replay_seconds=0.01, cost=slow)
+    for i in range(20):
+        _step(rt, i)
+        assert scheduler.estimated_replay_seconds(rt) < 0.01 + 3 * 0.001
+        scheduler.maybe_snapshot(rt, snap)
+    assert scheduler.snapshots == 5 and scheduler.last_reason == "replay_cost"
+    assert scheduler.cost is slow
+
+    _step(rt, 20)
+    measured = SnapshotScheduler(max_replay_seconds=60)
+    assert measured.estimated_replay_seconds(rt) > 0
+    assert measured.cost.seconds_per_byte > 0 and measured.cost.bytes_per_event > 0
+
+
+def test_replay_resumes_snapshot_baseline(tmp_path: Path):
+    store = FileEventStore(path=tmp_path / "events.jsonl")
+    snap = SnapshotStore(path=tmp_path / "snapshot.json")
+    rt = WorldRuntime(event_store=store)
+    for i in range(3):
+        _step(rt, i)
+    assert rt.save_snapshot(snap)
+    _step(rt, 3)
+
+    fast = WorldRuntime.replay_fast_from_store(store, snap)
+    assert fast.events_at_snapshot == 9
+    assert not fast.maybe_snapshot(snap, every_n_events=4)
+    _step(fast, 4)
+    assert fast.maybe_snapshot(snap, every_n_events=4)
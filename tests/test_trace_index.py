@@ -0,0 +1,134 @@
+"""
+test_trace_index.py
+===================
+验证 trace 索引与查询：
+
+1) 查询结果 == 全量扫描的结果（顺序为 输入 -> 决策 -> 动作）
+2) 增量维护：日志追加后 sync 只索引新增部分；写到一半的行留到下次
+3) 日志被截断 / 轮转后索引自动重建
+4) 老日志（没有 seq）查询出的事件 seq 按行号补上
+5) CLI trace 命令与 HTTP GET /v1/traces/{id}
+"""
+
+from pathlib import Path
+
+import pytest
+
+from cim_worldlab.cli.commands import cmd_run_once, cmd_trace
+from cim_worldlab.cli.config import CliPaths
+from cim_worldlab.world.events.codec import encode_event
+from cim_worldlab.world.events.event import Event
+from cim_worldlab.world.gateway import FakePluginGateway
+from cim_worldlab.world.persistence import FileEventStore, TraceIndex
+from cim_worldlab.world.persistence.file_input_queue import FileInputQueue
+from cim_worldlab.world.runtime import WorldRuntime
+
+from helpers import temp_reading
+
+
+def _run(store: FileEventStore, inputs, rt: WorldRuntime = None) -> WorldRuntime:
+    rt = rt or WorldRuntime(event_store=store)
+    rt.gateway = FakePluginGateway(queued=list(inputs))
+    rt.tick()
+    rt.ingest_inputs()
+    return rt
+
+
+def _scan(store: FileEventStore, trace_id: str):
+    return [e for e in store.load_all() if e.payload.get("trace_id") == trace_id]
+
+
+def test_lookup_matches_full_scan(tmp_path: Path):
+    store = FileEventStore(path=tmp_path / "events.jsonl")
+    _run(store, [temp_reading(99.0 if i % 3 == 0 else 20.0, f"EQ-{i % 4}", f"TR-{i}") for i in range(30)])
+
+    index = TraceIndex(store.path, buckets=8)
+    assert index.sync() == len(store.load_all())
+    for i in range(30):
+        tid = f"TR-{i}"
+        found = index.lookup(tid)
+        assert found == _scan(store, tid)
+        assert [e.seq for e in found] == [e.seq for e in _scan(store, tid)]
+
+    out = index.trace("TR-3")
+    assert out["chain"] == ["EXTERNAL_INPUT", "POLICY_DECISION", "ACTION_EXECUTED"]
+    assert out["events"][2]["payload"]["cause_id"] == out["events"][1]["id"]
+    assert out["span_t"] == 0 and out["lookup_ms"] >= 0
+    assert index.trace("TR-missing") is None
+
+
+def test_sync_is_incremental_and_skips_partial_lines(tmp_path: Path):
+    store = FileEventStore(path=tmp_path / "events.jsonl")
+    rt = _run(store, [temp_reading(99.0, "EQ-0", "TR-0")])
+    index = TraceIndex(store.path)
+    first = index.sync()
+    assert first == len(store.load_all())
+    assert index.sync() == 0
+
+    _run(store, [temp_reading(99.0, "EQ-1", "TR-1")], rt=rt)
+    # 模拟写到一半的行
+    with store.path.open("ab") as f:
+        f.write(b'{"t":9,"type":"EXTERNAL_INPUT","payload":{"trace_id":"TR-1"')
+    added = index.sync()
+    assert added == rt.next_seq - first
+    assert len(index.lookup("TR-1")) == 3
+
+    # 重新打开索引（从 meta.json 继续）
+    assert TraceIndex(store.path).sync() == 0
+
+
+def test_truncated_log_rebuilds_index(tmp_path: Path):
+    store = FileEventStore(path=tmp_path / "events.jsonl")
+    _run(store, [temp_reading(99.0, f"EQ-{i % 4}", f"TR-{i}") for i in range(5)])
+    index = TraceIndex(store.path)
+    index.sync()
+    assert index.lookup("TR-4")
+
+    store.path.unlink()
+    _run(store, [temp_reading(99.0, "EQ-0", "TR-100")])
+    index.sync()
+    assert index.lookup("TR-4") == []
+    assert [e.type for e in index.lookup("TR-100")] == ["EXTERNAL_INPUT", "POLICY_DECISION", "ACTION_EXECUTED"]
+
+
+def test_legacy_lines_get_seq_from_line_number(tmp_path: Path):
+    path = tmp_path / "events.jsonl"
+    legacy = [
+        Event(t=1, type="WORLD_TICK", payload={}),
+        temp_reading(20.0, "EQ-3", "TR-7").to_event(t=1),
+    ]
+    path.write_bytes(b"".join(encode_event(e) + b"\n" for e in legacy))
+    (found,) = TraceIndex(path).trace("TR-7")["events"]
+    assert found["seq"] == 1 and found["id"] == "ev-1"
+
+
+def test_cli_trace_command(tmp_path: Path):
+    paths = CliPaths(base_dir=tmp_path / "out")
+    FileInputQueue(path=paths.input_queue).append(temp_reading(99.0, "EQ-1", "TR-5"))
+    cmd_run_once(paths=paths, snapshot_every=0)
+
+    out = cmd_trace("TR-5", paths=paths)
+    assert out["found"] is True
+    assert out["chain"] == ["EXTERNAL_INPUT", "POLICY_DECISION", "ACTION_EXECUTED"]
+    assert (paths.traces / "meta.json").exists()
+    assert cmd_trace("nope", paths=paths) == {"trace_id": "nope", "found": False}
+
+
+def test_http_trace_endpoint(tmp_path: Path):
+    pytest.importorskip("fastapi")
+    from fastapi.testclient import TestClient
+
+    from cim_worldlab.plugins.http_ingest_app import create_app
+
+    store = FileEventStore(path=tmp_path / "events.jsonl")
+    _run(store, [temp_reading(99.0, "EQ-1", "TR-1")])
+    app = create_app(
+        queue_factory=lambda: FileInputQueue(path=tmp_path / "q.jsonl"),
+        trace_index_factory=lambda: TraceIndex(store.path),
+    )
+    client = TestClient(app)
+
+    resp = client.get("/v1/traces/TR-1")
+    assert resp.status_code == 200
+    assert resp.json()["chain"] == ["EXTERNAL_INPUT", "POLICY_DECISION", "ACTION_EXECUTED"]
+    assert client.get("/v1/traces/TR-404").status_code == 404
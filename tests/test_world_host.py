@@ -0,0 +1,173 @@
+"""
+test_world_host.py
+==================
+验证多世界托管（WorldHost）：
+
+1) 输入按 world id 路由：每个世界只消费自己的输入，状态互不影响
+2) 空闲卸载：打快照、存游标后卸掉；再用到时懒加载回来，状态与卸载前完全一样，输入不重复消费
+3) max_loaded：超出上限时卸最久没用的世界
+4) 非法 world id 被拒绝；重启后能发现还没消费的输入
+"""
+
+from dataclasses import asdict
+from pathlib import Path
+
+import pytest
+
+from cim_worldlab.cli.commands import cmd_replay
+from cim_worldlab.cli.config import CliPaths
+from cim_worldlab.host import WorldHost, check_world_id
+
+from helpers import temp_reading
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_inputs_are_routed_per_world(tmp_path: Path):
+    host = WorldHost(tmp_path, idle_seconds=None)
+    host.ingest("fab-a", temp_reading(20.0, "EQ-1"))
+    host.ingest("fab-a", temp_reading(99.0, "EQ-1"))
+    host.ingest("fab-b", temp_reading(21.0, "EQ-2"))
+
+    stepped = host.step_all()
+    assert set(stepped) == {"fab-a", "fab-b"}
+
+    assert host.metrics("fab-a").input_count == 2
+    assert host.metrics("fab-b").input_count == 1
+    assert host.project("fab-a", "equipment", "EQ-1")["values"]["temp_c"] == 99.0
+    assert host.project("fab-b", "equipment", "EQ-1") is None
+    host.close()
+
+    # 每个世界的目录就是一个普通的 CLI 输出目录
+    out = cmd_replay(CliPaths(base_dir=tmp_path / "fab-a"), fast=False)
+    assert out["state"]["input_count"] == 2
+
+
+def test_idle_world_is_evicted_and_reloaded(tmp_path: Path):
+    clock = FakeClock()
+    host = WorldHost(tmp_path, idle_seconds=10.0, clock=clock)
+    for i in range(5):
+        host.ingest("fab-a", temp_reading(90.0 + i, f"EQ-{i % 2}"))
+    host.step_all()
+    # 延迟统计只在内存里（不进快照），比较其余指标
+    before = {**asdict(host.metrics("fab-a")), "latency": None}
+    eq = host.project("fab-a", "equipment", "EQ-0")
+
+    clock.now = 5.0
+    assert host.evict_idle() == []
+    clock.now = 20.0
+    assert host.evict_idle() == ["fab-a"]
+    assert host.status()[0]["loaded"] is False
+    assert (tmp_path / "fab-a" / "snapshot.json").exists()
+
+    # 空闲的已卸载世界不参与调度
+    assert host.step_all() == {}
+
+    assert {**asdict(host.metrics("fab-a")), "latency": None} == before
+    assert host.project("fab-a", "equipment", "EQ-0") == eq
+    assert host.status()[0]["loads"] == 2
+
+    # 游标随快照保存：重新加载后不会重复消费旧输入
+    host.ingest("fab-a", temp_reading(20.0, "EQ-0"))
+    host.step_all()
+    assert host.metrics("fab-a").input_count == 6
+    host.close()
+
+
+def test_scheduler_loop_evicts_idle_world(tmp_path: Path):
+    # 和 start() 的后台循环一样：每一轮 step_all + evict_idle
+    clock = FakeClock()
+    host = WorldHost(tmp_path, idle_seconds=10.0, clock=clock)
+    host.ingest("fab-a", temp_reading(20.0, "EQ-1"))
+
+    evicted = []
+    for _ in range(6):
+        stepped = host.step_all()
+        evicted += host.evict_idle()
+        clock.now += 5.0
+        if evicted:
+            break
+    assert evicted == ["fab-a"]
+    assert stepped == {}  # 没有新输入时不 tick
+    assert host.status()[0]["loaded"] is False
+    assert host.metrics("fab-a").input_count == 1
+
+    # 有输入就一直算活跃
+    clock.now += 100.0
+    for i in range(4):
+        host.ingest("fab-a", temp_reading(20.0 + i, "EQ-1"))
+        assert host.step_all().keys() == {"fab-a"}
+        assert host.evict_idle() == []
+        clock.now += 5.0
+    host.close()
+
+
+def test_max_loaded_evicts_least_recently_used(tmp_path: Path):
+    clock = FakeClock()
+    host = WorldHost(tmp_path, idle_seconds=None, max_loaded=2, clock=clock)
+    for i, wid in enumerate(["w1", "w2", "w3"]):
+        clock.now = float(i)
+        host.ingest(wid, temp_reading(20.0, "EQ-1"))
+        host.step(wid)
+
+    host.step_all()
+    loaded = {s["world_id"] for s in host.status() if s["loaded"]}
+    assert len(loaded) == 2
+    host.close()
+
+
+def test_world_ids_are_validated(tmp_path: Path):
+    assert check_world_id("fab-a.01") == "fab-a.01"
+    host = WorldHost(tmp_path)
+    for bad in ["", "../x", ".hidden", "a/b", "a b", "fab-a\n"]:
+        with pytest.raises(ValueError):
+            host.ingest(bad, temp_reading(20.0, "EQ-1"))
+    assert list(tmp_path.iterdir()) == []
+    (tmp_path / "fab-a").mkdir()
+    assert host.exists("fab-a") and not host.exists("fab-a\n")
+    with pytest.raises(ValueError):
+        WorldHost(tmp_path, max_loaded=0)
+    host.close()
+
+
+def test_restart_picks_up_unconsumed_inputs(tmp_path: Path):
+    host = WorldHost(tmp_path, idle_seconds=None)
+    host.ingest("fab-a", temp_reading(20.0, "EQ-1"))
+    host.step_all()
+    host.ingest("fab-a", temp_reading(21.0, "EQ-1"))
+    host.close()
+
+    restarted = WorldHost(tmp_path, idle_seconds=None)
+    assert restarted.world_ids() == ["fab-a"]
+    assert restarted.step_all().keys() == {"fab-a"}
+    assert restarted.metrics("fab-a").input_count == 2
+    restarted.close()
+
+
+def test_http_routes_inputs_by_world(tmp_path: Path):
+    pytest.importorskip("fastapi")
+    from fastapi.testclient import TestClient
+
+    from cim_worldlab.plugins.host_app import create_host_app
+
+    host = WorldHost(tmp_path, idle_seconds=None)
+    client = TestClient(create_host_app(host, schema_path=Path("schemas/input.schema.json")))
+    body = {"source": "plugin", "channel": "equipment", "name": "TEMP_READING",
+            "data": {"equipment_id": "EQ-1", "temp_c": 99.0}}
+
+    assert client.post("/v1/worlds/fab-a/inputs", json=body).status_code == 200
+    assert client.post("/v1/worlds/fab-a/inputs", json={**body, "source": "robot"}).status_code == 400
+    assert client.get("/v1/worlds/nope/metrics").status_code == 404
+    host.step_all()
+
+    r = client.get("/v1/worlds/fab-a/metrics")
+    assert r.status_code == 200 and r.json()["metrics"]["input_count"] == 1
+    assert client.get("/v1/worlds/fab-a/projections/equipment/EQ-1").json()["value"]["values"]["temp_c"] == 99.0
+    assert [w["world_id"] for w in client.get("/v1/worlds").json()["worlds"]] == ["fab-a"]
+    host.close()